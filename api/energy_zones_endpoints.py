@@ -78,19 +78,18 @@ async def get_current_energy_zone(user_id: str):
     try:
         logger.info(f"Getting current energy zone for user {user_id}")
 
-        # Get current zone from full analysis
-        zones_result = await ai_energy_zones_service.calculate_energy_zones(user_id)
+        # Stored zones + interval index: no AI call while the result is unexpired
+        stored = await ai_energy_zones_service.get_stored_zones(user_id)
+        zones_result = stored.result
         current_time = datetime.now().time()
 
-        # Find current active zone
-        current_zone = None
-        for zone in zones_result.energy_zones:
-            if zone.start_time <= current_time <= zone.end_time:
-                current_zone = zone
-                break
+        current_zone = stored.index.zone_at(current_time)
+        next_zone = stored.index.next_zone(current_time)
 
         current_status = {
             "current_zone": current_zone.to_dict() if current_zone else None,
+            "time_remaining_minutes": current_zone.time_remaining_minutes(current_time) if current_zone else 0,
+            "next_zone": next_zone.to_dict() if next_zone else None,
             "energy_mode": zones_result.detected_mode.value,
             "confidence": zones_result.confidence_score
         }
@@ -118,7 +117,7 @@ async def get_energy_zones_summary(user_id: str):
     try:
         logger.info(f"Getting energy zones summary for user {user_id}")
 
-        # Get summary from AI analysis
+        # Get summary from stored (or freshly calculated) zones
         zones_result = await ai_energy_zones_service.calculate_energy_zones(user_id)
 
         summary = {
@@ -130,7 +129,7 @@ async def get_energy_zones_summary(user_id: str):
                 "sleep_time": zones_result.sleep_schedule.estimated_bedtime.strftime("%H:%M"),
                 "chronotype": zones_result.sleep_schedule.chronotype.value
             },
-            "zones_preview": [{"name": z.name, "start_time": z.start_time.strftime("%H:%M")} for z in zones_result.energy_zones[:3]]
+            "zones_preview": [{"name": z.zone_name.value, "start_time": z.start_time.strftime("%H:%M")} for z in zones_result.energy_zones[:3]]
         }
 
         return {
@@ -173,7 +172,7 @@ async def get_energy_zones_for_planning(
                     detail="Invalid date format. Use YYYY-MM-DD"
                 )
 
-        # Get zones for planning from AI analysis
+        # Get zones for planning from stored (or freshly calculated) zones
         zones_result = await ai_energy_zones_service.calculate_energy_zones(user_id)
 
         planning_zones = {
@@ -323,7 +322,8 @@ async def energy_zones_health_check():
                 "mode_detector": "operational",
                 "zones_calculator": "operational",
                 "debug_logging": "enabled"
-            }
+            },
+            "result_store": ai_energy_zones_service.store.get_stats()
         }
 
         return {
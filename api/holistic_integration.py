@@ -16,6 +16,9 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from shared_libs.supabase_client.adapter import SupabaseAsyncPGAdapter
+from shared_libs.utils.context_assembler import (
+    ContextAssembler, ContextSource, DEFAULT_SOURCE_TIMEOUT, SLOW_SOURCE_TIMEOUT
+)
 
 logger = logging.getLogger(__name__)
 
@@ -494,6 +497,100 @@ async def list_analysis_results(
         )
 
 
+def _parse_json_field(value: Any, fallback: Any) -> Any:
+    """analysis_result/source_data come back as JSON strings over the REST API"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return fallback
+    return value
+
+
+async def _fetch_primary_analysis(ctx: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    primary_query = """
+        SELECT
+            id, user_id, analysis_type, archetype, analysis_result,
+            created_at, analysis_date, confidence_score
+        FROM holistic_analysis_results
+        WHERE id = $1
+    """
+    return await ctx["db"].fetchrow(primary_query, ctx["analysis_result_id"])
+
+
+async def _fetch_latest_analysis_result(ctx: Dict[str, Any], analysis_type: str) -> Optional[Any]:
+    """Latest analysis_result of a type for the primary analysis' user"""
+    if not ctx["primary"]:
+        return None
+    query = """
+        SELECT analysis_result
+        FROM holistic_analysis_results
+        WHERE user_id = $1
+        AND analysis_type = $2
+        ORDER BY created_at DESC
+        LIMIT 1
+    """
+    row = await ctx["db"].fetchrow(query, ctx["primary"]["user_id"], analysis_type)
+    return _parse_json_field(row['analysis_result'], {}) if row else None
+
+
+async def _fetch_context_memory(ctx: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if not ctx["primary"]:
+        return None
+    memory_query = """
+        SELECT context_summary, source_data
+        FROM holistic_memory_analysis_context
+        WHERE user_id = $1
+        ORDER BY created_at DESC
+        LIMIT 1
+    """
+    memory = await ctx["db"].fetchrow(memory_query, ctx["primary"]["user_id"])
+    if not memory:
+        return None
+    return {
+        "summary": memory['context_summary'],
+        "source_data": _parse_json_field(memory['source_data'], {})
+    }
+
+
+async def _fetch_plan_items(ctx: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Keyed by the analysis id, so it runs alongside the primary lookup
+    # (non-routine analyses simply have no items)
+    items_query = """
+        SELECT
+            id, item_id, time_block, title,
+            scheduled_time, task_type
+        FROM plan_items
+        WHERE analysis_result_id = $1
+        ORDER BY scheduled_time
+    """
+    items = await ctx["db"].fetch(items_query, ctx["analysis_result_id"])
+    return [
+        {
+            "id": str(item['id']),
+            "item_id": item['item_id'],
+            "time_block": item['time_block'],
+            "title": item['title'],
+            "scheduled_time": serialize_datetime(item['scheduled_time']),
+            "task_type": item['task_type']
+        }
+        for item in items or []
+    ]
+
+
+# primary -> (behavior, circadian, memory) need the user id; plan items only need the analysis id.
+# The primary analysis is required (a timeout fails the request), so it gets the slow timeout
+full_context_assembler = ContextAssembler("full_context", [
+    ContextSource("primary", _fetch_primary_analysis, required=True, timeout=SLOW_SOURCE_TIMEOUT),
+    ContextSource("behavior_analysis", lambda ctx: _fetch_latest_analysis_result(ctx, "behavior_analysis"),
+                  depends_on=("primary",), timeout=DEFAULT_SOURCE_TIMEOUT),
+    ContextSource("circadian_analysis", lambda ctx: _fetch_latest_analysis_result(ctx, "circadian_analysis"),
+                  depends_on=("primary",), timeout=DEFAULT_SOURCE_TIMEOUT),
+    ContextSource("context_memory", _fetch_context_memory, depends_on=("primary",), timeout=DEFAULT_SOURCE_TIMEOUT),
+    ContextSource("plan_items", _fetch_plan_items, default=[], timeout=DEFAULT_SOURCE_TIMEOUT),
+])
+
+
 @router.get("/analysis-results/{analysis_result_id}/full-context")
 async def get_full_context(analysis_result_id: str):
     """
@@ -506,7 +603,10 @@ async def get_full_context(analysis_result_id: str):
     - Context memory
     - Plan items (if routine_plan)
 
-    This is an optimization endpoint to reduce multiple API calls
+    This is an optimization endpoint to reduce multiple API calls.
+    Secondary sources are fetched concurrently once the primary analysis is
+    known; one that fails or times out is omitted and listed in
+    metadata.degraded_sources.
 
     Args:
         analysis_result_id: UUID of the primary analysis result
@@ -518,16 +618,8 @@ async def get_full_context(analysis_result_id: str):
         logger.info(f"Fetching full context for analysis: {analysis_result_id}")
 
         db = await holistic_data_service._ensure_db_connection()
-        # Get primary analysis
-        primary_query = """
-            SELECT
-                id, user_id, analysis_type, archetype, analysis_result,
-                created_at, analysis_date, confidence_score
-            FROM holistic_analysis_results
-            WHERE id = $1
-        """
-
-        primary = await db.fetchrow(primary_query, analysis_result_id)
+        assembled = await full_context_assembler.assemble(db=db, analysis_result_id=analysis_result_id)
+        primary = assembled["primary"]
 
         if not primary:
             raise HTTPException(
@@ -535,112 +627,32 @@ async def get_full_context(analysis_result_id: str):
                 detail=f"Analysis result not found: {analysis_result_id}"
             )
 
-        user_id = primary['user_id']
-        analysis_date = primary['analysis_date']
-
-        # Parse primary analysis result
-        primary_result = primary['analysis_result']
-        if isinstance(primary_result, str):
-            try:
-                primary_result = json.loads(primary_result)
-            except json.JSONDecodeError:
-                pass
-
         # Build context bundle
         context = {
             "analysis_id": str(primary['id']),
-            "user_id": user_id,
+            "user_id": primary['user_id'],
             "analysis_type": primary['analysis_type'],
             "archetype": primary['archetype'],
-            "analysis_date": serialize_datetime(analysis_date),
-            "primary_analysis": primary_result
+            "analysis_date": serialize_datetime(primary['analysis_date']),
+            "primary_analysis": _parse_json_field(primary['analysis_result'], primary['analysis_result'])
         }
 
-        # Get behavior analysis
-        behavior_query = """
-            SELECT analysis_result
-            FROM holistic_analysis_results
-            WHERE user_id = $1
-            AND analysis_type = 'behavior_analysis'
-            ORDER BY created_at DESC
-            LIMIT 1
-        """
-        behavior = await db.fetchrow(behavior_query, user_id)
-        if behavior:
-            behavior_result = behavior['analysis_result']
-            if isinstance(behavior_result, str):
-                try:
-                    behavior_result = json.loads(behavior_result)
-                except json.JSONDecodeError:
-                    behavior_result = {}
-            context['behavior_analysis'] = behavior_result
-
-        # Get circadian analysis
-        circadian_query = """
-            SELECT analysis_result
-            FROM holistic_analysis_results
-            WHERE user_id = $1
-            AND analysis_type = 'circadian_analysis'
-            ORDER BY created_at DESC
-            LIMIT 1
-        """
-        circadian = await db.fetchrow(circadian_query, user_id)
-        if circadian:
-            circadian_result = circadian['analysis_result']
-            if isinstance(circadian_result, str):
-                try:
-                    circadian_result = json.loads(circadian_result)
-                except json.JSONDecodeError:
-                    circadian_result = {}
-            context['circadian_analysis'] = circadian_result
-
-        # Get context memory
-        memory_query = """
-            SELECT context_summary, source_data
-            FROM holistic_memory_analysis_context
-            WHERE user_id = $1
-            ORDER BY created_at DESC
-            LIMIT 1
-        """
-        memory = await db.fetchrow(memory_query, user_id)
-        if memory:
-            source_data = memory['source_data']
-            if isinstance(source_data, str):
-                try:
-                    source_data = json.loads(source_data)
-                except json.JSONDecodeError:
-                    source_data = {}
-            context['context_memory'] = {
-                "summary": memory['context_summary'],
-                "source_data": source_data
-            }
+        for key in ("behavior_analysis", "circadian_analysis", "context_memory"):
+            if assembled[key] is not None:
+                context[key] = assembled[key]
 
-        # Get plan items if this is a routine_plan
+        # Plan items only belong to a routine_plan
         if primary['analysis_type'] == 'routine_plan':
-            items_query = """
-                SELECT
-                    id, item_id, time_block, title,
-                    scheduled_time, task_type
-                FROM plan_items
-                WHERE analysis_result_id = $1
-                ORDER BY scheduled_time
-            """
-            items = await db.fetch(items_query, analysis_result_id)
-            context['plan_items'] = [
-                {
-                    "id": str(item['id']),
-                    "item_id": item['item_id'],
-                    "time_block": item['time_block'],
-                    "title": item['title'],
-                    "scheduled_time": serialize_datetime(item['scheduled_time']),
-                    "task_type": item['task_type']
-                }
-                for item in items
-            ]
+            context['plan_items'] = assembled["plan_items"]
 
         return {
             "success": True,
-            "data": context
+            "data": context,
+            "metadata": {
+                "fetch_duration_ms": assembled.duration_ms,
+                "sources": assembled.timings(),
+                "degraded_sources": assembled.degraded
+            }
         }
 
     except HTTPException:
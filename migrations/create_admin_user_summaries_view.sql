@@ -0,0 +1,40 @@
+-- Migration: Create admin_user_summaries view
+-- Purpose: One row per profile with its analysis count, latest analysis time
+--          and latest archetype, so the admin users page is a single query
+--          instead of two queries per user
+-- Used by: GET /api/admin/users (services/api_gateway/admin_apis.py)
+
+CREATE OR REPLACE VIEW admin_user_summaries AS
+SELECT
+    p.id::TEXT AS id,
+    p.data,
+    p.created_at,
+    COALESCE(
+        p.data->>'name',
+        p.data->'profileInfo'->>'externalId',
+        'User ' || LEFT(p.id::TEXT, 8)
+    ) AS display_name,
+    -- Lower-cased name + id for ilike search
+    LOWER(COALESCE(p.data->>'name', '') || ' ' || COALESCE(p.data->'profileInfo'->>'externalId', '') || ' ' || p.id::TEXT) AS search_text,
+    COALESCE(a.total_analyses, 0) AS total_analyses,
+    a.last_analysis_at,
+    -- Non-null sort key for keyset pagination (users without analyses sort last)
+    COALESCE(a.last_analysis_at, '-infinity'::TIMESTAMPTZ) AS last_analysis_sort,
+    a.latest_archetype
+FROM profiles p
+LEFT JOIN LATERAL (
+    SELECT
+        COUNT(*) AS total_analyses,
+        MAX(h.created_at) AS last_analysis_at,
+        (ARRAY_AGG(h.archetype ORDER BY h.created_at DESC))[1] AS latest_archetype
+    FROM holistic_analysis_results h
+    WHERE h.user_id = p.id::TEXT
+) a ON TRUE;
+
+COMMENT ON VIEW admin_user_summaries IS
+'Admin dashboard user list: profile plus analysis count, last analysis and latest archetype';
+
+-- Keyset pagination by profile creation and the per-user aggregate
+CREATE INDEX IF NOT EXISTS idx_profiles_created_at_id ON profiles(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_holistic_analysis_results_user_created
+    ON holistic_analysis_results(user_id, created_at DESC);
@@ -0,0 +1,34 @@
+-- Migration: Create background_jobs table for the durable background job store
+-- Purpose: Persist Sahha archival jobs so deploys/restarts don't drop them
+-- Used by: services/background/job_store.py (JOB_STORE_BACKEND=supabase)
+
+-- Timestamps are epoch seconds (DOUBLE PRECISION) to match the local SQLite store
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id TEXT PRIMARY KEY,
+    job_type TEXT NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    status TEXT NOT NULL CHECK (status IN ('pending', 'retry', 'processing', 'completed', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    idempotency_key TEXT,
+    available_at DOUBLE PRECISION NOT NULL,   -- Earliest time a retry may run
+    lease_until DOUBLE PRECISION,             -- Visibility timeout of a running job
+    error TEXT,
+    created_at DOUBLE PRECISION NOT NULL,
+    updated_at DOUBLE PRECISION NOT NULL
+);
+
+-- Recovery scans unfinished jobs by status
+CREATE INDEX IF NOT EXISTS idx_background_jobs_status
+ON background_jobs(status, created_at);
+
+-- One live (not failed) job per idempotency key; concurrent duplicate inserts fail
+CREATE UNIQUE INDEX IF NOT EXISTS idx_background_jobs_idempotency
+ON background_jobs(idempotency_key)
+WHERE idempotency_key IS NOT NULL AND status <> 'failed';
+
+-- Service role only (jobs carry raw health data)
+ALTER TABLE background_jobs ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE background_jobs IS
+'Durable background job store: at-least-once delivery with leases and idempotency keys';
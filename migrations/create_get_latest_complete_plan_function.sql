@@ -0,0 +1,27 @@
+-- Migration: Create get_latest_complete_plan() RPC
+-- Purpose: Find a user's most recent routine/nutrition plan that has both
+--          time_blocks and plan_items in one query, instead of probing each
+--          analysis with two queries
+-- Used by: PlanExtractionService.get_current_plan_items_for_user
+--          (services/plan_extraction_service.py)
+
+CREATE OR REPLACE FUNCTION get_latest_complete_plan(p_profile_id TEXT)
+RETURNS TABLE(id UUID, archetype TEXT, analysis_date DATE, created_at TIMESTAMPTZ, user_id TEXT) AS $$
+    SELECT har.id::UUID, har.archetype::TEXT, har.analysis_date::DATE, har.created_at::TIMESTAMPTZ, har.user_id::TEXT
+    FROM holistic_analysis_results har
+    WHERE har.user_id = p_profile_id
+      AND har.analysis_type IN ('routine_plan', 'nutrition_plan')
+      AND EXISTS (SELECT 1 FROM time_blocks tb WHERE tb.analysis_result_id = har.id)
+      AND EXISTS (SELECT 1 FROM plan_items pi WHERE pi.analysis_result_id = har.id)
+    ORDER BY har.created_at DESC
+    LIMIT 1;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION get_latest_complete_plan(TEXT) IS
+'Most recent routine/nutrition analysis of a user that has time_blocks and plan_items';
+
+-- The EXISTS probes and the recency scan are index lookups
+CREATE INDEX IF NOT EXISTS idx_holistic_analysis_results_user_created
+    ON holistic_analysis_results(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_time_blocks_analysis_result_id ON time_blocks(analysis_result_id);
+CREATE INDEX IF NOT EXISTS idx_plan_items_analysis_result_id ON plan_items(analysis_result_id);
@@ -0,0 +1,22 @@
+-- Migration: Create sahha_sync_watermarks table for incremental Sahha sync
+-- Purpose: Newest archived timestamp per user and category, so analyses only
+--          fetch the un-archived delta from Sahha
+-- Used by: services/sahha/sync_watermarks.py (advanced by ArchivalService)
+
+CREATE TABLE IF NOT EXISTS sahha_sync_watermarks (
+    profile_id TEXT NOT NULL,
+    category TEXT NOT NULL,          -- Biomarker category (activity, sleep, vitals, ...) or 'scores'
+    watermark TIMESTAMPTZ NOT NULL,  -- Newest archived endDateTime / scoreDateTime
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (profile_id, category)
+);
+
+-- Service role only (written by the background archival job)
+ALTER TABLE sahha_sync_watermarks ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE sahha_sync_watermarks IS
+'Per-user, per-category high-water marks of archived Sahha data (incremental sync)';
+
+-- Archived history is read by time window
+CREATE INDEX IF NOT EXISTS idx_biomarkers_profile_end ON biomarkers(profile_id, end_date_time);
+CREATE INDEX IF NOT EXISTS idx_scores_profile_score_date ON scores(profile_id, score_date_time);
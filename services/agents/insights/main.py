@@ -18,6 +18,7 @@ from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
 
 from shared_libs.event_system.base_agent import BaseAgent, AgentEvent, AgentResponse
+from services.agents.memory.memory_layers import memories_by_category
 from shared_libs.utils.system_prompts import get_system_prompt
 
 logger = logging.getLogger(__name__)
@@ -353,18 +354,15 @@ class HolisticInsightsAgent(BaseAgent):
             memory_service = AIContextIntegrationService()
             
             try:
-                # Get all 4 memory layers from real memory system
-                longterm = await memory_service.get_user_longterm_memory(user_id)
-                recent_patterns = await memory_service.get_recent_patterns(user_id, days=14)
-                meta_memory = await memory_service.get_meta_memory(user_id)
-                working_memory = await memory_service.get_working_memory(user_id)
+                # All 4 memory layers in one snapshot (single pooled round trip)
+                snapshot = await memory_service.get_memory_snapshot(user_id)
                 
                 # Transform to insights-friendly format
                 return {
-                    "working": self._transform_working_memory(working_memory),
-                    "shortterm": self._transform_shortterm_memory(recent_patterns),
-                    "longterm": self._transform_longterm_memory(longterm),
-                    "meta": self._transform_meta_memory(meta_memory)
+                    "working": self._transform_working_memory(memories_by_category(snapshot["working"])),
+                    "shortterm": self._transform_shortterm_memory(memories_by_category(snapshot["shortterm"])),
+                    "longterm": self._transform_longterm_memory(memories_by_category(snapshot["longterm"])),
+                    "meta": self._transform_meta_memory(snapshot["meta"][0] if snapshot["meta"] else None)
                 }
                 
             finally:
@@ -397,11 +395,14 @@ class HolisticInsightsAgent(BaseAgent):
             }
             
             # Working memory typically contains current session data
-            if hasattr(working_memory, 'session_data') and working_memory.session_data:
-                transformed["session_data"] = working_memory.session_data
+            transformed["session_data"] = {
+                category: content for category, content in working_memory.items() if category != 'user_goals'
+            }
+            if working_memory.get('analysis_context'):
+                transformed["recent_analysis"] = working_memory['analysis_context']
             
-            if hasattr(working_memory, 'current_goals') and working_memory.current_goals:
-                transformed["current_goals"] = working_memory.current_goals
+            if working_memory.get('user_goals'):
+                transformed["current_goals"] = working_memory['user_goals']
                 
             return transformed
             
@@ -424,15 +425,22 @@ class HolisticInsightsAgent(BaseAgent):
             }
             
             # Extract patterns from recent memory
-            if hasattr(recent_patterns, 'pattern_shifts') and recent_patterns.pattern_shifts:
-                transformed["patterns"] = recent_patterns.pattern_shifts
-                transformed["pattern_count"] = len(recent_patterns.pattern_shifts)
-            
-            if hasattr(recent_patterns, 'preference_changes') and recent_patterns.preference_changes:
-                transformed["preferences"] = recent_patterns.preference_changes
-            
-            if hasattr(recent_patterns, 'adherence_trends') and recent_patterns.adherence_trends:
-                transformed["adherence_data"] = recent_patterns.adherence_trends
+            patterns = [
+                recent_patterns[category] for category in ('recent_behaviors', 'interaction_patterns')
+                if recent_patterns.get(category)
+            ]
+            if patterns:
+                transformed["patterns"] = patterns
+                transformed["pattern_count"] = len(patterns)
+            
+            if recent_patterns.get('preference_changes'):
+                transformed["preferences"] = recent_patterns['preference_changes']
+            
+            if recent_patterns.get('goal_progress'):
+                transformed["adherence_data"] = recent_patterns['goal_progress']
+            
+            if recent_patterns.get('analysis_results'):
+                transformed["insights"] = [recent_patterns['analysis_results']]
                 
             return transformed
             
@@ -455,17 +463,20 @@ class HolisticInsightsAgent(BaseAgent):
             }
             
             # Extract established patterns and strategies
-            if hasattr(longterm_memory, 'success_strategies') and longterm_memory.success_strategies:
-                transformed["successful_strategies"] = longterm_memory.success_strategies
+            if longterm_memory.get('successful_strategies'):
+                transformed["successful_strategies"] = longterm_memory['successful_strategies']
+            
+            if longterm_memory.get('health_preferences'):
+                transformed["persistent_preferences"] = longterm_memory['health_preferences']
             
-            if hasattr(longterm_memory, 'preference_patterns') and longterm_memory.preference_patterns:
-                transformed["persistent_preferences"] = longterm_memory.preference_patterns
+            if longterm_memory.get('archetype_evolution'):
+                transformed["archetype_evolution"] = longterm_memory['archetype_evolution']
             
-            if hasattr(longterm_memory, 'behavioral_patterns') and longterm_memory.behavioral_patterns:
-                transformed["behavioral_patterns"] = longterm_memory.behavioral_patterns
+            if longterm_memory.get('behavioral_patterns'):
+                transformed["behavioral_patterns"] = longterm_memory['behavioral_patterns']
                 
-            if hasattr(longterm_memory, 'health_goals') and longterm_memory.health_goals:
-                transformed["health_goals"] = longterm_memory.health_goals
+            if longterm_memory.get('goal_history'):
+                transformed["health_goals"] = longterm_memory['goal_history']
                 
             return transformed
             
@@ -488,17 +499,17 @@ class HolisticInsightsAgent(BaseAgent):
             }
             
             # Extract meta-learning insights
-            if hasattr(meta_memory, 'learning_patterns') and meta_memory.learning_patterns:
-                transformed["learning_patterns"] = meta_memory.learning_patterns
+            if meta_memory.get('engagement_patterns'):
+                transformed["learning_patterns"] = meta_memory['engagement_patterns']
             
-            if hasattr(meta_memory, 'adaptation_patterns') and meta_memory.adaptation_patterns:
-                transformed["adaptation_rates"] = meta_memory.adaptation_patterns
+            if meta_memory.get('adaptation_patterns'):
+                transformed["adaptation_rates"] = meta_memory['adaptation_patterns']
                 
-            if hasattr(meta_memory, 'learning_velocity') and meta_memory.learning_velocity:
-                transformed["learning_velocity"] = meta_memory.learning_velocity
+            if meta_memory.get('learning_velocity'):
+                transformed["learning_velocity"] = meta_memory['learning_velocity']
                 
-            if hasattr(meta_memory, 'success_predictors') and meta_memory.success_predictors:
-                transformed["success_predictors"] = meta_memory.success_predictors
+            if meta_memory.get('success_predictors'):
+                transformed["success_predictors"] = meta_memory['success_predictors']
                 
             return transformed
             
@@ -13,6 +13,79 @@ from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
 
+MEMORY_LAYERS = ("working", "shortterm", "longterm", "meta")
+
+
+def _json_value(value):
+    """JSONB arrives as text from asyncpg and already decoded inside json_agg"""
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _iso(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def _working_record(row) -> dict:
+    return {
+        "id": str(row["id"]),
+        "category": row["memory_type"],
+        "content": _json_value(row["content"]),
+        "priority": row["priority"],
+        "created_at": _iso(row["created_at"]),
+        "expires_at": _iso(row["expires_at"])
+    }
+
+
+def _shortterm_record(row) -> dict:
+    return {
+        "id": str(row["id"]),
+        "category": row["memory_category"],
+        "content": _json_value(row["content"]),
+        "confidence": row["confidence_score"],
+        "recency_weight": row["recency_weight"],
+        "relevance": row["relevance_score"],
+        "importance": row["importance_score"],
+        "created_at": _iso(row["created_at"]),
+        "last_accessed": _iso(row["last_accessed"])
+    }
+
+
+def _longterm_record(row) -> dict:
+    return {
+        "id": str(row["id"]),
+        "category": row["memory_category"],
+        "content": _json_value(row["memory_data"]),
+        "confidence": row["confidence_score"],
+        "stability": row["stability_score"] or 0.5,
+        "version": row["version"],
+        "consolidated": row["is_consolidated"],
+        "created_at": _iso(row["created_at"]),
+        "last_updated": _iso(row["last_updated"])
+    }
+
+
+def _meta_record(row) -> dict:
+    return {
+        "adaptation_patterns": _json_value(row["adaptation_patterns"]),
+        "learning_velocity": _json_value(row["learning_velocity"]),
+        "success_predictors": _json_value(row["success_predictors"]),
+        "failure_patterns": _json_value(row["failure_patterns"]),
+        "agent_effectiveness": _json_value(row["agent_effectiveness"]),
+        "archetype_evolution": _json_value(row["archetype_evolution"]),
+        "engagement_patterns": _json_value(row["engagement_patterns"]),
+        "adaptability_score": row["adaptability_score"],
+        "consistency_score": row["consistency_score"],
+        "complexity_tolerance": row["complexity_tolerance"],
+        "confidence_level": row["confidence_level"],
+        "sample_size": row["sample_size"],
+        "created_at": _iso(row["created_at"]),
+        "last_updated": _iso(row["last_updated"]),
+        "analysis_window": {
+            "start": _iso(row["analysis_window_start"]),
+            "end": _iso(row["analysis_window_end"])
+        }
+    }
+
 class MemoryLayer:
     """Base class for memory layer implementations"""
     
@@ -104,19 +177,7 @@ class WorkingMemoryLayer(MemoryLayer):
             
             async with self.db_pool.acquire() as conn:
                 rows = await conn.fetch(query, user_id, category, limit)
-                
-                memories = []
-                for row in rows:
-                    memories.append({
-                        "id": str(row["id"]),
-                        "category": row["memory_type"],
-                        "content": json.loads(row["content"]),
-                        "priority": row["priority"],
-                        "created_at": row["created_at"].isoformat(),
-                        "expires_at": row["expires_at"].isoformat()
-                    })
-                
-                return memories
+                return [_working_record(row) for row in rows]
                 
         except Exception as e:
             logger.error(f"Error retrieving working memory: {e}")
@@ -213,19 +274,7 @@ class ShortTermMemoryLayer(MemoryLayer):
             async with self.db_pool.acquire() as conn:
                 rows = await conn.fetch(query, user_id, category, limit)
                 
-                memories = []
-                for row in rows:
-                    memories.append({
-                        "id": str(row["id"]),
-                        "category": row["memory_category"],
-                        "content": json.loads(row["content"]),
-                        "confidence": row["confidence_score"],
-                        "recency_weight": row["recency_weight"],
-                        "relevance": row["relevance_score"],
-                        "importance": row["importance_score"],
-                        "created_at": row["created_at"].isoformat(),
-                        "last_accessed": row["last_accessed"].isoformat()
-                    })
+                memories = [_shortterm_record(row) for row in rows]
                 
                 # Update last_accessed for retrieved memories
                 if memories:
@@ -310,22 +359,7 @@ class LongTermMemoryLayer(MemoryLayer):
             
             async with self.db_pool.acquire() as conn:
                 rows = await conn.fetch(query, user_id, category, limit)
-                
-                memories = []
-                for row in rows:
-                    memories.append({
-                        "id": str(row["id"]),
-                        "category": row["memory_category"],
-                        "content": json.loads(row["memory_data"]),
-                        "confidence": row["confidence_score"],
-                        "stability": row["stability_score"] or 0.5,
-                        "version": row["version"],
-                        "consolidated": row["is_consolidated"],
-                        "created_at": row["created_at"].isoformat(),
-                        "last_updated": row["last_updated"].isoformat()
-                    })
-                
-                return memories
+                return [_longterm_record(row) for row in rows]
                 
         except Exception as e:
             logger.error(f"Error retrieving long-term memory: {e}")
@@ -438,33 +472,109 @@ class MetaMemoryLayer(MemoryLayer):
                 if not row:
                     return []
                 
-                meta_memory = {
-                    "adaptation_patterns": json.loads(row["adaptation_patterns"]),
-                    "learning_velocity": json.loads(row["learning_velocity"]),
-                    "success_predictors": json.loads(row["success_predictors"]),
-                    "failure_patterns": json.loads(row["failure_patterns"]),
-                    "agent_effectiveness": json.loads(row["agent_effectiveness"]),
-                    "archetype_evolution": json.loads(row["archetype_evolution"]),
-                    "engagement_patterns": json.loads(row["engagement_patterns"]),
-                    "adaptability_score": row["adaptability_score"],
-                    "consistency_score": row["consistency_score"],
-                    "complexity_tolerance": row["complexity_tolerance"],
-                    "confidence_level": row["confidence_level"],
-                    "sample_size": row["sample_size"],
-                    "created_at": row["created_at"].isoformat(),
-                    "last_updated": row["last_updated"].isoformat(),
-                    "analysis_window": {
-                        "start": row["analysis_window_start"].isoformat(),
-                        "end": row["analysis_window_end"].isoformat()
-                    }
-                }
-                
-                return [meta_memory]
+                return [_meta_record(row)]
                 
         except Exception as e:
             logger.error(f"Error retrieving meta-memory: {e}")
             return []
 
+# All four layers in one statement: the CTEs run on a single pooled
+# connection and json_agg folds each layer into one column, so a snapshot
+# is one round trip instead of four (plus the short-term access update)
+MEMORY_SNAPSHOT_QUERY = """
+    WITH working AS (
+        SELECT id, memory_type, content, priority, created_at, expires_at
+        FROM holistic_working_memory
+        WHERE user_id = $1
+            AND is_active = true
+            AND expires_at > NOW()
+        ORDER BY priority DESC, created_at DESC
+        LIMIT $2
+    ), shortterm AS (
+        UPDATE holistic_shortterm_memory s
+        SET last_accessed = NOW(), access_count = s.access_count + 1
+        WHERE s.id IN (
+            SELECT id
+            FROM holistic_shortterm_memory
+            WHERE user_id = $1
+                AND (expires_at IS NULL OR expires_at > NOW())
+            ORDER BY recency_weight DESC, confidence_score DESC, created_at DESC
+            LIMIT $3
+        )
+        RETURNING s.id, s.memory_category, s.content, s.confidence_score, s.recency_weight,
+                  s.relevance_score, s.importance_score, s.created_at, s.last_accessed
+    ), longterm AS (
+        SELECT id, memory_category, memory_data, confidence_score,
+               stability_score, version, is_consolidated, created_at, last_updated
+        FROM holistic_longterm_memory
+        WHERE user_id = $1
+        ORDER BY confidence_score DESC, stability_score DESC, version DESC
+        LIMIT $4
+    ), meta AS (
+        SELECT adaptation_patterns, learning_velocity, success_predictors,
+               failure_patterns, agent_effectiveness, archetype_evolution,
+               engagement_patterns, adaptability_score, consistency_score,
+               complexity_tolerance, confidence_level, sample_size,
+               created_at, last_updated, analysis_window_start, analysis_window_end
+        FROM holistic_meta_memory
+        WHERE user_id = $1
+    )
+    SELECT
+        (SELECT COALESCE(json_agg(w ORDER BY w.priority DESC, w.created_at DESC), '[]') FROM working w) AS working,
+        (SELECT COALESCE(json_agg(s ORDER BY s.recency_weight DESC, s.confidence_score DESC, s.created_at DESC), '[]')
+         FROM shortterm s) AS shortterm,
+        (SELECT COALESCE(json_agg(l ORDER BY l.confidence_score DESC, l.stability_score DESC, l.version DESC), '[]')
+         FROM longterm l) AS longterm,
+        (SELECT COALESCE(json_agg(m), '[]') FROM meta m) AS meta
+"""
+
+_SNAPSHOT_RECORDS = {
+    "working": _working_record,
+    "shortterm": _shortterm_record,
+    "longterm": _longterm_record,
+    "meta": _meta_record
+}
+
+
+async def retrieve_memory_snapshot(db_pool, user_id: str, working_limit: int = 100,
+                                   shortterm_limit: int = 50, longterm_limit: int = 20) -> Dict[str, List[dict]]:
+    """
+    Retrieve all four memory layers for a user.
+
+    Returns {"working": [...], "shortterm": [...], "longterm": [...], "meta": [...]}
+    with the same record shapes as each layer's retrieve(). Uses one
+    statement on one connection; if that statement fails (e.g. a layer
+    table is missing) the layers are retrieved concurrently instead.
+    Connection errors propagate to the caller.
+    """
+    if not db_pool:
+        return {layer: [] for layer in MEMORY_LAYERS}
+
+    try:
+        async with db_pool.acquire() as conn:
+            row = await conn.fetchrow(MEMORY_SNAPSHOT_QUERY, user_id, working_limit, shortterm_limit, longterm_limit)
+        return {
+            layer: [_SNAPSHOT_RECORDS[layer](record) for record in _json_value(row[layer]) or []]
+            for layer in MEMORY_LAYERS
+        }
+    except asyncpg.PostgresError as e:
+        logger.warning(f"[MEMORY_SNAPSHOT] Single-statement snapshot failed, retrieving layers concurrently: {e}")
+
+    limits = {"working": working_limit, "shortterm": shortterm_limit, "longterm": longterm_limit, "meta": 1}
+    results = await asyncio.gather(*[
+        MemoryLayerFactory.create_layer(layer, db_pool).retrieve(user_id, limit=limits[layer])
+        for layer in MEMORY_LAYERS
+    ])
+    return dict(zip(MEMORY_LAYERS, results))
+
+
+def memories_by_category(records: List[dict]) -> Dict[str, Any]:
+    """Map category -> content, keeping the highest-ranked record per category"""
+    by_category: Dict[str, Any] = {}
+    for record in records:
+        by_category.setdefault(record.get("category"), record.get("content"))
+    return by_category
+
 # Memory Layer Factory
 class MemoryLayerFactory:
     """Factory for creating memory layer instances"""
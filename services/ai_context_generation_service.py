@@ -10,6 +10,7 @@ This service leverages the proven engagement APIs to gather raw data and uses
 AI to generate actionable context summaries.
 """
 
+import asyncio
 import json
 import logging
 import os
@@ -19,6 +20,7 @@ from dotenv import load_dotenv
 import openai
 from supabase import create_client, Client
 from shared_libs.supabase_client.adapter import SupabaseAsyncPGAdapter
+from shared_libs.supabase_client.async_executor import execute_async
 
 # Load environment variables
 load_dotenv()
@@ -429,10 +431,12 @@ class AIContextGeneratorService:
             await self.db.connect()
         return self.db
 
-    async def generate_user_context(self, user_id: str, archetype: str = None, days: int = 30) -> str:
+    async def generate_user_context(self, user_id: str, archetype: str = None, days: int = 30,
+                                    plans_memo: Optional[Dict] = None) -> str:
         """
         Generate complete user context including engagement data
         This is the main method that replaces the complex memory system
+        plans_memo: the caller's per-request _get_last_plans memo, if any
         """
         try:
             logger.info(f"Generating AI context for user {user_id[:8]}... (archetype: {archetype})")
@@ -444,7 +448,7 @@ class AIContextGeneratorService:
             previous_context = await self._get_last_context(user_id)
 
             # 3. Get last 3 plans for pattern analysis
-            last_plans = await self._get_last_plans(user_id, archetype, limit=3)
+            last_plans = await self._get_last_plans(user_id, archetype, limit=3, memo=plans_memo)
 
             # Add previous context and plans to raw data
             raw_data['previous_context'] = previous_context
@@ -565,12 +569,13 @@ Make your analysis specific to this user's proven patterns and preferences.
         try:
             if self.use_rest_api:
                 # Use REST API in development
-                context = self.supabase_client.table('holistic_memory_analysis_context')\
-                    .select('context_summary, created_at')\
-                    .eq('user_id', user_id)\
-                    .order('created_at', desc=True)\
-                    .limit(1)\
-                    .execute()
+                context = await execute_async(
+                    self.supabase_client.table('holistic_memory_analysis_context')
+                    .select('context_summary, created_at')
+                    .eq('user_id', user_id)
+                    .order('created_at', desc=True)
+                    .limit(1)
+                )
                 return context.data[0] if context.data else None
             else:
                 # Use database adapter in production
@@ -589,43 +594,66 @@ Make your analysis specific to this user's proven patterns and preferences.
             logger.error(f"Failed to get last context with timestamp for {user_id}: {e}")
             return None
 
-    async def _get_last_plans(self, user_id: str, archetype: str = None, limit: int = 3) -> List[Dict]:
-        """Get last N plans from analysis results, optionally filtered by archetype"""
-        try:
-            if self.use_rest_api:
-                # Use REST API in development
-                query = self.supabase_client.table('holistic_analysis_results')\
-                    .select('id, analysis_type, archetype, analysis_result, created_at')\
-                    .eq('user_id', user_id)
-
-                if archetype:
-                    query = query.eq('archetype', archetype)
+    async def _get_last_plans(self, user_id: str, archetype: str = None, limit: int = 3,
+                              memo: Optional[Dict] = None) -> List[Dict]:
+        """
+        Get last N plans from analysis results, optionally filtered by archetype
 
-                plans = query.order('created_at', desc=True)\
-                    .limit(limit)\
-                    .execute()
-                return plans.data
-            else:
-                # Use database adapter in production
-                db = await self._ensure_db_connection()
-                base_query = """
-                    SELECT id, analysis_type, archetype, analysis_result, created_at
-                    FROM holistic_analysis_results
-                    WHERE user_id = $1
-                """
-                params = [user_id]
-                if archetype:
-                    base_query += " AND archetype = $2"
-                    params.append(archetype)
-                base_query += " ORDER BY created_at DESC LIMIT ${}".format(len(params) + 1)
-                params.append(limit)
-                result = await db.fetch(base_query, *params)
-                return [dict(row) for row in result] if result else []
+        memo is a dict owned by one request: (user_id, archetype) -> (limit, fetch task).
+        Repeated or smaller-limit calls with the same memo reuse the first fetch;
+        failed fetches are dropped from it so a later call retries.
+        """
+        try:
+            if memo is None:
+                return await self._fetch_last_plans(user_id, archetype, limit)
+
+            key = (user_id, archetype)
+            entry = memo.get(key)
+            if entry is None or entry[0] < limit:
+                entry = (limit, asyncio.ensure_future(self._fetch_last_plans(user_id, archetype, limit)))
+                memo[key] = entry
+            try:
+                plans = await asyncio.shield(entry[1])
+            except Exception:
+                if memo.get(key) is entry:
+                    del memo[key]
+                raise
+            return plans[:limit]
 
         except Exception as e:
             logger.error(f"Failed to get last plans for {user_id}: {e}")
             return []
 
+    async def _fetch_last_plans(self, user_id: str, archetype: str = None, limit: int = 3) -> List[Dict]:
+        if self.use_rest_api:
+            # Use REST API in development
+            query = self.supabase_client.table('holistic_analysis_results')\
+                .select('id, analysis_type, archetype, analysis_result, created_at')\
+                .eq('user_id', user_id)
+
+            if archetype:
+                query = query.eq('archetype', archetype)
+
+            plans = await execute_async(query.order('created_at', desc=True).limit(limit))
+            return plans.data or []
+        else:
+            # Use database adapter in production
+            db = await self._ensure_db_connection()
+            base_query = """
+                SELECT id, analysis_type, archetype, analysis_result, created_at
+                FROM holistic_analysis_results
+                WHERE user_id = $1
+            """
+            params = [user_id]
+            if archetype:
+                base_query += " AND archetype = $2"
+                params.append(archetype)
+            base_query += " ORDER BY created_at DESC LIMIT ${}".format(len(params) + 1)
+            params.append(limit)
+            result = await db.fetch(base_query, *params)
+            return [dict(row) for row in result] if result else []
+
+
     async def _store_context(self, user_id: str, context_summary: str, source_data: Dict, archetype: str = None):
         """Store generated context in database"""
         try:
@@ -707,7 +735,8 @@ Make your analysis specific to this user's proven patterns and preferences.
         self,
         raw_data: Dict[str, Any],
         user_id: str,
-        archetype: str = None
+        archetype: str = None,
+        plans_memo: Optional[Dict] = None
     ) -> str:
         """
         Generate context for adaptive routine generation with dual-mode support
@@ -719,13 +748,14 @@ Make your analysis specific to this user's proven patterns and preferences.
             raw_data: Raw engagement data from SimpleEngagementDataService
             user_id: User identifier
             archetype: User archetype (Foundation Builder, Peak Performer, etc.)
+            plans_memo: The caller's per-request _get_last_plans memo, if any
 
         Returns:
             AI-generated context string for routine generation
         """
         try:
             # Check if this is a new user (no past routine plans)
-            last_plans = await self._get_last_plans(user_id, archetype, limit=3)
+            last_plans = await self._get_last_plans(user_id, archetype, limit=3, memo=plans_memo)
             is_new_user = not last_plans or len(last_plans) == 0
 
             # Calculate engagement metrics
@@ -3,6 +3,7 @@ AI Context Integration Service
 Replaces MemoryIntegrationService with AI-powered context generation
 Maintains same interface for seamless integration with existing agents
 """
+import asyncio
 import logging
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any, Tuple
@@ -70,16 +71,14 @@ class AIContextIntegrationService:
                 analysis_mode = "initial"
                 days_to_fetch = 7
 
-            # Check for recent AI context (< 10 minutes old) to avoid regeneration
-            recent_context = await self._get_recent_context(user_id, max_age_minutes=10)
-            if recent_context:
-                ai_context_summary = recent_context
-            else:
-                ai_context_summary = await self.ai_context_service.generate_user_context(user_id, archetype, days=3)
-
-            # Get agent-specific historical analyses
-            behavior_history = await self._get_agent_analysis_history(user_id, "behavior_analysis", archetype, limit=2)
-            circadian_history = await self._get_agent_analysis_history(user_id, "circadian_analysis", archetype, limit=2)
+            # AI context and agent-specific historical analyses are independent.
+            # They share one _get_last_plans() fetch through this request's memo.
+            plans_memo = {}
+            ai_context_summary, behavior_history, circadian_history = await asyncio.gather(
+                self._get_ai_context_summary(user_id, archetype, plans_memo=plans_memo),
+                self._get_agent_analysis_history(user_id, "behavior_analysis", archetype, limit=2, plans_memo=plans_memo),
+                self._get_agent_analysis_history(user_id, "circadian_analysis", archetype, limit=2, plans_memo=plans_memo)
+            )
 
             context = ContextEnhancedContext(
                 user_id=user_id,
@@ -145,6 +144,23 @@ Focus on building upon proven patterns and avoiding consistently failed strategi
             logger.error(f"[AI_CONTEXT_INTEGRATION_ERROR] Failed to enhance prompt: {e}")
             return base_prompt
 
+    async def get_memory_snapshot(self, user_id: str) -> Dict[str, List[Dict]]:
+        """
+        All four memory layers (working, shortterm, longterm, meta) in one
+        pooled round trip - see retrieve_memory_snapshot()
+        """
+        from shared_libs.database.connection_pool import db_pool
+        from services.agents.memory.memory_layers import retrieve_memory_snapshot
+
+        return await retrieve_memory_snapshot(db_pool, user_id)
+
+    async def _get_ai_context_summary(self, user_id: str, archetype: str = None, plans_memo: Optional[Dict] = None) -> str:
+        """Reuse recent AI context (< 10 minutes old) or generate a new one"""
+        recent_context = await self._get_recent_context(user_id, max_age_minutes=10)
+        if recent_context:
+            return recent_context
+        return await self.ai_context_service.generate_user_context(user_id, archetype, days=3, plans_memo=plans_memo)
+
     async def _get_recent_context(self, user_id: str, max_age_minutes: int = 5) -> Optional[str]:
         """
         Get recent AI context if it exists (< max_age_minutes old)
@@ -184,11 +200,12 @@ Focus on building upon proven patterns and avoiding consistently failed strategi
             logger.warning(f"[AI_CONTEXT_INTEGRATION] Error checking recent context for {user_id}: {e}")
             return None
 
-    async def _get_agent_analysis_history(self, user_id: str, analysis_type: str, archetype: str = None, limit: int = 2) -> List[Dict]:
+    async def _get_agent_analysis_history(self, user_id: str, analysis_type: str, archetype: str = None, limit: int = 2,
+                                          plans_memo: Optional[Dict] = None) -> List[Dict]:
         """Get last N analyses for specific agent type"""
         try:
             # Use the same method as AI Context Service for consistency
-            history = await self.ai_context_service._get_last_plans(user_id, archetype, limit=limit)
+            history = await self.ai_context_service._get_last_plans(user_id, archetype, limit=limit, memo=plans_memo)
 
             # Filter by analysis type
             filtered_history = [
@@ -5,15 +5,16 @@ Uses GPT-4o to analyze real health data and generate personalized energy zones.
 Single comprehensive AI call replaces rule-based logic.
 """
 
-import os
 import json
 import logging
 from datetime import datetime, date, time, timedelta
-from typing import List, Tuple, Any, Dict
+from typing import List, Tuple, Any, Dict, Optional
 from pathlib import Path
-import openai
 
 from services.user_data_service import UserDataService
+from services.energy_zone_store import energy_zone_store, StoredEnergyZones, EnergyZoneIndex
+from services.request_deduplication_service import SingleFlight
+from shared_libs.llm.openai_registry import create_chat_completion
 from shared_libs.data_models.health_models import UserHealthContext
 from shared_libs.data_models.energy_zones_models import (
     EnergyZonesResult, EnergyZone, SleepSchedule, BiomarkerSnapshot,
@@ -31,24 +32,63 @@ class AIEnergyZonesService:
     1. Personalized sleep schedule
     2. Current energy mode
     3. Customized energy zones throughout the day
+
+    Results are kept in energy_zone_store until they expire or new biomarker
+    data arrives, and concurrent cold requests for a user share one calculation.
     """
 
     def __init__(self, user_data_service: UserDataService):
         self.user_data_service = user_data_service
-        self.openai_client = openai.AsyncOpenAI(
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
+        self.store = energy_zone_store
+        self._single_flight = SingleFlight()
 
     async def calculate_energy_zones(self, user_id: str, force_recalculate: bool = False) -> EnergyZonesResult:
         """
         Main method: AI-powered energy zones calculation using single comprehensive analysis
+
+        Served from the result store while the stored result is unexpired, unless
+        force_recalculate is set.
+        """
+        stored = await self.get_stored_zones(user_id, force_recalculate)
+        return stored.result
+
+    async def get_stored_zones(self, user_id: str, force_recalculate: bool = False) -> StoredEnergyZones:
+        """
+        Get the user's energy zones together with their interval index
+
+        Args:
+            user_id: User identifier
+            force_recalculate: Ignore any stored result and run a new AI analysis
+
+        Returns:
+            StoredEnergyZones (result + index for O(log n) current-zone lookups)
         """
+        if not force_recalculate:
+            stored = self.store.get(user_id)
+            if stored is not None:
+                logger.debug(f"[ENERGY_ZONES] Serving stored zones for {user_id[:8]}...")
+                return stored
+
+        # A forced recalculation must not join a run that was not forced
+        flight_key = f"energy_zones:{user_id}:forced" if force_recalculate else f"energy_zones:{user_id}"
+        return await self._single_flight.do(flight_key, lambda: self._calculate_and_store(user_id))
+
+    async def _calculate_and_store(self, user_id: str) -> StoredEnergyZones:
+        """Run the AI calculation; only real (non-fallback) results are stored"""
+        result, data_watermark = await self._calculate(user_id)
+
+        if "fallback" in result.sleep_schedule.data_sources:
+            return StoredEnergyZones(result=result, index=EnergyZoneIndex(result.energy_zones))
+        return self.store.put(user_id, result, data_watermark)
+
+    async def _calculate(self, user_id: str) -> Tuple[EnergyZonesResult, Optional[datetime]]:
+        """Fetch health data and run the comprehensive AI analysis"""
         try:
             # Get raw health data (same as behavior analysis)
             health_context, latest_timestamp = await self.user_data_service.get_analysis_data(user_id)
 
             if not health_context or not health_context.scores:
-                return self._create_default_zones(user_id)
+                return self._create_default_zones(user_id), None
 
             # Single comprehensive AI analysis
             analysis_result = await self._ai_comprehensive_analysis(health_context)
@@ -66,11 +106,11 @@ class AIEnergyZonesService:
                 expires_at=datetime.now() + timedelta(hours=24)
             )
 
-            return result
+            return result, latest_timestamp
 
         except Exception as e:
             logger.error(f"AI energy zones calculation failed: {e}")
-            return self._create_default_zones(user_id)
+            return self._create_default_zones(user_id), None
 
     async def _ai_comprehensive_analysis(self, health_context: UserHealthContext) -> Dict[str, Any]:
         """
@@ -164,7 +204,8 @@ class AIEnergyZonesService:
             }}
             """
 
-            response = await self.openai_client.chat.completions.create(
+            # Shared client and gpt-4o concurrency slot (shared_libs.llm.openai_registry)
+            response = await create_chat_completion(
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": "You are an energy optimization expert. Analyze health data and create personalized energy profiles. Respond only with valid JSON."},
@@ -4,14 +4,19 @@ Dedicated endpoints for bio-coach-hub admin dashboard
 Separated from main API for better organization
 """
 
+import asyncio
+import base64
+import json
 import logging
+import os
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
 # Import timezone utility
 from shared_libs.utils.timezone_utils import utc_to_est
+from shared_libs.supabase_client.async_executor import execute_async, get_shared_supabase_client
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -38,6 +43,7 @@ class UserListResponse(BaseModel):
     users: List[UserSummary]
     total_count: int
     has_more: bool
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page
 
 class AnalysisSummary(BaseModel):
     total_analyses: int
@@ -78,6 +84,162 @@ class AnalysisDataResponse(BaseModel):
     total_analyses: int
     analyses: List[AnalysisData]
 
+# =====================================================================
+# Helpers
+# =====================================================================
+
+# One row per profile with analysis aggregates (migrations/create_admin_user_summaries_view.sql)
+ADMIN_USER_SUMMARIES_VIEW = "admin_user_summaries"
+
+# sort parameter -> view column (keyset pagination uses (column, id))
+ADMIN_USER_SORTS = {
+    "created": "created_at",
+    "last_analysis": "last_analysis_sort",
+    "total_analyses": "total_analyses",
+    "name": "display_name"
+}
+
+ADMIN_USER_COLUMNS = "id, data, created_at, total_analyses, last_analysis_at, latest_archetype"
+
+
+def _get_supabase():
+    """Shared Supabase client (one connection pool for all admin requests)"""
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_KEY") or os.getenv("SUPABASE_SERVICE_KEY", "")
+    if not supabase_url or not supabase_key:
+        raise Exception("Missing SUPABASE_URL or SUPABASE_KEY")
+    return get_shared_supabase_client(supabase_url, supabase_key)
+
+
+def _encode_cursor(sort_value: Any, user_id: str) -> str:
+    """Opaque keyset cursor: the last row's sort value and id"""
+    raw = json.dumps([sort_value, user_id], default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        sort_value, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(sort_value, (str, int, float)) or not isinstance(user_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort_value, user_id
+
+
+def _quote_filter_value(value: Any) -> str:
+    """
+    Quote a value for a PostgREST logic filter (or=/and=)
+
+    Inside double quotes only backslash and double quote are special; both are
+    backslash-escaped, so a cursor cannot close the quote and add conditions.
+    """
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def _like_pattern(search: str) -> str:
+    """
+    Case-insensitive substring pattern for a PostgREST ilike filter
+
+    LIKE's own wildcards (% and _) and its escape character (backslash) are
+    backslash-escaped so user input only matches literally. (PostgREST turns
+    every * into % and has no escape for it, so * still matches anything.)
+    """
+    text = search.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"*{text}*"
+
+
+def _keyset_filter(sort_column: str, op: str, sort_value: Any, last_id: str) -> str:
+    """Rows after (sort_value, last_id) in (sort_column, id) order"""
+    value, row_id = _quote_filter_value(sort_value), _quote_filter_value(last_id)
+    return f"{sort_column}.{op}.{value},and({sort_column}.eq.{value},id.{op}.{row_id})"
+
+
+def _profile_name_and_age(profile_row: Dict[str, Any]) -> Tuple[str, Optional[int]]:
+    """Extract user info from profile data"""
+    user_id = profile_row['id']
+    profile_data = profile_row.get('data', {})
+    if isinstance(profile_data, dict):
+        name = (
+            profile_data.get('name') or 
+            (profile_data.get('profileInfo', {}).get('externalId') if isinstance(profile_data.get('profileInfo'), dict) else None) or
+            f"User {user_id[:8]}"
+        )
+        age = profile_data.get('age')
+        if isinstance(age, str) and age.isdigit():
+            age = int(age)
+        elif not isinstance(age, int):
+            age = None
+    else:
+        name = f"User {user_id[:8]}"
+        age = None
+    return name, age
+
+
+def _to_user_summary(row: Dict[str, Any]) -> UserSummary:
+    name, age = _profile_name_and_age(row)
+    total_analyses = row.get('total_analyses') or 0
+    return UserSummary(
+        id=row['id'],
+        name=name,
+        age=age,
+        total_analyses=total_analyses,
+        last_analysis_date=utc_to_est(row.get('last_analysis_at')),
+        latest_archetype=row.get('latest_archetype'),
+        has_health_data=total_analyses > 0,
+        overall_score=None,
+        profile_created=utc_to_est(row.get('created_at'))
+    )
+
+
+def _is_missing_relation(error: Exception) -> bool:
+    message = str(error)
+    return ADMIN_USER_SUMMARIES_VIEW in message and (
+        "does not exist" in message or "PGRST205" in message or "Could not find" in message
+    )
+
+
+async def _list_users_without_view(
+    supabase, limit: int, offset: int, cursor: Optional[str]
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Fallback while the view is not deployed: newest profiles plus one
+    in_() query for their analyses, aggregated here (still flat per page)
+    """
+    query = supabase.table("profiles").select("id, data, created_at")
+    if cursor:
+        created_at, user_id = _decode_cursor(cursor)
+        query = query.or_(_keyset_filter("created_at", "lt", created_at, user_id))
+    query = query.order("created_at", desc=True).order("id", desc=True)
+    # One row past the page tells whether there is a next page
+    query = query.limit(limit + 1) if cursor else query.range(offset, offset + limit)
+    profiles_response, total_count_response = await asyncio.gather(
+        execute_async(query),
+        execute_async(supabase.table("profiles").select("id", count="exact").limit(1))
+    )
+    rows = profiles_response.data or []
+
+    user_ids = [row['id'] for row in rows[:limit]]
+    analyses_response = await execute_async(
+        supabase.table("holistic_analysis_results")
+        .select("user_id, archetype, created_at")
+        .in_("user_id", user_ids)
+        .order("created_at", desc=True)
+    ) if user_ids else None
+
+    aggregates: Dict[str, Dict[str, Any]] = {}
+    for analysis in (analyses_response.data if analyses_response else None) or []:
+        aggregate = aggregates.setdefault(analysis['user_id'], {
+            "total_analyses": 0,
+            "last_analysis_at": analysis.get('created_at'),  # Newest first
+            "latest_archetype": analysis.get('archetype')
+        })
+        aggregate["total_analyses"] += 1
+
+    return [{**row, **aggregates.get(row['id'], {})} for row in rows], total_count_response.count or 0
+
+
 # =====================================================================
 # Admin API Endpoints
 # =====================================================================
@@ -86,109 +248,98 @@ class AnalysisDataResponse(BaseModel):
 async def get_admin_users_list(
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (keyset pagination)"),
+    sort: str = Query("created", description="created, last_analysis, total_analyses or name"),
+    order: str = Query("desc", description="asc or desc"),
+    search: Optional[str] = Query(None, description="Case-insensitive match on name, external id or user id"),
+    archetype: Optional[str] = Query(None, description="Filter by latest archetype")
 ):
     """
     Get list of all users with their summary information
     Used by dashboard homepage (Index.tsx)
     
+    One query against the admin_user_summaries view (plus a concurrent
+    count), independent of the number of users.
+    
     Args:
         limit: Number of results to return (max 200)
-        offset: Number of results to skip for pagination
-        status: Optional filter by user status
+        offset: Number of results to skip (first page only; prefer cursor)
+        status: Optional filter - "active" (has analyses) or "inactive"
+        cursor: Keyset cursor returned as next_cursor
+        sort: Sort column
+        order: Sort direction
+        search: Optional name/id search
+        archetype: Optional latest-archetype filter
     
     Returns:
         UserListResponse with users array and pagination info
     """
+    if sort not in ADMIN_USER_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {list(ADMIN_USER_SORTS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    if status and status not in ("active", "inactive"):
+        raise HTTPException(status_code=400, detail="status must be active or inactive")
+
     try:
-        from supabase import create_client
-        import os
-        
-        # Use Supabase client directly for better reliability
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_KEY")
-        supabase = create_client(supabase_url, supabase_key)
-        
-        # Get profiles using Supabase client
-        # Get profiles using Supabase client
-        profiles_response = (
-            supabase.table("profiles")
-            .select("id, data, created_at")
-            .order("created_at", desc=True)
-            .range(offset, offset + limit - 1)
-            .execute()
+        supabase = _get_supabase()
+        sort_column = ADMIN_USER_SORTS[sort]
+        descending = order == "desc"
+
+        def filtered(query):
+            if search:
+                query = query.ilike("search_text", _like_pattern(search))
+            if archetype:
+                query = query.eq("latest_archetype", archetype)
+            if status == "active":
+                query = query.gt("total_analyses", 0)
+            elif status == "inactive":
+                query = query.eq("total_analyses", 0)
+            return query
+
+        page_query = filtered(
+            supabase.table(ADMIN_USER_SUMMARIES_VIEW).select(f"{ADMIN_USER_COLUMNS}, {sort_column}")
         )
-        
-        profiles_data = profiles_response.data if profiles_response.data else []
-        
-        # Get analysis data for each user
-        users = []
-        for profile_row in profiles_data:
-            user_id = profile_row['id']
-            
-            # Get analysis count for this user
-            count_response = (
-                supabase.table("holistic_analysis_results")
-                .select("id", count="exact")
-                .eq("user_id", user_id)
-                .execute()
-            )
-            total_analyses = count_response.count or 0
-            
-            # Get latest analysis info
-            latest_response = (
-                supabase.table("holistic_analysis_results")
-                .select("archetype, created_at")
-                .eq("user_id", user_id)
-                .order("created_at", desc=True)
-                .limit(1)
-                .execute()
+        if cursor:
+            sort_value, last_id = _decode_cursor(cursor)
+            page_query = page_query.or_(_keyset_filter(sort_column, "lt" if descending else "gt", sort_value, last_id))
+        page_query = page_query.order(sort_column, desc=descending).order("id", desc=descending)
+        # One row past the page tells whether there is a next page
+        page_query = page_query.limit(limit + 1) if cursor else page_query.range(offset, offset + limit)
+
+        try:
+            page_response, count_response = await asyncio.gather(
+                execute_async(page_query),
+                execute_async(
+                    filtered(supabase.table(ADMIN_USER_SUMMARIES_VIEW).select("id", count="exact")).limit(1)
+                )
             )
-            latest_analysis = latest_response.data[0] if latest_response.data else {}
-            
-            # Extract user info from profile data
-            profile_data = profile_row.get('data', {})
-            if isinstance(profile_data, dict):
-                name = (
-                    profile_data.get('name') or 
-                    (profile_data.get('profileInfo', {}).get('externalId') if isinstance(profile_data.get('profileInfo'), dict) else None) or
-                    f"User {user_id[:8]}"
+            rows, total_count = page_response.data or [], count_response.count or 0
+        except Exception as e:
+            if not _is_missing_relation(e):
+                raise
+            if sort != "created" or not descending or search or archetype or status:
+                raise HTTPException(
+                    status_code=501,
+                    detail="Sorting/filtering users needs migrations/create_admin_user_summaries_view.sql"
                 )
-                age = profile_data.get('age')
-                if isinstance(age, str) and age.isdigit():
-                    age = int(age)
-                elif not isinstance(age, int):
-                    age = None
-            else:
-                name = f"User {user_id[:8]}"
-                age = None
-            
-            users.append(UserSummary(
-                id=user_id,
-                name=name,
-                age=age,
-                total_analyses=total_analyses,
-                last_analysis_date=utc_to_est(latest_analysis.get('created_at')),
-                latest_archetype=latest_analysis.get('archetype'),
-                has_health_data=total_analyses > 0,
-                overall_score=None,
-                profile_created=utc_to_est(profile_row.get('created_at'))
-            ))
-        
-        # Get total count for pagination
-        total_count_response = (
-            supabase.table("profiles")
-            .select("id", count="exact")
-            .execute()
-        )
-        total_count = total_count_response.count or 0
-        
+            logger.warning(f"[ADMIN_API] {ADMIN_USER_SUMMARIES_VIEW} view missing - using batched fallback")
+            rows, total_count = await _list_users_without_view(supabase, limit, offset, cursor)
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1].get(sort_column), rows[-1]['id']) if has_more else None
+
         return UserListResponse(
-            users=users,
+            users=[_to_user_summary(row) for row in rows],
             total_count=total_count,
-            has_more=(offset + limit) < total_count
+            has_more=has_more,
+            next_cursor=next_cursor
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"[ADMIN_API] Failed to get users list: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to retrieve users: {str(e)}")
@@ -207,13 +358,7 @@ async def get_admin_user_overview(user_id: str):
         UserProfileResponse with complete user profile data
     """
     try:
-        from supabase import create_client
-        import os
-        
-        # Use Supabase client directly
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_KEY")
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = _get_supabase()
         
         # Get user profile using Supabase client
         profile_response = (
@@ -332,13 +477,7 @@ async def get_admin_user_analysis_data(
         AnalysisDataResponse with analyses for the specified date
     """
     try:
-        from supabase import create_client
-        import os
-        
-        # Use Supabase client directly
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_KEY")
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = _get_supabase()
         
         # Parse and validate date
         try:
@@ -5,9 +5,13 @@ Fetches all data needed for personalized responses in one call
 from fastapi import APIRouter, HTTPException, Depends
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
+import asyncio
 import logging
 
 from shared_libs.supabase_client.adapter import SupabaseAsyncPGAdapter
+from shared_libs.utils.context_assembler import (
+    ContextAssembler, ContextSource, DEFAULT_SOURCE_TIMEOUT, SLOW_SOURCE_TIMEOUT
+)
 from services.user_data_service import UserDataService
 
 logger = logging.getLogger(__name__)
@@ -15,6 +19,7 @@ router = APIRouter(prefix="/api/v1/context", tags=["context"])
 
 # Database adapter (lazy initialization)
 db_adapter = None
+_db_adapter_lock = asyncio.Lock()
 
 # Dependency for user data service
 def get_user_service() -> UserDataService:
@@ -24,11 +29,29 @@ async def get_db_adapter() -> SupabaseAsyncPGAdapter:
     """Get or create database adapter with connection"""
     global db_adapter
     if db_adapter is None:
-        db_adapter = SupabaseAsyncPGAdapter()
-        await db_adapter.connect()
+        # Context sources run concurrently - connect once
+        async with _db_adapter_lock:
+            if db_adapter is None:
+                adapter = SupabaseAsyncPGAdapter()
+                await adapter.connect()
+                db_adapter = adapter
     return db_adapter
 
 
+# Chat context sources are independent, so they are all fetched concurrently.
+# Health data may fall through to a live Sahha fetch, so it gets the slow timeout;
+# the stored analyses and plan are single queries
+chat_context_assembler = ContextAssembler("chat_context", [
+    ContextSource("health_data", lambda ctx: _fetch_health_data(ctx["service"], ctx["user_id"]),
+                  timeout=SLOW_SOURCE_TIMEOUT),
+    ContextSource("behavior_analysis", lambda ctx: _fetch_behavior_analysis(ctx["user_id"]),
+                  timeout=DEFAULT_SOURCE_TIMEOUT),
+    ContextSource("circadian_analysis", lambda ctx: _fetch_circadian_analysis(ctx["user_id"]),
+                  timeout=DEFAULT_SOURCE_TIMEOUT),
+    ContextSource("plan", lambda ctx: _fetch_plan_data(ctx["user_id"]), timeout=DEFAULT_SOURCE_TIMEOUT),
+])
+
+
 @router.get("/user/{user_id}/chat-context")
 async def get_chat_context(
     user_id: str,
@@ -41,56 +64,44 @@ async def get_chat_context(
     - Circadian analysis (pre-analyzed)
     - Plan data (time blocks + tasks)
 
-    Returns everything needed for personalized chat responses
+    Returns everything needed for personalized chat responses.
+    Sources are fetched concurrently; a source that fails or times out is
+    returned as null and listed in metadata.degraded_sources.
     """
     start_time = datetime.now()
 
     try:
         logger.info(f"Fetching chat context for user {user_id}")
 
+        # Health data, behavior, circadian and plan in parallel (each with its own timeout)
+        assembled = await chat_context_assembler.assemble(user_id=user_id, service=service)
+        health_data = assembled["health_data"]
+        behavior_analysis = assembled["behavior_analysis"]
+        circadian_analysis = assembled["circadian_analysis"]
+        plan_data = assembled["plan"]
+
         context = {
             "success": True,
             "user_id": user_id,
-            "health_data": None,
-            "behavior_analysis": None,
-            "circadian_analysis": None,
-            "plan": None,
+            "health_data": health_data,
+            "behavior_analysis": behavior_analysis,
+            "circadian_analysis": circadian_analysis,
+            "plan": plan_data,
             "metadata": {}
         }
 
-        # 1. Fetch raw health data (last 3 days) using existing service
-        health_context = await service.get_user_health_data(user_id, days=3)
-        context["health_data"] = {
-            "scores": [score.dict() for score in health_context.scores] if health_context.scores else [],
-            "biomarkers": [biomarker.dict() for biomarker in health_context.biomarkers] if health_context.biomarkers else [],
-            "date_range": {
-                "start": health_context.date_range.start_date.isoformat(),
-                "end": health_context.date_range.end_date.isoformat()
-            }
-        }
-
-        # 2. Fetch latest behavior analysis
-        behavior_analysis = await _fetch_behavior_analysis(user_id)
-        context["behavior_analysis"] = behavior_analysis
-
-        # 3. Fetch latest circadian analysis
-        circadian_analysis = await _fetch_circadian_analysis(user_id)
-        context["circadian_analysis"] = circadian_analysis
-
-        # 4. Fetch plan data (time blocks + tasks)
-        plan_data = await _fetch_plan_data(user_id)
-        context["plan"] = plan_data
-
         # Metadata
         duration = (datetime.now() - start_time).total_seconds()
         context["metadata"] = {
             "fetch_duration_seconds": round(duration, 3),
             "data_freshness": datetime.now().isoformat(),
             "days_of_health_data": 3,
-            "has_health_data": len(context["health_data"]["scores"]) > 0 or len(context["health_data"]["biomarkers"]) > 0,
+            "has_health_data": bool(health_data and (health_data["scores"] or health_data["biomarkers"])),
             "has_behavior_analysis": behavior_analysis is not None,
             "has_circadian_analysis": circadian_analysis is not None,
-            "has_plan": plan_data is not None
+            "has_plan": plan_data is not None,
+            "sources": assembled.timings(),
+            "degraded_sources": assembled.degraded
         }
 
         logger.info(f"✅ Chat context fetched in {duration:.3f}s")
@@ -104,6 +115,19 @@ async def get_chat_context(
         )
 
 
+async def _fetch_health_data(service: UserDataService, user_id: str) -> Dict[str, Any]:
+    """Fetch raw health data (last 3 days) using existing service"""
+    health_context = await service.get_user_health_data(user_id, days=3)
+    return {
+        "scores": [score.dict() for score in health_context.scores] if health_context.scores else [],
+        "biomarkers": [biomarker.dict() for biomarker in health_context.biomarkers] if health_context.biomarkers else [],
+        "date_range": {
+            "start": health_context.date_range.start_date.isoformat(),
+            "end": health_context.date_range.end_date.isoformat()
+        }
+    }
+
+
 async def _fetch_behavior_analysis(user_id: str) -> Optional[Dict[str, Any]]:
     """Fetch latest pre-analyzed behavior analysis"""
     try:
@@ -240,8 +264,6 @@ async def _fetch_plan_data(user_id: str) -> Optional[Dict[str, Any]]:
         ORDER BY block_order
         """
 
-        blocks = await db.fetch(blocks_query, analysis_id)
-
         # Get tasks
         tasks_query = """
         SELECT
@@ -259,7 +281,11 @@ async def _fetch_plan_data(user_id: str) -> Optional[Dict[str, Any]]:
         ORDER BY scheduled_time
         """
 
-        tasks = await db.fetch(tasks_query, analysis_id)
+        # Time blocks and tasks only depend on the plan id
+        blocks, tasks = await asyncio.gather(
+            db.fetch(blocks_query, analysis_id),
+            db.fetch(tasks_query, analysis_id)
+        )
 
         created_at = plan_result.get('created_at')
         if created_at and hasattr(created_at, 'isoformat'):
@@ -18,13 +18,14 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from fastapi.responses import JSONResponse
 
 from services.plan_extraction_service import PlanExtractionService
-from supabase import create_client, Client
+from supabase import Client
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 from shared_libs.exceptions.holisticos_exceptions import HolisticOSException
+from shared_libs.supabase_client.async_executor import execute_async, get_shared_supabase_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -159,10 +160,10 @@ async def get_supabase() -> Client:
     # Prefer service key for API operations (bypasses RLS)
     if service_key:
         print(f"✅ Using SUPABASE_SERVICE_KEY for admin operations")
-        return create_client(supabase_url, service_key)
+        return get_shared_supabase_client(supabase_url, service_key)
     elif anon_key:
         print(f"⚠️ Using SUPABASE_KEY (anon) - RLS policies will apply")
-        return create_client(supabase_url, anon_key)
+        return get_shared_supabase_client(supabase_url, anon_key)
     else:
         raise ValueError("Either SUPABASE_SERVICE_KEY or SUPABASE_KEY is required")
 
@@ -190,10 +191,11 @@ async def submit_task_checkin(
         analysis_result_id = request.analysis_result_id
         if not analysis_result_id:
             # Look up analysis_result_id from plan_items table
-            plan_item_result = supabase.table("plan_items")\
-                .select("analysis_result_id")\
-                .eq("id", request.plan_item_id)\
-                .execute()
+            plan_item_result = await execute_async(
+                supabase.table("plan_items")
+                .select("analysis_result_id")
+                .eq("id", request.plan_item_id)
+            )
             
             if plan_item_result.data:
                 analysis_result_id = plan_item_result.data[0]["analysis_result_id"]
@@ -214,9 +216,10 @@ async def submit_task_checkin(
         }
         
         # Use upsert to handle updates to existing check-ins
-        result = supabase.table("task_checkins")\
-            .upsert(checkin_data, on_conflict="profile_id,plan_item_id,planned_date")\
-            .execute()
+        result = await execute_async(
+            supabase.table("task_checkins")
+            .upsert(checkin_data, on_conflict="profile_id,plan_item_id,planned_date")
+        )
         
         if result.data:
             logger.info(f"Task check-in recorded for profile {request.profile_id}, task {request.plan_item_id}")
@@ -265,17 +268,18 @@ async def get_user_tasks(
         
         # Get completion status for items that have plan_date matching target_date
         # JOIN with plan_items to get check-ins for items planned for the target date
-        checkin_result = supabase.table("task_checkins")\
+        checkin_result = await execute_async(
+            supabase.table("task_checkins")
             .select("""
                 plan_item_id, 
                 completion_status, 
                 satisfaction_rating, 
                 completed_at,
                 plan_items!inner(plan_date)
-            """)\
-            .eq("profile_id", profile_id)\
-            .eq("plan_items.plan_date", target_date.isoformat())\
-            .execute()
+            """)
+            .eq("profile_id", profile_id)
+            .eq("plan_items.plan_date", target_date.isoformat())
+        )
         
         # Create completion lookup
         completions = {
@@ -366,9 +370,10 @@ async def submit_daily_journal(
         }
         
         # Use upsert to handle updates to existing journal entries
-        result = supabase.table("daily_journals")\
-            .upsert(journal_data, on_conflict="profile_id,journal_date")\
-            .execute()
+        result = await execute_async(
+            supabase.table("daily_journals")
+            .upsert(journal_data, on_conflict="profile_id,journal_date")
+        )
         
         if result.data:
             logger.info(f"Daily journal recorded for profile {request.profile_id}, date {request.journal_date}")
@@ -396,12 +401,13 @@ async def get_daily_journal(
     try:
         target_date = date.fromisoformat(date_param) if date_param else date.today()
         
-        result = supabase.table("daily_journals")\
-            .select("*")\
-            .eq("profile_id", profile_id)\
-            .eq("journal_date", target_date.isoformat())\
-            .single()\
-            .execute()
+        result = await execute_async(
+            supabase.table("daily_journals")
+            .select("*")
+            .eq("profile_id", profile_id)
+            .eq("journal_date", target_date.isoformat())
+            .single()
+        )
         
         if result.data:
             return result.data
@@ -422,12 +428,13 @@ async def get_journal_history(
     Get journal history for analytics and trend analysis
     """
     try:
-        result = supabase.table("daily_journals")\
-            .select("*")\
-            .eq("profile_id", profile_id)\
-            .order("journal_date", desc=True)\
-            .limit(days)\
-            .execute()
+        result = await execute_async(
+            supabase.table("daily_journals")
+            .select("*")
+            .eq("profile_id", profile_id)
+            .order("journal_date", desc=True)
+            .limit(days)
+        )
         
         return {
             "profile_id": profile_id,
@@ -473,10 +480,11 @@ async def get_block_title_from_time_block(time_block_string: str, supabase: Clie
             return time_block_string
 
         # Fetch time_blocks for this analysis_result_id
-        result = supabase.table("time_blocks")\
-            .select("id, block_title, block_order")\
-            .eq("analysis_result_id", analysis_result_id)\
-            .execute()
+        result = await execute_async(
+            supabase.table("time_blocks")
+            .select("id, block_title, block_order")
+            .eq("analysis_result_id", analysis_result_id)
+        )
 
         if not result.data:
             return time_block_string
@@ -619,6 +627,25 @@ async def get_current_plans(
 # Batch Check-in Endpoints (MVP)
 # =====================================================
 
+# Ids per plan_items in_() lookup (keeps the PostgREST URL short)
+PLAN_ITEM_LOOKUP_CHUNK = 200
+
+async def _fetch_plan_items_by_id(supabase: Client, plan_item_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Resolve plan items for a batch with one in_() query per chunk of ids"""
+    chunks = [
+        plan_item_ids[i:i + PLAN_ITEM_LOOKUP_CHUNK]
+        for i in range(0, len(plan_item_ids), PLAN_ITEM_LOOKUP_CHUNK)
+    ]
+    results = await asyncio.gather(*[
+        execute_async(
+            supabase.table("plan_items")
+            .select("id, profile_id, analysis_result_id, plan_date")
+            .in_("id", chunk)
+        )
+        for chunk in chunks
+    ])
+    return {row["id"]: row for result in results for row in (result.data or [])}
+
 class BatchCheckinItem(BaseModel):
     """Individual item in a batch check-in request"""
     plan_item_id: str = Field(..., description="Plan item UUID")
@@ -643,49 +670,82 @@ async def submit_batch_checkin(
 ):
     """
     Submit multiple task check-ins at once (MVP - simple completed status only)
+
+    All referenced plan items are resolved with one in_() query and validated
+    in memory, then every check-in is written with one bulk upsert: two round
+    trips regardless of batch size. Items that are unknown, belong to another
+    profile or fail to write are reported in failed_items.
     """
     try:
+        # Duplicate ids in one upsert would hit the same row twice (Postgres rejects that)
+        plan_item_ids = list(dict.fromkeys(item.plan_item_id for item in request.checkins))
+        plan_items = await _fetch_plan_items_by_id(supabase, plan_item_ids)
+
         checkin_data = []
-        
-        for checkin_item in request.checkins:
-            # Get analysis_result_id and plan_date from plan_items table
-            plan_item_result = supabase.table("plan_items")\
-                .select("analysis_result_id, plan_date")\
-                .eq("id", checkin_item.plan_item_id)\
-                .execute()
-            
-            if not plan_item_result.data:
-                logger.warning(f"Plan item not found: {checkin_item.plan_item_id}")
+        failed_items = []
+        now = datetime.now().isoformat()
+
+        for plan_item_id in plan_item_ids:
+            plan_item = plan_items.get(plan_item_id)
+            if not plan_item:
+                logger.warning(f"Plan item not found: {plan_item_id}")
+                failed_items.append({"plan_item_id": plan_item_id, "error": "Plan item not found"})
                 continue
-            
-            analysis_result_id = plan_item_result.data[0]["analysis_result_id"]
-            plan_date = plan_item_result.data[0]["plan_date"]
-            
+
+            owner = plan_item.get("profile_id")
+            if owner and owner != request.profile_id:
+                logger.warning(f"Plan item {plan_item_id} does not belong to profile {request.profile_id}")
+                failed_items.append({"plan_item_id": plan_item_id, "error": "Plan item belongs to another profile"})
+                continue
+
             checkin_data.append({
                 'profile_id': request.profile_id,
-                'plan_item_id': checkin_item.plan_item_id,
-                'analysis_result_id': analysis_result_id,
+                'plan_item_id': plan_item_id,
+                'analysis_result_id': plan_item["analysis_result_id"],
                 'completion_status': 'completed',  # MVP: only completed status
-                'planned_date': plan_date,  # Use plan_date from plan_items, not request.planned_date
-                'completed_at': datetime.now().isoformat(),
-                'actual_completion_time': datetime.now().isoformat()
+                'planned_date': plan_item["plan_date"],  # Use plan_date from plan_items, not request.planned_date
+                'completed_at': now,
+                'actual_completion_time': now
             })
-        
+
         if not checkin_data:
-            return {"success": False, "message": "No valid plan items found", "items_processed": 0}
-        
+            return {
+                "success": False,
+                "message": "No valid plan items found",
+                "items_processed": 0,
+                "failed_items": failed_items
+            }
+
         # Batch upsert to handle updates to existing check-ins
-        result = supabase.table("task_checkins")\
-            .upsert(checkin_data, on_conflict="profile_id,plan_item_id,planned_date")\
-            .execute()
-        
-        items_processed = len(result.data) if result.data else 0
-        
-        logger.info(f"Batch check-in recorded for profile {request.profile_id}: {items_processed} tasks")
+        try:
+            result = await execute_async(
+                supabase.table("task_checkins")
+                .upsert(checkin_data, on_conflict="profile_id,plan_item_id,planned_date")
+            )
+            items_processed = len(result.data) if result.data else 0
+        except Exception as bulk_error:
+            # One bad row fails the whole statement - retry row by row to report it
+            logger.warning(f"Bulk check-in upsert failed ({bulk_error}), retrying per item")
+            items_processed = 0
+            for row in checkin_data:
+                try:
+                    result = await execute_async(
+                        supabase.table("task_checkins")
+                        .upsert(row, on_conflict="profile_id,plan_item_id,planned_date")
+                    )
+                    items_processed += len(result.data) if result.data else 0
+                except Exception as row_error:
+                    failed_items.append({"plan_item_id": row["plan_item_id"], "error": str(row_error)})
+
+        logger.info(
+            f"Batch check-in recorded for profile {request.profile_id}: {items_processed} tasks"
+            + (f", {len(failed_items)} failed" if failed_items else "")
+        )
         return {
-            "success": True,
+            "success": items_processed > 0,
             "message": f"Successfully checked in {items_processed} tasks",
-            "items_processed": items_processed
+            "items_processed": items_processed,
+            "failed_items": failed_items
         }
             
     except Exception as e:
@@ -704,11 +764,12 @@ async def undo_batch_checkin(
         # Delete check-ins for the specified plan items
         # Note: We don't filter by planned_date because check-ins should be associated 
         # with plan_date from plan_items, regardless of when the check-in was submitted
-        result = supabase.table("task_checkins")\
-            .delete()\
-            .eq("profile_id", request.profile_id)\
-            .in_("plan_item_id", request.plan_item_ids)\
-            .execute()
+        result = await execute_async(
+            supabase.table("task_checkins")
+            .delete()
+            .eq("profile_id", request.profile_id)
+            .in_("plan_item_id", request.plan_item_ids)
+        )
         
         items_removed = len(result.data) if result.data else 0
         
@@ -759,7 +820,7 @@ async def get_checkin_status(
         if analysis_id:
             query = query.eq("analysis_result_id", analysis_id)
 
-        result = query.execute()
+        result = await execute_async(query)
 
         # Extract just the plan_item_ids for simple frontend lookup
         completed_plan_item_ids = [
@@ -799,11 +860,12 @@ async def get_completion_summary(
         start_date = date.today() - timedelta(days=days)
         
         # Get task completion data
-        result = supabase.table("task_checkins")\
-            .select("completion_status, satisfaction_rating, planned_date")\
-            .eq("profile_id", profile_id)\
-            .gte("planned_date", start_date.isoformat())\
-            .execute()
+        result = await execute_async(
+            supabase.table("task_checkins")
+            .select("completion_status, satisfaction_rating, planned_date")
+            .eq("profile_id", profile_id)
+            .gte("planned_date", start_date.isoformat())
+        )
         
         data = result.data or []
         
@@ -898,20 +960,22 @@ async def get_engagement_context(
         # Fallback to separate queries
         if not result or not result.data:
             # Fallback: Get plan items
-            plan_items_result = supabase.table("plan_items")\
-                .select("title, description, scheduled_time, estimated_duration_minutes, task_type, time_block, plan_date")\
-                .eq("profile_id", profile_id)\
-                .gte("plan_date", start_date)\
-                .lte("plan_date", end_date)\
-                .execute()
+            plan_items_result = await execute_async(
+                supabase.table("plan_items")
+                .select("title, description, scheduled_time, estimated_duration_minutes, task_type, time_block, plan_date")
+                .eq("profile_id", profile_id)
+                .gte("plan_date", start_date)
+                .lte("plan_date", end_date)
+            )
             
             # Get check-ins with timing data
-            checkins_result = supabase.table("task_checkins")\
-                .select("completion_status, satisfaction_rating, planned_date, planned_time, actual_completion_time, completed_at, user_notes")\
-                .eq("profile_id", profile_id)\
-                .gte("planned_date", start_date)\
-                .lte("planned_date", end_date)\
-                .execute()
+            checkins_result = await execute_async(
+                supabase.table("task_checkins")
+                .select("completion_status, satisfaction_rating, planned_date, planned_time, actual_completion_time, completed_at, user_notes")
+                .eq("profile_id", profile_id)
+                .gte("planned_date", start_date)
+                .lte("planned_date", end_date)
+            )
             
             plan_items = plan_items_result.data or []
             checkins = checkins_result.data or []
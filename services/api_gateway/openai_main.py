@@ -42,6 +42,7 @@ def convert_enums_to_strings(obj):
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Response, Request, Header, Security
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security.api_key import APIKeyHeader
 from pydantic import BaseModel
 import openai
@@ -186,6 +187,11 @@ async def production_error_handler(request: Request, call_next):
 # Configure CORS with secure settings
 from shared_libs.config.security_settings import get_cors_config
 from shared_libs.middleware.input_validator import validate_request_middleware, RequestSizeLimit
+from shared_libs.llm.openai_registry import create_chat_completion
+from shared_libs.utils.energy_timeline import (
+    get_timeline_engine, TimelineDefaults, PEAK_THRESHOLD, MAINTENANCE_THRESHOLD
+)
+from shared_libs.llm.prompt_encoding import PromptBudget
 import re
 
 # Custom origin validator to allow all localhost ports
@@ -550,6 +556,13 @@ async def initialize_agents():
         except Exception as e:
             pass  # Database pool initialization failed
         
+        # Initialize shared HTTP client pool (keep-alive connections to upstream APIs)
+        try:
+            from shared_libs.http.client_pool import http_pool
+            logger.info(f"[STARTUP] HTTP client pool ready (http2={http_pool.http2}, max_per_host={http_pool.max_connections})")
+        except Exception as e:
+            logger.error(f"[STARTUP] HTTP client pool unavailable: {e}")
+
         # Initialize agents
         from services.orchestrator.main import HolisticOrchestrator
         from services.agents.memory.main import HolisticMemoryAgent
@@ -635,6 +648,35 @@ async def shutdown_agents():
         except Exception as e:
             logger.error(f"[SHUTDOWN] Failed to stop background worker: {e}")
 
+        # Close pooled upstream HTTP connections (Sahha, hos-fapi)
+        try:
+            from shared_libs.http.client_pool import close_http_pool
+            await close_http_pool()
+            logger.info("[SHUTDOWN] HTTP client pool closed")
+        except Exception as e:
+            logger.error(f"[SHUTDOWN] Failed to close HTTP client pool: {e}")
+
+        # Stop the Supabase I/O executor
+        try:
+            from shared_libs.supabase_client.async_executor import shutdown_executor
+            shutdown_executor()
+        except Exception as e:
+            logger.error(f"[SHUTDOWN] Failed to stop Supabase executor: {e}")
+
+        # Close shared OpenAI clients
+        try:
+            from shared_libs.llm.openai_registry import openai_registry
+            await openai_registry.close()
+        except Exception as e:
+            logger.error(f"[SHUTDOWN] Failed to close OpenAI clients: {e}")
+
+        # Write out queued debug logs
+        try:
+            from shared_libs.utils.log_sink import close_log_sink
+            close_log_sink()
+        except Exception as e:
+            logger.error(f"[SHUTDOWN] Failed to flush log sink: {e}")
+
         # Stop behavior analysis scheduler
         from services.scheduler.behavior_analysis_scheduler import stop_behavior_analysis_scheduler
         await stop_behavior_analysis_scheduler()
@@ -835,11 +877,21 @@ async def get_monitoring_stats():
     health_status = await health_checker.run_comprehensive_health_check()
     basic_stats = metrics.get_basic_stats()
     alert_summary = alert_manager.get_alert_summary()
+    from shared_libs.llm.openai_registry import openai_registry
+    from shared_libs.llm.response_cache import get_response_cache
+    from shared_libs.supabase_client.async_executor import get_executor_stats
+    from services.sahha import get_sahha_client
+    from shared_libs.utils.log_sink import get_log_sink
     
     return {
         "health": health_status,
         "metrics": basic_stats,
         "alerts": alert_summary,
+        "openai_concurrency": openai_registry.get_stats(),
+        "llm_response_cache": get_response_cache().get_stats(),
+        "supabase_executor": get_executor_stats(),
+        "sahha_rate_controller": get_sahha_client().rate_controller.get_stats(),
+        "log_sink": get_log_sink().get_stats(),
         "system_info": {
             "version": "2.0.0",
             "environment": os.getenv("ENVIRONMENT", "production"),
@@ -1125,11 +1177,12 @@ async def generate_fresh_routine_plan(user_id: str, request: PlanGenerationReque
     if request_deduplicator.is_duplicate_request(user_id, archetype, "routine"):
         raise HTTPException(status_code=429, detail="Duplicate routine request detected. Please wait 60 seconds before retrying.")
     
+    cost = None  # Reserved cost; released in finally unless settled on success
     try:
         # Apply rate limiting if available
         if RATE_LIMITING_AVAILABLE:
             try:
-                await rate_limiter.apply_rate_limit(http_request, "routine_generation")
+                cost = await rate_limiter.apply_rate_limit(http_request, "routine_generation")
             except Exception as rate_limit_error:
                 pass
                 raise rate_limit_error
@@ -1210,33 +1263,30 @@ async def generate_fresh_routine_plan(user_id: str, request: PlanGenerationReque
         pass
 
         # DETAILED LOGGING: Log raw data and analysis outputs for agent handoff tracking
+        # (queued on the log sink - no file I/O on the request path)
+        handoff_dir = "logs/agent_handoffs"
+        handoff_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        handoff_sample_key = f"{user_id}:{handoff_timestamp}"
         try:
-            import json
-            import os
-
-            # Create handoff logs directory
-            handoff_dir = "logs/agent_handoffs"  # Production: Disabled
-            if not os.path.exists(handoff_dir):
-                os.makedirs(handoff_dir)
-
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            from shared_libs.utils.log_sink import get_log_sink
+            log_sink = get_log_sink()
 
             # SIMPLE LOGGING: Just dump the actual agent outputs
             if behavior_success:
-                with open(f"{handoff_dir}/01_behavior_analysis_output_{timestamp}.json", 'w') as f:
-                    json.dump({
-                        "timestamp": datetime.now().isoformat(),
-                        "user_id": user_id,
-                        "full_behavior_analysis_output": behavior_analysis
-                    }, f, indent=2, default=str)
+                log_sink.submit(f"{handoff_dir}/01_behavior_analysis_output_{handoff_timestamp}.json", {
+                    "timestamp": datetime.now().isoformat(),
+                    "user_id": user_id,
+                    "full_behavior_analysis_output": behavior_analysis
+                }, stream="behavior_analysis_output", sample_key=handoff_sample_key,
+                    payload_fields=("full_behavior_analysis_output",))
 
             if circadian_success:
-                with open(f"{handoff_dir}/02_circadian_analysis_output_{timestamp}.json", 'w') as f:
-                    json.dump({
-                        "timestamp": datetime.now().isoformat(),
-                        "user_id": user_id,
-                        "full_circadian_analysis_output": circadian_analysis
-                    }, f, indent=2, default=str)
+                log_sink.submit(f"{handoff_dir}/02_circadian_analysis_output_{handoff_timestamp}.json", {
+                    "timestamp": datetime.now().isoformat(),
+                    "user_id": user_id,
+                    "full_circadian_analysis_output": circadian_analysis
+                }, stream="circadian_analysis_output", sample_key=handoff_sample_key,
+                    payload_fields=("full_circadian_analysis_output",))
 
             pass
 
@@ -1282,24 +1332,18 @@ async def generate_fresh_routine_plan(user_id: str, request: PlanGenerationReque
 
             # RAW DATA LOGGING: Log the actual health data that goes into analysis
             try:
-                import os
-                import json
-
-                handoff_dir = "logs/agent_handoffs"  # Production: Disabled
-                if not os.path.exists(handoff_dir):
-                    os.makedirs(handoff_dir)
-
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                from shared_libs.utils.log_sink import get_log_sink
 
                 # SIMPLE LOGGING: Just dump the actual raw data - properly convert to dict
-                with open(f"{handoff_dir}/00_raw_health_data_{timestamp}.json", 'w') as f:
+                log_sink = get_log_sink()
+                if log_sink.should_sample(handoff_sample_key):
                     # Convert user_context to dict if it's a Pydantic model
                     raw_data_dict = user_context.dict() if hasattr(user_context, 'dict') else user_context
-                    json.dump({
+                    log_sink.submit(f"{handoff_dir}/00_raw_health_data_{handoff_timestamp}.json", {
                         "timestamp": datetime.now().isoformat(),
                         "user_id": user_id,
                         "full_raw_health_data": raw_data_dict
-                    }, f, indent=2, default=str)
+                    }, stream="raw_health_data")
 
                 # Production: Raw data logging removed
 
@@ -1318,24 +1362,17 @@ async def generate_fresh_routine_plan(user_id: str, request: PlanGenerationReque
 
             # FINAL AGENT HANDOFF: Log the combined analysis → routine generation transformation
             try:
-                import os
-                import json
-
-                handoff_dir = "logs/agent_handoffs"  # Production: Disabled
-                if not os.path.exists(handoff_dir):
-                    os.makedirs(handoff_dir)
-
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                from shared_libs.utils.log_sink import get_log_sink
 
                 # SIMPLE LOGGING: Just dump the actual routine output
-                with open(f"{handoff_dir}/03_routine_generation_output_{timestamp}.json", 'w') as f:
-                    json.dump({
-                        "timestamp": datetime.now().isoformat(),
-                        "user_id": user_id,
-                        "behavior_analysis_used": behavior_analysis if behavior_success else None,
-                        "circadian_analysis_used": circadian_analysis if circadian_success else None,
-                        "full_routine_plan_output": routine_plan
-                    }, f, indent=2, default=str)
+                get_log_sink().submit(f"{handoff_dir}/03_routine_generation_output_{handoff_timestamp}.json", {
+                    "timestamp": datetime.now().isoformat(),
+                    "user_id": user_id,
+                    "behavior_analysis_used": behavior_analysis if behavior_success else None,
+                    "circadian_analysis_used": circadian_analysis if circadian_success else None,
+                    "full_routine_plan_output": routine_plan
+                }, stream="routine_generation_output", sample_key=handoff_sample_key,
+                    payload_fields=("behavior_analysis_used", "circadian_analysis_used", "full_routine_plan_output"))
 
                 pass
 
@@ -1386,9 +1423,9 @@ async def generate_fresh_routine_plan(user_id: str, request: PlanGenerationReque
             # when storing behavior analysis results - no need for global timestamp update
             
             # Track API cost for rate limiting
-            if RATE_LIMITING_AVAILABLE:
+            if cost:
                 try:
-                    await rate_limiter.track_api_cost(user_id, "routine_generation")
+                    await cost.settle()
                 except Exception as cost_error:
                     pass
             
@@ -1452,22 +1489,137 @@ async def generate_fresh_routine_plan(user_id: str, request: PlanGenerationReque
                     output_data=output_data,
                     raw_health_data=raw_health_data,
                     user_id=user_id,
-                    archetype=archetype
+                    archetype=archetype,
+                    analysis_number=analysis_number
                 )
             except Exception as log_error:
                 pass  # Never let logging errors break the API response
 
             return response_data
             
+        except HTTPException:
+            raise
         except Exception as context_error:
             pass
             raise HTTPException(status_code=500, detail=f"Failed to get user data for routine generation: {str(context_error)}")
             
+    except HTTPException:
+        # Mark request as complete even on error; keep the status (429/402 from rate limiting)
+        request_deduplicator.mark_request_complete(user_id, archetype, "routine")
+        raise
     except Exception as e:
         # Mark request as complete even on error
         request_deduplicator.mark_request_complete(user_id, archetype, "routine")
         print(f"❌ [ROUTINE_GENERATE_ERROR] Failed to generate routine for {user_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate routine plan: {str(e)}")
+    finally:
+        if cost:
+            await cost.release()
+
+@app.post("/api/user/{user_id}/routine/generate/stream")
+async def generate_routine_plan_stream(user_id: str, request: PlanGenerationRequest, http_request: Request, api_key: str = Security(api_key_header)):
+    """
+    Streaming variant of /routine/generate (Server-Sent Events)
+
+    Events:
+    - status: {"stage": "analysis" | "generating"}
+    - time_block: {"time_block": {...}, "tasks": [...]} as soon as each block closes
+    - complete: {"routine_plan": {...}} once the plan is stored (same payload as /routine/generate)
+    - error: {"error": "..."}
+    """
+    # Validate client API key for external applications (Flutter app)
+    api_key = http_request.headers.get("X-API-Key")
+    if api_key != "hosa_flutter_app_2024":
+        print(f"🔒 [AUTH_FAILED] Invalid or missing API key for user {user_id[:8]}... Provided: {api_key}")
+        raise HTTPException(status_code=401, detail="User not authenticated")
+
+    from services.request_deduplication_service import request_deduplicator
+    from services.plan_streaming_service import PlanEventStream
+
+    archetype = request.archetype or "Foundation Builder"
+    if request_deduplicator.is_duplicate_request(user_id, archetype, "routine"):
+        raise HTTPException(status_code=429, detail="Duplicate routine request detected. Please wait 60 seconds before retrying.")
+
+    cost = None
+    if RATE_LIMITING_AVAILABLE:
+        try:
+            cost = await rate_limiter.apply_rate_limit(http_request, "routine_generation")
+        except Exception:
+            request_deduplicator.mark_request_complete(user_id, archetype, "routine")
+            raise
+
+    force_refresh = request.preferences.get('force_refresh', False) if request.preferences else False
+    plan_stream = PlanEventStream()
+
+    async def generate():
+        try:
+            await plan_stream.emit("status", {"stage": "analysis"})
+
+            from services.mvp_style_logger import mvp_logger
+            analysis_number = mvp_logger.get_next_analysis_number()
+            behavior_analysis, circadian_analysis = await asyncio.gather(
+                get_or_create_shared_behavior_analysis(user_id, archetype, force_refresh, analysis_number),
+                get_or_create_shared_circadian_analysis(user_id, archetype, force_refresh, analysis_number),
+                return_exceptions=True
+            )
+
+            behavior_success = behavior_analysis and not isinstance(behavior_analysis, Exception)
+            circadian_success = circadian_analysis and not isinstance(circadian_analysis, Exception)
+            if not behavior_success:
+                await plan_stream.emit("error", {
+                    "error": "Behavior analysis failed or returned no results",
+                    "suggestion": "Try with force_refresh=true or ensure user has sufficient health data"
+                })
+                return
+
+            behavior_analysis = convert_enums_to_strings(behavior_analysis)
+            if circadian_success:
+                circadian_analysis = convert_enums_to_strings(circadian_analysis)
+
+            await plan_stream.emit("status", {"stage": "generating"})
+            routine_plan = await run_memory_enhanced_routine_generation(
+                user_id=user_id,
+                archetype=archetype,
+                behavior_analysis=behavior_analysis,
+                circadian_analysis=circadian_analysis if circadian_success else None,
+                combined_analysis={
+                    "behavior_analysis": behavior_analysis,
+                    "circadian_analysis": circadian_analysis if circadian_success else {},
+                    "combined_metadata": {
+                        "behavior_success": behavior_success,
+                        "circadian_success": circadian_success,
+                        "parallel_execution": True,
+                        "analysis_timestamp": datetime.now().isoformat(),
+                        "archetype": archetype,
+                        "force_refresh": force_refresh
+                    }
+                },
+                user_timezone=request.timezone,
+                plan_stream=plan_stream
+            )
+
+            if cost:
+                try:
+                    await cost.settle()
+                except Exception:
+                    pass
+
+            await plan_stream.emit("complete", {"status": "success", "user_id": user_id, "routine_plan": routine_plan})
+
+        except Exception as e:
+            print(f"❌ [ROUTINE_STREAM_ERROR] Failed to generate routine for {user_id}: {e}")
+            await plan_stream.emit("error", {"error": f"Failed to generate routine plan: {str(e)}"})
+        finally:
+            request_deduplicator.mark_request_complete(user_id, archetype, "routine")
+            if cost:
+                await cost.release()
+            await plan_stream.close()
+
+    return StreamingResponse(
+        plan_stream.serve(generate()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/api/user/{user_id}/nutrition/latest", response_model=NutritionPlanResponse)
 async def get_latest_nutrition_plan(user_id: str):
@@ -1694,11 +1846,12 @@ async def generate_fresh_nutrition_plan(user_id: str, request: PlanGenerationReq
     if request_deduplicator.is_duplicate_request(user_id, archetype, "nutrition"):
         raise HTTPException(status_code=429, detail="Duplicate nutrition request detected. Please wait 60 seconds before retrying.")
     
+    cost = None  # Reserved cost; released in finally unless settled on success
     try:
         # Apply rate limiting if available
         if RATE_LIMITING_AVAILABLE:
             try:
-                await rate_limiter.apply_rate_limit(http_request, "nutrition_generation")
+                cost = await rate_limiter.apply_rate_limit(http_request, "nutrition_generation")
             except Exception as rate_limit_error:
                 pass
                 raise rate_limit_error
@@ -1770,9 +1923,9 @@ async def generate_fresh_nutrition_plan(user_id: str, request: PlanGenerationReq
             # when storing behavior analysis results - no need for global timestamp update
             
             # Track API cost for rate limiting
-            if RATE_LIMITING_AVAILABLE:
+            if cost:
                 try:
-                    await rate_limiter.track_api_cost(user_id, "nutrition_generation")
+                    await cost.settle()
                 except Exception as cost_error:
                     pass
             
@@ -1797,16 +1950,25 @@ async def generate_fresh_nutrition_plan(user_id: str, request: PlanGenerationReq
                 cached=(analysis_type == "cached")
             )
             
+        except HTTPException:
+            raise
         except Exception as context_error:
             pass
             raise HTTPException(status_code=500, detail=f"Failed to get user data for nutrition generation: {str(context_error)}")
 
             
+    except HTTPException:
+        # Mark request as complete even on error; keep the status (429/402 from rate limiting)
+        request_deduplicator.mark_request_complete(user_id, archetype, "nutrition")
+        raise
     except Exception as e:
         # Mark request as complete even on error
         request_deduplicator.mark_request_complete(user_id, archetype, "nutrition")
         print(f"❌ [NUTRITION_GENERATE_ERROR] Failed to generate nutrition for {user_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate nutrition plan: {str(e)}")
+    finally:
+        if cost:
+            await cost.release()
 
 @app.get("/api/user/{user_id}/insights/latest")
 async def get_latest_insights(user_id: str):
@@ -1985,9 +2147,10 @@ async def analyze_behavior(user_id: str, request: BehaviorAnalysisRequest, http_
     Only runs fresh analysis when 50+ new data points exist, otherwise returns cached analysis
     """
     # Apply rate limiting if available (stricter for expensive behavior analysis)
+    cost = None  # Reserved cost; released in finally unless settled on success
     if RATE_LIMITING_AVAILABLE:
         try:
-            await rate_limiter.apply_rate_limit(http_request, "behavior_analysis")
+            cost = await rate_limiter.apply_rate_limit(http_request, "behavior_analysis")
         except Exception as rate_limit_error:
             pass
             raise rate_limit_error
@@ -2097,11 +2260,12 @@ async def analyze_behavior(user_id: str, request: BehaviorAnalysisRequest, http_
             next_eligible = f"Need {needed_points} more data points to trigger fresh analysis"
         
         # Track API cost for rate limiting (only for fresh analysis, not cached)
-        if RATE_LIMITING_AVAILABLE and analysis_type == "fresh":
+        if cost and analysis_type == "fresh":
             try:
-                await rate_limiter.track_api_cost(user_id, "behavior_analysis")
+                await cost.settle()
             except Exception as cost_error:
                 pass
+        # Cached results are left unsettled: finally releases the reservation
 
         # Prepare response data
         response_data = BehaviorAnalysisResponse(
@@ -2139,7 +2303,8 @@ async def analyze_behavior(user_id: str, request: BehaviorAnalysisRequest, http_
                 input_data=input_data,
                 output_data=output_data,
                 user_id=user_id,
-                archetype=request.archetype or "Foundation Builder"
+                archetype=request.archetype or "Foundation Builder",
+                analysis_number=analysis_number
             )
         except Exception as log_error:
             pass  # Never let logging errors break the API response
@@ -2148,6 +2313,9 @@ async def analyze_behavior(user_id: str, request: BehaviorAnalysisRequest, http_
     except Exception as e:
         print(f"❌ [BEHAVIOR_ANALYZE_ERROR] Failed to analyze behavior for {user_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to analyze behavior: {str(e)}")
+    finally:
+        if cost:
+            await cost.release()
 
 @app.post("/api/user/{user_id}/circadian/analyze", response_model=CircadianAnalysisResponse)
 @track_endpoint_metrics("circadian_analysis") if MONITORING_AVAILABLE else lambda x: x
@@ -2168,11 +2336,12 @@ async def analyze_circadian_rhythm(user_id: str, request: CircadianAnalysisReque
     if IS_DEVELOPMENT:
         print(f"🔑 [AUTH_SUCCESS] Valid client API key provided for circadian analysis {user_id[:8]}...")
 
+    cost = None  # Reserved cost; released in finally unless settled on success
     try:
         # Apply rate limiting if available
         if RATE_LIMITING_AVAILABLE:
             try:
-                await rate_limiter.apply_rate_limit(http_request, "circadian_analysis")
+                cost = await rate_limiter.apply_rate_limit(http_request, "circadian_analysis")
             except Exception as rate_limit_error:
                 pass
                 raise rate_limit_error
@@ -2232,11 +2401,12 @@ async def analyze_circadian_rhythm(user_id: str, request: CircadianAnalysisReque
         analysis_type = "fresh" if circadian_result.get("analysis_type") == "circadian_rhythm" else "cached"
 
         # Track API cost for rate limiting
-        if RATE_LIMITING_AVAILABLE and analysis_type == "fresh":
+        if cost and analysis_type == "fresh":
             try:
-                await rate_limiter.track_api_cost(user_id, "circadian_analysis")
+                await cost.settle()
             except Exception as cost_error:
                 pass
+        # Cached results are left unsettled: finally releases the reservation
 
         # Prepare response data
         response_data = CircadianAnalysisResponse(
@@ -2271,7 +2441,8 @@ async def analyze_circadian_rhythm(user_id: str, request: CircadianAnalysisReque
                 input_data=input_data,
                 output_data=output_data,
                 user_id=user_id,
-                archetype=archetype
+                archetype=archetype,
+                analysis_number=analysis_number
             )
         except Exception as log_error:
             pass  # Never let logging errors break the API response
@@ -2282,6 +2453,9 @@ async def analyze_circadian_rhythm(user_id: str, request: CircadianAnalysisReque
     except Exception as e:
         print(f"❌ [CIRCADIAN_ANALYZE_ERROR] Failed to analyze circadian rhythm for {user_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to analyze circadian rhythm: {str(e)}")
+    finally:
+        if cost:
+            await cost.release()
 
 
 async def run_complete_health_analysis(user_id: str, archetype: str) -> dict:
@@ -2715,12 +2889,10 @@ async def run_behavior_analysis(user_id: str, archetype: str) -> dict:
 async def run_behavior_analysis_o3(system_prompt: str, user_context: str) -> dict:
     """Run behavior analysis using o3 model for deep analysis - Phase 3.2"""
     try:
-        # Use o3 for complex behavior analysis
-        client = openai.AsyncOpenAI()
-        
         # Note: o3 model only supports default temperature (1)
-        response = await client.chat.completions.create(
+        response = await create_chat_completion(
             model="o3",
+            cache=True,  # Identical context + prompt -> reuse the stored analysis
             messages=[
                 {
                     "role": "system", 
@@ -2803,10 +2975,9 @@ Focus on actionable insights from the provided health metrics.
 async def run_circadian_analysis_gpt4o(system_prompt: str, user_context: str) -> dict:
     """Run circadian rhythm analysis using GPT-4o model with readiness assessment"""
     try:
-        client = openai.AsyncOpenAI()
-
-        response = await client.chat.completions.create(
+        response = await create_chat_completion(
             model="gpt-4o",
+            cache=True,  # Identical context + prompt -> reuse the stored analysis
             messages=[
                 {
                     "role": "system",
@@ -2934,7 +3105,8 @@ Provide structured JSON output with ALL sections: readiness_assessment, chronoty
         }
 
 
-def _generate_generous_baseline_energy_timeline(chronotype: str = "moderate", archetype: str = "Foundation Builder") -> dict:
+def _generate_generous_baseline_energy_timeline(chronotype: str = "moderate", archetype: str = "Foundation Builder",
+                                                resolution_minutes: int = 15) -> dict:
     """
     Generate a generous, motivating energy timeline when data is insufficient.
 
@@ -2948,89 +3120,26 @@ def _generate_generous_baseline_energy_timeline(chronotype: str = "moderate", ar
     Args:
         chronotype: User's chronotype (default: "moderate")
         archetype: User's archetype (default: "Foundation Builder")
+        resolution_minutes: Slot length (default: 15 -> 96 slots)
 
     Returns:
         dict with energy_timeline array, summary, and metadata
     """
-    timeline = []
-
-    for slot_index in range(96):  # 24 hours * 4 (15-min slots)
-        time_minutes = slot_index * 15
-        hour = time_minutes // 60
-        minute = time_minutes % 60
-        time_str = f"{hour:02d}:{minute:02d}"
-
-        # GENEROUS ENERGY ASSIGNMENT
-        if 7 <= hour < 10:  # Morning Peak (07:00-10:00)
-            zone = "peak"
-            energy = 75 + (slot_index % 4) * 2  # 75-81 (varying within peak range)
-
-        elif 10 <= hour < 13:  # Productive Morning (10:00-13:00)
-            zone = "productive"
-            energy = 65 + (slot_index % 4)  # 65-68
-
-        elif 13 <= hour < 14 or (hour == 14 and (slot_index % 4) < 2):  # Post-lunch dip (13:00-14:30)
-            zone = "maintenance"
-            energy = 52 + (slot_index % 4)  # 52-55
-
-        elif (hour == 14 and (slot_index % 4) >= 2) or 15 <= hour < 17:  # Afternoon Peak (14:30-17:00)
-            zone = "productive"
-            energy = 68 + (slot_index % 4)  # 68-71
-
-        elif 17 <= hour < 21:  # Evening Maintenance (17:00-21:00)
-            zone = "maintenance"
-            energy = 50 - ((hour - 17) * 2)  # 50 declining to 42
-
-        elif 21 <= hour < 22:  # Sleep Prep (21:00-22:00)
-            zone = "recovery"
-            energy = 38 - (slot_index % 4) * 2  # 38 declining to 32
-
-        else:  # Sleep Time (22:00-07:00)
-            zone = "recovery"
-            energy = 25 + (slot_index % 4)  # 25-28
-
-        timeline.append({
-            "time": time_str,
-            "zone": zone,
-            "slot_index": slot_index,
-            "energy_level": energy
-        })
-
-    # Calculate summary statistics
-    peak_slots = [s for s in timeline if s['zone'] == 'peak']
-    productive_slots = [s for s in timeline if s['zone'] == 'productive']
-    maintenance_slots = [s for s in timeline if s['zone'] == 'maintenance']
-    recovery_slots = [s for s in timeline if s['zone'] == 'recovery']
-
-    # Find continuous periods
-    def find_continuous_periods(slots: list) -> list:
-        """Find continuous time periods from slots"""
-        if not slots:
-            return []
-        periods = []
-        start_time = slots[0]['time']
-        prev_idx = slots[0]['slot_index']
-
-        for i in range(1, len(slots)):
-            if slots[i]['slot_index'] != prev_idx + 1:
-                # Gap found - end previous period
-                periods.append(f"{start_time}-{slots[i-1]['time']}")
-                start_time = slots[i]['time']
-            prev_idx = slots[i]['slot_index']
-
-        # Add final period
-        periods.append(f"{start_time}-{slots[-1]['time']}")
-        return periods
+    engine = get_timeline_engine(resolution_minutes, PEAK_THRESHOLD, MAINTENANCE_THRESHOLD)
+    energy, zones = engine.baseline()
+    energy, zones = energy[0], zones[0]
+    timeline = engine.to_slots(energy, zones)
+    periods = engine.zone_periods(zones)
 
     summary = {
-        "peak_energy_periods": find_continuous_periods(peak_slots),
-        "productive_periods": find_continuous_periods(productive_slots),
-        "maintenance_periods": find_continuous_periods(maintenance_slots),
-        "recovery_periods": find_continuous_periods(recovery_slots),
-        "total_peak_minutes": len(peak_slots) * 15,
-        "total_productive_minutes": len(productive_slots) * 15,
-        "total_maintenance_minutes": len(maintenance_slots) * 15,
-        "total_recovery_minutes": len(recovery_slots) * 15
+        "peak_energy_periods": periods["peak"],
+        "productive_periods": periods["productive"],
+        "maintenance_periods": periods["maintenance"],
+        "recovery_periods": periods["recovery"],
+        "total_peak_minutes": engine.zone_minutes(zones, "peak"),
+        "total_productive_minutes": engine.zone_minutes(zones, "productive"),
+        "total_maintenance_minutes": engine.zone_minutes(zones, "maintenance"),
+        "total_recovery_minutes": engine.zone_minutes(zones, "recovery")
     }
 
     timeline_metadata = {
@@ -3123,7 +3232,7 @@ def _assess_circadian_data_quality(circadian_analysis: dict) -> str:
         return "insufficient"
 
 
-def _generate_energy_timeline_from_analysis(circadian_analysis: dict) -> dict:
+def _generate_energy_timeline_from_analysis(circadian_analysis: dict, resolution_minutes: int = 15) -> dict:
     """
     Generate 96-slot energy timeline with interpolation from GPT-4o analysis
 
@@ -3131,6 +3240,7 @@ def _generate_energy_timeline_from_analysis(circadian_analysis: dict) -> dict:
 
     Args:
         circadian_analysis: Raw GPT-4o output with time windows
+        resolution_minutes: Slot length (default: 15 -> 96 slots)
 
     Returns:
         dict with energy_timeline array, summary, and metadata
@@ -3147,15 +3257,11 @@ def _generate_energy_timeline_from_analysis(circadian_analysis: dict) -> dict:
     # Use generous baseline if data is insufficient
     if data_quality == "insufficient":
         logger.info("[CIRCADIAN_GENEROUS] Using generous baseline - insufficient data for accurate analysis")
-        return _generate_generous_baseline_energy_timeline(chronotype, archetype)
+        return _generate_generous_baseline_energy_timeline(chronotype, archetype, resolution_minutes)
 
     # If moderate data quality, we'll use the data-driven approach but with generous defaults
     # Continue with existing logic below for good/excellent data quality
 
-    # Energy zone thresholds
-    PEAK_THRESHOLD = 75
-    MAINTENANCE_THRESHOLD = 50
-
     # Default energy levels for undefined periods (UPDATED to be more generous)
     if data_quality == "moderate":
         # More generous defaults for moderate data quality
@@ -3229,159 +3335,38 @@ def _generate_energy_timeline_from_analysis(circadian_analysis: dict) -> dict:
     if low_window:
         low_ranges = parse_time_window(low_window)
 
-    # Create energy blocks with levels
-    energy_blocks = []
-
-    # Add peak blocks (energy = 85)
-    for start, end in peak_ranges:
-        energy_blocks.append({
-            'start': start,
-            'end': end,
-            'energy': 85,
-            'zone': 'peak'
-        })
-
-    # Add maintenance blocks (energy = 60)
-    for start, end in maintenance_ranges:
-        energy_blocks.append({
-            'start': start,
-            'end': end,
-            'energy': 60,
-            'zone': 'maintenance'
-        })
-
-    # Add low energy blocks (energy = 35)
-    for start, end in low_ranges:
-        energy_blocks.append({
-            'start': start,
-            'end': end,
-            'energy': 35,
-            'zone': 'recovery'
-        })
-
-    # Sort blocks by start time
-    energy_blocks.sort(key=lambda x: x['start'])
+    # Energy blocks: (start, end, energy, zone) - peak 85, maintenance 60, low 35
+    energy_blocks = (
+        [(start, end, 85, 'peak') for start, end in peak_ranges] +
+        [(start, end, 60, 'maintenance') for start, end in maintenance_ranges] +
+        [(start, end, 35, 'recovery') for start, end in low_ranges]
+    )
 
-    def get_energy_for_slot(slot_minutes: int) -> Tuple[int, str]:
-        """
-        Calculate energy level and zone for a given time slot
-        Handles interpolation between blocks
-        """
-        # Check if slot is inside any defined block
-        for block in energy_blocks:
-            if block['start'] <= slot_minutes < block['end']:
-                return block['energy'], block['zone']
-
-        # Slot is in a gap - find surrounding blocks for interpolation
-        prev_block = None
-        next_block = None
-
-        for block in energy_blocks:
-            if block['end'] <= slot_minutes:
-                prev_block = block  # Most recent block before gap
-            elif block['start'] > slot_minutes:
-                next_block = block  # Next block after gap
-                break
-
-        # Interpolate between blocks
-        if prev_block and next_block:
-            gap_duration = next_block['start'] - prev_block['end']
-            position_in_gap = slot_minutes - prev_block['end']
-            progress = position_in_gap / gap_duration  # 0.0 to 1.0
-
-            energy_delta = next_block['energy'] - prev_block['energy']
-            interpolated_energy = prev_block['energy'] + (energy_delta * progress)
-
-            # Determine zone based on interpolated energy
-            if interpolated_energy >= PEAK_THRESHOLD:
-                zone = 'peak'
-            elif interpolated_energy >= MAINTENANCE_THRESHOLD:
-                zone = 'maintenance'
-            else:
-                zone = 'recovery'
-
-            return round(interpolated_energy), zone
-
-        # No surrounding blocks - use defaults based on time of day
-        hour = slot_minutes // 60
-
-        if hour < 6:  # Early morning (00:00-06:00)
-            return DEFAULT_EARLY_MORNING, 'recovery'
-        elif hour >= 22:  # Late night (22:00-24:00)
-            return DEFAULT_LATE_NIGHT, 'recovery'
-        else:  # Daytime unspecified
-            return DEFAULT_UNSPECIFIED, 'maintenance'
-
-    # Generate all 96 slots
-    timeline = []
-    for slot_index in range(96):
-        slot_minutes = slot_index * 15
-        hour = slot_minutes // 60
-        minute = slot_minutes % 60
-
-        time_str = f"{hour:02d}:{minute:02d}"
-        energy_level, zone = get_energy_for_slot(slot_minutes)
-
-        timeline.append({
-            "time": time_str,
-            "energy_level": energy_level,
-            "slot_index": slot_index,
-            "zone": zone
-        })
+    # Paint blocks, interpolate gaps between them, defaults elsewhere (vectorized)
+    engine = get_timeline_engine(resolution_minutes, PEAK_THRESHOLD, MAINTENANCE_THRESHOLD)
+    defaults = TimelineDefaults(
+        early_morning=DEFAULT_EARLY_MORNING,
+        late_night=DEFAULT_LATE_NIGHT,
+        unspecified=DEFAULT_UNSPECIFIED
+    )
+    energy, zones = engine.paint([energy_blocks], defaults)
+    energy, zones = energy[0], zones[0]
+    timeline = engine.to_slots(energy, zones)
 
     # Generate human-readable summary
-    def find_continuous_periods(timeline_data: list, zone_filter: str) -> List[str]:
-        """Find continuous periods of a specific zone"""
-        periods = []
-        start_idx = None
-
-        for i, slot in enumerate(timeline_data):
-            if slot['zone'] == zone_filter:
-                if start_idx is None:
-                    start_idx = i
-            else:
-                if start_idx is not None:
-                    # Period ended
-                    start_time = timeline_data[start_idx]['time']
-                    end_time = timeline_data[i-1]['time']
-                    periods.append(f"{start_time}-{end_time}")
-                    start_idx = None
-
-        # Handle case where period extends to end of day
-        if start_idx is not None:
-            start_time = timeline_data[start_idx]['time']
-            end_time = timeline_data[-1]['time']
-            periods.append(f"{start_time}-{end_time}")
-
-        return periods
-
-    peak_periods = find_continuous_periods(timeline, 'peak')
-    maintenance_periods = find_continuous_periods(timeline, 'maintenance')
-    low_periods = find_continuous_periods(timeline, 'recovery')
+    periods = engine.zone_periods(zones)
+    peak_periods = periods['peak']
+    maintenance_periods = periods['maintenance']
+    low_periods = periods['recovery']
 
     # Calculate total minutes per zone
-    total_peak = sum(1 for slot in timeline if slot['zone'] == 'peak') * 15
-    total_maintenance = sum(1 for slot in timeline if slot['zone'] == 'maintenance') * 15
-    total_recovery = sum(1 for slot in timeline if slot['zone'] == 'recovery') * 15
-
-    # Find optimal wake/sleep windows from timeline
-    # Wake: First sustained rise above 50
-    wake_window = None
-    for i in range(len(timeline) - 3):
-        if all(timeline[i+j]['energy_level'] > 50 for j in range(3)):
-            wake_start = timeline[i]['time']
-            wake_end = timeline[min(i+4, 95)]['time']
-            wake_window = f"{wake_start}-{wake_end}"
-            break
-
-    # Sleep: First sustained drop below 35 (starting from 15:00 onwards)
-    sleep_window = None
-    for i in range(60, len(timeline) - 3):
-        if all(timeline[i+j]['energy_level'] < 35 for j in range(3)):
-            sleep_start = timeline[max(0, i-4)]['time']
-            sleep_end = timeline[i]['time']
-            sleep_window = f"{sleep_start}-{sleep_end}"
-            break
+    total_peak = engine.zone_minutes(zones, 'peak')
+    total_maintenance = engine.zone_minutes(zones, 'maintenance')
+    total_recovery = engine.zone_minutes(zones, 'recovery')
+
+    # Wake: first sustained rise above 50; Sleep: first sustained drop below 35 from 15:00
+    wake_window = engine.wake_window(energy)
+    sleep_window = engine.sleep_window(energy)
 
     summary = {
         "optimal_wake_window": wake_window or "06:30-07:30",
@@ -3395,8 +3380,8 @@ def _generate_energy_timeline_from_analysis(circadian_analysis: dict) -> dict:
     }
 
     metadata = {
-        "total_slots": 96,
-        "slot_duration_minutes": 15,
+        "total_slots": engine.n_slots,
+        "slot_duration_minutes": engine.resolution_minutes,
         "interpolation_method": "linear",
         "default_energy_levels": {
             "early_morning": DEFAULT_EARLY_MORNING,
@@ -3529,78 +3514,70 @@ async def get_or_create_shared_behavior_analysis(user_id: str, archetype: str, f
     Used by routine/nutrition endpoints to avoid duplicate analysis
     Applies 50-item threshold logic from OnDemandAnalysisService
     
-    RACE CONDITION FIX: Uses global coordination to prevent duplicate analyses
+    RACE CONDITION FIX: Concurrent callers for the same user + archetype share one
+    single-flight execution (result or exception) instead of waiting on a timeout
     """
     from services.request_deduplication_service import enhanced_deduplicator
     
     try:
-        # COORDINATION FIX: Check if analysis is in progress or cached
-        should_process, cached_result = await enhanced_deduplicator.coordinate_request(
-            user_id, archetype, "behavior_analysis"
+        return await enhanced_deduplicator.run_single_flight(
+            user_id, archetype, "behavior_analysis",
+            lambda: _create_shared_behavior_analysis(user_id, archetype, force_refresh, analysis_number),
+            bypass_cache=force_refresh
         )
-        
-        if not should_process and cached_result:
-            pass
-            return cached_result
-
-        # Step 1: Check if fresh analysis needed (50-item threshold logic WITH ARCHETYPE)
-        from services.ondemand_analysis_service import get_ondemand_service, AnalysisDecision
-        ondemand_service = await get_ondemand_service()
-        decision, metadata = await ondemand_service.should_run_analysis(
-            user_id,
-            force_refresh,
-            archetype,
-            analysis_type="behavior_analysis"  # Track behavior analysis separately
-        )
-        
-        # Enhanced debugging for threshold issues
-        decision_str = decision.value if hasattr(decision, 'value') else str(decision)
-        new_data = metadata.get('new_data_points', 0)
-        threshold = metadata.get('threshold_used', 50)
-        
-        # # Production: Verbose print removed  # Commented for error-only mode
-        # # Production: Verbose print removed  # Commented to reduce noise
-        # print(f"   📈 New Data Points: {new_data}")  # Commented for error-only mode
-        # # Production: Verbose print removed  # Commented for error-only mode
-        # print(f"   💾 Memory Quality: {metadata.get('memory_quality', 'unknown')}")  # Commented for error-only mode
-        # print(f"   ⏰ Hours Since Last: {metadata.get('hours_since_analysis', 0):.1f}")  # Commented for error-only mode
-        # # Production: Verbose print removed  # Commented for error-only mode
-        
-        logger.debug(f"[SHARED_ANALYSIS] {user_id[:8]}... Decision: {decision_str}, Data: {new_data}/{threshold}")
-        
-        # Step 2: Use cached if sufficient (only for MEMORY_ENHANCED_CACHE decision)
-        if decision == AnalysisDecision.MEMORY_ENHANCED_CACHE:
-            # print(f"💾 [THRESHOLD_DEBUG] Decision is MEMORY_ENHANCED_CACHE - fetching cached analysis...")  # Commented for error-only mode
-            # Use OnDemandAnalysisService's archetype-aware cache retrieval
-            cached_analysis = await ondemand_service.get_cached_behavior_analysis(user_id, archetype)
-            if cached_analysis:
-        # # Production: Verbose print removed  # Commented to reduce noise
-                print(f"   📝 Cache contains: {len(str(cached_analysis))} characters")
-                logger.debug(f"[SHARED_ANALYSIS] {user_id[:8]}... Using cached analysis")
-                # Complete coordination with cached result
-                enhanced_deduplicator.complete_request(user_id, archetype, "behavior_analysis", cached_analysis)
-                return cached_analysis
-            else:
-                print(f"❌ [THRESHOLD_DEBUG] No cached analysis found - falling back to fresh")
-                logger.warning(f"[SHARED_ANALYSIS] {user_id[:8]}... Cache failed, using fresh")
-        
-        # Step 3: Run fresh analysis for all other decisions
-        logger.debug(f"[SHARED_ANALYSIS] {user_id[:8]}... Running fresh analysis")
-        fresh_result = await run_fresh_behavior_analysis_like_api_analyze(user_id, archetype, metadata, analysis_number)
-        logger.info(f"[SHARED_ANALYSIS] {user_id[:8]}... Fresh analysis completed")
-        
-        # Complete coordination with fresh result
-        enhanced_deduplicator.complete_request(user_id, archetype, "behavior_analysis", fresh_result)
-        return fresh_result
-        
     except Exception as e:
         logger.error(f"[SHARED_ANALYSIS] {user_id[:8]}... Error: {e}")
-        # Complete coordination with error
-        enhanced_deduplicator.complete_request(user_id, archetype, "behavior_analysis", {"error": str(e)})
         # No fallback - all analysis must go through OnDemandAnalysisService
         raise Exception(f"Shared behavior analysis failed for user {user_id}: {e}")
 
 
+async def _create_shared_behavior_analysis(user_id: str, archetype: str, force_refresh: bool, analysis_number: int) -> dict:
+    """Threshold check + cached/fresh behavior analysis (runs once per single-flight key)"""
+    # Step 1: Check if fresh analysis needed (50-item threshold logic WITH ARCHETYPE)
+    from services.ondemand_analysis_service import get_ondemand_service, AnalysisDecision
+    ondemand_service = await get_ondemand_service()
+    decision, metadata = await ondemand_service.should_run_analysis(
+        user_id,
+        force_refresh,
+        archetype,
+        analysis_type="behavior_analysis"  # Track behavior analysis separately
+    )
+    
+    # Enhanced debugging for threshold issues
+    decision_str = decision.value if hasattr(decision, 'value') else str(decision)
+    new_data = metadata.get('new_data_points', 0)
+    threshold = metadata.get('threshold_used', 50)
+    
+    # # Production: Verbose print removed  # Commented for error-only mode
+    # # Production: Verbose print removed  # Commented to reduce noise
+    # print(f"   📈 New Data Points: {new_data}")  # Commented for error-only mode
+    # # Production: Verbose print removed  # Commented for error-only mode
+    # print(f"   💾 Memory Quality: {metadata.get('memory_quality', 'unknown')}")  # Commented for error-only mode
+    # print(f"   ⏰ Hours Since Last: {metadata.get('hours_since_analysis', 0):.1f}")  # Commented for error-only mode
+    # # Production: Verbose print removed  # Commented for error-only mode
+    
+    logger.debug(f"[SHARED_ANALYSIS] {user_id[:8]}... Decision: {decision_str}, Data: {new_data}/{threshold}")
+    
+    # Step 2: Use cached if sufficient (only for MEMORY_ENHANCED_CACHE decision)
+    if decision == AnalysisDecision.MEMORY_ENHANCED_CACHE:
+        # print(f"💾 [THRESHOLD_DEBUG] Decision is MEMORY_ENHANCED_CACHE - fetching cached analysis...")  # Commented for error-only mode
+        # Use OnDemandAnalysisService's archetype-aware cache retrieval
+        cached_analysis = await ondemand_service.get_cached_behavior_analysis(user_id, archetype)
+        if cached_analysis:
+            print(f"   📝 Cache contains: {len(str(cached_analysis))} characters")
+            logger.debug(f"[SHARED_ANALYSIS] {user_id[:8]}... Using cached analysis")
+            return cached_analysis
+        else:
+            print(f"❌ [THRESHOLD_DEBUG] No cached analysis found - falling back to fresh")
+            logger.warning(f"[SHARED_ANALYSIS] {user_id[:8]}... Cache failed, using fresh")
+    
+    # Step 3: Run fresh analysis for all other decisions
+    logger.debug(f"[SHARED_ANALYSIS] {user_id[:8]}... Running fresh analysis")
+    fresh_result = await run_fresh_behavior_analysis_like_api_analyze(user_id, archetype, metadata, analysis_number)
+    logger.info(f"[SHARED_ANALYSIS] {user_id[:8]}... Fresh analysis completed")
+    return fresh_result
+
+
 async def get_cached_behavior_analysis_from_memory(user_id: str) -> dict:
     """Retrieve cached behavior analysis from memory system"""
     try:
@@ -3638,57 +3615,53 @@ async def get_or_create_shared_circadian_analysis(user_id: str, archetype: str,
     Used by circadian endpoints and potential routine/nutrition integration
     Applies 50-item threshold logic from OnDemandAnalysisService
 
-    RACE CONDITION FIX: Uses global coordination to prevent duplicate analyses
+    RACE CONDITION FIX: Concurrent callers for the same user + archetype share one
+    single-flight execution; only completed analyses are cached afterwards
     """
     from services.request_deduplication_service import enhanced_deduplicator
 
     try:
-        # COORDINATION FIX: Check if analysis is in progress or cached
-        should_process, cached_result = await enhanced_deduplicator.coordinate_request(
-            user_id, archetype, "circadian_analysis"
+        return await enhanced_deduplicator.run_single_flight(
+            user_id, archetype, "circadian_analysis",
+            lambda: _create_shared_circadian_analysis(user_id, archetype, force_refresh, analysis_number),
+            cacheable=lambda result: isinstance(result, dict) and result.get("status") not in ("skipped", "error"),
+            bypass_cache=force_refresh
         )
 
-        if not should_process and cached_result:
-            pass
-            return cached_result
+    except Exception as e:
+        print(f"❌ [SHARED_CIRCADIAN] Error in shared circadian analysis: {e}")
+        return {"status": "error", "error": str(e), "circadian_analysis": {}}
 
-        # FRESH ANALYSIS: Proceed with threshold check via OnDemandAnalysisService
-        pass
-        pass
-        print(f"   🧠 [MEMORY] Integrating 4-layer memory system for personalized analysis")
 
-        # Use OnDemandAnalysisService to get proper metadata
-        from services.ondemand_analysis_service import get_ondemand_service, AnalysisDecision
-        ondemand_service = await get_ondemand_service()
-        decision, ondemand_metadata = await ondemand_service.should_run_analysis(
-            user_id,
-            force_refresh=force_refresh,
-            requested_archetype=archetype,
-            analysis_type="circadian_analysis"  # Track circadian separately
-        )
+async def _create_shared_circadian_analysis(user_id: str, archetype: str, force_refresh: bool, analysis_number: int) -> dict:
+    """Threshold check + memory-enhanced circadian analysis (runs once per single-flight key)"""
+    # FRESH ANALYSIS: Proceed with threshold check via OnDemandAnalysisService
+    print(f"   🧠 [MEMORY] Integrating 4-layer memory system for personalized analysis")
 
-        # Check if we should skip (threshold not met)
-        if decision == AnalysisDecision.MEMORY_ENHANCED_CACHE and not force_refresh:
-            logger.info(f"⏭️  [CIRCADIAN_THRESHOLD] Skipping circadian analysis - threshold not met for {user_id[:8]}... + {archetype}")
-            logger.info(f"   Reason: {ondemand_metadata.get('reason', 'insufficient new data')}")
-            logger.info(f"   New data points: {ondemand_metadata.get('new_data_points', 0)}, Threshold: {ondemand_metadata.get('threshold_used', 50)}")
-            return {"status": "skipped", "reason": "threshold_not_met", "circadian_analysis": {}, "metadata": ondemand_metadata}
+    # Use OnDemandAnalysisService to get proper metadata
+    from services.ondemand_analysis_service import get_ondemand_service, AnalysisDecision
+    ondemand_service = await get_ondemand_service()
+    decision, ondemand_metadata = await ondemand_service.should_run_analysis(
+        user_id,
+        force_refresh=force_refresh,
+        requested_archetype=archetype,
+        analysis_type="circadian_analysis"  # Track circadian separately
+    )
 
-        # Run memory-enhanced circadian analysis
-        circadian_result = await run_memory_enhanced_circadian_analysis(user_id, archetype)
+    # Check if we should skip (threshold not met)
+    if decision == AnalysisDecision.MEMORY_ENHANCED_CACHE and not force_refresh:
+        logger.info(f"⏭️  [CIRCADIAN_THRESHOLD] Skipping circadian analysis - threshold not met for {user_id[:8]}... + {archetype}")
+        logger.info(f"   Reason: {ondemand_metadata.get('reason', 'insufficient new data')}")
+        logger.info(f"   New data points: {ondemand_metadata.get('new_data_points', 0)}, Threshold: {ondemand_metadata.get('threshold_used', 50)}")
+        return {"status": "skipped", "reason": "threshold_not_met", "circadian_analysis": {}, "metadata": ondemand_metadata}
 
-        # Note: Analysis completion is tracked via database storage and coordination service
-        # await ondemand_service.mark_analysis_complete(user_id)  # Method not available
+    # Run memory-enhanced circadian analysis
+    circadian_result = await run_memory_enhanced_circadian_analysis(user_id, archetype)
 
-        # Result stored in database - no additional caching needed
+    # Note: Analysis completion is tracked via database storage and coordination service
+    # await ondemand_service.mark_analysis_complete(user_id)  # Method not available
 
-        pass
-        return circadian_result
-
-    except Exception as e:
-        print(f"❌ [SHARED_CIRCADIAN] Error in shared circadian analysis: {e}")
-        enhanced_deduplicator.mark_request_complete(user_id, archetype, "circadian_analysis")
-        return {"status": "error", "error": str(e), "circadian_analysis": {}}
+    return circadian_result
 
 
 async def run_fresh_behavior_analysis_like_api_analyze(user_id: str, archetype: str, ondemand_metadata: dict = None, analysis_number: int = None) -> dict:
@@ -4121,7 +4094,7 @@ async def run_memory_enhanced_circadian_analysis(user_id: str, archetype: str) -
         print(f"❌ [CIRCADIAN_ENHANCED] Circadian analysis failed completely")
         return None
 
-async def run_memory_enhanced_routine_generation(user_id: str, archetype: str, behavior_analysis: dict, circadian_analysis: dict = None, combined_analysis: dict = None, markdown_plan: str = None, user_timezone: str = None) -> dict:
+async def run_memory_enhanced_routine_generation(user_id: str, archetype: str, behavior_analysis: dict, circadian_analysis: dict = None, combined_analysis: dict = None, markdown_plan: str = None, user_timezone: str = None, plan_stream=None) -> dict:
     """
     Memory-Enhanced Routine Generation - Includes all features from /api/analyze
     Features:
@@ -4131,6 +4104,7 @@ async def run_memory_enhanced_routine_generation(user_id: str, archetype: str, b
     - Updating user memory profile
     - Complete logging of routine generation data
     - NEW: Markdown conversion mode for conversational plan modifications
+    - Optional plan_stream (PlanEventStream): time blocks are pushed as the model streams them
     """
     try:
         # print(f"🏃 [MEMORY_ENHANCED] Starting memory-enhanced routine generation for {user_id[:8]}...")  # Commented for error-only mode
@@ -4181,13 +4155,17 @@ async def run_memory_enhanced_routine_generation(user_id: str, archetype: str, b
 
             # Generate adaptive context (detects new vs existing user automatically)
             context_generator = AIContextGeneratorService()
+            plans_memo = {}
             adaptive_context = await context_generator.generate_adaptive_routine_context(
-                raw_data, user_id, archetype
+                raw_data, user_id, archetype, plans_memo=plans_memo
             )
 
             # Use routine_plan prompt (now points to adaptive generation by default)
             system_prompt = get_system_prompt("routine_plan")
 
+            # Reuses the lookup generate_adaptive_routine_context just made
+            has_routine_history = bool(await context_generator._get_last_plans(user_id, archetype, 1, memo=plans_memo))
+
             # Create enhanced prompt with adaptive context
             enhanced_prompt = f"""{system_prompt}
 
@@ -4200,10 +4178,10 @@ USER CONTEXT ANALYSIS:
 CIRCADIAN RHYTHM DATA:
 {circadian_analysis if circadian_analysis else "No circadian analysis available - use default time blocks"}
 
-This user has {"NO" if not await context_generator._get_last_plans(user_id, archetype, 1) else ""} previous routine history.
+This user has {"" if has_routine_history else "NO"} previous routine history.
 Apply the appropriate mode (INITIAL or ADAPTIVE) based on this history."""
 
-            print(f"✅ [ADAPTIVE_ROUTINE] Generated context using {'INITIAL' if not await context_generator._get_last_plans(user_id, archetype, 1) else 'ADAPTIVE'} mode")
+            print(f"✅ [ADAPTIVE_ROUTINE] Generated context using {'ADAPTIVE' if has_routine_history else 'INITIAL'} mode")
 
             # Cleanup
             await engagement_service.cleanup()
@@ -4230,7 +4208,7 @@ Apply the appropriate mode (INITIAL or ADAPTIVE) based on this history."""
             print(f"🏃 [MEMORY_ENHANCED] Using behavior analysis only (circadian analysis not available)")
 
         # Step 5: Run routine planning with memory-enhanced prompt and combined analysis
-        routine_result = await run_routine_planning_4o(enhanced_prompt, user_context_summary, behavior_analysis, archetype, circadian_analysis, markdown_plan=markdown_plan, user_timezone=user_timezone)
+        routine_result = await run_routine_planning_4o(enhanced_prompt, user_context_summary, behavior_analysis, archetype, circadian_analysis, markdown_plan=markdown_plan, user_timezone=user_timezone, plan_stream=plan_stream)
 
         # Step 6: Store complete routine plan in holistic_analysis_results table using AIContextIntegrationService
         analysis_id = None
@@ -4452,8 +4430,6 @@ async def run_memory_enhanced_nutrition_generation(user_id: str, archetype: str,
 async def run_nutrition_planning_4o(system_prompt: str, user_context: str, behavior_analysis: dict, archetype: str, user_timezone: str = None) -> dict:
     """Run nutrition planning using gpt-4o - now includes readiness mode"""
     try:
-        client = openai.AsyncOpenAI()
-
         # Extract readiness mode from behavior analysis
         readiness_level = behavior_analysis.get('readiness_level', 'Medium')
         mode_mapping = {
@@ -4463,7 +4439,7 @@ async def run_nutrition_planning_4o(system_prompt: str, user_context: str, behav
         }
         mode_description = mode_mapping.get(readiness_level, 'balanced nutrition')
 
-        response = await client.chat.completions.create(
+        response = await create_chat_completion(
             model="gpt-4o",
             messages=[
                 {
@@ -4536,9 +4512,7 @@ Make this plan practical, evidence-based, and specifically tailored to the {arch
 async def run_routine_planning_gpt4o(system_prompt: str, user_context: str, behavior_analysis: dict, archetype: str, user_timezone: str = None) -> dict:
     """Run routine planning using gpt-4o for plan generation - Phase 4.2 Direct OpenAI Implementation"""
     try:
-        client = openai.AsyncOpenAI()
-        
-        response = await client.chat.completions.create(
+        response = await create_chat_completion(
             model="gpt-4o",
             messages=[
                 {
@@ -4597,20 +4571,21 @@ Make this routine practical, evidence-based, and specifically tailored to the {a
             "date": get_user_local_date(user_timezone)
         }
 
-async def run_routine_planning_4o(system_prompt: str, user_context: str, behavior_analysis: dict, archetype: str, circadian_analysis: dict = None, markdown_plan: str = None, user_timezone: str = None) -> dict:
+async def run_routine_planning_4o(system_prompt: str, user_context: str, behavior_analysis: dict, archetype: str, circadian_analysis: dict = None, markdown_plan: str = None, user_timezone: str = None, plan_stream=None) -> dict:
     """
     Run routine planning using gpt-4o
 
     Two modes:
     - Normal mode: Uses behavior + circadian analysis to generate plan
     - Markdown mode: Converts user's markdown plan to structured format
+
+    With plan_stream (PlanEventStream) the completion is streamed and each time
+    block is emitted as soon as it closes; the returned result is unchanged.
     """
     try:
         # NOTE: Enum conversion now handled at source (see line ~1102)
         # behavior_analysis already has enums converted before reaching this function
 
-        client = openai.AsyncOpenAI()
-
         # Extract readiness mode from circadian analysis (if available) or behavior analysis
         if circadian_analysis and 'readiness_assessment' in circadian_analysis:
             readiness_level = circadian_analysis['readiness_assessment'].get('current_mode', 'Productive')
@@ -4625,6 +4600,12 @@ async def run_routine_planning_4o(system_prompt: str, user_context: str, behavio
             }
             mode_description = mode_mapping.get(readiness_level, 'balanced activities')
 
+        # Per-section prompt token accounting, logged before the call
+        prompt_budget = PromptBudget(
+            "routine_planning", model="gpt-4o",
+            caps={"energy_timeline": int(os.getenv("PROMPT_TIMELINE_TOKEN_CAP", "1500"))}
+        )
+
         # Prepare circadian context for prompt (only for normal mode)
         circadian_context = ""
         if circadian_analysis and not markdown_plan:
@@ -4632,11 +4613,13 @@ async def run_routine_planning_4o(system_prompt: str, user_context: str, behavio
             timeline_available = 'energy_timeline' in circadian_analysis and len(circadian_analysis.get('energy_timeline', [])) > 0
 
             if timeline_available:
+                # Compact encoding (run-length by default) instead of 96 indented JSON objects
+                timeline_encoder, timeline_text = prompt_budget.encode_timeline(circadian_analysis['energy_timeline'])
                 circadian_context = f"""
 CIRCADIAN ENERGY DATA:
 
-Energy Timeline (96 time slots, 15-minute intervals):
-Each slot has: time (HH:MM), energy_level (0-100), zone (peak/maintenance/recovery)
+Energy Timeline (96 time slots, 15-minute intervals, zones peak/productive/maintenance/recovery):
+Format: {timeline_encoder.description}
 
 Quick Summary:
 - Optimal wake window: {circadian_analysis.get('summary', {}).get('optimal_wake_window', 'N/A')}
@@ -4646,7 +4629,7 @@ Quick Summary:
 - Optimal sleep window: {circadian_analysis.get('summary', {}).get('optimal_sleep_window', 'N/A')}
 
 Full Energy Timeline:
-{json.dumps(circadian_analysis.get('energy_timeline', []), indent=2, cls=DateTimeEncoder)}
+{timeline_text}
 """
             else:
                 # Fallback to old format if timeline not available
@@ -4837,11 +4820,15 @@ NOW PROCESS THE USER'S PLAN ABOVE. Output ONLY valid JSON. Count their blocks an
                     winddown_start = winddown_slots[0].get('time', winddown_start)
                     winddown_end = winddown_slots[-1].get('time', winddown_end) if len(winddown_slots) > 1 else winddown_end
 
+            behavior_insights = json.dumps(behavior_analysis, indent=2, cls=DateTimeEncoder)
+            prompt_budget.add("user_context", user_context)
+            prompt_budget.add("behavioral_insights", behavior_insights)
+
             user_message = f"""
 {user_context}
 
 BEHAVIORAL INSIGHTS:
-{json.dumps(behavior_analysis, indent=2, cls=DateTimeEncoder)}
+{behavior_insights}
 
 {circadian_context}
 
@@ -4949,8 +4936,9 @@ You MUST respond with EXACTLY 5 time blocks in this structure (block_name, start
 🚨 YOU MUST OUTPUT ONLY VALID JSON - NO MARKDOWN, NO EXTRA TEXT, JUST JSON.
 """
 
-        response = await client.chat.completions.create(
+        completion_kwargs = dict(
             model="gpt-4o",
+            cache=True,  # Identical context + prompt -> reuse the stored plan
             response_format={"type": "json_object"},  # Force structured JSON output
             messages=[
                 {
@@ -4966,8 +4954,23 @@ You MUST respond with EXACTLY 5 time blocks in this structure (block_name, start
             max_tokens=2000
         )
 
+        prompt_budget.add("system", completion_kwargs["messages"][0]["content"])
+        prompt_budget.add_remainder(
+            "instructions", user_message, ["user_context", "behavioral_insights", "energy_timeline"]
+        )
+        prompt_budget.log()
+
+        if plan_stream is not None:
+            # STREAMING: push time blocks to the client as each one closes
+            from services.plan_streaming_service import stream_plan_completion
+            content = await stream_plan_completion(
+                plan_stream, {"id": "pending", "archetype": archetype}, **completion_kwargs
+            )
+        else:
+            response = await create_chat_completion(**completion_kwargs)
+            content = response.choices[0].message.content
+
         # Parse the JSON response
-        content = response.choices[0].message.content
         try:
             structured_data = json.loads(content)
         except json.JSONDecodeError:
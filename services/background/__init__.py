@@ -4,11 +4,17 @@ MVP-style: Simple async queue without Redis dependency
 """
 
 from .archival_service import ArchivalService, get_archival_service
+from .job_store import JobStore, MemoryJobStore, SQLiteJobStore, SupabaseJobStore, create_job_store
 from .simple_queue import SimpleJobQueue, get_job_queue
 
 __all__ = [
     'ArchivalService',
     'get_archival_service',
     'SimpleJobQueue',
-    'get_job_queue'
+    'get_job_queue',
+    'JobStore',
+    'MemoryJobStore',
+    'SQLiteJobStore',
+    'SupabaseJobStore',
+    'create_job_store'
 ]
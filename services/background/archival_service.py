@@ -1,30 +1,70 @@
 """
 Sahha Data Archival Service
 MVP-style: UPSERT with simple error handling
+
+Records are normalized once, deduplicated in memory on the table's conflict
+keys and written with one UPSERT per chunk (ARCHIVAL_BATCH_SIZE, default 500)
+instead of one round trip per record.
 """
 
+import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import os
-from supabase import create_client
+
+from shared_libs.supabase_client.async_executor import execute_async, get_shared_supabase_client
+from services.sahha.sync_watermarks import (
+    SCORES_CATEGORY, biomarker_row_to_sahha, compute_watermarks, get_watermark_store, score_row_to_sahha
+)
+from shared_libs.caching.tiered_cache import invalidate_cache_scope
 
 logger = logging.getLogger(__name__)
 
+# SQLSTATE classes caused by the rows themselves (cardinality violation, data
+# exception, integrity constraint violation) - only these are worth bisecting
+ROW_ERROR_SQLSTATE_CLASSES = ("21", "22", "23")
+
+
+def is_row_error(error: Exception) -> bool:
+    """True when a write failed because of the data sent, not the connection or server"""
+    code = getattr(error, "code", None)
+    return isinstance(code, str) and code[:2] in ROW_ERROR_SQLSTATE_CLASSES
+
 
 class ArchivalService:
     """
     Archives Sahha data to Supabase with deduplication
 
     Features:
-    - UPSERT for biomarkers (prevents duplicates)
-    - UPSERT for scores (prevents duplicates)
+    - Batched UPSERT for biomarkers and scores (prevents duplicates)
+    - Chunks rejected for their data are bisected so one bad row only loses itself;
+      transient errors are retried and then fail the job
+    - Rows rejected for their data are logged and the job completes as a partial
+      sync (their categories keep their watermarks)
     - Updates sync status in archetype_analysis_tracking
+    - Advances per-category sync watermarks (incremental Sahha fetch)
     - Simple error handling with logging
     """
 
-    def __init__(self):
+    BIOMARKER_CONFLICT_KEYS = ("profile_id", "type", "start_date_time", "end_date_time")
+    SCORE_CONFLICT_KEYS = ("profile_id", "type", "score_date_time")
+
+    def __init__(self, batch_size: Optional[int] = None):
         self.supabase = None
+        self.batch_size = max(1, batch_size or int(os.getenv("ARCHIVAL_BATCH_SIZE", "500")))
+        self.write_retries = int(os.getenv("ARCHIVAL_WRITE_RETRIES", "2"))
+        self.retry_delay = float(os.getenv("ARCHIVAL_RETRY_DELAY", "0.5"))
+        self.stats = {
+            "rows_written": 0,
+            "rows_failed": 0,
+            "write_retries": 0,
+            "duplicates_dropped": 0,
+            "upsert_calls": 0,
+            "bisections": 0,
+            "write_seconds": 0.0
+        }
 
     def _get_supabase(self):
         """Get Supabase client"""
@@ -35,7 +75,7 @@ class ArchivalService:
             if not supabase_url or not supabase_key:
                 raise Exception("Missing SUPABASE_URL or SUPABASE_KEY")
 
-            self.supabase = create_client(supabase_url, supabase_key)
+            self.supabase = get_shared_supabase_client(supabase_url, supabase_key)
             logger.debug("[ARCHIVAL] Connected to Supabase")
 
         return self.supabase
@@ -46,7 +86,9 @@ class ArchivalService:
         archetype: str,
         analysis_type: str,
         sahha_data: Dict[str, Any],
-        tracking_record_id: Optional[int] = None
+        tracking_record_id: Optional[int] = None,
+        tracking_record_ids: Optional[List[int]] = None,
+        analyses: Optional[List[List[str]]] = None
     ):
         """
         Archive Sahha data to Supabase (main method)
@@ -57,12 +99,24 @@ class ArchivalService:
             analysis_type: "behavior_analysis" or "circadian_analysis"
             sahha_data: Dict with "biomarkers" and "scores" lists
             tracking_record_id: ID in archetype_analysis_tracking (optional)
+            tracking_record_ids: IDs of every analysis whose data this job carries
+                (coalesced jobs); without ids the most recent analysis is updated
+            analyses: (archetype, analysis_type) pairs of a coalesced job; without
+                tracking ids the most recent analysis of each is updated
+
+        Returns:
+            Dict with stored and rejected counts, incomplete categories, write time
+            and rows/second
 
         Raises:
             Exception: If archival fails (for retry logic)
         """
 
         logger.info(f"[ARCHIVAL] Starting for {user_id[:8]}... ({archetype}, {analysis_type})")
+        start = time.perf_counter()
+        tracking_ids = list(tracking_record_ids or [])
+        if tracking_record_id is not None and tracking_record_id not in tracking_ids:
+            tracking_ids.append(tracking_record_id)
 
         try:
             supabase = self._get_supabase()
@@ -71,40 +125,82 @@ class ArchivalService:
             scores = sahha_data.get("scores", [])
 
             # Store biomarkers with UPSERT (prevents duplicates)
-            stored_biomarkers = await self._store_biomarkers(supabase, user_id, biomarkers)
+            stored_biomarker_rows, rejected_biomarkers = await self._store_biomarkers(supabase, user_id, biomarkers)
+            stored_biomarkers = len(stored_biomarker_rows)
 
             # Store scores with UPSERT
-            stored_scores = await self._store_scores(supabase, user_id, scores)
+            stored_score_rows, rejected_scores = await self._store_scores(supabase, user_id, scores)
+            stored_scores = len(stored_score_rows)
+
+            # A category whose Sahha fetch or archival was incomplete keeps its watermark,
+            # so its next fetch covers the gap again
+            incomplete = set(sahha_data.get("incomplete_categories") or [])
+            incomplete.update(row["category"] for row in rejected_biomarkers if row.get("category"))
+            if rejected_scores:
+                incomplete.add(SCORES_CATEGORY)
+
+            # Rejected rows would be rejected again on retry - record them and
+            # finish as a partial sync rather than failing the job
+            partial_note = None
+            if rejected_biomarkers or rejected_scores:
+                partial_note = (
+                    f"Partial sync: {len(rejected_biomarkers)} biomarkers and {len(rejected_scores)} scores "
+                    f"rejected (incomplete: {', '.join(sorted(incomplete))})"
+                )
+                logger.warning(f"[ARCHIVAL] {partial_note} for {user_id[:8]}...")
+                for row in rejected_biomarkers:
+                    logger.warning(f"[ARCHIVAL] Rejected biomarker: {self._row_key(row, self.BIOMARKER_CONFLICT_KEYS)}")
+                for row in rejected_scores:
+                    logger.warning(f"[ARCHIVAL] Rejected score: {self._row_key(row, self.SCORE_CONFLICT_KEYS)}")
 
             # Update sync status in tracking table
-            await self._update_sync_status(
+            await self._update_sync_statuses(
                 supabase,
                 user_id,
-                archetype,
-                analysis_type,
+                analyses or [[archetype, analysis_type]],
                 success=True,
                 biomarkers_count=stored_biomarkers,
-                scores_count=stored_scores
+                scores_count=stored_scores,
+                error_message=partial_note,
+                tracking_record_ids=tracking_ids
             )
 
+            # Advance per-category watermarks so the next fetch only asks for the delta
+            await self._update_watermarks(supabase, user_id, stored_biomarker_rows, stored_score_rows, incomplete)
+
+            # Cached health contexts for this user are now stale on every worker
+            await invalidate_cache_scope("health_data", user_id)
+
+            elapsed = time.perf_counter() - start
+            rows = stored_biomarkers + stored_scores
             logger.info(
                 f"[ARCHIVAL] Completed: {stored_biomarkers} biomarkers + "
-                f"{stored_scores} scores for {user_id[:8]}..."
+                f"{stored_scores} scores for {user_id[:8]}... in {elapsed:.2f}s"
             )
 
+            return {
+                "biomarkers": stored_biomarkers,
+                "scores": stored_scores,
+                "rows": rows,
+                "rejected": len(rejected_biomarkers) + len(rejected_scores),
+                "incomplete_categories": sorted(incomplete),
+                "seconds": round(elapsed, 3),
+                "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else 0
+            }
+
         except Exception as e:
             logger.error(f"[ARCHIVAL] Failed for {user_id[:8]}...: {e}")
 
             # Try to update sync status with error
             try:
                 supabase = self._get_supabase()
-                await self._update_sync_status(
+                await self._update_sync_statuses(
                     supabase,
                     user_id,
-                    archetype,
-                    analysis_type,
+                    analyses or [[archetype, analysis_type]],
                     success=False,
-                    error_message=str(e)
+                    error_message=str(e),
+                    tracking_record_ids=tracking_ids
                 )
             except:
                 pass  # Ignore secondary errors
@@ -117,115 +213,219 @@ class ArchivalService:
         supabase,
         user_id: str,
         biomarkers: List[Dict[str, Any]]
-    ) -> int:
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         """
-        Store biomarkers with UPSERT (prevents duplicates)
+        Store biomarkers with batched UPSERT (prevents duplicates)
 
-        Returns: Number of biomarkers stored
+        Returns: (stored biomarkers rows, rejected biomarkers rows)
         """
 
         if not biomarkers:
-            return 0
+            return [], []
 
-        stored_count = 0
+        now = datetime.utcnow().isoformat()
+        records = [self._normalize_biomarker(user_id, bio, now) for bio in biomarkers]
 
-        for bio in biomarkers:
-            try:
-                # Prepare biomarker data with ALL Sahha fields
-                # Build data field with additional metadata
-                data_field = {
-                    "periodicity": bio.get("periodicity"),
-                    "aggregation": bio.get("aggregation"),
-                    "valueType": bio.get("valueType"),
-                    "sahha_id": bio.get("id")
-                }
-
-                bio_data = {
-                    "profile_id": user_id,
-                    "category": bio.get("category"),  # CRITICAL: vitals, sleep, activity, etc.
-                    "type": bio.get("type"),
-                    "value": bio.get("value"),
-                    "unit": bio.get("unit"),
-                    "data": data_field,  # CRITICAL: Store additional metadata
-                    "start_date_time": bio.get("startDateTime"),
-                    "end_date_time": bio.get("endDateTime"),
-                    "created_at": bio.get("createdAt", datetime.utcnow().isoformat()),
-                    "updated_at": datetime.utcnow().isoformat()
-                }
-
-                # UPSERT using unique constraint (profile_id, type, start_date_time, end_date_time)
-                # Supabase upsert() handles INSERT ON CONFLICT UPDATE automatically
-                result = supabase.table("biomarkers").upsert(
-                    bio_data,
-                    on_conflict="profile_id,type,start_date_time,end_date_time"
-                ).execute()
-
-                if result.data:
-                    stored_count += 1
-
-            except Exception as e:
-                # Log but continue with other biomarkers
-                logger.debug(f"[ARCHIVAL] Biomarker insert/update failed: {e}")
-                continue
+        # UPSERT using unique constraint (profile_id, type, start_date_time, end_date_time)
+        stored, failed = await self._upsert_batched(supabase, "biomarkers", records, self.BIOMARKER_CONFLICT_KEYS)
 
-        logger.debug(f"[ARCHIVAL] Stored {stored_count}/{len(biomarkers)} biomarkers")
-        return stored_count
+        logger.debug(f"[ARCHIVAL] Stored {len(stored)}/{len(biomarkers)} biomarkers")
+        return stored, failed
 
     async def _store_scores(
         self,
         supabase,
         user_id: str,
         scores: List[Dict[str, Any]]
-    ) -> int:
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         """
-        Store scores with UPSERT (prevents duplicates)
+        Store scores with batched UPSERT (prevents duplicates)
 
-        Returns: Number of scores stored
+        Returns: (stored scores rows, rejected scores rows)
         """
 
         if not scores:
-            return 0
+            return [], []
+
+        now = datetime.utcnow().isoformat()
+        records = [self._normalize_score(user_id, score, now) for score in scores]
+
+        # UPSERT using unique constraint (profile_id, type, score_date_time)
+        stored, failed = await self._upsert_batched(supabase, "scores", records, self.SCORE_CONFLICT_KEYS)
+
+        logger.debug(f"[ARCHIVAL] Stored {len(stored)}/{len(scores)} scores")
+        return stored, failed
+
+    def _normalize_biomarker(self, user_id: str, bio: Dict[str, Any], now: str) -> Dict[str, Any]:
+        """Map a Sahha biomarker to a biomarkers row (ALL Sahha fields kept)"""
+        # Build data field with additional metadata
+        data_field = {
+            "periodicity": bio.get("periodicity"),
+            "aggregation": bio.get("aggregation"),
+            "valueType": bio.get("valueType"),
+            "sahha_id": bio.get("id")
+        }
+
+        return {
+            "profile_id": user_id,
+            "category": bio.get("category"),  # CRITICAL: vitals, sleep, activity, etc.
+            "type": bio.get("type"),
+            "value": bio.get("value"),
+            "unit": bio.get("unit"),
+            "data": data_field,  # CRITICAL: Store additional metadata
+            "start_date_time": bio.get("startDateTime"),
+            "end_date_time": bio.get("endDateTime"),
+            "created_at": bio.get("createdAt", now),
+            "updated_at": now
+        }
+
+    def _normalize_score(self, user_id: str, score: Dict[str, Any], now: str) -> Dict[str, Any]:
+        """Map a Sahha score to a scores row (ALL Sahha fields kept)"""
+        # Build data field with factors array (CRITICAL for analysis)
+        data_field = {
+            "factors": score.get("factors", []),  # CRITICAL: Sleep factors, activity factors, etc.
+            "dataSources": score.get("dataSources", []),
+            "version": score.get("version"),
+            "sahha_id": score.get("id"),
+            "createdAtUtc": score.get("createdAtUtc")
+        }
+
+        return {
+            "profile_id": user_id,
+            "type": score.get("type"),
+            "score": score.get("score"),
+            "score_date_time": score.get("scoreDateTime"),
+            "state": score.get("state"),
+            "data": data_field,  # CRITICAL: Store factors array for detailed analysis
+            "created_at": now,
+            "updated_at": now
+        }
+
+    @staticmethod
+    def _row_key(row: Dict[str, Any], conflict_keys: Tuple[str, ...]) -> Dict[str, Any]:
+        """Conflict key values identifying a row in logs"""
+        return {key: row.get(key) for key in conflict_keys if key != "profile_id"}
+
+    def _dedupe(self, records: List[Dict[str, Any]], conflict_keys: Tuple[str, ...]) -> List[Dict[str, Any]]:
+        """
+        Keep the last record per conflict key
 
-        stored_count = 0
+        Postgres rejects an UPSERT that touches the same row twice, so
+        duplicates must not reach a single statement.
+        """
+        unique: Dict[tuple, Dict[str, Any]] = {}
+        for record in records:
+            key = tuple(record.get(k) for k in conflict_keys)
+            unique.pop(key, None)  # Re-insert so the surviving row keeps the latest position
+            unique[key] = record
+        dropped = len(records) - len(unique)
+        if dropped:
+            self.stats["duplicates_dropped"] += dropped
+            logger.debug(f"[ARCHIVAL] Dropped {dropped} duplicate rows")
+        return list(unique.values())
+
+    async def _upsert_batched(
+        self,
+        supabase,
+        table: str,
+        records: List[Dict[str, Any]],
+        conflict_keys: Tuple[str, ...]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Deduplicate and UPSERT records in chunks of batch_size
+
+        Returns: (stored rows, rejected rows)
+        """
+        records = self._dedupe(records, conflict_keys)
+        on_conflict = ",".join(conflict_keys)
+        start = time.perf_counter()
 
-        for score in scores:
+        stored, failed = [], []
+        try:
+            for offset in range(0, len(records), self.batch_size):
+                chunk_stored, chunk_failed = await self._upsert_chunk(
+                    supabase, table, records[offset:offset + self.batch_size], on_conflict
+                )
+                stored.extend(chunk_stored)
+                failed.extend(chunk_failed)
+        finally:
+            self.stats["rows_written"] += len(stored)
+            self.stats["write_seconds"] += time.perf_counter() - start
+        return stored, failed
+
+    async def _upsert_chunk(
+        self,
+        supabase,
+        table: str,
+        chunk: List[Dict[str, Any]],
+        on_conflict: str
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        UPSERT one chunk; if its data is rejected, split it in half and retry each half
+
+        A single bad row costs about 2*log2(chunk) extra calls instead of
+        falling back to one call per row. Transient errors (connection,
+        timeout, server) are retried with backoff and then raised, since
+        bisecting them would only multiply the failing calls.
+
+        Returns: (stored rows, rows rejected on their own)
+        """
+        for attempt in range(self.write_retries + 1):
+            self.stats["upsert_calls"] += 1
             try:
-                # Prepare score data with ALL Sahha fields
-                # Build data field with factors array (CRITICAL for analysis)
-                data_field = {
-                    "factors": score.get("factors", []),  # CRITICAL: Sleep factors, activity factors, etc.
-                    "dataSources": score.get("dataSources", []),
-                    "version": score.get("version"),
-                    "sahha_id": score.get("id"),
-                    "createdAtUtc": score.get("createdAtUtc")
-                }
-
-                score_data = {
-                    "profile_id": user_id,
-                    "type": score.get("type"),
-                    "score": score.get("score"),
-                    "score_date_time": score.get("scoreDateTime"),
-                    "state": score.get("state"),
-                    "data": data_field,  # CRITICAL: Store factors array for detailed analysis
-                    "created_at": datetime.utcnow().isoformat(),
-                    "updated_at": datetime.utcnow().isoformat()
-                }
-
-                # UPSERT using unique constraint (profile_id, type, score_date_time)
-                result = supabase.table("scores").upsert(
-                    score_data,
-                    on_conflict="profile_id,type,score_date_time"
-                ).execute()
-
-                if result.data:
-                    stored_count += 1
+                await execute_async(supabase.table(table).upsert(chunk, on_conflict=on_conflict))
+                return chunk, []
 
             except Exception as e:
-                logger.debug(f"[ARCHIVAL] Score insert/update failed: {e}")
-                continue
-
-        logger.debug(f"[ARCHIVAL] Stored {stored_count}/{len(scores)} scores")
-        return stored_count
+                if is_row_error(e):
+                    error = e
+                    break
+                if attempt == self.write_retries:
+                    raise
+                self.stats["write_retries"] += 1
+                delay = self.retry_delay * 2 ** attempt
+                logger.warning(f"[ARCHIVAL] {table} write failed, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+
+        if len(chunk) == 1:
+            self.stats["rows_failed"] += 1
+            logger.warning(f"[ARCHIVAL] {table} row rejected: {error}")
+            return [], chunk
+
+        self.stats["bisections"] += 1
+        logger.debug(f"[ARCHIVAL] {table} chunk of {len(chunk)} rejected, bisecting: {error}")
+        middle = len(chunk) // 2
+        left_stored, left_failed = await self._upsert_chunk(supabase, table, chunk[:middle], on_conflict)
+        right_stored, right_failed = await self._upsert_chunk(supabase, table, chunk[middle:], on_conflict)
+        return left_stored + right_stored, left_failed + right_failed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get archival write statistics (including rows/second)"""
+        seconds = self.stats["write_seconds"]
+        return {
+            **self.stats,
+            "write_seconds": round(seconds, 3),
+            "rows_per_second": round(self.stats["rows_written"] / seconds, 1) if seconds > 0 else 0,
+            "batch_size": self.batch_size
+        }
+
+    async def _update_sync_statuses(
+        self,
+        supabase,
+        user_id: str,
+        analyses: List[List[str]],
+        tracking_record_ids: Optional[List[int]] = None,
+        **status
+    ):
+        """Update sync status by tracking ids, or for the latest run of each analysis"""
+        if tracking_record_ids:
+            archetype, analysis_type = analyses[0]
+            await self._update_sync_status(
+                supabase, user_id, archetype, analysis_type, tracking_record_ids=tracking_record_ids, **status
+            )
+            return
+        for archetype, analysis_type in analyses:
+            await self._update_sync_status(supabase, user_id, archetype, analysis_type, **status)
 
     async def _update_sync_status(
         self,
@@ -236,7 +436,8 @@ class ArchivalService:
         success: bool,
         biomarkers_count: int = 0,
         scores_count: int = 0,
-        error_message: Optional[str] = None
+        error_message: Optional[str] = None,
+        tracking_record_ids: Optional[List[int]] = None
     ):
         """
         Update sync status in archetype_analysis_tracking
@@ -249,7 +450,8 @@ class ArchivalService:
             success: Whether sync succeeded
             biomarkers_count: Number of biomarkers stored
             scores_count: Number of scores stored
-            error_message: Error message if failed
+            error_message: Error message if failed, or the partial sync note
+            tracking_record_ids: Tracking rows to update (default: the most recent analysis)
         """
 
         try:
@@ -258,20 +460,26 @@ class ArchivalService:
                 "biomarkers_synced": success and biomarkers_count > 0,
                 "scores_synced": success and scores_count > 0,
                 "sync_completed_at": datetime.utcnow().isoformat() if success else None,
-                "sync_error": error_message if not success else None,
+                "sync_error": error_message,
                 "updated_at": datetime.utcnow().isoformat()
             }
 
-            # Update the most recent analysis for this user + archetype + analysis_type
-            result = supabase.table("archetype_analysis_tracking").update(update_data).eq(
-                "user_id", user_id
-            ).eq(
-                "archetype", archetype
-            ).eq(
-                "analysis_type", analysis_type
-            ).order(
-                "analysis_timestamp", desc=True
-            ).limit(1).execute()
+            query = supabase.table("archetype_analysis_tracking").update(update_data)
+            if tracking_record_ids:
+                # Every analysis merged into this job
+                query = query.in_("id", tracking_record_ids)
+            else:
+                # Update the most recent analysis for this user + archetype + analysis_type
+                query = query.eq(
+                    "user_id", user_id
+                ).eq(
+                    "archetype", archetype
+                ).eq(
+                    "analysis_type", analysis_type
+                ).order(
+                    "analysis_timestamp", desc=True
+                ).limit(1)
+            result = await execute_async(query)
 
             if result.data:
                 logger.debug(f"[ARCHIVAL] Updated sync status for {user_id[:8]}... ({archetype})")
@@ -283,6 +491,33 @@ class ArchivalService:
             # Don't raise - this is secondary
 
 
+    async def _update_watermarks(
+        self,
+        supabase,
+        user_id: str,
+        stored_biomarkers: List[Dict[str, Any]],
+        stored_scores: List[Dict[str, Any]],
+        incomplete_categories: Optional[set] = None
+    ):
+        """
+        Advance sahha_sync_watermarks to the newest stored row per category
+
+        Only rows that reached the tables count, and categories listed in
+        incomplete_categories are left where they are.
+        """
+        try:
+            marks = compute_watermarks(
+                [biomarker_row_to_sahha(row) for row in stored_biomarkers],
+                [score_row_to_sahha(row) for row in stored_scores]
+            )
+            for category in incomplete_categories or ():
+                marks.pop(category, None)
+            await get_watermark_store().advance(user_id, marks, supabase)
+        except Exception as e:
+            logger.error(f"[ARCHIVAL] Failed to update sync watermarks: {e}")
+            # Don't raise - the next fetch falls back to a full window
+
+
 # Singleton instance
 _archival_service = None
 
@@ -0,0 +1,394 @@
+"""
+Durable Job Store for the Background Queue
+SimpleJobQueue keeps jobs in an asyncio.Queue; a deploy or OOM restart used to
+drop every pending archival. Every job is now written to a store first, and the
+queue only dispatches from memory:
+
+    - at-least-once: a job leaves the store only when it completes or fails
+      permanently
+    - visibility timeout: every job a process owns (queued, waiting for a
+      retry or running) holds a lease it keeps renewing; if the process dies
+      the lease expires and another process claims the job
+    - idempotency keys: re-submitting work that is queued, running or done is
+      a no-op
+    - recovery: unfinished jobs whose lease expired are claimed with one
+      atomic update, so two processes never take the same job
+
+Backends:
+    - supabase: Postgres table background_jobs (migrations/create_background_jobs_table.sql),
+      the default outside development and tests
+    - sqlite: file-backed, for local runs (default in development)
+    - memory: no durability (default for ENVIRONMENT=test)
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job states kept in the store (mirrors JobStatus values)
+ACTIVE_STATUSES = ("pending", "retry", "processing")
+FINISHED_STATUSES = ("completed", "failed")
+
+_COLUMNS = (
+    "id", "job_type", "payload", "status", "attempts", "max_attempts",
+    "idempotency_key", "available_at", "lease_until", "error", "created_at", "updated_at"
+)
+
+
+class JobStore:
+    """
+    Base class for job backends
+
+    Records are dicts with the _COLUMNS keys; payload is a dict and all
+    timestamps are epoch seconds (they must survive a restart).
+    """
+
+    name = "base"
+
+    def add(self, record: Dict[str, Any]) -> Optional[str]:
+        """
+        Insert a new job
+
+        Returns:
+            None when inserted, or the id of the job already holding the
+            record's idempotency key (queued, running or completed)
+        """
+        raise NotImplementedError
+
+    def update(self, job_id: str, **fields):
+        """Update columns of a job (payload, status, attempts, lease_until, ...)"""
+        raise NotImplementedError
+
+    def remove(self, job_id: str):
+        """Delete a job (e.g. merged into another job)"""
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def claim(self, now: float, lease_until: float) -> List[Dict[str, Any]]:
+        """
+        Take over unfinished jobs whose lease is missing or expired
+
+        One atomic update per backend: a job leased by a live process is never
+        returned, and two processes claiming at once never get the same job.
+
+        Args:
+            now: Current epoch time
+            lease_until: Lease given to the claimed jobs
+
+        Returns:
+            Claimed records, oldest first
+        """
+        raise NotImplementedError
+
+    def set_lease(self, job_ids: List[str], lease_until: Optional[float]):
+        """Renew (or with None, release) the leases of jobs this process owns"""
+        raise NotImplementedError
+
+    def purge(self, finished_before: float) -> int:
+        """Drop completed/failed jobs last updated before the given time"""
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {}
+
+    def close(self):
+        pass
+
+
+class MemoryJobStore(JobStore):
+    """In-process store: idempotency and leases without durability"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, record: Dict[str, Any]) -> Optional[str]:
+        with self._lock:
+            key = record.get("idempotency_key")
+            if key:
+                for job in self._jobs.values():
+                    if job["idempotency_key"] == key and job["status"] != "failed":
+                        return job["id"]
+            self._jobs[record["id"]] = dict(record)
+            return None
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields, updated_at=time.time())
+
+    def remove(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def claim(self, now: float, lease_until: float) -> List[Dict[str, Any]]:
+        with self._lock:
+            claimed = []
+            for job in self._jobs.values():
+                if job["status"] in ACTIVE_STATUSES and (job["lease_until"] or 0) <= now:
+                    job.update(lease_until=lease_until, updated_at=time.time())
+                    claimed.append(dict(job))
+            return sorted(claimed, key=lambda job: job["created_at"])
+
+    def set_lease(self, job_ids: List[str], lease_until: Optional[float]):
+        with self._lock:
+            for job_id in job_ids:
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    job["lease_until"] = lease_until
+
+    def purge(self, finished_before: float) -> int:
+        with self._lock:
+            stale = [
+                job_id for job_id, job in self._jobs.items()
+                if job["status"] in FINISHED_STATUSES and job["updated_at"] < finished_before
+            ]
+            for job_id in stale:
+                del self._jobs[job_id]
+            return len(stale)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"jobs_by_status": counts}
+
+
+class SQLiteJobStore(JobStore):
+    """File-backed store for local runs (WAL mode, one connection behind a lock)"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS background_jobs (
+                id TEXT PRIMARY KEY,
+                job_type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 3,
+                idempotency_key TEXT,
+                available_at REAL NOT NULL,
+                lease_until REAL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_background_jobs_status ON background_jobs(status)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_background_jobs_idempotency ON background_jobs(idempotency_key)"
+        )
+        self._conn.commit()
+
+    def _to_record(self, row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        record["payload"] = json.loads(record["payload"])
+        return record
+
+    def add(self, record: Dict[str, Any]) -> Optional[str]:
+        with self._lock:
+            key = record.get("idempotency_key")
+            if key:
+                row = self._conn.execute(
+                    "SELECT id FROM background_jobs WHERE idempotency_key = ? AND status != 'failed'", (key,)
+                ).fetchone()
+                if row is not None:
+                    return row["id"]
+            values = {**record, "payload": json.dumps(record["payload"], default=str)}
+            self._conn.execute(
+                f"INSERT INTO background_jobs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                tuple(values.get(column) for column in _COLUMNS)
+            )
+            self._conn.commit()
+            return None
+
+    def update(self, job_id: str, **fields):
+        if "payload" in fields:
+            fields["payload"] = json.dumps(fields["payload"], default=str)
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE background_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id)
+            )
+            self._conn.commit()
+
+    def remove(self, job_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM background_jobs WHERE id = ?", (job_id,))
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM background_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_record(row) if row else None
+
+    def claim(self, now: float, lease_until: float) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "UPDATE background_jobs SET lease_until = ?, updated_at = ? "
+                "WHERE status IN ('pending', 'retry', 'processing') AND COALESCE(lease_until, 0) <= ? "
+                "RETURNING *",
+                (lease_until, time.time(), now)
+            ).fetchall()
+            self._conn.commit()
+        return sorted((self._to_record(row) for row in rows), key=lambda job: job["created_at"])
+
+    def set_lease(self, job_ids: List[str], lease_until: Optional[float]):
+        if not job_ids:
+            return
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE background_jobs SET lease_until = ? WHERE id IN ({', '.join('?' for _ in job_ids)})",
+                (lease_until, *job_ids)
+            )
+            self._conn.commit()
+
+    def purge(self, finished_before: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM background_jobs WHERE status IN ('completed', 'failed') AND updated_at < ?",
+                (finished_before,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM background_jobs GROUP BY status").fetchall()
+        return {"jobs_by_status": {status: count for status, count in rows}, "path": self.path}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SupabaseJobStore(JobStore):
+    """
+    Postgres table store for production (background_jobs)
+
+    Calls are synchronous; the queue runs them off the event loop. A unique
+    partial index on idempotency_key makes concurrent duplicate inserts fail,
+    which is reported as a duplicate.
+    """
+
+    name = "supabase"
+    TABLE = "background_jobs"
+
+    def __init__(self, client=None):
+        if client is None:
+            from shared_libs.supabase_client.async_executor import get_shared_supabase_client
+
+            supabase_url = os.getenv('SUPABASE_URL')
+            supabase_key = os.getenv('SUPABASE_KEY') or os.getenv('SUPABASE_SERVICE_KEY', '')
+            if not supabase_url or not supabase_key:
+                raise Exception("Missing SUPABASE_URL or SUPABASE_KEY")
+            client = get_shared_supabase_client(supabase_url, supabase_key)
+        self.client = client
+
+    def _existing(self, key: str) -> Optional[str]:
+        result = self.client.table(self.TABLE).select("id").eq("idempotency_key", key).neq(
+            "status", "failed"
+        ).limit(1).execute()
+        return result.data[0]["id"] if result.data else None
+
+    def add(self, record: Dict[str, Any]) -> Optional[str]:
+        key = record.get("idempotency_key")
+        if key:
+            existing = self._existing(key)
+            if existing:
+                return existing
+        try:
+            self.client.table(self.TABLE).insert(record).execute()
+        except Exception as e:
+            if key and "duplicate key" in str(e).lower():
+                return self._existing(key) or record["id"]
+            raise
+        return None
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        self.client.table(self.TABLE).update(fields).eq("id", job_id).execute()
+
+    def remove(self, job_id: str):
+        self.client.table(self.TABLE).delete().eq("id", job_id).execute()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        result = self.client.table(self.TABLE).select("*").eq("id", job_id).limit(1).execute()
+        return result.data[0] if result.data else None
+
+    def claim(self, now: float, lease_until: float) -> List[Dict[str, Any]]:
+        # A single UPDATE ... RETURNING: rows a concurrent claim took no longer match
+        result = self.client.table(self.TABLE).update(
+            {"lease_until": lease_until, "updated_at": time.time()}
+        ).in_("status", list(ACTIVE_STATUSES)).or_(
+            f"lease_until.is.null,lease_until.lte.{now}"
+        ).execute()
+        return sorted(result.data or [], key=lambda job: job["created_at"])
+
+    def set_lease(self, job_ids: List[str], lease_until: Optional[float]):
+        if job_ids:
+            self.client.table(self.TABLE).update({"lease_until": lease_until}).in_("id", job_ids).execute()
+
+    def purge(self, finished_before: float) -> int:
+        result = self.client.table(self.TABLE).delete().in_(
+            "status", list(FINISHED_STATUSES)
+        ).lt("updated_at", finished_before).execute()
+        return len(result.data or [])
+
+
+def create_job_store(backend: Optional[str] = None, path: Optional[str] = None) -> JobStore:
+    """
+    Create the job store selected by JOB_STORE_BACKEND
+
+    Defaults to supabase, sqlite in development and memory for ENVIRONMENT=test.
+    A backend that cannot be opened falls back to the next durable one
+    (supabase -> sqlite -> memory) so the queue keeps working.
+    """
+    if backend is None:
+        environment = os.getenv("ENVIRONMENT", "development").lower()
+        default_backend = {"development": "sqlite", "test": "memory", "testing": "memory"}.get(environment, "supabase")
+        backend = os.getenv("JOB_STORE_BACKEND", default_backend).lower()
+
+    if backend == "supabase":
+        try:
+            return SupabaseJobStore()
+        except Exception as e:
+            logger.warning(f"[JOB_STORE] supabase backend unavailable ({e}) - using sqlite")
+            backend = "sqlite"
+
+    if backend == "sqlite":
+        try:
+            return SQLiteJobStore(path or os.getenv("JOB_STORE_PATH", "logs/background_jobs.sqlite3"))
+        except Exception as e:
+            logger.warning(f"[JOB_STORE] sqlite backend unavailable ({e}) - using memory")
+    return MemoryJobStore()
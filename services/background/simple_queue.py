@@ -1,14 +1,31 @@
 """
 Simple Async Job Queue
 MVP-style: In-memory queue with retry logic (no Redis needed)
+
+A pool of workers (JOB_QUEUE_WORKERS, default 4) drains the queue. Failed jobs
+wait for their backoff on a delay heap instead of inside a worker, and pending
+SYNC_SAHHA_DATA jobs for the same user and analysis are merged into one.
+
+Every job is also written to a durable JobStore (see job_store.py) so jobs
+survive restarts: delivery is at-least-once, running jobs hold a lease
+(visibility timeout) and unfinished jobs are recovered on start().
 """
 
 import asyncio
+import hashlib
+import heapq
+import itertools
+import json
 import logging
+import os
+import time
+import uuid
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, Awaitable, List, Set, Tuple
 from enum import Enum
 
+from .job_store import JobStore, MemoryJobStore, create_job_store
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,15 +41,80 @@ class JobStatus(Enum):
 class Job:
     """Simple job wrapper"""
 
-    def __init__(self, job_type: str, payload: Dict[str, Any]):
-        self.id = f"{job_type}_{datetime.utcnow().timestamp()}"
+    def __init__(self, job_type: str, payload: Dict[str, Any], idempotency_key: Optional[str] = None):
+        self.id = f"{job_type}_{datetime.utcnow().timestamp()}_{uuid.uuid4().hex[:8]}"
         self.job_type = job_type
         self.payload = payload
+        self.idempotency_key = idempotency_key
         self.status = JobStatus.PENDING
         self.attempts = 0
         self.max_attempts = 3
         self.error = None
+        self.result = None
         self.created_at = datetime.utcnow()
+        self.available_at = time.time()
+
+    def to_record(self) -> Dict[str, Any]:
+        """Row for the job store (timestamps as epoch seconds)"""
+        now = time.time()
+        return {
+            "id": self.id,
+            "job_type": self.job_type,
+            "payload": self.payload,
+            "status": self.status.value,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "idempotency_key": self.idempotency_key,
+            "available_at": self.available_at,
+            "lease_until": None,
+            "error": self.error,
+            "created_at": self.created_at.timestamp(),
+            "updated_at": now
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "Job":
+        """Rebuild a job loaded from the job store"""
+        job = cls(record["job_type"], record["payload"], record.get("idempotency_key"))
+        job.id = record["id"]
+        job.status = JobStatus(record["status"])
+        job.attempts = record.get("attempts") or 0
+        job.max_attempts = record.get("max_attempts") or job.max_attempts
+        job.error = record.get("error")
+        job.created_at = datetime.utcfromtimestamp(record["created_at"])
+        job.available_at = record.get("available_at") or job.available_at
+        return job
+
+
+# Prefix of keys derived from the payload; they are released when the job finishes
+PAYLOAD_KEY_PREFIX = "payload:"
+
+
+def make_idempotency_key(job_type: str, payload: Dict[str, Any]) -> str:
+    """Default idempotency key: hash of the job type and canonical payload"""
+    canonical = json.dumps({"job_type": job_type, "payload": payload}, sort_keys=True, separators=(",", ":"), default=str)
+    return PAYLOAD_KEY_PREFIX + hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def payload_analyses(payload: Dict[str, Any]) -> List[List[str]]:
+    """(archetype, analysis_type) pairs a SYNC_SAHHA_DATA payload carries data for"""
+    if payload.get("analyses"):
+        return [list(pair) for pair in payload["analyses"]]
+    return [[payload.get("archetype"), payload.get("analysis_type")]]
+
+
+def tracking_record_ids(payload: Dict[str, Any]) -> List[Any]:
+    """archetype_analysis_tracking ids a SYNC_SAHHA_DATA payload must complete"""
+    ids = list(payload.get("tracking_record_ids") or [])
+    if payload.get("tracking_record_id") is not None:
+        ids.append(payload["tracking_record_id"])
+    return ids
+
+
+JobHandler = Callable[[Job], Awaitable[Any]]
+
+# Job types whose pending jobs are merged per user (see _coalesce_key)
+COALESCED_JOB_TYPES = {"SYNC_SAHHA_DATA"}
 
 
 class SimpleJobQueue:
@@ -41,63 +123,300 @@ class SimpleJobQueue:
 
     Features:
     - In-memory queue (asyncio.Queue)
-    - Automatic retry (3 attempts)
-    - Worker loop running in background
+    - Worker pool with configurable concurrency
+    - Automatic retry (3 attempts) scheduled on a delay heap - a job waiting
+      for its backoff never occupies a worker
+    - Pending SYNC_SAHHA_DATA jobs for the same user are coalesced, and a
+      user's sync jobs never run concurrently
+    - Durable job store: at-least-once delivery, leases, idempotency keys
+      and recovery of jobs whose owner died
     - No Redis dependency
 
     Limitations (acceptable for MVP):
-    - Jobs lost on restart (okay - next analysis will refetch)
-    - Single-server only (okay for MVP scale)
+    - A job may run twice after a crash (archival upserts are idempotent)
+    - Jobs of a crashed process wait up to JOB_LEASE_SECONDS before another
+      process claims them
+    - With the memory store (ENVIRONMENT=test) jobs are lost on restart
     """
 
-    def __init__(self):
+    def __init__(self, concurrency: Optional[int] = None, retry_base_delay: float = 2.0,
+                 store: Optional[JobStore] = None, lease_seconds: Optional[float] = None,
+                 reap_interval: Optional[float] = None):
         self.queue = asyncio.Queue()
         self.running = False
-        self.worker_task = None
+        self.concurrency = max(1, concurrency or int(os.getenv("JOB_QUEUE_WORKERS", "4")))
+        self.retry_base_delay = retry_base_delay
+        self.worker_tasks: List[asyncio.Task] = []
+        self.scheduler_task = None
+
+        # Durable store; every job this process owns holds a lease of lease_seconds,
+        # renewed every reap_interval
+        self.store = store or create_job_store()
+        self.lease_seconds = lease_seconds or float(os.getenv("JOB_LEASE_SECONDS", "300"))
+        self.reap_interval = reap_interval or min(30.0, self.lease_seconds / 2)
+        self.retention_seconds = float(os.getenv("JOB_STORE_RETENTION_HOURS", "24")) * 3600
+        self._last_reap = time.monotonic()
+
+        # Jobs this process owns (queued, delayed or running) by id
+        self._active: Dict[str, Job] = {}
+
+        # Delayed retries: (ready_at monotonic, sequence, job)
+        self._delayed: List[Tuple[float, int, Job]] = []
+        self._delayed_changed = asyncio.Event()
+        self._sequence = itertools.count()
+
+        # Coalescing: key -> job still waiting in the queue
+        self._pending: Dict[tuple, Job] = {}
+        # Per-user serialization: keys with a running job, and the pending job
+        # held back until it finishes
+        self._running_keys: Set[tuple] = set()
+        self._held: Dict[tuple, Job] = {}
+        self._in_flight = 0
+
+        self.handlers: Dict[str, JobHandler] = {
+            "SYNC_SAHHA_DATA": self._sync_sahha_data
+        }
         self.stats = {
             "queued": 0,
             "completed": 0,
             "failed": 0,
-            "retries": 0
+            "retries": 0,
+            "coalesced": 0,
+            "duplicates": 0,
+            "recovered": 0,
+            "archived_rows": 0,
+            "archival_seconds": 0.0
         }
 
+    def register_handler(self, job_type: str, handler: JobHandler):
+        """Register (or replace) the coroutine that processes a job type"""
+        self.handlers[job_type] = handler
+
     async def start(self):
-        """Start background worker"""
+        """Start background workers and the retry scheduler"""
         if self.running:
             logger.warning("[QUEUE] Worker already running")
             return
 
+        await self._recover()
+
         self.running = True
-        self.worker_task = asyncio.create_task(self._worker_loop())
-        logger.info("[QUEUE] Background worker started")
+        self.worker_tasks = [
+            asyncio.create_task(self._worker_loop(worker_id)) for worker_id in range(self.concurrency)
+        ]
+        self.scheduler_task = asyncio.create_task(self._scheduler_loop())
+        logger.info(f"[QUEUE] Background workers started ({self.concurrency} workers)")
 
     async def stop(self):
-        """Stop background worker gracefully"""
+        """Stop background workers gracefully (in-flight jobs finish first)"""
         if not self.running:
             return
 
         self.running = False
-        if self.worker_task:
-            await self.worker_task
-        logger.info("[QUEUE] Background worker stopped")
-
-    async def submit_job(self, job_type: str, payload: Dict[str, Any]):
+        self._delayed_changed.set()
+        await asyncio.gather(*self.worker_tasks, self.scheduler_task, return_exceptions=True)
+        self.worker_tasks = []
+        self.scheduler_task = None
+
+        # Hand unfinished jobs back right away instead of when their leases expire
+        await self._store_call(self.store.set_lease, list(self._active), None)
+
+        if self._delayed or not self.queue.empty():
+            logger.info(
+                f"[QUEUE] {self.queue.qsize()} queued + {len(self._delayed)} delayed jobs left "
+                f"in the {self.store.name} job store"
+            )
+        logger.info("[QUEUE] Background workers stopped")
+
+    async def submit_job(self, job_type: str, payload: Dict[str, Any],
+                         idempotency_key: Optional[str] = None) -> Optional[str]:
         """
         Submit job to queue (non-blocking)
 
+        A SYNC_SAHHA_DATA job for a user that already has one waiting in the
+        queue is merged into the waiting job instead of being queued again.
+        A job whose explicit idempotency key is already queued, running or
+        completed (within JOB_STORE_RETENTION_HOURS) is dropped. Without a key,
+        an identical payload is only dropped while the first job is unfinished,
+        so resubmitting the same work later runs it again.
+
         Args:
             job_type: Type of job (e.g., "SYNC_SAHHA_DATA")
             payload: Job data
+            idempotency_key: Dedupe key (default: hash of job type + payload,
+                released when the job finishes)
+
+        Returns:
+            ID of the job that will carry out the work
         """
-        job = Job(job_type, payload)
-        await self.queue.put(job)
+        idempotency_key = idempotency_key or make_idempotency_key(job_type, payload)
+
+        key = self._coalesce_key(job_type, payload)
+        pending = self._pending.get(key) if key else None
+        if pending is not None:
+            if pending.idempotency_key == idempotency_key:
+                self.stats["duplicates"] += 1
+                return pending.id
+            pending.payload = self._merge_payloads(pending.payload, payload)
+            await self._store_call(self.store.update, pending.id, payload=pending.payload)
+            self.stats["coalesced"] += 1
+            logger.info(f"[QUEUE] Job merged into pending {pending.id} (type: {job_type})")
+            return pending.id
+
+        job = Job(job_type, payload, idempotency_key)
+        record = {**job.to_record(), "lease_until": time.time() + self.lease_seconds}
+        existing = await self._store_call(self.store.add, record)
+        if existing:
+            self.stats["duplicates"] += 1
+            logger.info(f"[QUEUE] Duplicate of job {existing} dropped (type: {job_type})")
+            return existing
+
+        await self._enqueue(job)
         self.stats["queued"] += 1
         logger.info(f"[QUEUE] Job {job.id} queued (type: {job_type})")
+        return job.id
+
+    async def _store_call(self, method, *args, **kwargs):
+        """
+        Run a job store call off the event loop
+
+        Store failures are logged, not raised - the queue keeps working from
+        memory (without durability) rather than dropping the job.
+        """
+        try:
+            if isinstance(self.store, MemoryJobStore):
+                return method(*args, **kwargs)
+            return await asyncio.to_thread(method, *args, **kwargs)
+        except Exception as e:
+            logger.warning(f"[QUEUE] Job store {method.__name__} failed: {e}")
+            return None
+
+    async def _recover(self):
+        """Claim unfinished jobs nobody holds a lease on (startup recovery)"""
+        await self._store_call(self.store.purge, time.time() - self.retention_seconds)
+        now = time.time()
+        records = await self._store_call(self.store.claim, now, now + self.lease_seconds) or []
+        recovered = await self._requeue_records(records)
+        if recovered:
+            logger.info(f"[QUEUE] Recovered {recovered} unfinished jobs from the {self.store.name} job store")
+
+    async def _reap_expired_leases(self):
+        """Renew this process's leases, then claim jobs whose owner stopped renewing (it died)"""
+        now = time.time()
+        await self._store_call(self.store.set_lease, list(self._active), now + self.lease_seconds)
+        records = await self._store_call(self.store.claim, now, now + self.lease_seconds) or []
+        recovered = await self._requeue_records(records)
+        if recovered:
+            logger.warning(f"[QUEUE] Re-delivered {recovered} jobs with expired leases")
+
+    async def _requeue_records(self, records: List[Dict[str, Any]]) -> int:
+        recovered = 0
+        now = time.time()
+        for record in records:
+            if record["id"] in self._active:
+                continue  # Still owned by this process
+            job = Job.from_record(record)
+            if job.status == JobStatus.RETRY and job.available_at > now:
+                self._active[job.id] = job
+                self._schedule_retry(job, job.available_at - now)
+            else:
+                await self._enqueue(job)
+            recovered += 1
+        self.stats["recovered"] += recovered
+        return recovered
 
-    async def _worker_loop(self):
+    def _coalesce_key(self, job_type: str, payload: Dict[str, Any]) -> Optional[tuple]:
+        """
+        Jobs with the same key are merged while pending and never run at the
+        same time (None = neither)
+
+        The key is the user alone; duplicates of one analysis are still caught
+        by the idempotency key (hash of the whole payload).
+        """
+        if job_type not in COALESCED_JOB_TYPES:
+            return None
+        return (job_type, payload.get("user_id"))
+
+    def _merge_payloads(self, older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Merge two SYNC_SAHHA_DATA payloads
+
+        Records are concatenated oldest first; archival deduplicates on the
+        table conflict keys with the last record winning, so newer data wins.
+        Tracking record ids and (archetype, analysis_type) pairs from both are
+        kept so every merged analysis is marked synced.
+        """
+        older_data = older.get("sahha_data") or {}
+        newer_data = newer.get("sahha_data") or {}
+        merged = {**older, **newer}
+        merged.pop("tracking_record_id", None)
+        ids = list(dict.fromkeys(tracking_record_ids(older) + tracking_record_ids(newer)))
+        if ids:
+            merged["tracking_record_ids"] = ids
+        else:
+            merged.pop("tracking_record_ids", None)
+        analyses = payload_analyses(older) + payload_analyses(newer)
+        merged["analyses"] = [list(pair) for pair in dict.fromkeys(map(tuple, analyses))]
+        merged["sahha_data"] = {
+            **older_data,
+            **newer_data,
+            "biomarkers": list(older_data.get("biomarkers", [])) + list(newer_data.get("biomarkers", [])),
+            "scores": list(older_data.get("scores", [])) + list(newer_data.get("scores", [])),
+            # Either fetch's gaps keep the category's watermark in place
+            "incomplete_categories": sorted(
+                set(older_data.get("incomplete_categories") or []) | set(newer_data.get("incomplete_categories") or [])
+            )
+        }
+        return merged
+
+    async def _enqueue(self, job: Job):
+        """Put a job on the ready queue, merging it into a pending duplicate if any"""
+        key = self._coalesce_key(job.job_type, job.payload)
+        if key:
+            pending = self._pending.get(key)
+            if pending is not None and pending is not job:
+                # A retry is older than the job submitted while it waited
+                pending.payload = self._merge_payloads(job.payload, pending.payload)
+                self._active.pop(job.id, None)
+                await self._store_call(self.store.update, pending.id, payload=pending.payload)
+                await self._store_call(self.store.remove, job.id)
+                self.stats["coalesced"] += 1
+                return
+            self._pending[key] = job
+
+        self._active[job.id] = job
+        job.status = JobStatus.PENDING
+        self.queue.put_nowait(job)
+
+    def _schedule_retry(self, job: Job, delay: float):
+        """Park a job on the delay heap; the scheduler re-queues it when due"""
+        heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._sequence), job))
+        self._delayed_changed.set()
+
+    async def _scheduler_loop(self):
+        """Move delayed retries to the ready queue when their backoff expires"""
+
+        while self.running:
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                _, _, job = heapq.heappop(self._delayed)
+                await self._enqueue(job)
+
+            if now - self._last_reap >= self.reap_interval:
+                self._last_reap = now
+                await self._reap_expired_leases()
+
+            timeout = self._delayed[0][0] - now if self._delayed else 1.0
+            self._delayed_changed.clear()
+            try:
+                await asyncio.wait_for(self._delayed_changed.wait(), timeout=min(timeout, 1.0, self.reap_interval))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker_loop(self, worker_id: int = 0):
         """Background worker loop - processes jobs from queue"""
 
-        logger.info("[QUEUE] Worker loop starting")
+        logger.debug(f"[QUEUE] Worker {worker_id} starting")
 
         while self.running:
             try:
@@ -107,14 +426,36 @@ class SimpleJobQueue:
                 except asyncio.TimeoutError:
                     continue
 
+                key = self._coalesce_key(job.job_type, job.payload)
+                if key in self._running_keys:
+                    # Same user already running - stays pending (and mergeable)
+                    # until that job finishes
+                    self._held[key] = job
+                    continue
+
+                # Job is now running - later submissions start a new pending job
+                if key:
+                    if self._pending.get(key) is job:
+                        del self._pending[key]
+                    self._running_keys.add(key)
+
                 # Process job
-                await self._process_job(job)
+                self._in_flight += 1
+                try:
+                    await self._process_job(job)
+                finally:
+                    self._in_flight -= 1
+                    if key:
+                        self._running_keys.discard(key)
+                        held = self._held.pop(key, None)
+                        if held is not None:
+                            self.queue.put_nowait(held)
 
             except Exception as e:
                 logger.error(f"[QUEUE] Worker loop error: {e}")
                 await asyncio.sleep(1)
 
-        logger.info("[QUEUE] Worker loop stopped")
+        logger.debug(f"[QUEUE] Worker {worker_id} stopped")
 
     async def _process_job(self, job: Job):
         """
@@ -126,31 +467,30 @@ class SimpleJobQueue:
 
         job.attempts += 1
         job.status = JobStatus.PROCESSING
+        await self._store_call(
+            self.store.update, job.id, status=job.status.value, attempts=job.attempts,
+            lease_until=time.time() + self.lease_seconds
+        )
 
         logger.info(f"[QUEUE] Processing job {job.id} (attempt {job.attempts}/{job.max_attempts})")
 
         try:
-            # Import here to avoid circular dependency
-            from .archival_service import get_archival_service
-
-            archival_service = get_archival_service()
-
             # Process based on job type
-            if job.job_type == "SYNC_SAHHA_DATA":
-                await archival_service.archive_sahha_data(
-                    user_id=job.payload["user_id"],
-                    archetype=job.payload["archetype"],
-                    analysis_type=job.payload["analysis_type"],
-                    sahha_data=job.payload["sahha_data"],
-                    tracking_record_id=job.payload.get("tracking_record_id")
-                )
+            handler = self.handlers.get(job.job_type)
+            if handler is None:
+                raise ValueError(f"Unknown job type: {job.job_type}")
 
-                job.status = JobStatus.COMPLETED
-                self.stats["completed"] += 1
-                logger.info(f"[QUEUE] Job {job.id} completed successfully")
+            job.result = await handler(job)
 
-            else:
-                raise ValueError(f"Unknown job type: {job.job_type}")
+            job.status = JobStatus.COMPLETED
+            self._active.pop(job.id, None)
+            # Keep the row (without payload) so an explicit idempotency key stays taken
+            finished = {"status": job.status.value, "payload": {}, "lease_until": None, "error": None}
+            if (job.idempotency_key or "").startswith(PAYLOAD_KEY_PREFIX):
+                finished["idempotency_key"] = None
+            await self._store_call(self.store.update, job.id, **finished)
+            self.stats["completed"] += 1
+            logger.info(f"[QUEUE] Job {job.id} completed successfully")
 
         except Exception as e:
             job.error = str(e)
@@ -161,22 +501,66 @@ class SimpleJobQueue:
                 job.status = JobStatus.RETRY
                 self.stats["retries"] += 1
 
-                # Re-queue with exponential backoff delay
-                delay = 2 ** job.attempts  # 2s, 4s, 8s
+                # Re-queue with exponential backoff delay (without holding this worker)
+                delay = self.retry_base_delay * 2 ** (job.attempts - 1)  # 2s, 4s, 8s
                 logger.info(f"[QUEUE] Retrying job {job.id} in {delay}s")
-                await asyncio.sleep(delay)
-                await self.queue.put(job)
+                job.available_at = time.time() + delay
+                # Still owned by this process while it waits on the delay heap
+                await self._store_call(
+                    self.store.update, job.id, status=job.status.value, available_at=job.available_at,
+                    lease_until=time.time() + self.lease_seconds, error=job.error
+                )
+                self._schedule_retry(job, delay)
 
             else:
                 job.status = JobStatus.FAILED
+                self._active.pop(job.id, None)
+                await self._store_call(
+                    self.store.update, job.id, status=job.status.value, lease_until=None, error=job.error
+                )
                 self.stats["failed"] += 1
                 logger.error(f"[QUEUE] Job {job.id} permanently failed after {job.attempts} attempts")
 
+    async def _sync_sahha_data(self, job: Job) -> Optional[Dict[str, Any]]:
+        """Archive a SYNC_SAHHA_DATA job's biomarkers and scores"""
+        # Import here to avoid circular dependency
+        from .archival_service import get_archival_service
+
+        archival_service = get_archival_service()
+        archived = await archival_service.archive_sahha_data(
+            user_id=job.payload["user_id"],
+            archetype=job.payload["archetype"],
+            analysis_type=job.payload["analysis_type"],
+            sahha_data=job.payload["sahha_data"],
+            tracking_record_ids=tracking_record_ids(job.payload),
+            analyses=payload_analyses(job.payload)
+        )
+
+        # New biomarkers are stored - drop the user's cached energy zones
+        try:
+            from services.energy_zone_store import energy_zone_store
+            energy_zone_store.note_new_data(job.payload["user_id"])
+        except Exception as e:
+            logger.warning(f"[QUEUE] Energy zone invalidation failed: {e}")
+
+        if archived:
+            self.stats["archived_rows"] += archived["rows"]
+            self.stats["archival_seconds"] += archived["seconds"]
+        return archived
+
     def get_stats(self) -> Dict[str, Any]:
-        """Get queue statistics"""
+        """Get queue statistics (including archival throughput)"""
+        seconds = self.stats["archival_seconds"]
         return {
             **self.stats,
+            "archival_seconds": round(seconds, 3),
+            "archival_rows_per_second": round(self.stats["archived_rows"] / seconds, 1) if seconds > 0 else 0,
             "queue_size": self.queue.qsize(),
+            "delayed": len(self._delayed),
+            "held": len(self._held),
+            "in_flight": self._in_flight,
+            "workers": self.concurrency,
+            "job_store": {"backend": self.store.name, **self.store.get_stats()},
             "running": self.running
         }
 
@@ -8,7 +8,7 @@ import os
 import uuid
 from datetime import datetime, date
 from typing import List, Dict, Optional, Any
-from supabase import create_client
+from shared_libs.supabase_client.async_executor import execute_async, get_shared_supabase_client
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,7 +24,7 @@ class CalendarSelectionService:
         if not self.supabase_url or not self.supabase_key:
             raise ValueError("Missing Supabase configuration. Please set SUPABASE_URL and SUPABASE_KEY.")
         
-        self.supabase = create_client(self.supabase_url, self.supabase_key)
+        self.supabase = get_shared_supabase_client(self.supabase_url, self.supabase_key)
 
     async def add_plan_item_to_calendar(
         self, 
@@ -45,11 +45,12 @@ class CalendarSelectionService:
         """
         try:
             # Check if plan item exists
-            plan_item_check = self.supabase.table("plan_items")\
-                .select("id, title, time_block_id, scheduled_time")\
-                .eq("id", plan_item_id)\
-                .eq("profile_id", profile_id)\
-                .execute()
+            plan_item_check = await execute_async(
+                self.supabase.table("plan_items")
+                .select("id, title, time_block_id, scheduled_time")
+                .eq("id", plan_item_id)
+                .eq("profile_id", profile_id)
+            )
             
             if not plan_item_check.data:
                 raise ValueError(f"Plan item {plan_item_id} not found for user {profile_id}")
@@ -67,10 +68,10 @@ class CalendarSelectionService:
             }
             
             # Upsert to handle duplicates
-            result = self.supabase.table("calendar_selections").upsert(
+            result = await execute_async(self.supabase.table("calendar_selections").upsert(
                 selection,
                 on_conflict="profile_id,plan_item_id"
-            ).execute()
+            ))
             
             logger.info(f"Added plan item {plan_item_id} to calendar for user {profile_id}")
             
@@ -102,11 +103,12 @@ class CalendarSelectionService:
         """
         try:
             # Delete the calendar selection
-            result = self.supabase.table("calendar_selections")\
-                .delete()\
-                .eq("profile_id", profile_id)\
-                .eq("plan_item_id", plan_item_id)\
-                .execute()
+            result = await execute_async(
+                self.supabase.table("calendar_selections")
+                .delete()
+                .eq("profile_id", profile_id)
+                .eq("plan_item_id", plan_item_id)
+            )
             
             logger.info(f"Removed plan item {plan_item_id} from calendar for user {profile_id}")
             
@@ -164,7 +166,7 @@ class CalendarSelectionService:
                 query = query.gte("selection_timestamp", f"{date_filter}T00:00:00")\
                              .lt("selection_timestamp", f"{date_filter}T23:59:59")
             
-            result = query.order("selection_timestamp").execute()
+            result = await execute_async(query.order("selection_timestamp"))
             
             # Group by time block for easier frontend consumption
             time_blocks = {}
@@ -228,7 +230,7 @@ class CalendarSelectionService:
             if archetype_filter:
                 time_blocks_query = time_blocks_query.eq("analysis_result_id", archetype_filter)
             
-            time_blocks_result = time_blocks_query.order("block_order").execute()
+            time_blocks_result = await execute_async(time_blocks_query.order("block_order"))
             
             # Get calendar selections for these time blocks
             calendar_items = {}
@@ -259,7 +261,7 @@ class CalendarSelectionService:
                     selections_query = selections_query.gte("selection_timestamp", f"{date_filter}T00:00:00")\
                                                      .lt("selection_timestamp", f"{date_filter}T23:59:59")
                 
-                selections_result = selections_query.execute()
+                selections_result = await execute_async(selections_query)
                 
                 # Organize items by time block
                 for selection in (selections_result.data or []):
@@ -329,10 +331,10 @@ class CalendarSelectionService:
                 selections.append(selection)
             
             # Bulk upsert
-            result = self.supabase.table("calendar_selections").upsert(
+            result = await execute_async(self.supabase.table("calendar_selections").upsert(
                 selections,
                 on_conflict="profile_id,plan_item_id"
-            ).execute()
+            ))
             
             logger.info(f"Bulk added {len(plan_item_ids)} items to calendar for user {profile_id}")
             
@@ -368,7 +370,7 @@ class CalendarSelectionService:
                 .select("id")\
                 .eq("profile_id", profile_id)
             
-            plan_items_result = plan_items_query.execute()
+            plan_items_result = await execute_async(plan_items_query)
             total_available = len(plan_items_result.data or [])
             
             # Get calendar selections
@@ -381,7 +383,7 @@ class CalendarSelectionService:
                 selections_query = selections_query.gte("selection_timestamp", f"{date_filter}T00:00:00")\
                                                  .lt("selection_timestamp", f"{date_filter}T23:59:59")
             
-            selections_result = selections_query.execute()
+            selections_result = await execute_async(selections_query)
             total_selected = len(selections_result.data or [])
             
             # Calculate selection rate
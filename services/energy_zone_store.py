@@ -0,0 +1,193 @@
+"""
+Energy Zone Result Store
+Keeps each user's latest EnergyZonesResult in memory until its `expires_at`, so
+dashboard polling of /current and /summary is served without re-fetching health
+data or calling the model. Entries are dropped as soon as new biomarker data is
+archived for the user.
+
+"Current zone" lookups go through an interval index built once per result:
+O(log n) by bisection instead of a scan over every zone.
+"""
+
+import logging
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, time
+from typing import Any, Dict, List, Optional
+
+from shared_libs.data_models.energy_zones_models import EnergyZone, EnergyZonesResult
+
+logger = logging.getLogger(__name__)
+
+
+class EnergyZoneIndex:
+    """
+    Interval index over a result's zones
+
+    The sorted start/end times split the day into breakpoints and the open gaps
+    between them; the active zone is precomputed for each, with the same
+    semantics as EnergyZonesResult.get_current_zone (closed intervals, first
+    matching zone in list order wins). A lookup is then a single bisection.
+    """
+
+    def __init__(self, zones: List[EnergyZone]):
+        self._points: List[time] = sorted(
+            {zone.start_time for zone in zones} | {zone.end_time for zone in zones}
+        )
+        self._at_point: List[Optional[EnergyZone]] = [
+            self._first_active(zones, point, point) for point in self._points
+        ]
+        # _in_gap[i] covers the open interval (points[i], points[i + 1])
+        self._in_gap: List[Optional[EnergyZone]] = [
+            self._first_active(zones, self._points[i], self._points[i + 1])
+            for i in range(len(self._points) - 1)
+        ]
+
+        by_start = sorted(
+            (zone for zone in zones if zone.start_time <= zone.end_time),
+            key=lambda zone: zone.start_time
+        )
+        self._starts: List[time] = [zone.start_time for zone in by_start]
+        self._by_start: List[EnergyZone] = by_start
+
+    @staticmethod
+    def _first_active(zones: List[EnergyZone], low: time, high: time) -> Optional[EnergyZone]:
+        for zone in zones:
+            if zone.start_time <= low and high <= zone.end_time:
+                return zone
+        return None
+
+    def zone_at(self, current_time: time) -> Optional[EnergyZone]:
+        """Zone active at current_time, or None between zones"""
+        i = bisect_right(self._points, current_time) - 1
+        if i < 0:
+            return None
+        if self._points[i] == current_time:
+            return self._at_point[i]
+        if i >= len(self._in_gap):
+            return None
+        return self._in_gap[i]
+
+    def next_zone(self, current_time: time) -> Optional[EnergyZone]:
+        """First zone starting after current_time today"""
+        i = bisect_right(self._starts, current_time)
+        return self._by_start[i] if i < len(self._by_start) else None
+
+
+@dataclass
+class StoredEnergyZones:
+    """A stored result with its index and the health-data watermark it was built from"""
+    result: EnergyZonesResult
+    index: EnergyZoneIndex
+    data_watermark: Optional[datetime] = None
+    stored_at: datetime = field(default_factory=datetime.now)
+
+    def is_expired(self, now: Optional[datetime] = None) -> bool:
+        expires_at = self.result.expires_at
+        if expires_at is None:
+            return False
+        now = now or datetime.now(expires_at.tzinfo)
+        return now >= expires_at
+
+
+class EnergyZoneResultStore:
+    """
+    Per-user LRU store of energy-zone results
+
+    - get() honours the result's expires_at
+    - invalidate() / note_new_data() drop a user's entry when fresh health data lands
+    - bounded by max_users so a burst of one-off users cannot grow it without limit
+    """
+
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+        self._entries: "OrderedDict[str, StoredEnergyZones]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str) -> Optional[StoredEnergyZones]:
+        """Get a user's unexpired entry, or None"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.is_expired():
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry
+
+    def put(self, user_id: str, result: EnergyZonesResult,
+            data_watermark: Optional[datetime] = None) -> StoredEnergyZones:
+        """Store a result (replacing any previous one) and build its index"""
+        entry = StoredEnergyZones(
+            result=result,
+            index=EnergyZoneIndex(result.energy_zones),
+            data_watermark=data_watermark
+        )
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._entries[user_id] = entry
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, user_id: str) -> bool:
+        """Drop a user's entry; returns True if one was stored"""
+        with self._lock:
+            removed = self._entries.pop(user_id, None) is not None
+            if removed:
+                self.invalidations += 1
+        if removed:
+            logger.debug(f"[ENERGY_ZONES] Invalidated stored zones for {user_id[:8]}...")
+        return removed
+
+    def note_new_data(self, user_id: str, data_timestamp: Optional[datetime] = None) -> bool:
+        """
+        Record that new biomarker data arrived for a user
+
+        The entry is dropped unless it was built from data at least as new as
+        data_timestamp (unknown timestamps always invalidate).
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return False
+            watermark = entry.data_watermark
+        if data_timestamp is not None and watermark is not None:
+            try:
+                if data_timestamp <= watermark:
+                    return False
+            except TypeError:
+                pass  # naive vs aware timestamps - treat as new data
+        return self.invalidate(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/invalidation counts for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "users": len(self._entries),
+            "max_users": self.max_users,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+            "invalidations": self.invalidations
+        }
+
+
+# Global instance shared by the energy zones service and the archival worker
+energy_zone_store = EnergyZoneResultStore()
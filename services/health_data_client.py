@@ -10,6 +10,8 @@ from typing import Dict, List, Optional, Any
 import logging
 from dataclasses import dataclass
 
+from shared_libs.http.client_pool import get_http_client
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -57,71 +59,71 @@ class HealthDataClient:
         
         for attempt in range(self.max_retries):
             try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    response = await client.get(url, params=params)
-                    duration = (datetime.now() - start_time).total_seconds() * 1000
+                client = get_http_client(self.base_url, self.timeout)
+                response = await client.get(url, params=params, timeout=self.timeout)
+                duration = (datetime.now() - start_time).total_seconds() * 1000
+                
+                # Handle different response scenarios
+                if response.status_code == 200:
+                    data = response.json()
                     
-                    # Handle different response scenarios
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        # Handle different response formats from hos-fapi
-                        if isinstance(data, dict):
-                            if 'data' in data:
-                                actual_data = data['data']
-                            elif 'items' in data:
-                                actual_data = data['items']
-                            elif 'results' in data:
-                                actual_data = data['results']
-                            else:
-                                # Assume the whole response is data
-                                actual_data = [data] if not isinstance(data, list) else data
+                    # Handle different response formats from hos-fapi
+                    if isinstance(data, dict):
+                        if 'data' in data:
+                            actual_data = data['data']
+                        elif 'items' in data:
+                            actual_data = data['items']
+                        elif 'results' in data:
+                            actual_data = data['results']
                         else:
-                            actual_data = data if isinstance(data, list) else [data]
-                        
-                        self.success_count += 1
-                        logger.debug(f"[API_SUCCESS] {endpoint}: {len(actual_data)} records in {duration:.0f}ms")
-                        
-                        return APIResponse(
-                            success=True,
-                            data=actual_data,
-                            status_code=response.status_code,
-                            duration_ms=duration
-                        )
+                            # Assume the whole response is data
+                            actual_data = [data] if not isinstance(data, list) else data
+                    else:
+                        actual_data = data if isinstance(data, list) else [data]
+                    
+                    self.success_count += 1
+                    logger.debug(f"[API_SUCCESS] {endpoint}: {len(actual_data)} records in {duration:.0f}ms")
                     
-                    elif response.status_code == 404:
-                        # Not found is OK - user might not have data
-                        logger.debug(f"[API_NO_DATA] {endpoint}: No data found (404)")
+                    return APIResponse(
+                        success=True,
+                        data=actual_data,
+                        status_code=response.status_code,
+                        duration_ms=duration
+                    )
+                
+                elif response.status_code == 404:
+                    # Not found is OK - user might not have data
+                    logger.debug(f"[API_NO_DATA] {endpoint}: No data found (404)")
+                    return APIResponse(
+                        success=True,
+                        data=[],
+                        status_code=response.status_code,
+                        duration_ms=duration
+                    )
+                
+                elif response.status_code == 429:
+                    # Rate limited - exponential backoff
+                    wait_time = self.retry_delay * (2 ** attempt)
+                    logger.warning(f"[API_RATE_LIMITED] {endpoint}: Retrying in {wait_time}s")
+                    await asyncio.sleep(wait_time)
+                    continue
+                
+                else:
+                    # Other HTTP errors
+                    logger.warning(f"[API_HTTP_ERROR] {endpoint}: Status {response.status_code}, attempt {attempt + 1}")
+                    if attempt == self.max_retries - 1:
+                        self.error_count += 1
                         return APIResponse(
-                            success=True,
+                            success=False,
                             data=[],
                             status_code=response.status_code,
-                            duration_ms=duration
+                            duration_ms=duration,
+                            error=f"HTTP {response.status_code}"
                         )
                     
-                    elif response.status_code == 429:
-                        # Rate limited - exponential backoff
-                        wait_time = self.retry_delay * (2 ** attempt)
-                        logger.warning(f"[API_RATE_LIMITED] {endpoint}: Retrying in {wait_time}s")
-                        await asyncio.sleep(wait_time)
-                        continue
+                    await asyncio.sleep(self.retry_delay)
+                    continue
                     
-                    else:
-                        # Other HTTP errors
-                        logger.warning(f"[API_HTTP_ERROR] {endpoint}: Status {response.status_code}, attempt {attempt + 1}")
-                        if attempt == self.max_retries - 1:
-                            self.error_count += 1
-                            return APIResponse(
-                                success=False,
-                                data=[],
-                                status_code=response.status_code,
-                                duration_ms=duration,
-                                error=f"HTTP {response.status_code}"
-                            )
-                        
-                        await asyncio.sleep(self.retry_delay)
-                        continue
-                        
             except httpx.TimeoutException:
                 logger.warning(f"[API_TIMEOUT] {endpoint}: Timeout on attempt {attempt + 1}")
                 if attempt == self.max_retries - 1:
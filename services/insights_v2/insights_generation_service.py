@@ -318,14 +318,16 @@ Generate insights now:"""
         if not self.openai_client:
             raise ValueError("OpenAI client not initialized. Check OPENAI_API_KEY environment variable.")
 
-        # Real OpenAI API call only
-        response = await self.openai_client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            temperature=0.7,
-            max_tokens=1500
-        )
+        # Real OpenAI API call only - queued behind the shared per-model limit
+        from shared_libs.llm.openai_registry import openai_registry
+        async with openai_registry.model_slot(self.model):
+            response = await self.openai_client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                response_format={"type": "json_object"},
+                temperature=0.7,
+                max_tokens=1500
+            )
         return json.loads(response.choices[0].message.content)
 
     async def _call_anthropic(self, prompt: str) -> Dict[str, Any]:
@@ -435,11 +437,11 @@ async def get_insights_generation_service() -> InsightsGenerationService:
     if _insights_generation_service is None:
         # Initialize with OpenAI client
         import os
-        from openai import AsyncOpenAI
+        from shared_libs.llm.openai_registry import get_openai_client
 
         openai_api_key = os.getenv("OPENAI_API_KEY")
         if openai_api_key:
-            openai_client = AsyncOpenAI(api_key=openai_api_key)
+            openai_client = get_openai_client(openai_api_key)
             _insights_generation_service = InsightsGenerationService(
                 openai_client=openai_client,
                 model="gpt-4o"
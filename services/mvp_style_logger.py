@@ -2,14 +2,21 @@
 MVP-Style Direct File Logger - Enhanced for Complete System Flow
 Completely independent of database operations - ensures logs are always created
 Captures: Raw Health Data, AI Prompts/Responses, Agent Handoffs, Complete System Flow
+
+Writes go through the shared log sink (shared_libs/utils/log_sink.py): the
+log_* methods queue the record and return without touching the disk.
 """
 
-import json
 import os
 import glob
+import gzip
+import json
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 
+from shared_libs.utils.log_sink import get_log_sink
+from shared_libs.utils.sequence_allocator import SequenceAllocator
+
 # Environment-aware logging
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development").lower()
 IS_DEVELOPMENT = ENVIRONMENT in ["development", "dev"]
@@ -33,31 +40,57 @@ class MVPStyleLogger:
         for dir_path in [self.raw_data_dir, self.agent_handoffs_dir, self.ai_interactions_dir]:
             os.makedirs(dir_path, exist_ok=True)
 
+        # Analysis numbers come from a locked counter file shared by all workers
+        self.analysis_numbers = SequenceAllocator(
+            os.path.join(logs_dir, ".analysis_number"),
+            block_size=int(os.getenv("MVP_ANALYSIS_NUMBER_BLOCK", "1")),
+            seed=self._scan_last_analysis_number
+        )
+
     def get_next_analysis_number(self) -> int:
-        """Get next analysis number by checking existing files"""
+        """Allocate the next analysis number (atomic across workers, no directory scan)"""
         try:
-            # Look for existing input files to determine next number
-            existing_files = glob.glob(f"{self.logs_dir}/input_*.txt")
+            return self.analysis_numbers.next()
+        except Exception as e:
+            print(f"[MVP_LOGGER_ERROR] Error getting analysis number: {e}")
+            return 1
 
-            if not existing_files:
-                return 1
+    def _scan_last_analysis_number(self) -> int:
+        """
+        Highest analysis number already written - seeds a new counter file once
 
-            numbers = []
-            for filename in existing_files:
-                try:
-                    # Extract number from filename like "input_5.txt"
-                    basename = os.path.basename(filename)
-                    number_part = basename.replace("input_", "").replace(".txt", "")
-                    number = int(number_part)
-                    numbers.append(number)
-                except (ValueError, IndexError):
-                    continue
+        Looks at both sink formats: input_N.txt[.gz] files, and the
+        analysis_number of records in the input.jsonl segment and its newest
+        rotated backup.
+        """
+        try:
+            numbers = [0]
+
+            for filename in glob.glob(f"{self.logs_dir}/input_*.txt*"):
+                # Extract number from filename like "input_5.txt" / "input_5.txt.gz"
+                number_part = os.path.basename(filename).split(".")[0].replace("input_", "")
+                if number_part.isdigit():
+                    numbers.append(int(number_part))
 
-            return max(numbers) + 1 if numbers else 1
+            segment = os.path.join(self.logs_dir, "input.jsonl")
+            for path in (segment, f"{segment}.1", f"{segment}.1.gz"):
+                if not os.path.exists(path):
+                    continue
+                opener = gzip.open if path.endswith(".gz") else open
+                with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+                    for line in f:
+                        try:
+                            number = json.loads(line).get("analysis_number")
+                        except (ValueError, AttributeError):
+                            continue  # Torn last line after a crash
+                        if isinstance(number, int):
+                            numbers.append(number)
+
+            return max(numbers)
 
         except Exception as e:
-            print(f"[MVP_LOGGER_ERROR] Error getting analysis number: {e}")
-            return 1
+            print(f"[MVP_LOGGER_ERROR] Error scanning analysis numbers: {e}")
+            return 0
 
     def log_input_data(self, analysis_number: int, input_data: Dict[str, Any]) -> bool:
         """Log input data to input_N.txt file - MVP style"""
@@ -72,11 +105,10 @@ class MVPStyleLogger:
                 "data": input_data
             }
 
-            # Write directly to file (MVP approach)
-            with open(input_file, 'w', encoding='utf-8') as f:
-                json.dump(log_data, f, indent=2, default=str, ensure_ascii=False)
-
-            return True
+            # Queue for the background writer (same file layout as before)
+            return get_log_sink().submit(
+                input_file, log_data, stream="input", sample_key=analysis_number, payload_fields=("data",)
+            )
 
         except Exception as e:
             print(f"❌ [MVP_LOGGER_ERROR] Failed to log input data: {e}")
@@ -95,11 +127,10 @@ class MVPStyleLogger:
                 "data": output_data
             }
 
-            # Write directly to file (MVP approach)
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(log_data, f, indent=2, default=str, ensure_ascii=False)
-
-            return True
+            # Queue for the background writer (same file layout as before)
+            return get_log_sink().submit(
+                output_file, log_data, stream="output", sample_key=analysis_number, payload_fields=("data",)
+            )
 
         except Exception as e:
             print(f"❌ [MVP_LOGGER_ERROR] Failed to log output data: {e}")
@@ -118,11 +149,10 @@ class MVPStyleLogger:
                 "data": insights_data
             }
 
-            # Write directly to file (MVP approach)
-            with open(insights_file, 'w', encoding='utf-8') as f:
-                json.dump(log_data, f, indent=2, default=str, ensure_ascii=False)
-
-            return True
+            # Queue for the background writer (same file layout as before)
+            return get_log_sink().submit(
+                insights_file, log_data, stream="insights", sample_key=analysis_number, payload_fields=("data",)
+            )
 
         except Exception as e:
             print(f"❌ [MVP_LOGGER_ERROR] Failed to log insights data: {e}")
@@ -154,10 +184,10 @@ class MVPStyleLogger:
                 "api_responses": raw_data.get("api_responses", {})
             }
 
-            with open(raw_data_file, 'w', encoding='utf-8') as f:
-                json.dump(log_data, f, indent=2, default=str, ensure_ascii=False)
-
-            return True
+            return get_log_sink().submit(
+                raw_data_file, log_data, stream="raw_health", sample_key=analysis_number,
+                payload_fields=("data_sources", "api_responses")
+            )
 
         except Exception as e:
             print(f"❌ [MVP_LOGGER_ERROR] Failed to log raw health data: {e}")
@@ -193,11 +223,11 @@ class MVPStyleLogger:
                 }
             }
 
-            with open(ai_file, 'w', encoding='utf-8') as f:
-                json.dump(log_data, f, indent=2, default=str, ensure_ascii=False)
-
             pass  # Production: Verbose print removed
-            return True
+            return get_log_sink().submit(
+                ai_file, log_data, stream="ai_interaction", sample_key=analysis_number,
+                payload_fields=("prompt.system_prompt", "prompt.user_prompt", "response.content")
+            )
 
         except Exception as e:
             print(f"❌ [MVP_LOGGER_ERROR] Failed to log AI interaction: {e}")
@@ -241,11 +271,13 @@ class MVPStyleLogger:
                 }
             }
 
-            with open(handoff_file, 'w', encoding='utf-8') as f:
-                json.dump(log_data, f, indent=2, default=str, ensure_ascii=False)
+            queued = get_log_sink().submit(
+                handoff_file, log_data, stream="handoff", sample_key=analysis_number,
+                payload_fields=("input_data.data", "output_data.data")
+            )
 
             print(f"🔄 [MVP_LOGGER] Agent handoff logged: {os.path.basename(handoff_file)}")
-            return True
+            return queued
 
         except Exception as e:
             print(f"❌ [MVP_LOGGER_ERROR] Failed to log agent handoff: {e}")
@@ -260,12 +292,14 @@ class MVPStyleLogger:
         ai_interactions: Optional[List[Dict[str, Any]]] = None,
         agent_handoffs: Optional[List[Dict[str, Any]]] = None,
         user_id: str = None,
-        archetype: str = None
+        archetype: str = None,
+        analysis_number: Optional[int] = None
     ) -> Dict[str, Any]:
         """Log complete analysis cycle with enhanced system flow data"""
         try:
-            # Get next analysis number
-            analysis_number = self.get_next_analysis_number()
+            # Reuse the number allocated at the start of the request, if any
+            if analysis_number is None:
+                analysis_number = self.get_next_analysis_number()
 
             results = {
                 "analysis_number": analysis_number,
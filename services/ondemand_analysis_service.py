@@ -222,17 +222,19 @@ class OnDemandAnalysisService:
                 return 0
             
             # Count new scores - Fix datetime comparison
-            scores_result = db.client.table("scores").select("id", count="exact")\
-                .eq("profile_id", user_id)\
-                .gte("created_at", since_timestamp.isoformat())\
-                .execute()
+            scores_result = await db.execute_query(
+                db.client.table("scores").select("id", count="exact")
+                .eq("profile_id", user_id)
+                .gte("created_at", since_timestamp.isoformat())
+            )
             scores_count = scores_result.count if hasattr(scores_result, 'count') else len(scores_result.data if scores_result.data else [])
             
             # Count new biomarkers - Fix datetime comparison
-            biomarkers_result = db.client.table("biomarkers").select("id", count="exact")\
-                .eq("profile_id", user_id)\
-                .gte("created_at", since_timestamp.isoformat())\
-                .execute()
+            biomarkers_result = await db.execute_query(
+                db.client.table("biomarkers").select("id", count="exact")
+                .eq("profile_id", user_id)
+                .gte("created_at", since_timestamp.isoformat())
+            )
             biomarkers_count = biomarkers_result.count if hasattr(biomarkers_result, 'count') else len(biomarkers_result.data if biomarkers_result.data else [])
             
             total_count = scores_count + biomarkers_count
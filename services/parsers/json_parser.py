@@ -4,7 +4,7 @@ Parses pre-structured JSON with time_blocks and plan_items arrays
 """
 import json
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from datetime import datetime
 
 from services.parsers.base_parser import BasePlanParser
@@ -79,63 +79,14 @@ class JsonPlanParser(BasePlanParser):
             task_counter = 1
 
             for i, block_data in enumerate(data.get('time_blocks', []), 1):
-                block_id = f"{analysis_id}_block_{i}"
-
-                # Build time_range from start_time and end_time
-                start_time = block_data.get('start_time', '')
-                end_time = block_data.get('end_time', '')
-                time_range = f"{start_time} - {end_time}" if start_time and end_time else block_data.get('time_range', '')
-
-                # Build title from block_name and time_range
-                block_name = block_data.get('block_name', block_data.get('title', 'Block'))
-                title = f"{block_name} ({time_range}): {block_data.get('purpose', '')}"
-
-                time_block = TimeBlockContext(
-                    block_id=block_id,
-                    title=title,
-                    time_range=time_range,
-                    purpose=block_data.get('purpose', ''),
-                    why_it_matters=block_data.get('why_it_matters'),
-                    connection_to_insights=block_data.get('connection_to_insights'),
-                    health_data_integration=block_data.get('health_data_integration'),
-                    block_order=i,
-                    parent_routine_id=analysis_id,
-                    archetype=archetype
+                time_block, block_tasks = self.parse_time_block(
+                    block_data, i, analysis_id, archetype, first_task_number=task_counter
                 )
                 time_blocks.append(time_block)
 
-                # NEW FORMAT: Parse nested tasks from this block
-                nested_tasks = block_data.get('tasks', [])
-                for task_data in nested_tasks:
-                    task_id = f"{analysis_id}_task_{task_counter}"
-                    task_counter += 1
-
-                    # Parse times - convert 12-hour format to 24-hour first
-                    start_time_str = task_data.get('start_time', '')
-                    end_time_str = task_data.get('end_time', '')
-                    scheduled_time = self._parse_time_string(self._convert_12h_to_24h(start_time_str))
-                    scheduled_end_time = self._parse_time_string(self._convert_12h_to_24h(end_time_str))
-
-                    # Calculate duration if not provided
-                    duration = task_data.get('estimated_duration_minutes')
-                    if not duration and scheduled_time and scheduled_end_time:
-                        duration = (datetime.combine(datetime.today(), scheduled_end_time) -
-                                   datetime.combine(datetime.today(), scheduled_time)).seconds // 60
-
-                    task = ExtractedTask(
-                        task_id=task_id,
-                        title=task_data.get('title', 'Task'),
-                        description=task_data.get('description', ''),
-                        time_block_id=block_id,  # Already linked to this block
-                        scheduled_time=scheduled_time,
-                        scheduled_end_time=scheduled_end_time,
-                        estimated_duration_minutes=duration,
-                        task_type=task_data.get('task_type', 'general'),
-                        priority_level=task_data.get('priority', task_data.get('priority_level', 'medium')),
-                        task_order_in_block=len(all_tasks) + 1,
-                        parent_routine_id=analysis_id
-                    )
-                    all_tasks.append(task)
+                # NEW FORMAT: Nested tasks are parsed with their block
+                all_tasks.extend(block_tasks)
+                task_counter += len(block_tasks)
 
             # OLD FORMAT: Parse plan_items as a separate array (backward compatibility)
             if 'plan_items' in data:
@@ -180,3 +131,67 @@ class JsonPlanParser(BasePlanParser):
         except Exception as e:
             logger.error(f"❌ JSON parser failed: {e}", exc_info=True)
             return {'time_blocks': [], 'tasks': []}
+
+    def parse_time_block(self, block_data: Dict[str, Any], block_order: int, analysis_id: str,
+                         archetype: str, first_task_number: int = 1) -> Tuple[TimeBlockContext, List[ExtractedTask]]:
+        """
+        Build one time block and its nested tasks
+
+        Shared by parse() and the incremental streaming parser so a block
+        emitted mid-stream is identical to the one extracted from the full plan.
+        """
+        block_id = f"{analysis_id}_block_{block_order}"
+
+        # Build time_range from start_time and end_time
+        start_time = block_data.get('start_time', '')
+        end_time = block_data.get('end_time', '')
+        time_range = f"{start_time} - {end_time}" if start_time and end_time else block_data.get('time_range', '')
+
+        # Build title from block_name and time_range
+        block_name = block_data.get('block_name', block_data.get('title', 'Block'))
+        title = f"{block_name} ({time_range}): {block_data.get('purpose', '')}"
+
+        time_block = TimeBlockContext(
+            block_id=block_id,
+            title=title,
+            time_range=time_range,
+            purpose=block_data.get('purpose', ''),
+            why_it_matters=block_data.get('why_it_matters'),
+            connection_to_insights=block_data.get('connection_to_insights'),
+            health_data_integration=block_data.get('health_data_integration'),
+            block_order=block_order,
+            parent_routine_id=analysis_id,
+            archetype=archetype
+        )
+
+        tasks = []
+        for task_number, task_data in enumerate(block_data.get('tasks', []), first_task_number):
+            task_id = f"{analysis_id}_task_{task_number}"
+
+            # Parse times - convert 12-hour format to 24-hour first
+            start_time_str = task_data.get('start_time', '')
+            end_time_str = task_data.get('end_time', '')
+            scheduled_time = self._parse_time_string(self._convert_12h_to_24h(start_time_str))
+            scheduled_end_time = self._parse_time_string(self._convert_12h_to_24h(end_time_str))
+
+            # Calculate duration if not provided
+            duration = task_data.get('estimated_duration_minutes')
+            if not duration and scheduled_time and scheduled_end_time:
+                duration = (datetime.combine(datetime.today(), scheduled_end_time) -
+                           datetime.combine(datetime.today(), scheduled_time)).seconds // 60
+
+            tasks.append(ExtractedTask(
+                task_id=task_id,
+                title=task_data.get('title', 'Task'),
+                description=task_data.get('description', ''),
+                time_block_id=block_id,  # Already linked to this block
+                scheduled_time=scheduled_time,
+                scheduled_end_time=scheduled_end_time,
+                estimated_duration_minutes=duration,
+                task_type=task_data.get('task_type', 'general'),
+                priority_level=task_data.get('priority', task_data.get('priority_level', 'medium')),
+                task_order_in_block=task_number,
+                parent_routine_id=analysis_id
+            ))
+
+        return time_block, tasks
@@ -30,6 +30,9 @@ from services.plan_extraction_service import TimeBlockContext, ExtractedTask
 
 logger = logging.getLogger(__name__)
 
+# Time block header: **6:00 AM - 9:45 AM: Maintenance Zone**
+BLOCK_HEADER_PATTERN = r'\*\*(\d{1,2}:\d{2}\s*(?:AM|PM)?)\s*-\s*(\d{1,2}:\d{2}\s*(?:AM|PM)?)\s*:\s*([^*]+)\*\*'
+
 
 class MarkdownPlanParser(BasePlanParser):
     """Parser for markdown-formatted plans"""
@@ -92,7 +95,7 @@ class MarkdownPlanParser(BasePlanParser):
         time_blocks = []
 
         # Pattern: **6:00 AM - 9:45 AM: Maintenance Zone**
-        block_pattern = r'\*\*(\d{1,2}:\d{2}\s*(?:AM|PM)?)\s*-\s*(\d{1,2}:\d{2}\s*(?:AM|PM)?)\s*:\s*([^*]+)\*\*'
+        block_pattern = BLOCK_HEADER_PATTERN
 
         matches = re.finditer(block_pattern, content, re.MULTILINE)
 
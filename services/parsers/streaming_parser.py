@@ -0,0 +1,204 @@
+"""
+Incremental Plan Parsers - For streaming routine generation
+
+Consume the model output chunk by chunk and emit each time block (with its
+tasks) as soon as the block is closed in the text, instead of waiting for the
+full completion:
+- IncrementalJsonPlanParser: a block is closed when its object in the
+  "time_blocks" array closes
+- IncrementalMarkdownPlanParser: a block is closed when the next block header
+  appears (the last block closes at finish())
+
+Blocks are built with the batch parsers' own logic, so a streamed block matches
+what PlanExtractionService later extracts from the stored plan.
+"""
+import json
+import logging
+import re
+from dataclasses import asdict
+from datetime import time
+from typing import Dict, Any, List, Optional
+
+from services.parsers.json_parser import JsonPlanParser
+from services.parsers.markdown_parser import MarkdownPlanParser, BLOCK_HEADER_PATTERN
+from services.plan_extraction_service import TimeBlockContext, ExtractedTask
+
+logger = logging.getLogger(__name__)
+
+_TIME_BLOCKS_ARRAY = re.compile(r'"time_blocks"\s*:\s*\[')
+
+
+class IncrementalJsonPlanParser:
+    """Streams blocks out of a JSON plan: {"time_blocks": [{...}, {...}]}"""
+
+    def __init__(self, analysis_result: Dict[str, Any]):
+        self.analysis_id = analysis_result.get('id', 'unknown')
+        self.archetype = analysis_result.get('archetype', 'Unknown')
+        self._parser = JsonPlanParser()
+        self._buffer = ""
+        self._pos = 0                  # Next character to scan
+        self._in_array = False
+        self._array_done = False
+        self._depth = 0                # Nesting depth inside the current block object
+        self._in_string = False
+        self._escaped = False
+        self._element_start = None
+        self._block_count = 0
+        self._task_count = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Add a chunk of model output; return blocks closed by it"""
+        self._buffer += chunk
+        if self._array_done:
+            return []
+
+        if not self._in_array:
+            match = _TIME_BLOCKS_ARRAY.search(self._buffer)
+            if not match:
+                return []
+            self._in_array = True
+            self._pos = match.end()
+
+        completed = []
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                if self._depth == 0:
+                    self._element_start = i
+                self._depth += 1
+            elif ch in '}]':
+                if self._depth == 0:
+                    # End of the time_blocks array
+                    self._array_done = True
+                    self._pos = i + 1
+                    return completed
+                self._depth -= 1
+                if self._depth == 0:
+                    block = self._emit(buffer[self._element_start:i + 1])
+                    if block:
+                        completed.append(block)
+
+        self._pos = len(buffer)
+        return completed
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Every JSON block is emitted by feed(); nothing is pending at the end"""
+        return []
+
+    def _emit(self, element: str) -> Optional[Dict[str, Any]]:
+        try:
+            block_data = json.loads(element)
+        except json.JSONDecodeError as e:
+            logger.warning(f"⚠️ Skipping unparseable streamed block: {e}")
+            return None
+        if not isinstance(block_data, dict):
+            return None
+
+        self._block_count += 1
+        time_block, tasks = self._parser.parse_time_block(
+            block_data, self._block_count, self.analysis_id, self.archetype,
+            first_task_number=self._task_count + 1
+        )
+        self._task_count += len(tasks)
+        return {'time_block': time_block, 'tasks': tasks}
+
+
+class IncrementalMarkdownPlanParser:
+    """Streams blocks out of a markdown plan using the strict header format"""
+
+    def __init__(self, analysis_result: Dict[str, Any]):
+        self.analysis_id = analysis_result.get('id', 'unknown')
+        self.archetype = analysis_result.get('archetype', 'Unknown')
+        self._parser = MarkdownPlanParser()
+        self._buffer = ""
+        self._emitted_blocks = 0
+        self._emitted_tasks = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Add a chunk of model output; return blocks closed by it"""
+        self._buffer += chunk
+        headers = list(re.finditer(BLOCK_HEADER_PATTERN, self._buffer, re.MULTILINE))
+        # The last header's block is still open until the next header arrives
+        closed = len(headers) - 1
+        if closed <= self._emitted_blocks:
+            return []
+        return self._emit_upto(headers[closed].start(), closed)
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Flush the final block once the stream has ended"""
+        headers = re.findall(BLOCK_HEADER_PATTERN, self._buffer, re.MULTILINE)
+        if len(headers) <= self._emitted_blocks:
+            return []
+        return self._emit_upto(len(self._buffer), len(headers))
+
+    def _emit_upto(self, end: int, block_total: int) -> List[Dict[str, Any]]:
+        content = self._buffer[:end]
+        time_blocks = self._parser._extract_time_blocks(content, self.analysis_id, self.archetype)
+        tasks = self._parser._extract_tasks(content, self.analysis_id, time_blocks)
+
+        new_tasks = tasks[self._emitted_tasks:]
+        completed = []
+        for block in time_blocks[self._emitted_blocks:block_total]:
+            completed.append({
+                'time_block': block,
+                'tasks': [task for task in new_tasks if task.time_block_id == block.block_id]
+            })
+
+        # Tasks matched (by time) to an earlier block still go out with this batch
+        assigned = {id(task) for event in completed for task in event['tasks']}
+        leftovers = [task for task in new_tasks if id(task) not in assigned]
+        if leftovers and completed:
+            completed[-1]['tasks'].extend(leftovers)
+
+        self._emitted_blocks = block_total
+        self._emitted_tasks = len(tasks)
+        return completed
+
+
+class IncrementalPlanParser:
+    """Picks the JSON or markdown incremental parser from the first output characters"""
+
+    def __init__(self, analysis_result: Dict[str, Any]):
+        self.analysis_result = analysis_result
+        self._delegate = None
+        self._pending = ""
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        if self._delegate is None:
+            self._pending += chunk
+            stripped = self._pending.lstrip()
+            if not stripped:
+                return []
+            parser_class = IncrementalJsonPlanParser if stripped[0] in '{[' else IncrementalMarkdownPlanParser
+            self._delegate = parser_class(self.analysis_result)
+            chunk, self._pending = self._pending, ""
+        return self._delegate.feed(chunk)
+
+    def finish(self) -> List[Dict[str, Any]]:
+        return self._delegate.finish() if self._delegate else []
+
+
+def serialize_block_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a {'time_block', 'tasks'} event into JSON-safe dicts"""
+    def to_dict(item) -> Dict[str, Any]:
+        data = asdict(item)
+        for key, value in data.items():
+            if isinstance(value, time):
+                data[key] = value.strftime('%H:%M')
+        return data
+
+    block: TimeBlockContext = event['time_block']
+    tasks: List[ExtractedTask] = event['tasks']
+    return {'time_block': to_dict(block), 'tasks': [to_dict(task) for task in tasks]}
@@ -5,6 +5,7 @@ This service extracts individual trackable tasks from plans stored in
 holistic_analysis_results and populates the plan_items table for check-in tracking.
 """
 
+import copy
 import json
 import re
 import asyncio
@@ -13,13 +14,15 @@ from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, time
 from dataclasses import dataclass, asdict
 
-from supabase import create_client, Client
+from supabase import Client
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 from shared_libs.exceptions.holisticos_exceptions import HolisticOSException
+from shared_libs.supabase_client.async_executor import execute_async, get_shared_supabase_client
+from shared_libs.caching.lru_cache import LRUCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -36,6 +39,25 @@ logger.info(f"🔧 Plan Extraction Method: {EXTRACTION_METHOD} (from env var: {o
 ENVIRONMENT = os.getenv('ENVIRONMENT', 'development')
 PRODUCTION_MODE = ENVIRONMENT == 'production'
 
+# Per-user "current plan" cache for get_current_plan_items_for_user. Storing
+# plan items or time blocks invalidates it in this process; the short TTL
+# bounds staleness across workers. 0 disables it.
+CURRENT_PLAN_CACHE_TTL = int(os.getenv('CURRENT_PLAN_CACHE_TTL', '30'))
+_current_plan_cache = LRUCache(max_size=1000, ttl_seconds=CURRENT_PLAN_CACHE_TTL)
+# Tokens of the uncached lookups in flight per user. Invalidation drops them so
+# a lookup that raced a store does not cache its stale result; a user's entry
+# only exists while a lookup runs.
+_current_plan_lookups: Dict[str, set] = {}
+
+# Analyses checked per round when the get_latest_complete_plan RPC is missing
+COMPLETE_PLAN_CANDIDATE_BATCH = 25
+
+
+def invalidate_current_plan_cache(profile_id: str):
+    """Drop the cached current plan of a user (call after writing plan_items/time_blocks)"""
+    _current_plan_lookups.pop(profile_id, None)
+    _current_plan_cache.delete(profile_id)
+
 @dataclass
 class TimeBlockContext:
     """Represents a time block with rich contextual metadata"""
@@ -79,6 +101,9 @@ class ExtractedPlan:
 
 class PlanExtractionService:
     """Service to extract trackable tasks from existing holistic_analysis_results"""
+
+    # Cleared when the get_latest_complete_plan RPC turns out not to exist
+    _latest_plan_rpc_available = True
     
     def __init__(self):
         """Initialize the plan extraction service"""
@@ -93,7 +118,7 @@ class PlanExtractionService:
         if not supabase_url or not supabase_key:
             raise HolisticOSException("Missing Supabase credentials. Please check SUPABASE_URL and SUPABASE_SERVICE_KEY/SUPABASE_KEY environment variables.")
         
-        self.supabase = create_client(supabase_url, supabase_key)
+        self.supabase = get_shared_supabase_client(supabase_url, supabase_key)
         
     async def extract_and_store_plan_items(self, analysis_result_id: str, profile_id: str, override_plan_date: str = None) -> List[Dict[str, Any]]:
         """
@@ -202,11 +227,12 @@ class PlanExtractionService:
     async def _get_analysis_result(self, analysis_result_id: str) -> Optional[Dict[str, Any]]:
         """Get analysis result from holistic_analysis_results table"""
         try:
-            result = self.supabase.table("holistic_analysis_results")\
-                .select("*")\
-                .eq("id", analysis_result_id)\
-                .single()\
-                .execute()
+            result = await execute_async(
+                self.supabase.table("holistic_analysis_results")
+                .select("*")
+                .eq("id", analysis_result_id)
+                .single()
+            )
             
             return result.data if result.data else None
             
@@ -565,10 +591,11 @@ class PlanExtractionService:
                 plan_date = override_plan_date
             else:
                 # Get the analysis_date from holistic_analysis_results
-                analysis_result = self.supabase.table("holistic_analysis_results")\
-                    .select("analysis_date")\
-                    .eq("id", analysis_result_id)\
-                    .execute()
+                analysis_result = await execute_async(
+                    self.supabase.table("holistic_analysis_results")
+                    .select("analysis_date")
+                    .eq("id", analysis_result_id)
+                )
                 
                 if not analysis_result.data:
                     raise HolisticOSException(f"Analysis result not found: {analysis_result_id}")
@@ -598,9 +625,11 @@ class PlanExtractionService:
                 insert_data.append(item_data)
             
             # Insert into database (use upsert to handle duplicates)
-            result = self.supabase.table("plan_items")\
-                .upsert(insert_data, on_conflict="analysis_result_id,item_id")\
-                .execute()
+            result = await execute_async(
+                self.supabase.table("plan_items")
+                .upsert(insert_data, on_conflict="analysis_result_id,item_id")
+            )
+            invalidate_current_plan_cache(profile_id)
             
             return result.data if result.data else []
             
@@ -608,7 +637,7 @@ class PlanExtractionService:
             logger.error(f"Error storing plan items: {str(e)}")
             raise HolisticOSException(f"Failed to store plan items: {str(e)}")
     
-    def get_plan_items_for_analysis(self, analysis_result_id: str, trackable_only: bool = True) -> List[Dict[str, Any]]:
+    async def get_plan_items_for_analysis(self, analysis_result_id: str, trackable_only: bool = True) -> List[Dict[str, Any]]:
         """Get all plan items for a specific analysis result with time block names"""
         try:
             # Get plan items
@@ -621,16 +650,18 @@ class PlanExtractionService:
             if trackable_only:
                 query = query.eq("is_trackable", True)
 
-            result = query.execute()
+            # Plan items and their time blocks in one concurrent round trip
+            result, time_blocks_result = await asyncio.gather(
+                execute_async(query),
+                execute_async(
+                    self.supabase.table("time_blocks")
+                    .select("id, block_title, time_range, purpose, block_order")
+                    .eq("analysis_result_id", analysis_result_id)
+                )
+            )
             plan_items = result.data if result.data else []
 
             if plan_items:
-                # Get time blocks for this analysis_result_id
-                time_blocks_result = self.supabase.table("time_blocks")\
-                    .select("id, block_title, time_range, purpose, block_order")\
-                    .eq("analysis_result_id", analysis_result_id)\
-                    .execute()
-
                 time_blocks = time_blocks_result.data if time_blocks_result.data else []
 
                 # Create mapping from time_block_id (UUID) to time block data
@@ -687,20 +718,22 @@ class PlanExtractionService:
             # Step 1: If specific analysis_result_id provided, use that directly
             if analysis_result_id:
                 logger.info(f"Using specific analysis_result_id: {analysis_result_id}")
-                specific_analysis = self.supabase.table("holistic_analysis_results")\
-                    .select("id, archetype, analysis_date, created_at, user_id")\
-                    .eq("id", analysis_result_id)\
-                    .eq("user_id", profile_id)\
-                    .single()\
-                    .execute()
+                specific_analysis = await execute_async(
+                    self.supabase.table("holistic_analysis_results")
+                    .select("id, archetype, analysis_date, created_at, user_id")
+                    .eq("id", analysis_result_id)
+                    .eq("user_id", profile_id)
+                    .single()
+                )
                 
                 if specific_analysis.data:
                     # Verify this analysis has plan_items (no need to check time_blocks for specific requests)
-                    plan_items_check = self.supabase.table("plan_items")\
-                        .select("id")\
-                        .eq("analysis_result_id", analysis_result_id)\
-                        .limit(1)\
-                        .execute()
+                    plan_items_check = await execute_async(
+                        self.supabase.table("plan_items")
+                        .select("id")
+                        .eq("analysis_result_id", analysis_result_id)
+                        .limit(1)
+                    )
                     
                     if plan_items_check.data:
                         complete_analysis = specific_analysis.data
@@ -714,85 +747,36 @@ class PlanExtractionService:
             
             # Step 2: If no specific analysis_result_id, find most recent COMPLETE analysis
             if not complete_analysis:
-                logger.info("No specific analysis_result_id provided, finding most recent complete analysis")
-                analyses_with_blocks = self.supabase.table("holistic_analysis_results")\
-                    .select("id, archetype, analysis_date, created_at, user_id")\
-                    .eq("user_id", profile_id)\
-                    .in_("analysis_type", ["routine_plan", "nutrition_plan"])\
-                    .order("created_at", desc=True)\
-                    .execute()
-                
-                if not analyses_with_blocks.data:
-                    logger.warning(f"No analyses found for user {profile_id}")
-                    return {"routine_plan": None, "nutrition_plan": None, "items": [], "date": target_date_str}
-                
-                # Find the most recent analysis that has both time_blocks AND plan_items
-                for analysis in analyses_with_blocks.data:
-                    # Check if this analysis has time_blocks
-                    time_blocks_check = self.supabase.table("time_blocks")\
-                        .select("id")\
-                        .eq("analysis_result_id", analysis["id"])\
-                        .limit(1)\
-                        .execute()
-                    
-                    # Check if this analysis has plan_items
-                    plan_items_check = self.supabase.table("plan_items")\
-                        .select("id")\
-                        .eq("analysis_result_id", analysis["id"])\
-                        .limit(1)\
-                        .execute()
-                    
-                    if time_blocks_check.data and plan_items_check.data:
-                        complete_analysis = analysis
-                        logger.info(f"Found complete analysis: {analysis['id']} ({analysis['archetype']}, {analysis['analysis_date']})")
-                        break
-                
-                if not complete_analysis:
-                    logger.warning(f"No complete analyses found for user {profile_id}")
-                    return {"routine_plan": None, "nutrition_plan": None, "items": [], "date": target_date_str}
-            
-            # Step 2: Get plan items using our new implementation
-            plan_items = self.get_plan_items_for_analysis(complete_analysis["id"], trackable_only=True)
+                cached = _current_plan_cache.get(profile_id) if CURRENT_PLAN_CACHE_TTL > 0 else None
+                if cached is not None:
+                    logger.info(f"Current plan cache hit for user {profile_id}")
+                    return {**copy.deepcopy(cached), "date": target_date_str}
 
-            logger.info(f"DEBUG: Retrieved {len(plan_items)} items for analysis {complete_analysis['id']}")
-            if plan_items:
-                logger.info(f"DEBUG: First item time_block: {plan_items[0].get('time_block')}")
-                logger.info(f"DEBUG: First item time_blocks: {plan_items[0].get('time_blocks')}")
-
-            # If no items for target date, try again with our new implementation (should not happen with current logic)
-            if not plan_items:
-                logger.info(f"No items found - trying fallback logic")
-                plan_items = self.get_plan_items_for_analysis(complete_analysis["id"], trackable_only=False)
-            
-            # Step 3: Organize response
-            all_items = []
-            plan_info = {
-                "routine_plan": {
-                    "analysis_id": complete_analysis["id"],
-                    "analysis_result_id": complete_analysis["id"],  # Add explicit analysis_result_id field
-                    "archetype": complete_analysis.get("archetype"),
-                    "created_at": complete_analysis["created_at"],
-                    "analysis_date": complete_analysis["analysis_date"]
-                },
-                "nutrition_plan": None
-            }
-            
-            for item in plan_items:
-                # Add plan context to item
-                item["plan_type"] = "routine_plan"
-                item["analysis_info"] = plan_info["routine_plan"]
-                all_items.append(item)
-            
-            logger.info(f"Returning {len(all_items)} plan items from analysis {complete_analysis['id']}")
-            
-            return {
-                "routine_plan": plan_info["routine_plan"],
-                "nutrition_plan": plan_info["nutrition_plan"],
-                "items": all_items,
-                "date": target_date_str,
-                "analysis_used": complete_analysis["id"],
-                "archetype": complete_analysis.get("archetype")
-            }
+                # A store during this lookup must not be overwritten by the stale result
+                token = object()
+                _current_plan_lookups.setdefault(profile_id, set()).add(token)
+                try:
+                    complete_analysis = await self._find_latest_complete_analysis(profile_id)
+
+                    if not complete_analysis:
+                        logger.warning(f"No complete analyses found for user {profile_id}")
+                        plan_data = {"routine_plan": None, "nutrition_plan": None, "items": []}
+                    else:
+                        logger.info(f"Found complete analysis: {complete_analysis['id']} ({complete_analysis['archetype']}, {complete_analysis['analysis_date']})")
+                        plan_data = await self._load_plan_data(complete_analysis)
+
+                    if CURRENT_PLAN_CACHE_TTL > 0 and token in _current_plan_lookups.get(profile_id, ()):
+                        _current_plan_cache.set(profile_id, copy.deepcopy(plan_data))
+                    return {**plan_data, "date": target_date_str}
+                finally:
+                    lookups = _current_plan_lookups.get(profile_id)
+                    if lookups is not None:
+                        lookups.discard(token)
+                        if not lookups:
+                            del _current_plan_lookups[profile_id]
+
+            plan_data = await self._load_plan_data(complete_analysis)
+            return {**plan_data, "date": target_date_str}
             
         except Exception as e:
             logger.error(f"Error fetching current plan items: {str(e)}")
@@ -800,6 +784,99 @@ class PlanExtractionService:
             fallback_date = date_str if date_str else date.today().isoformat()
             return {"routine_plan": None, "nutrition_plan": None, "items": [], "date": fallback_date}
 
+    async def _find_latest_complete_analysis(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Most recent routine/nutrition analysis with both time_blocks and plan_items
+
+        One get_latest_complete_plan() RPC call
+        (migrations/create_get_latest_complete_plan_function.sql). Without the
+        function, candidates are checked in batches with two in_() queries.
+        """
+        if PlanExtractionService._latest_plan_rpc_available:
+            try:
+                result = await execute_async(
+                    self.supabase.rpc("get_latest_complete_plan", {"p_profile_id": profile_id})
+                )
+                return result.data[0] if result.data else None
+            except Exception as e:
+                if "get_latest_complete_plan" in str(e) or "PGRST202" in str(e):
+                    PlanExtractionService._latest_plan_rpc_available = False
+                logger.warning(f"get_latest_complete_plan RPC failed ({e}) - using batched lookup")
+
+        offset = 0
+        while True:
+            candidates = await execute_async(
+                self.supabase.table("holistic_analysis_results")
+                .select("id, archetype, analysis_date, created_at, user_id")
+                .eq("user_id", profile_id)
+                .in_("analysis_type", ["routine_plan", "nutrition_plan"])
+                .order("created_at", desc=True)
+                .range(offset, offset + COMPLETE_PLAN_CANDIDATE_BATCH - 1)
+            )
+            analyses = candidates.data or []
+            if not analyses:
+                return None
+
+            ids = [analysis["id"] for analysis in analyses]
+            time_blocks, plan_items = await asyncio.gather(
+                execute_async(self.supabase.table("time_blocks").select("analysis_result_id").in_("analysis_result_id", ids)),
+                execute_async(self.supabase.table("plan_items").select("analysis_result_id").in_("analysis_result_id", ids))
+            )
+            with_blocks = {row["analysis_result_id"] for row in time_blocks.data or []}
+            with_items = {row["analysis_result_id"] for row in plan_items.data or []}
+
+            for analysis in analyses:
+                if analysis["id"] in with_blocks and analysis["id"] in with_items:
+                    return analysis
+
+            if len(analyses) < COMPLETE_PLAN_CANDIDATE_BATCH:
+                return None
+            offset += COMPLETE_PLAN_CANDIDATE_BATCH
+
+    async def _load_plan_data(self, complete_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Plan items of an analysis, organized for get_current_plan_items_for_user"""
+        # Step 2: Get plan items using our new implementation
+        plan_items = await self.get_plan_items_for_analysis(complete_analysis["id"], trackable_only=True)
+
+        logger.info(f"DEBUG: Retrieved {len(plan_items)} items for analysis {complete_analysis['id']}")
+        if plan_items:
+            logger.info(f"DEBUG: First item time_block: {plan_items[0].get('time_block')}")
+            logger.info(f"DEBUG: First item time_blocks: {plan_items[0].get('time_blocks')}")
+
+        # If no items for target date, try again with our new implementation (should not happen with current logic)
+        if not plan_items:
+            logger.info(f"No items found - trying fallback logic")
+            plan_items = await self.get_plan_items_for_analysis(complete_analysis["id"], trackable_only=False)
+        
+        # Step 3: Organize response
+        all_items = []
+        plan_info = {
+            "routine_plan": {
+                "analysis_id": complete_analysis["id"],
+                "analysis_result_id": complete_analysis["id"],  # Add explicit analysis_result_id field
+                "archetype": complete_analysis.get("archetype"),
+                "created_at": complete_analysis["created_at"],
+                "analysis_date": complete_analysis["analysis_date"]
+            },
+            "nutrition_plan": None
+        }
+        
+        for item in plan_items:
+            # Add plan context to item
+            item["plan_type"] = "routine_plan"
+            item["analysis_info"] = plan_info["routine_plan"]
+            all_items.append(item)
+        
+        logger.info(f"Returning {len(all_items)} plan items from analysis {complete_analysis['id']}")
+        
+        return {
+            "routine_plan": plan_info["routine_plan"],
+            "nutrition_plan": plan_info["nutrition_plan"],
+            "items": all_items,
+            "analysis_used": complete_analysis["id"],
+            "archetype": complete_analysis.get("archetype")
+        }
+
     def extract_plan_with_time_blocks(self, content: str, analysis_result: Dict[str, Any]) -> ExtractedPlan:
         """
         Time-block-centric extraction method for hybrid approach
@@ -1524,9 +1601,11 @@ class PlanExtractionService:
             logger.info(f"Inserting {len(time_block_data)} time blocks with titles: {[bd['block_title'][:50] + '...' for bd in time_block_data]}")
 
             # Insert time blocks
-            result = self.supabase.table("time_blocks")\
-                .upsert(time_block_data, on_conflict="analysis_result_id,block_title")\
-                .execute()
+            result = await execute_async(
+                self.supabase.table("time_blocks")
+                .upsert(time_block_data, on_conflict="analysis_result_id,block_title")
+            )
+            invalidate_current_plan_cache(profile_id)
             
             logger.info(f"Stored {len(result.data)} time blocks")
             return result.data if result.data else []
@@ -1546,10 +1625,11 @@ class PlanExtractionService:
                 plan_date = override_plan_date
             else:
                 # Get the analysis_date from holistic_analysis_results for plan_date
-                analysis_result = self.supabase.table("holistic_analysis_results")\
-                    .select("analysis_date")\
-                    .eq("id", analysis_result_id)\
-                    .execute()
+                analysis_result = await execute_async(
+                    self.supabase.table("holistic_analysis_results")
+                    .select("analysis_date")
+                    .eq("id", analysis_result_id)
+                )
                 
                 if not analysis_result.data:
                     raise HolisticOSException(f"Analysis result {analysis_result_id} not found")
@@ -1603,9 +1683,11 @@ class PlanExtractionService:
                 insert_data.append(item_data)
             
             # Insert into database (use upsert to handle duplicates)
-            result = self.supabase.table("plan_items")\
-                .upsert(insert_data, on_conflict="analysis_result_id,item_id")\
-                .execute()
+            result = await execute_async(
+                self.supabase.table("plan_items")
+                .upsert(insert_data, on_conflict="analysis_result_id,item_id")
+            )
+            invalidate_current_plan_cache(profile_id)
             
             return result.data if result.data else []
             
@@ -0,0 +1,91 @@
+"""
+Plan Streaming Service
+Streams routine plan generation to the client as Server-Sent Events: each time
+block is pushed as soon as it closes in the model output, so time-to-first-block
+is a fraction of the full completion latency.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Dict
+
+from services.parsers.streaming_parser import IncrementalPlanParser, serialize_block_event
+from shared_libs.llm.openai_registry import stream_chat_completion
+
+logger = logging.getLogger(__name__)
+
+_STREAM_END = object()
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class PlanEventStream:
+    """
+    Queue of plan events between the generation task and the SSE response
+
+    Events: `status` (stage changes), `time_block` (one per closed block with its
+    tasks), `complete` (final routine plan) and `error`.
+    """
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.blocks_sent = 0
+
+    async def emit(self, event: str, data: Dict[str, Any]):
+        """Queue an event for the client"""
+        if event == "time_block":
+            self.blocks_sent += 1
+        await self._queue.put((event, data))
+
+    async def close(self):
+        """Signal that no more events will be emitted"""
+        await self._queue.put(_STREAM_END)
+
+    async def serve(self, producer: Awaitable[None]) -> AsyncIterator[str]:
+        """
+        Run the producer and yield its events as SSE frames
+
+        The producer is not cancelled if the client disconnects: the plan is still
+        generated and stored, exactly like the non-streaming endpoint.
+        """
+        task = asyncio.ensure_future(producer)
+        while True:
+            item = await self._queue.get()
+            if item is _STREAM_END:
+                break
+            event, data = item
+            yield format_sse(event, data)
+        await task
+
+
+async def stream_plan_completion(plan_stream: PlanEventStream, analysis_result: Dict[str, Any],
+                                 model: str, **completion_kwargs) -> str:
+    """
+    Stream a routine plan completion, emitting time blocks as they close
+
+    Args:
+        plan_stream: Destination for `time_block` events
+        analysis_result: {'id', 'archetype'} used to build block/task ids
+        model: OpenAI model name
+        **completion_kwargs: Passed to stream_chat_completion (messages, cache, ...)
+
+    Returns:
+        The full completion text, for the same post-processing as the batch path
+    """
+    parser = IncrementalPlanParser(analysis_result)
+    parts = []
+
+    async for delta in stream_chat_completion(model, **completion_kwargs):
+        parts.append(delta)
+        for event in parser.feed(delta):
+            await plan_stream.emit("time_block", serialize_block_event(event))
+
+    for event in parser.finish():
+        await plan_stream.emit("time_block", serialize_block_event(event))
+
+    logger.debug(f"[PLAN_STREAM] Streamed {plan_stream.blocks_sent} blocks")
+    return "".join(parts)
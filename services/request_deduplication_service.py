@@ -7,10 +7,64 @@ ENHANCED: Includes coordination logic to prevent race conditions
 import asyncio
 import logging
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Optional, Tuple, Any
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key onto one in-flight execution
+
+    The first caller for a key starts the work as a task; every caller that
+    arrives while it is running awaits the same task and receives its result
+    or its exception. Callers are shielded from each other: a caller that is
+    cancelled (e.g. client disconnect) does not cancel the shared work. There
+    is no wait timeout, so slow work is never duplicated.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.executions = 0
+        self.shared_waits = 0
+
+    async def do(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `work` once per key across concurrent callers
+
+        Args:
+            key: Coalescing key
+            work: Zero-argument coroutine function producing the result
+
+        Returns:
+            The result of the single shared execution
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(work())
+            self._calls[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        else:
+            self.shared_waits += 1
+            logger.debug(f"[SINGLE_FLIGHT] Joining in-flight call for {key}")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception retrieved when every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self, key: str) -> bool:
+        """Check whether a call is currently running for key"""
+        return key in self._calls
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
 class RequestDeduplicationService:
     """
     Service to prevent duplicate requests from creating multiple analyses/plans
@@ -28,6 +82,7 @@ class RequestDeduplicationService:
         self.request_cache_ttl = 600  # 10 minutes
         self.max_cache_entries = 100  # Memory management
         self.last_cleanup = datetime.now(timezone.utc)
+        self.single_flight = SingleFlight()
         
     def is_duplicate_request(self, user_id: str, archetype: str, request_type: str) -> bool:
         """
@@ -166,6 +221,57 @@ class RequestDeduplicationService:
         # Also mark as complete for the original deduplication logic
         self.mark_request_complete(user_id, archetype, request_type)
     
+    async def run_single_flight(self, user_id: str, archetype: str, request_type: str,
+                                work: Callable[[], Awaitable[dict]],
+                                cacheable: Optional[Callable[[dict], bool]] = None,
+                                bypass_cache: bool = False) -> dict:
+        """
+        Run an analysis once for all concurrent (user, archetype, type) callers
+        
+        Concurrent callers share the one in-flight execution and get the same
+        result or exception. Results accepted by `cacheable` are kept in the
+        results cache so callers arriving shortly after also reuse them.
+        
+        Args:
+            user_id: User identifier
+            archetype: Archetype being used
+            request_type: Analysis type ('behavior_analysis', 'circadian_analysis', ...)
+            work: Zero-argument coroutine function that performs the analysis
+            cacheable: Predicate deciding whether a result may be cached (default: always)
+            bypass_cache: Skip the results cache (force refresh); joins only other forced runs
+            
+        Returns:
+            dict: Shared analysis result
+        """
+        key = self._generate_request_key(user_id, archetype, request_type)
+        
+        await self._cleanup_if_needed()
+        
+        if not bypass_cache and key in self.results_cache:
+            timestamp, result = self.results_cache[key]
+            age_seconds = (datetime.now(timezone.utc) - timestamp).total_seconds()
+            if age_seconds < self.request_cache_ttl:
+                logger.debug(f"[COORDINATION] Using cached {request_type} for {user_id[:8]}... ({age_seconds:.1f}s old)")
+                return result
+            del self.results_cache[key]
+        
+        # A forced caller must not get the result of a run that was not forced
+        flight_key = f"{key}:forced" if bypass_cache else key
+        if self.single_flight.in_flight(flight_key):
+            logger.info(f"[COORDINATION] Joining in-progress {request_type} for {user_id[:8]}... + {archetype}")
+        
+        async def _execute() -> dict:
+            self.active_requests[key] = datetime.now(timezone.utc)
+            try:
+                result = await work()
+                if cacheable is None or cacheable(result):
+                    self.results_cache[key] = (datetime.now(timezone.utc), result)
+                return result
+            finally:
+                self.mark_request_complete(user_id, archetype, request_type)
+        
+        return await self.single_flight.do(flight_key, _execute)
+    
     async def _cleanup_if_needed(self):
         """Perform memory cleanup based on usage and time"""
         now = datetime.now(timezone.utc)
@@ -217,7 +323,9 @@ class RequestDeduplicationService:
         """Get current coordination statistics"""
         return {
             'active_requests': len(self.active_requests),
-            'in_progress': len(self.in_progress),
+            'in_progress': len(self.in_progress) + len(self.single_flight),
+            'single_flight_executions': self.single_flight.executions,
+            'single_flight_shared_waits': self.single_flight.shared_waits,
             'cached_results': len(self.results_cache),
             'last_cleanup': self.last_cleanup.isoformat()
         }
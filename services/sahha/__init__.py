@@ -3,6 +3,7 @@ Sahha Integration Services
 Direct Sahha API client with incremental sync support
 """
 
+from .rate_controller import AdaptiveRateController, parse_retry_after
 from .sahha_client import SahhaClient, get_sahha_client
 
-__all__ = ['SahhaClient', 'get_sahha_client']
+__all__ = ['SahhaClient', 'get_sahha_client', 'AdaptiveRateController', 'parse_retry_after']
@@ -0,0 +1,130 @@
+"""
+Adaptive Rate Controller for Sahha API Requests
+A token bucket shared by every request the client makes, replacing the fixed
+sleep before each request:
+
+- Requests take a token; up to `burst` requests start immediately, after that
+  they are spaced at `rate` requests/second
+- A 429 halves the rate and pauses every caller until Retry-After has passed
+- Each success adds a little rate back, up to the configured maximum (AIMD)
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: Optional[str], max_seconds: float = 60.0) -> Optional[float]:
+    """
+    Parse a Retry-After header (delay in seconds or an HTTP date)
+
+    Returns:
+        Seconds to wait (capped at max_seconds), or None if absent/invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), max_seconds)
+
+
+class AdaptiveRateController:
+    """
+    Token bucket with additive-increase / multiplicative-decrease on 429s
+
+    All state changes happen between awaits, so one instance can be shared by
+    concurrent tasks without a lock.
+    """
+
+    def __init__(self, rate: float, burst: int = 4, min_rate: Optional[float] = None,
+                 increase: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or rate / 8
+        self.increase = increase or rate / 10
+        self.capacity = max(1, burst)
+
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+        self.requests = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """
+        Wait for a request slot
+
+        Returns:
+            Seconds spent waiting
+        """
+        started = time.monotonic()
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            wait = self._blocked_until - now
+            if wait <= 0:
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.requests += 1
+                    waited = now - started
+                    self.wait_seconds += waited
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        """Additive increase back towards the configured rate"""
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """
+        Multiplicative decrease after a 429
+
+        Args:
+            retry_after: Parsed Retry-After seconds; every caller waits at
+                least this long before the next request
+        """
+        now = time.monotonic()
+        self._refill(now)
+        self.throttled += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._tokens = min(self._tokens, 0.0)
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+        logger.warning(
+            f"[SAHHA_RATE] Throttled - rate now {self.rate:.2f} req/s"
+            + (f", pausing {retry_after:.1f}s" if retry_after else "")
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get rate controller statistics for monitoring"""
+        return {
+            "rate": round(self.rate, 3),
+            "max_rate": self.max_rate,
+            "burst": self.capacity,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "paused_for": round(max(0.0, self._blocked_until - time.monotonic()), 3)
+        }
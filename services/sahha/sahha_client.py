@@ -3,12 +3,17 @@ Sahha API Client with Incremental Sync Support
 MVP-style: Simple code, full features (watermark-based incremental fetch)
 """
 
-import aiohttp
 import asyncio
 import os
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Set
+
+import httpx
+
+from shared_libs.http.client_pool import get_http_client
+
+from .rate_controller import AdaptiveRateController, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
@@ -20,10 +25,15 @@ class SahhaClient:
     Features:
     - Token caching (23-hour expiry)
     - Incremental fetch with watermarks
-    - Rate limiting & retry logic
+    - Concurrent per-category / per-date-window biomarker requests
+    - Adaptive token-bucket rate limiting (honours 429 + Retry-After) & retry logic
+    - Pooled keep-alive connections (shared_libs.http)
     - Simple error handling
     """
 
+    # Biomarker categories fetched when none are requested
+    BIOMARKER_CATEGORIES = ["activity", "sleep", "vitals"]
+
     def __init__(self):
         # Load config from environment
         self.base_url = os.getenv("SAHHA_API_BASE_URL", "https://api.sahha.ai")
@@ -34,10 +44,21 @@ class SahhaClient:
         self._token = None
         self._token_expires = None
 
-        # Rate limiting config (MVP: simple delays)
+        # Rate limiting config: sustained rate defaults to one request per
+        # SAHHA_RATE_LIMIT_DELAY (the old fixed sleep), with a small burst
         self.request_delay = float(os.getenv("SAHHA_RATE_LIMIT_DELAY", "0.5"))
         self.max_retries = int(os.getenv("SAHHA_MAX_RETRIES", "3"))
         self.timeout = int(os.getenv("SAHHA_REQUEST_TIMEOUT", "30"))
+        self.rate_controller = AdaptiveRateController(
+            rate=float(os.getenv("SAHHA_RATE_LIMIT_RPS", str(1 / max(self.request_delay, 0.01)))),
+            burst=int(os.getenv("SAHHA_RATE_LIMIT_BURST", "4"))
+        )
+
+        # Concurrent biomarker requests (categories x date windows)
+        self.max_concurrency = int(os.getenv("SAHHA_MAX_CONCURRENCY", "4"))
+        self.window_days = int(os.getenv("SAHHA_FETCH_WINDOW_DAYS", "7"))
+        self._semaphore = None
+        self._semaphore_loop = None
 
     async def get_token(self) -> Optional[str]:
         """Get account token with 23-hour caching"""
@@ -49,36 +70,93 @@ class SahhaClient:
 
         # Fetch new token
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/api/v1/oauth/account/token",
-                    json={
-                        "clientId": self.client_id,
-                        "clientSecret": self.client_secret
-                    },
-                    timeout=aiohttp.ClientTimeout(total=self.timeout)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        self._token = data.get("accountToken")
-                        self._token_expires = now + timedelta(hours=23)
-                        logger.info("[SAHHA] Token refreshed successfully")
-                        return self._token
-                    else:
-                        error = await response.text()
-                        logger.error(f"[SAHHA] Token fetch failed: {response.status} {error}")
-                        return None
+            client = get_http_client(self.base_url, self.timeout)
+            response = await client.post(
+                f"{self.base_url}/api/v1/oauth/account/token",
+                json={
+                    "clientId": self.client_id,
+                    "clientSecret": self.client_secret
+                },
+                timeout=self.timeout
+            )
+            if response.status_code == 200:
+                data = response.json()
+                self._token = data.get("accountToken")
+                self._token_expires = now + timedelta(hours=23)
+                logger.info("[SAHHA] Token refreshed successfully")
+                return self._token
+            else:
+                logger.error(f"[SAHHA] Token fetch failed: {response.status_code} {response.text}")
+                return None
 
         except Exception as e:
             logger.error(f"[SAHHA] Token fetch error: {e}")
             return None
 
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Concurrency limit for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _get_json(self, url: str, headers: Dict[str, str], params: Dict[str, Any], label: str) -> Optional[Any]:
+        """
+        Rate-controlled GET with retry on 429
+
+        Returns:
+            Parsed JSON body, or None if the request failed
+        """
+        client = get_http_client(self.base_url, self.timeout)
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                async with self._get_semaphore():
+                    await self.rate_controller.acquire()
+                    response = await client.get(url, headers=headers, params=params, timeout=self.timeout)
+            except httpx.HTTPError as e:
+                # One failed category/window must not sink the others
+                logger.error(f"[SAHHA] {label} request error: {e}")
+                return None
+
+            if response.status_code == 200:
+                self.rate_controller.on_success()
+                return response.json()
+
+            if response.status_code == 429:
+                # Rate limited - slow down and wait (every request shares the pause)
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is None:
+                    retry_after = float(2 ** attempt)
+                self.rate_controller.on_throttle(retry_after)
+                logger.warning(f"[SAHHA] Rate limited on {label} (attempt {attempt}/{self.max_retries}), waiting {retry_after:.1f}s")
+                continue
+
+            logger.error(f"[SAHHA] {label} fetch failed: {response.status_code} {response.text}")
+            return None
+
+        logger.error(f"[SAHHA] {label} fetch gave up after {self.max_retries} rate-limited attempts")
+        return None
+
+    def _date_windows(self, start_date: datetime, end_date: datetime) -> List[tuple]:
+        """Split [start_date, end_date] into windows of window_days (fetched concurrently)"""
+        step = timedelta(days=max(1, self.window_days))
+        windows = []
+        window_start = start_date
+        while window_start < end_date:
+            window_end = min(window_start + step, end_date)
+            windows.append((window_start, window_end))
+            window_start = window_end
+        return windows or [(start_date, end_date)]
+
     async def fetch_biomarkers(
         self,
         external_id: str,
         since_timestamp: Optional[datetime] = None,
         days: int = 7,
-        categories: Optional[List[str]] = None
+        categories: Optional[List[str]] = None,
+        category_since: Optional[Dict[str, datetime]] = None,
+        failed_categories: Optional[Set[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         Fetch biomarkers with incremental sync support
@@ -88,15 +166,25 @@ class SahhaClient:
             since_timestamp: Watermark - fetch only data after this (incremental)
             days: If no watermark, fetch last N days (initial fetch)
             categories: List of categories to fetch (default: activity, sleep, vitals)
+            category_since: Per-category start overriding the range above
+                (sync watermarks - only the un-archived delta is fetched)
+            failed_categories: If given, receives every category with a window
+                that could not be fetched (its data is incomplete)
 
         Returns:
             List of biomarker dictionaries
         """
 
+        # Default categories
+        if not categories:
+            categories = self.BIOMARKER_CATEGORIES
+        failed = failed_categories if failed_categories is not None else set()
+
         try:
             token = await self.get_token()
             if not token:
                 logger.error(f"[SAHHA] No token available for {external_id[:8]}...")
+                failed.update(categories)
                 return []
 
             headers = {
@@ -116,48 +204,37 @@ class SahhaClient:
                 start_date = end_date - timedelta(days=days)
                 logger.info(f"[SAHHA] Initial biomarker fetch for {external_id[:8]}... ({days} days)")
 
-            # Default categories
-            if not categories:
-                categories = ["activity", "sleep", "vitals"]
+            category_since = category_since or {}
 
-            # Fetch biomarkers
-            all_biomarkers = []
-            for category in categories:
-                params = {
-                    "startDateTime": start_date.isoformat(),
-                    "endDateTime": end_date.isoformat(),
+            # Fetch every category x date window concurrently (bounded + rate controlled)
+            url = f"{self.base_url}/api/v1/profile/biomarker/{external_id}"
+            fetches = [
+                (category, {
+                    "startDateTime": window_start.isoformat(),
+                    "endDateTime": window_end.isoformat(),
                     "categories": [category]
-                }
-
-                # Rate limiting delay
-                await asyncio.sleep(self.request_delay)
-
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        f"{self.base_url}/api/v1/profile/biomarker/{external_id}",
-                        headers=headers,
-                        params=params,
-                        timeout=aiohttp.ClientTimeout(total=self.timeout)
-                    ) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            if data:
-                                all_biomarkers.extend(data)
-                                logger.debug(f"[SAHHA] Fetched {len(data)} {category} biomarkers")
-                        elif response.status == 429:
-                            # Rate limited - wait and skip
-                            retry_after = int(response.headers.get('Retry-After', 2))
-                            logger.warning(f"[SAHHA] Rate limited, waiting {retry_after}s")
-                            await asyncio.sleep(retry_after)
-                        else:
-                            error = await response.text()
-                            logger.error(f"[SAHHA] Biomarker fetch failed: {response.status} {error}")
+                })
+                for category in categories
+                for window_start, window_end in self._date_windows(category_since.get(category, start_date), end_date)
+            ]
+            results = await asyncio.gather(*(
+                self._get_json(url, headers, params, f"{category} biomarker") for category, params in fetches
+            ))
+
+            all_biomarkers = []
+            for (category, _), data in zip(fetches, results):
+                if data is None:
+                    failed.add(category)
+                elif data:
+                    all_biomarkers.extend(data)
+                    logger.debug(f"[SAHHA] Fetched {len(data)} {category} biomarkers")
 
             logger.info(f"[SAHHA] Fetched {len(all_biomarkers)} total biomarkers for {external_id[:8]}...")
             return all_biomarkers
 
         except Exception as e:
             logger.error(f"[SAHHA] Biomarker fetch error for {external_id}: {e}")
+            failed.update(categories)
             return []
 
     async def fetch_scores(
@@ -165,7 +242,8 @@ class SahhaClient:
         external_id: str,
         since_timestamp: Optional[datetime] = None,
         days: int = 7,
-        types: Optional[List[str]] = None
+        types: Optional[List[str]] = None,
+        failed_categories: Optional[Set[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         Fetch scores with incremental sync support
@@ -175,15 +253,19 @@ class SahhaClient:
             since_timestamp: Watermark - fetch only data after this
             days: If no watermark, fetch last N days
             types: Score types to fetch (default: sleep, activity, wellbeing)
+            failed_categories: If given, receives "scores" when the fetch failed
 
         Returns:
             List of score dictionaries
         """
 
+        failed = failed_categories if failed_categories is not None else set()
+
         try:
             token = await self.get_token()
             if not token:
                 logger.error(f"[SAHHA] No token available for {external_id[:8]}...")
+                failed.add("scores")
                 return []
 
             headers = {
@@ -212,39 +294,26 @@ class SahhaClient:
                 "version": 1.0
             }
 
-            # Rate limiting delay
-            await asyncio.sleep(self.request_delay)
-
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.base_url}/api/v1/profile/score/{external_id}",
-                    headers=headers,
-                    params=params,
-                    timeout=aiohttp.ClientTimeout(total=self.timeout)
-                ) as response:
-                    if response.status == 200:
-                        scores = await response.json()
-                        logger.info(f"[SAHHA] Fetched {len(scores)} scores for {external_id[:8]}...")
-                        return scores if scores else []
-                    elif response.status == 429:
-                        retry_after = int(response.headers.get('Retry-After', 2))
-                        logger.warning(f"[SAHHA] Rate limited, waiting {retry_after}s")
-                        await asyncio.sleep(retry_after)
-                        return []
-                    else:
-                        error = await response.text()
-                        logger.error(f"[SAHHA] Score fetch failed: {response.status} {error}")
-                        return []
+            scores = await self._get_json(
+                f"{self.base_url}/api/v1/profile/score/{external_id}", headers, params, "Score"
+            )
+            if scores is None:
+                failed.add("scores")
+                return []
+            logger.info(f"[SAHHA] Fetched {len(scores)} scores for {external_id[:8]}...")
+            return scores
 
         except Exception as e:
             logger.error(f"[SAHHA] Score fetch error for {external_id}: {e}")
+            failed.add("scores")
             return []
 
     async def fetch_health_data(
         self,
         external_id: str,
         since_timestamp: Optional[datetime] = None,
-        days: int = 7
+        days: int = 7,
+        category_since: Optional[Dict[str, datetime]] = None
     ) -> Dict[str, Any]:
         """
         Fetch complete health data (biomarkers + scores) with incremental sync
@@ -255,6 +324,8 @@ class SahhaClient:
             external_id: User's external ID
             since_timestamp: Watermark for incremental fetch (None = initial fetch)
             days: Days to fetch if no watermark (default: 7)
+            category_since: Per-category fetch start from the sync watermarks
+                (biomarker categories + "scores")
 
         Returns:
             {
@@ -262,15 +333,22 @@ class SahhaClient:
                 "scores": [...],
                 "fetched_at": "...",
                 "is_incremental": True/False,
-                "watermark": "..." or None
+                "watermark": "..." or None,
+                "incomplete_categories": [...]  # Categories with a failed fetch
             }
         """
 
         logger.info(f"[SAHHA] Fetching health data for {external_id[:8]}... (watermark: {since_timestamp})")
 
         # Fetch in parallel for speed
-        biomarkers_task = self.fetch_biomarkers(external_id, since_timestamp, days)
-        scores_task = self.fetch_scores(external_id, since_timestamp, days)
+        category_since = category_since or {}
+        failed_categories: Set[str] = set()
+        biomarkers_task = self.fetch_biomarkers(
+            external_id, since_timestamp, days, category_since=category_since, failed_categories=failed_categories
+        )
+        scores_task = self.fetch_scores(
+            external_id, category_since.get("scores", since_timestamp), days, failed_categories=failed_categories
+        )
 
         biomarkers, scores = await asyncio.gather(biomarkers_task, scores_task)
 
@@ -278,14 +356,17 @@ class SahhaClient:
             "biomarkers": biomarkers,
             "scores": scores,
             "fetched_at": datetime.utcnow().isoformat(),
-            "is_incremental": since_timestamp is not None,
+            "is_incremental": since_timestamp is not None or bool(category_since),
             "watermark": since_timestamp.isoformat() if since_timestamp else None,
-            "total_items": len(biomarkers) + len(scores)
+            "total_items": len(biomarkers) + len(scores),
+            "incomplete_categories": sorted(failed_categories)
         }
+        if failed_categories:
+            logger.warning(f"[SAHHA] Incomplete fetch for {external_id[:8]}...: {', '.join(sorted(failed_categories))}")
 
         logger.info(
             f"[SAHHA] Fetched {len(biomarkers)} biomarkers + {len(scores)} scores "
-            f"({'incremental' if since_timestamp else 'initial'})"
+            f"({'incremental' if result['is_incremental'] else 'initial'})"
         )
 
         return result
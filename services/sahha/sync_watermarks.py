@@ -0,0 +1,242 @@
+"""
+Sahha Sync Watermarks - per-user, per-category high-water marks
+MVP-style: one small table, advanced by ArchivalService after each archive
+
+A watermark is the newest archived timestamp for a user and category
+(biomarker categories by endDateTime, "scores" by scoreDateTime). With
+watermarks, an analysis only asks Sahha for the delta since the last archived
+record (minus a small overlap for periods Sahha may still revise) and rebuilds
+the rest of its window from the archived biomarkers/scores tables.
+
+Table: sahha_sync_watermarks (migrations/create_sahha_sync_watermarks_table.sql)
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from shared_libs.supabase_client.async_executor import execute_async, get_shared_supabase_client
+
+logger = logging.getLogger(__name__)
+
+SCORES_CATEGORY = "scores"
+
+# Archived rows loaded per table when rebuilding history
+MAX_ARCHIVED_ROWS = 5000
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parse an ISO timestamp (Z / offset / naive) to naive UTC"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def to_utc_iso(timestamp: datetime) -> str:
+    """Naive UTC datetime -> ISO string with an explicit offset (for timestamptz)"""
+    return timestamp.replace(tzinfo=timezone.utc).isoformat()
+
+
+def compute_watermarks(biomarkers: Iterable[Dict[str, Any]], scores: Iterable[Dict[str, Any]]) -> Dict[str, datetime]:
+    """Newest timestamp per biomarker category (endDateTime) and for scores (scoreDateTime)"""
+    marks: Dict[str, datetime] = {}
+
+    def advance(category: Optional[str], value: Any):
+        timestamp = parse_timestamp(value)
+        if category and timestamp and (category not in marks or timestamp > marks[category]):
+            marks[category] = timestamp
+
+    for bio in biomarkers:
+        advance(bio.get("category"), bio.get("endDateTime") or bio.get("startDateTime"))
+    for score in scores:
+        advance(SCORES_CATEGORY, score.get("scoreDateTime"))
+    return marks
+
+
+def biomarker_row_to_sahha(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Archived biomarkers row -> Sahha biomarker (inverse of ArchivalService._normalize_biomarker)"""
+    data = row.get("data") or {}
+    return {
+        "id": data.get("sahha_id") or row.get("id"),
+        "category": row.get("category"),
+        "type": row.get("type"),
+        "value": row.get("value"),
+        "unit": row.get("unit"),
+        "periodicity": data.get("periodicity"),
+        "aggregation": data.get("aggregation"),
+        "valueType": data.get("valueType"),
+        "startDateTime": row.get("start_date_time"),
+        "endDateTime": row.get("end_date_time"),
+        "createdAt": row.get("created_at")
+    }
+
+
+def score_row_to_sahha(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Archived scores row -> Sahha score (inverse of ArchivalService._normalize_score)"""
+    data = row.get("data") or {}
+    return {
+        "id": data.get("sahha_id") or row.get("id"),
+        "type": row.get("type"),
+        "score": row.get("score"),
+        "state": row.get("state"),
+        "scoreDateTime": row.get("score_date_time"),
+        "factors": data.get("factors", []),
+        "dataSources": data.get("dataSources", []),
+        "version": data.get("version"),
+        "createdAtUtc": data.get("createdAtUtc")
+    }
+
+
+def _merge(history: List[Dict[str, Any]], delta: List[Dict[str, Any]], key_fields: tuple) -> List[Dict[str, Any]]:
+    merged: Dict[tuple, Dict[str, Any]] = {}
+    for record in [*history, *delta]:  # Delta last: fresh Sahha values win
+        key = tuple(
+            parse_timestamp(record.get(field)) if field.endswith("DateTime") else record.get(field)
+            for field in key_fields
+        )
+        merged[key] = record
+    return list(merged.values())
+
+
+def merge_sahha_data(history: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge archived history with a freshly fetched delta
+
+    Records are matched on the archival conflict keys (timestamps compared
+    after parsing, so "Z" and "+00:00" forms match); the delta wins.
+    """
+    return {
+        **delta,
+        "biomarkers": _merge(
+            history.get("biomarkers", []), delta.get("biomarkers", []), ("type", "startDateTime", "endDateTime")
+        ),
+        "scores": _merge(history.get("scores", []), delta.get("scores", []), ("type", "scoreDateTime"))
+    }
+
+
+class SahhaWatermarkStore:
+    """Reads/advances sync watermarks and loads archived history"""
+
+    TABLE = "sahha_sync_watermarks"
+
+    def __init__(self):
+        self.supabase = None
+        self.overlap = timedelta(hours=float(os.getenv("SAHHA_SYNC_OVERLAP_HOURS", "24")))
+
+    def _get_supabase(self):
+        """Get Supabase client"""
+        if not self.supabase:
+            supabase_url = os.getenv('SUPABASE_URL')
+            supabase_key = os.getenv('SUPABASE_KEY') or os.getenv('SUPABASE_SERVICE_KEY', '')
+
+            if not supabase_url or not supabase_key:
+                raise Exception("Missing SUPABASE_URL or SUPABASE_KEY")
+
+            self.supabase = get_shared_supabase_client(supabase_url, supabase_key)
+        return self.supabase
+
+    async def get_watermarks(self, user_id: str, supabase=None) -> Dict[str, datetime]:
+        """Current watermark per category for a user (empty = never synced)"""
+        supabase = supabase or self._get_supabase()
+        result = await execute_async(
+            supabase.table(self.TABLE).select("category, watermark").eq("profile_id", user_id)
+        )
+        marks = {}
+        for row in result.data or []:
+            timestamp = parse_timestamp(row.get("watermark"))
+            if timestamp:
+                marks[row["category"]] = timestamp
+        return marks
+
+    async def advance(self, user_id: str, marks: Dict[str, datetime], supabase=None):
+        """
+        Move watermarks forward (never backwards)
+
+        A retried or coalesced archival job may carry older data than one that
+        already finished, so each mark only replaces an older one.
+        """
+        if not marks:
+            return
+        supabase = supabase or self._get_supabase()
+        current = await self.get_watermarks(user_id, supabase)
+
+        now = datetime.utcnow().isoformat()
+        rows = [
+            {"profile_id": user_id, "category": category, "watermark": to_utc_iso(timestamp), "updated_at": now}
+            for category, timestamp in marks.items()
+            if current.get(category) is None or timestamp > current[category]
+        ]
+        if rows:
+            await execute_async(supabase.table(self.TABLE).upsert(rows, on_conflict="profile_id,category"))
+            logger.debug(f"[SAHHA_SYNC] Advanced {len(rows)} watermarks for {user_id[:8]}...")
+
+    def plan_delta(
+        self,
+        marks: Dict[str, datetime],
+        context_start: datetime,
+        categories: Iterable[str]
+    ) -> Optional[Dict[str, datetime]]:
+        """
+        Start of the Sahha fetch per category (plus "scores")
+
+        A category without a watermark (e.g. a metric the user's device never
+        reports) is fetched from the context start, so it costs one small
+        fetch instead of turning every sync back into a full fetch.
+
+        Returns:
+            {category: since} - the later of the context start and the
+            watermark minus the overlap - or None when the user has never been
+            archived (a full fetch is needed)
+        """
+        if not marks:
+            return None
+        plan = {}
+        for category in [*categories, SCORES_CATEGORY]:
+            mark = marks.get(category)
+            plan[category] = context_start if mark is None else max(context_start, mark - self.overlap)
+        return plan
+
+    async def load_archived(self, user_id: str, since: datetime) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Archived biomarkers/scores from `since` onwards, in Sahha format (oldest first)
+
+        Past MAX_ARCHIVED_ROWS per table the oldest rows are the ones left out.
+        """
+        supabase = self._get_supabase()
+        since_iso = to_utc_iso(parse_timestamp(since))
+        biomarkers_result = await execute_async(
+            supabase.table("biomarkers").select("*").eq("profile_id", user_id)
+            .gte("end_date_time", since_iso).order("end_date_time", desc=True).limit(MAX_ARCHIVED_ROWS)
+        )
+        scores_result = await execute_async(
+            supabase.table("scores").select("*").eq("profile_id", user_id)
+            .gte("score_date_time", since_iso).order("score_date_time", desc=True).limit(MAX_ARCHIVED_ROWS)
+        )
+        return {
+            "biomarkers": [biomarker_row_to_sahha(row) for row in reversed(biomarkers_result.data or [])],
+            "scores": [score_row_to_sahha(row) for row in reversed(scores_result.data or [])]
+        }
+
+
+# Singleton instance
+_watermark_store = None
+
+
+def get_watermark_store() -> SahhaWatermarkStore:
+    """Get or create singleton watermark store"""
+    global _watermark_store
+
+    if _watermark_store is None:
+        _watermark_store = SahhaWatermarkStore()
+
+    return _watermark_store
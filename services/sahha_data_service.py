@@ -4,11 +4,13 @@ MVP-style: Simple wrapper, non-breaking integration
 """
 
 import logging
-from datetime import datetime
-from typing import Dict, Any, Optional
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
 import asyncio
 
 from services.sahha import get_sahha_client
+from services.sahha.sync_watermarks import get_watermark_store, merge_sahha_data, parse_timestamp
 from services.background import get_job_queue
 from shared_libs.data_models.health_models import UserHealthContext, create_health_context_from_raw_data
 
@@ -21,13 +23,17 @@ class SahhaDataService:
 
     Features:
     - Fetches directly from Sahha (with watermark for incremental)
+    - Per-category sync watermarks: only the un-archived delta comes from
+      Sahha, the rest of the window from archived biomarkers/scores
     - Converts to UserHealthContext format
-    - Submits background archival job
+    - Submits background archival job (delta only)
     - Fallback to Supabase on error
     """
 
     def __init__(self):
         self.sahha_client = get_sahha_client()
+        self.watermark_store = get_watermark_store()
+        self.incremental_sync = os.getenv("SAHHA_INCREMENTAL_SYNC", "true").lower() == "true"
 
     async def fetch_health_data_for_analysis(
         self,
@@ -54,27 +60,37 @@ class SahhaDataService:
         logger.info(f"[SAHHA_DATA] Fetching for {user_id[:8]}... ({archetype}, {analysis_type})")
 
         try:
+            # Only the delta since the archived watermarks comes from Sahha
+            category_since, archived = await self._plan_incremental_sync(user_id, watermark, days)
+
             # Fetch from Sahha (incremental if watermark exists)
             sahha_data = await self.sahha_client.fetch_health_data(
                 external_id=user_id,
                 since_timestamp=watermark,
-                days=days
+                days=days,
+                category_since=category_since
             )
+            health_data = merge_sahha_data(archived, sahha_data) if archived else sahha_data
 
             # Check if we got data
-            if not sahha_data.get("biomarkers") and not sahha_data.get("scores"):
+            if not health_data.get("biomarkers") and not health_data.get("scores"):
                 logger.warning(f"[SAHHA_DATA] No data returned from Sahha for {user_id[:8]}...")
                 # Return empty context (will trigger fallback in caller)
                 return self._create_empty_context(user_id, days)
 
             # Convert to UserHealthContext format
-            context = self._convert_to_health_context(user_id, sahha_data, days)
+            context = self._convert_to_health_context(user_id, health_data, days)
 
             logger.info(
                 f"[SAHHA_DATA] Fetched {len(sahha_data['biomarkers'])} biomarkers + "
                 f"{len(sahha_data['scores'])} scores"
+                + (f" (delta; {len(health_data['biomarkers'])} + {len(health_data['scores'])} with archived history)"
+                   if archived else "")
             )
 
+            if not sahha_data.get("biomarkers") and not sahha_data.get("scores"):
+                return context  # Nothing new to archive
+
             # Submit background archival job (fire-and-forget - truly non-blocking)
             asyncio.create_task(self._submit_archival_job(
                 user_id=user_id,
@@ -90,6 +106,45 @@ class SahhaDataService:
             # Return empty context (caller will fallback to Supabase)
             return self._create_empty_context(user_id, days)
 
+    async def _plan_incremental_sync(
+        self,
+        user_id: str,
+        watermark: Optional[datetime],
+        days: int
+    ) -> Tuple[Optional[Dict[str, datetime]], Optional[Dict[str, Any]]]:
+        """
+        Plan a delta fetch from the per-category sync watermarks
+
+        Returns:
+            (per-category fetch start, archived history in Sahha format), or
+            (None, None) for a full fetch (first sync, disabled or on error)
+        """
+        if not self.incremental_sync:
+            return None, None
+
+        try:
+            # Same window the caller asked for: since the analysis watermark, else last N days
+            context_start = parse_timestamp(watermark) if watermark else datetime.utcnow() - timedelta(days=days)
+
+            marks = await self.watermark_store.get_watermarks(user_id)
+            category_since = self.watermark_store.plan_delta(
+                marks, context_start, self.sahha_client.BIOMARKER_CATEGORIES
+            )
+            if category_since is None:
+                logger.debug(f"[SAHHA_DATA] No sync watermarks for {user_id[:8]}... - full fetch")
+                return None, None
+
+            # Archived records only matter where the delta starts after the window start
+            if all(since <= context_start for since in category_since.values()):
+                return category_since, None
+
+            archived = await self.watermark_store.load_archived(user_id, context_start)
+            return category_since, archived
+
+        except Exception as e:
+            logger.warning(f"[SAHHA_DATA] Incremental sync unavailable for {user_id[:8]}... ({e}) - full fetch")
+            return None, None
+
     def _convert_to_health_context(
         self,
         user_id: str,
@@ -10,13 +10,15 @@ import logging
 
 # Import existing infrastructure
 from shared_libs.supabase_client.adapter import SupabaseAsyncPGAdapter
+from shared_libs.supabase_client.async_executor import execute_async, get_shared_supabase_client
 
 # Import new components
 from .health_data_client import HealthDataClient
 from shared_libs.data_models.health_models import UserHealthContext, create_health_context_from_raw_data
 
-# Import memory-safe caching
+# Import memory-safe caching (in-process L1 + Redis L2 shared across workers)
 from shared_libs.caching.lru_cache import cache_manager
+from shared_libs.caching.tiered_cache import get_tiered_cache, get_tiered_cache_stats
 
 # Setup logging for easy troubleshooting
 logging.basicConfig(level=logging.INFO)
@@ -33,17 +35,23 @@ class UserDataService:
         self.db_adapter = None
         self.api_client = HealthDataClient()
         
-        # Replace unbounded cache with memory-safe LRU cache
-        self.user_context_cache = cache_manager.create_cache(
-            name="user_contexts",
-            max_size=50,      # Maximum 50 cached user contexts
-            ttl_seconds=1800  # 30 minutes TTL
+        # Two-tier caches shared by every instance in the worker and, through
+        # Redis, by every worker. Keys are scoped per user so archival can
+        # invalidate a user's entries (see invalidate_cache_scope).
+        self.user_context_cache = get_tiered_cache(
+            "user_contexts",
+            l1_max_size=50,      # Maximum 50 cached user contexts per worker
+            l1_ttl_seconds=60,
+            l1_max_bytes=8 * 1024 * 1024,
+            l2_ttl_seconds=1800  # 30 minutes TTL
         )
         
-        self.health_data_cache = cache_manager.create_cache(
-            name="health_data",
-            max_size=30,      # Maximum 30 cached health data sets
-            ttl_seconds=600   # 10 minutes TTL
+        self.health_data_cache = get_tiered_cache(
+            "health_data",
+            l1_max_size=30,      # Maximum 30 cached health data sets per worker
+            l1_ttl_seconds=60,
+            l1_max_bytes=32 * 1024 * 1024,
+            l2_ttl_seconds=600   # 10 minutes TTL
         )
         
         # Configuration
@@ -52,10 +60,12 @@ class UserDataService:
         self.use_api_first = True  # API-first approach like health-agent-main
         
         # Phase 4.0 MVP: Simple sync tracking - replace with bounded cache
-        self.sync_cache = cache_manager.create_cache(
-            name="sync_tracking",
-            max_size=100,     # Maximum 100 sync timestamps
-            ttl_seconds=3600  # 1 hour TTL
+        self.sync_cache = get_tiered_cache(
+            "sync_tracking",
+            l1_max_size=100,     # Maximum 100 sync timestamps per worker
+            l1_ttl_seconds=60,
+            l1_max_bytes=1024 * 1024,
+            l2_ttl_seconds=3600  # 1 hour TTL
         )
         
         logger.debug("[USER_DATA_SERVICE] Initialized with memory-safe caching")
@@ -278,186 +288,15 @@ class UserDataService:
 
         logger.debug(f"[USER_HEALTH_DATA] Starting fetch for user {user_id}, {days} days")
 
-        # Import MVP logger for enhanced system flow logging
-        from services.mvp_style_logger import mvp_logger
-
-        # Use memory-safe LRU cache with automatic TTL
-        cache_key = f"{user_id}_{days}days"
-        cached_data = self.health_data_cache.get(cache_key)
-        if cached_data:
-            logger.debug(f"[CACHE_HIT] Returning cached data for {user_id}")
-            return cached_data
-
-        start_date, end_date = self._get_date_range(days)
-        
         try:
-            # Try API first (health-agent-main pattern)
-            if self.use_api_first:
-                try:
-                    logger.debug(f"[API_FIRST] Attempting API fetch for {user_id}")
-                    api_tasks = [
-                        self.api_client.get_user_scores(user_id, start_date, end_date),
-                        self.api_client.get_user_biomarkers(user_id, start_date, end_date),
-                        self.api_client.get_user_archetypes(user_id)
-                    ]
-                    
-                    api_scores, api_biomarkers, api_archetypes = await asyncio.gather(*api_tasks)
-                    
-                    # If API returns good data, use it
-                    if api_scores or api_biomarkers:
-                        logger.debug(f"[API_SUCCESS] Using API data: {len(api_scores)} scores, {len(api_biomarkers)} biomarkers")
-                        result = create_health_context_from_raw_data(
-                            user_id=user_id,
-                            raw_scores=api_scores,
-                            raw_biomarkers=api_biomarkers,
-                            raw_archetypes=api_archetypes,
-                            days=days
-                        )
-                        
-                        # Cache and return
-                        self.health_data_cache.set(cache_key, result)
-                        # Check memory usage and cleanup if needed
-                        cache_manager.cleanup_if_needed()
-
-                        overall_duration = (datetime.now() - overall_start).total_seconds()
-                        logger.debug(f"[USER_HEALTH_DATA] API completed for {user_id} in {overall_duration:.2f}s")
-
-                        # Enhanced System Flow Logging: Log raw health data if analysis_number provided
-                        if analysis_number is not None:
-                            try:
-                                raw_health_data = {
-                                    "sahha_scores": api_scores,
-                                    "sahha_biomarkers": api_biomarkers,
-                                    "sahha_archetypes": api_archetypes,
-                                    "date_range": {
-                                        "start_date": start_date.isoformat(),
-                                        "end_date": end_date.isoformat(),
-                                        "days_requested": days
-                                    },
-                                    "data_source": "sahha_api_primary",
-                                    "fetch_duration_seconds": overall_duration,
-                                    "user_id": user_id,
-                                    "cache_hit": False,
-                                    "api_responses": {
-                                        "scores_count": len(api_scores),
-                                        "biomarkers_count": len(api_biomarkers),
-                                        "archetypes_count": len(api_archetypes)
-                                    }
-                                }
-                                mvp_logger.log_raw_health_data(analysis_number, raw_health_data)
-                            except Exception as log_error:
-                                logger.warning(f"[MVP_LOGGER] Failed to log raw health data: {log_error}")
-
-                        return result
-                    
-                    logger.debug(f"[API_NO_DATA] No API data found, falling back to database")
-                    
-                except Exception as api_error:
-                    logger.warning(f"[API_FALLBACK] API failed for {user_id}: {api_error}, trying database")
-            
-            # Fallback to database (existing logic)
-            logger.debug(f"[DB_FALLBACK] Using database for {user_id}")
-            tasks = [
-                self.fetch_user_scores(user_id, days),
-                self.fetch_user_biomarkers(user_id, days),
-                self.fetch_user_archetypes(user_id)
-            ]
-            
-            db_scores, db_biomarkers, db_archetypes = await asyncio.gather(*tasks)
-            
-            # Convert to proper format for create_health_context_from_raw_data
-            raw_scores = [
-                {
-                    'id': s['id'],
-                    'profile_id': s['profile_id'],
-                    'type': s['type'],
-                    'score': s['score'],
-                    'data': s['data'],
-                    'score_date_time': s['score_date_time'],
-                    'created_at': s['created_at'],
-                    'updated_at': s['updated_at']
-                } for s in db_scores
-            ]
-            
-            raw_biomarkers = [
-                {
-                    'id': b['id'],
-                    'profile_id': b['profile_id'],
-                    'category': b['category'],
-                    'type': b['type'],
-                    'data': b['data'],
-                    'start_date_time': b['start_date_time'],
-                    'end_date_time': b['end_date_time'],
-                    'created_at': b['created_at'],
-                    'updated_at': b['updated_at']
-                } for b in db_biomarkers
-            ]
-            
-            raw_archetypes = [
-                {
-                    'id': a['id'],
-                    'profile_id': a['profile_id'],
-                    'name': a['name'],
-                    'periodicity': a['periodicity'],
-                    'value': a['value'],
-                    'data': a['data'],
-                    'start_date_time': a['start_date_time'],
-                    'end_date_time': a['end_date_time'],
-                    'created_at': a['created_at'],
-                    'updated_at': a['updated_at']
-                } for a in db_archetypes
-            ]
-            
-            result = create_health_context_from_raw_data(
-                user_id=user_id,
-                raw_scores=raw_scores,
-                raw_biomarkers=raw_biomarkers,
-                raw_archetypes=raw_archetypes,
-                days=days
+            # L1 -> Redis L2 -> fetch; concurrent misses for a user share one fetch
+            result = await self.health_data_cache.get_or_load(
+                f"{days}days",
+                lambda: self._load_user_health_data(user_id, days, analysis_number, overall_start),
+                scope=user_id
             )
-            
-            # Cache result
-            self.health_data_cache.set(cache_key, result)
             # Check memory usage and cleanup if needed
             cache_manager.cleanup_if_needed()
-            
-            overall_duration = (datetime.now() - overall_start).total_seconds()
-            logger.debug(f"[USER_HEALTH_DATA] Database completed for {user_id} in {overall_duration:.2f}s")
-            logger.debug(f"[DATA_QUALITY] Scores: {result.data_quality.scores_count}, "
-                       f"Biomarkers: {result.data_quality.biomarkers_count}, "
-                       f"Quality: {result.data_quality.quality_level}")
-
-            # Enhanced System Flow Logging: Log raw health data from database fallback
-            if analysis_number is not None:
-                try:
-                    raw_health_data = {
-                        "supabase_scores": raw_scores,
-                        "supabase_biomarkers": raw_biomarkers,
-                        "supabase_archetypes": raw_archetypes,
-                        "date_range": {
-                            "start_date": start_date.isoformat(),
-                            "end_date": end_date.isoformat(),
-                            "days_requested": days
-                        },
-                        "data_source": "supabase_database_fallback",
-                        "fetch_duration_seconds": overall_duration,
-                        "user_id": user_id,
-                        "cache_hit": False,
-                        "api_responses": {
-                            "scores_count": len(raw_scores),
-                            "biomarkers_count": len(raw_biomarkers),
-                            "archetypes_count": len(raw_archetypes)
-                        },
-                        "data_quality": {
-                            "scores_count": result.data_quality.scores_count,
-                            "biomarkers_count": result.data_quality.biomarkers_count,
-                            "quality_level": result.data_quality.quality_level
-                        }
-                    }
-                    mvp_logger.log_raw_health_data(analysis_number, raw_health_data)
-                except Exception as log_error:
-                    logger.warning(f"[MVP_LOGGER] Failed to log raw health data from database: {log_error}")
-
             return result
             
         except Exception as e:
@@ -471,6 +310,175 @@ class UserDataService:
                 days=days
             )
     
+    async def _load_user_health_data(self, user_id: str, days: int, analysis_number: Optional[int],
+                                     overall_start: datetime) -> UserHealthContext:
+        """Fetch health data (API first, database fallback) - called on cache miss, raises on failure"""
+        # Import MVP logger for enhanced system flow logging
+        from services.mvp_style_logger import mvp_logger
+
+        start_date, end_date = self._get_date_range(days)
+        
+        # Try API first (health-agent-main pattern)
+        if self.use_api_first:
+            try:
+                logger.debug(f"[API_FIRST] Attempting API fetch for {user_id}")
+                api_tasks = [
+                    self.api_client.get_user_scores(user_id, start_date, end_date),
+                    self.api_client.get_user_biomarkers(user_id, start_date, end_date),
+                    self.api_client.get_user_archetypes(user_id)
+                ]
+                
+                api_scores, api_biomarkers, api_archetypes = await asyncio.gather(*api_tasks)
+                
+                # If API returns good data, use it
+                if api_scores or api_biomarkers:
+                    logger.debug(f"[API_SUCCESS] Using API data: {len(api_scores)} scores, {len(api_biomarkers)} biomarkers")
+                    result = create_health_context_from_raw_data(
+                        user_id=user_id,
+                        raw_scores=api_scores,
+                        raw_biomarkers=api_biomarkers,
+                        raw_archetypes=api_archetypes,
+                        days=days
+                    )
+                    
+
+                    overall_duration = (datetime.now() - overall_start).total_seconds()
+                    logger.debug(f"[USER_HEALTH_DATA] API completed for {user_id} in {overall_duration:.2f}s")
+
+                    # Enhanced System Flow Logging: Log raw health data if analysis_number provided
+                    if analysis_number is not None:
+                        try:
+                            raw_health_data = {
+                                "sahha_scores": api_scores,
+                                "sahha_biomarkers": api_biomarkers,
+                                "sahha_archetypes": api_archetypes,
+                                "date_range": {
+                                    "start_date": start_date.isoformat(),
+                                    "end_date": end_date.isoformat(),
+                                    "days_requested": days
+                                },
+                                "data_source": "sahha_api_primary",
+                                "fetch_duration_seconds": overall_duration,
+                                "user_id": user_id,
+                                "cache_hit": False,
+                                "api_responses": {
+                                    "scores_count": len(api_scores),
+                                    "biomarkers_count": len(api_biomarkers),
+                                    "archetypes_count": len(api_archetypes)
+                                }
+                            }
+                            mvp_logger.log_raw_health_data(analysis_number, raw_health_data)
+                        except Exception as log_error:
+                            logger.warning(f"[MVP_LOGGER] Failed to log raw health data: {log_error}")
+
+                    return result
+                
+                logger.debug(f"[API_NO_DATA] No API data found, falling back to database")
+                
+            except Exception as api_error:
+                logger.warning(f"[API_FALLBACK] API failed for {user_id}: {api_error}, trying database")
+        
+        # Fallback to database (existing logic)
+        logger.debug(f"[DB_FALLBACK] Using database for {user_id}")
+        tasks = [
+            self.fetch_user_scores(user_id, days),
+            self.fetch_user_biomarkers(user_id, days),
+            self.fetch_user_archetypes(user_id)
+        ]
+        
+        db_scores, db_biomarkers, db_archetypes = await asyncio.gather(*tasks)
+        
+        # Convert to proper format for create_health_context_from_raw_data
+        raw_scores = [
+            {
+                'id': s['id'],
+                'profile_id': s['profile_id'],
+                'type': s['type'],
+                'score': s['score'],
+                'data': s['data'],
+                'score_date_time': s['score_date_time'],
+                'created_at': s['created_at'],
+                'updated_at': s['updated_at']
+            } for s in db_scores
+        ]
+        
+        raw_biomarkers = [
+            {
+                'id': b['id'],
+                'profile_id': b['profile_id'],
+                'category': b['category'],
+                'type': b['type'],
+                'data': b['data'],
+                'start_date_time': b['start_date_time'],
+                'end_date_time': b['end_date_time'],
+                'created_at': b['created_at'],
+                'updated_at': b['updated_at']
+            } for b in db_biomarkers
+        ]
+        
+        raw_archetypes = [
+            {
+                'id': a['id'],
+                'profile_id': a['profile_id'],
+                'name': a['name'],
+                'periodicity': a['periodicity'],
+                'value': a['value'],
+                'data': a['data'],
+                'start_date_time': a['start_date_time'],
+                'end_date_time': a['end_date_time'],
+                'created_at': a['created_at'],
+                'updated_at': a['updated_at']
+            } for a in db_archetypes
+        ]
+        
+        result = create_health_context_from_raw_data(
+            user_id=user_id,
+            raw_scores=raw_scores,
+            raw_biomarkers=raw_biomarkers,
+            raw_archetypes=raw_archetypes,
+            days=days
+        )
+        
+        
+        overall_duration = (datetime.now() - overall_start).total_seconds()
+        logger.debug(f"[USER_HEALTH_DATA] Database completed for {user_id} in {overall_duration:.2f}s")
+        logger.debug(f"[DATA_QUALITY] Scores: {result.data_quality.scores_count}, "
+                   f"Biomarkers: {result.data_quality.biomarkers_count}, "
+                   f"Quality: {result.data_quality.quality_level}")
+
+        # Enhanced System Flow Logging: Log raw health data from database fallback
+        if analysis_number is not None:
+            try:
+                raw_health_data = {
+                    "supabase_scores": raw_scores,
+                    "supabase_biomarkers": raw_biomarkers,
+                    "supabase_archetypes": raw_archetypes,
+                    "date_range": {
+                        "start_date": start_date.isoformat(),
+                        "end_date": end_date.isoformat(),
+                        "days_requested": days
+                    },
+                    "data_source": "supabase_database_fallback",
+                    "fetch_duration_seconds": overall_duration,
+                    "user_id": user_id,
+                    "cache_hit": False,
+                    "api_responses": {
+                        "scores_count": len(raw_scores),
+                        "biomarkers_count": len(raw_biomarkers),
+                        "archetypes_count": len(raw_archetypes)
+                    },
+                    "data_quality": {
+                        "scores_count": result.data_quality.scores_count,
+                        "biomarkers_count": result.data_quality.biomarkers_count,
+                        "quality_level": result.data_quality.quality_level
+                    }
+                }
+                mvp_logger.log_raw_health_data(analysis_number, raw_health_data)
+            except Exception as log_error:
+                logger.warning(f"[MVP_LOGGER] Failed to log raw health data from database: {log_error}")
+
+        return result
+    
     # Simplified Incremental Sync - True incremental from last analysis to now
     async def fetch_data_since(self, user_id: str, since_timestamp: datetime) -> tuple[List[Dict], List[Dict], List[Dict], datetime]:
         """Fetch ALL data from timestamp to now - true incremental using Supabase native API"""
@@ -480,7 +488,6 @@ class UserDataService:
             logger.debug(f"[INCREMENTAL] Fetching data for {user_id} since {since_timestamp.isoformat()}")
             
             # Use Supabase native API for more reliable queries
-            from supabase import create_client
             import os
             
             # Try Supabase native API first, fallback to SQL adapter
@@ -489,25 +496,27 @@ class UserDataService:
                 supabase_key = os.getenv('SUPABASE_KEY') 
                 
                 if supabase_url and supabase_key:
-                    supabase_client = create_client(supabase_url, supabase_key)
+                    supabase_client = get_shared_supabase_client(supabase_url, supabase_key)
                     
-                    # Fetch scores using native Supabase API
-                    scores_response = supabase_client.table('scores')\
-                        .select('*')\
-                        .eq('profile_id', user_id)\
-                        .gte('created_at', since_timestamp.isoformat())\
-                        .order('created_at', desc=True)\
-                        .limit(self.max_records)\
-                        .execute()
-                    
-                    # Fetch biomarkers using native Supabase API  
-                    biomarkers_response = supabase_client.table('biomarkers')\
-                        .select('*')\
-                        .eq('profile_id', user_id)\
-                        .gte('created_at', since_timestamp.isoformat())\
-                        .order('created_at', desc=True)\
-                        .limit(self.max_records)\
-                        .execute()
+                    # Fetch scores and biomarkers using native Supabase API (off the event loop, in parallel)
+                    scores_response, biomarkers_response = await asyncio.gather(
+                        execute_async(
+                            supabase_client.table('scores')
+                            .select('*')
+                            .eq('profile_id', user_id)
+                            .gte('created_at', since_timestamp.isoformat())
+                            .order('created_at', desc=True)
+                            .limit(self.max_records)
+                        ),
+                        execute_async(
+                            supabase_client.table('biomarkers')
+                            .select('*')
+                            .eq('profile_id', user_id)
+                            .gte('created_at', since_timestamp.isoformat())
+                            .order('created_at', desc=True)
+                            .limit(self.max_records)
+                        )
+                    )
                     
                     scores_rows = scores_response.data
                     biomarkers_rows = biomarkers_response.data
@@ -825,6 +834,7 @@ class UserDataService:
             
             # Get cache statistics for monitoring
             cache_stats = cache_manager.get_cache_stats()
+            cache_stats["tiered"] = get_tiered_cache_stats()
             
             return {
                 'status': 'healthy',
@@ -1,106 +1,329 @@
 """
 Memory-Safe LRU Cache Implementation for HolisticOS
 Provides bounded memory usage with automatic cleanup and monitoring
+
+Each entry's approximate size in bytes is tracked so caches can be bounded
+by a byte budget as well as by entry count, and the cache manager evicts
+by what the caches actually hold rather than by process RSS. TTL expiry is
+lazy: get() checks the entry's deadline, and a timer wheel reclaims expired
+entries nobody reads again without scanning the whole cache.
+
+The app runs on one asyncio event loop, so LRUCache takes no lock. Use
+ThreadSafeLRUCache for caches shared with worker threads.
 """
 
-from collections import OrderedDict
+from collections import OrderedDict, deque
+import os
+import sys
 import threading
-from typing import Any, Optional, Dict
+from types import FunctionType, ModuleType
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Timer wheel slots per cache; resolution is ttl / slots
+WHEEL_SLOTS = 256
+
+# Entry layout (a list, mutated in place on refresh): value, size in bytes, expires_at
+_VALUE, _SIZE, _EXPIRES = 0, 1, 2
+
+_ATOMIC_TYPES = (str, bytes, bytearray, int, float, complex, bool, type(None))
+_SEQUENCE_TYPES = (list, tuple, set, frozenset, deque)
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate deep size of a value in bytes.
+
+    Walks containers, object __dict__s (dataclasses, pydantic models) and
+    __slots__, counting shared objects once. Classes, modules and functions
+    are not followed.
+    """
+    seen = set()
+    stack = [value]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+
+        if isinstance(obj, _ATOMIC_TYPES):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, _SEQUENCE_TYPES):
+            stack.extend(obj)
+        elif not isinstance(obj, (type, ModuleType, FunctionType)):
+            attributes = getattr(obj, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+            for slot in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, slot):
+                    stack.append(getattr(obj, slot))
+    return size
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel for lazy TTL expiry.
+
+    Keys are bucketed by expiry tick; advance() only visits the buckets
+    whose tick has passed since the last call, so reclaiming expired keys
+    costs O(expired) instead of a scan of the cache. Records can be stale
+    (the key was refreshed or removed) - the owner re-checks each one.
+    """
+
+    def __init__(self, resolution: float, slots: int = WHEEL_SLOTS):
+        self.resolution = max(resolution, 0.001)
+        self.slots: List[List[Tuple[int, str, list]]] = [[] for _ in range(slots)]
+        self.slot_count = slots
+        self.records = 0
+        self.current_tick = self._tick(time.monotonic()) - 1  # Last fully elapsed tick
+
+    def _tick(self, when: float) -> int:
+        return int(when / self.resolution)
+
+    def schedule(self, key: str, entry: list) -> None:
+        tick = int(entry[_EXPIRES] / self.resolution)
+        if tick <= self.current_tick:
+            tick = self.current_tick + 1  # An already processed tick would wait a whole revolution
+        self.slots[tick % self.slot_count].append((tick, key, entry))
+        self.records += 1
+
+    def is_due(self, now: float) -> bool:
+        return int(now / self.resolution) - 1 > self.current_tick
+
+    def advance(self, now: float) -> List[Tuple[str, list]]:
+        """Records whose tick has fully elapsed (key, entry)"""
+        tick = self._tick(now) - 1
+        if tick <= self.current_tick:
+            return []
+
+        due = []
+        # After a full revolution every slot has been visited once
+        for step in range(1, min(tick - self.current_tick, self.slot_count) + 1):
+            slot = self.slots[(self.current_tick + step) % self.slot_count]
+            if not slot:
+                continue
+            pending = []
+            for record in slot:
+                if record[0] <= tick:
+                    due.append((record[1], record[2]))
+                else:
+                    pending.append(record)  # Expires on a later revolution
+            slot[:] = pending
+        self.current_tick = tick
+        self.records -= len(due)
+        return due
+
+    def rebuild(self, entries: Dict[str, list]) -> None:
+        """Drop stale records (after many refreshes/removals)"""
+        for slot in self.slots:
+            slot.clear()
+        self.records = 0
+        for key, entry in entries.items():
+            self.schedule(key, entry)
+
+
 class LRUCache:
-    """Thread-safe LRU cache with size and time limits"""
-    
-    def __init__(self, max_size: int = 100, ttl_seconds: int = 3600):
+    """LRU cache with entry-count, byte and time limits (asyncio, no lock)"""
+
+    def __init__(self, max_size: int = 100, ttl_seconds: int = 3600, max_bytes: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = estimate_size):
         self.max_size = max_size
         self.ttl_seconds = ttl_seconds
-        self.cache = OrderedDict()
-        self.timestamps = {}
-        self.lock = threading.RLock()
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._wheel = TimerWheel(ttl_seconds / WHEEL_SLOTS)
         self._hits = 0
         self._misses = 0
-    
+        self._evictions = 0
+        self._expirations = 0
+        self._rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[_EXPIRES] > time.monotonic()
+
     def get(self, key: str) -> Optional[Any]:
         """Get item from cache"""
-        with self.lock:
-            if key not in self.cache:
-                self._misses += 1
-                return None
-            
-            # Check TTL
-            if time.time() - self.timestamps[key] > self.ttl_seconds:
-                self._remove_key(key)
-                self._misses += 1
-                return None
-            
-            # Move to end (most recently used)
-            value = self.cache.pop(key)
-            self.cache[key] = value
-            self._hits += 1
-            return value
-    
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+
+        # Lazy TTL check
+        if entry[_EXPIRES] <= time.monotonic():
+            self._remove_key(key)
+            self._expirations += 1
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(key)  # Most recently used
+        self._hits += 1
+        return entry[_VALUE]
+
     def set(self, key: str, value: Any) -> None:
         """Set item in cache"""
-        with self.lock:
-            # Remove if exists
-            if key in self.cache:
-                self.cache.pop(key)
-                self.timestamps.pop(key, None)
-            
-            # Add new item
-            self.cache[key] = value
-            self.timestamps[key] = time.time()
-            
-            # Enforce size limit
-            while len(self.cache) > self.max_size:
-                oldest_key = next(iter(self.cache))
-                self._remove_key(oldest_key)
-    
+        now = time.monotonic()
+        wheel = self._wheel
+        if wheel.is_due(now):
+            self._expire_due(now)
+
+        size = self.sizeof(value)
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.total_bytes -= previous[_SIZE]
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Would evict the whole cache and still not fit
+            self._rejected += 1
+            logger.debug(f"[CACHE] Not caching {key}: {size} bytes exceeds budget of {self.max_bytes}")
+            return
+
+        entry = [value, size, now + self.ttl_seconds]
+        self._entries[key] = entry
+        self.total_bytes += size
+        wheel.schedule(key, entry)  # Refreshes leave the old record behind (skipped as stale)
+
+        # Enforce size and byte limits, least recently used first
+        count = len(self._entries)
+        if count > self.max_size or (self.max_bytes is not None and self.total_bytes > self.max_bytes):
+            while len(self._entries) > self.max_size or (
+                    self.max_bytes is not None and self.total_bytes > self.max_bytes):
+                self._evict_oldest()
+            count = len(self._entries)
+
+        if wheel.records > 4 * count + wheel.slot_count:
+            wheel.rebuild(self._entries)
+
+    def delete(self, key: str) -> None:
+        """Remove item from cache (no-op if absent)"""
+        self._remove_key(key)
+
     def _remove_key(self, key: str) -> None:
-        """Remove key from cache and timestamps"""
-        self.cache.pop(key, None)
-        self.timestamps.pop(key, None)
-    
+        """Remove key and release its bytes"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[_SIZE]
+
+    def _evict_oldest(self) -> None:
+        _, entry = self._entries.popitem(last=False)
+        self.total_bytes -= entry[_SIZE]
+        self._evictions += 1
+
+    def _expire_due(self, now: float) -> int:
+        """Reclaim entries whose wheel tick has passed"""
+        expired = 0
+        for key, entry in self._wheel.advance(now):
+            # Skip stale records: key refreshed (new entry) or already removed
+            if self._entries.get(key) is entry and entry[_EXPIRES] <= now:
+                self._remove_key(key)
+                expired += 1
+        self._expirations += expired
+        return expired
+
+    def purge_expired(self) -> int:
+        """Drop expired entries now (set() does this as it goes)"""
+        return self._expire_due(time.monotonic())
+
+    def shrink_to(self, target_bytes: int) -> int:
+        """Evict least recently used entries until at most target_bytes remain"""
+        evicted = 0
+        while self._entries and self.total_bytes > target_bytes:
+            self._evict_oldest()
+            evicted += 1
+        return evicted
+
     def clear(self) -> None:
         """Clear all cache entries"""
-        with self.lock:
-            self.cache.clear()
-            self.timestamps.clear()
-    
+        self._entries.clear()
+        self._wheel.rebuild(self._entries)
+        self.total_bytes = 0
+
     def get_stats(self) -> dict:
         """Get cache statistics"""
+        total_requests = self._hits + self._misses
+        hit_rate = self._hits / total_requests if total_requests > 0 else 0
+
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(hit_rate, 3),
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "rejected": self._rejected,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+class ThreadSafeLRUCache(LRUCache):
+    """LRUCache guarded by a lock, for caches touched from worker threads"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.RLock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            return super().get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        with self.lock:
+            super().set(key, value)
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            super().delete(key)
+
+    def purge_expired(self) -> int:
         with self.lock:
-            total_requests = self._hits + self._misses
-            hit_rate = self._hits / total_requests if total_requests > 0 else 0
-            
-            return {
-                "size": len(self.cache),
-                "max_size": self.max_size,
-                "hits": self._hits,
-                "misses": self._misses,
-                "hit_rate": round(hit_rate, 3),
-                "ttl_seconds": self.ttl_seconds
-            }
+            return super().purge_expired()
+
+    def shrink_to(self, target_bytes: int) -> int:
+        with self.lock:
+            return super().shrink_to(target_bytes)
+
+    def clear(self) -> None:
+        with self.lock:
+            super().clear()
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return super().get_stats()
+
 
 class MemoryAwareCacheManager:
-    """Manages multiple caches with memory monitoring"""
-    
+    """Manages multiple caches against a shared byte budget"""
+
     def __init__(self, total_memory_limit_mb: int = 128):
         self.total_memory_limit_mb = total_memory_limit_mb
-        self.caches = {}
-        
-    def create_cache(self, name: str, max_size: int = 50, ttl_seconds: int = 1800) -> LRUCache:
+        self.caches: Dict[str, LRUCache] = {}
+
+    def create_cache(self, name: str, max_size: int = 50, ttl_seconds: int = 1800,
+                     max_bytes: Optional[int] = None, thread_safe: bool = False) -> LRUCache:
         """Create a new named cache"""
-        cache = LRUCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        cache_class = ThreadSafeLRUCache if thread_safe else LRUCache
+        cache = cache_class(max_size=max_size, ttl_seconds=ttl_seconds, max_bytes=max_bytes)
         self.caches[name] = cache
-        logger.debug(f"Created cache '{name}' with max_size={max_size}, ttl={ttl_seconds}s")
+        logger.debug(f"Created cache '{name}' with max_size={max_size}, max_bytes={max_bytes}, ttl={ttl_seconds}s")
         return cache
-    
+
     def get_memory_usage_mb(self) -> float:
-        """Get current memory usage"""
+        """Get current process memory usage (reported in stats only)"""
         try:
             import psutil
             process = psutil.Process()
@@ -108,41 +331,44 @@ class MemoryAwareCacheManager:
         except ImportError:
             logger.debug("psutil not available for memory monitoring")
             return 0.0
-    
+
+    def get_cache_bytes(self) -> int:
+        """Approximate bytes held by all caches"""
+        return sum(cache.total_bytes for cache in self.caches.values())
+
     def get_cache_stats(self) -> dict:
         """Get statistics for all caches"""
         stats = {
             "memory_usage_mb": round(self.get_memory_usage_mb(), 2),
             "memory_limit_mb": self.total_memory_limit_mb,
+            "cache_bytes_mb": round(self.get_cache_bytes() / 1024 / 1024, 2),
             "caches": {}
         }
-        
+
         for name, cache in self.caches.items():
             stats["caches"][name] = cache.get_stats()
-        
+
         return stats
-    
+
     def cleanup_if_needed(self) -> bool:
-        """Clean up caches if memory usage is high"""
-        current_memory = self.get_memory_usage_mb()
-        
-        if current_memory > self.total_memory_limit_mb * 0.8:  # 80% threshold
-            logger.debug(f"High memory usage: {current_memory:.1f}MB, cleaning caches")
-            
-            # Clear oldest items from all caches
-            for cache in self.caches.values():
-                # Remove 50% of items from each cache
-                current_size = len(cache.cache)
-                target_size = current_size // 2
-                
-                with cache.lock:
-                    keys_to_remove = list(cache.cache.keys())[:current_size - target_size]
-                    for key in keys_to_remove:
-                        cache._remove_key(key)
-            
+        """Clean up caches if they hold more than 80% of the byte budget"""
+        limit_bytes = self.total_memory_limit_mb * 1024 * 1024
+        if self.get_cache_bytes() <= limit_bytes * 0.8:
+            return False
+
+        # Expired entries go first; only then evict live ones
+        for cache in self.caches.values():
+            cache.purge_expired()
+        cache_bytes = self.get_cache_bytes()
+        if cache_bytes <= limit_bytes * 0.8:
             return True
-        
-        return False
+
+        logger.debug(f"High cache usage: {cache_bytes / 1024 / 1024:.1f}MB, cleaning caches")
+        for cache in self.caches.values():
+            # Keep the most recently used half of each cache's bytes
+            cache.shrink_to(cache.total_bytes // 2)
+        return True
+
 
 # Global cache manager - single instance for the application
-cache_manager = MemoryAwareCacheManager(total_memory_limit_mb=128)
\ No newline at end of file
+cache_manager = MemoryAwareCacheManager(total_memory_limit_mb=int(os.getenv("CACHE_MEMORY_LIMIT_MB", "128")))
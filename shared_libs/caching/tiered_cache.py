@@ -0,0 +1,456 @@
+"""
+Two-tier cache for HolisticOS
+Bounded in-process L1 (LRUCache) in front of a Redis L2 shared by all
+workers, with stampede protection and versioned keys for invalidation
+
+Keys look like {prefix}:v{schema}:{namespace}:{scope}:{version}:{key}. The
+scope (usually a user id) has a version counter in Redis; invalidate()
+bumps it, so every worker stops reading the old entries without deleting
+them (they age out through the L2 TTL). Workers re-read the version at most
+every version_ttl_seconds, which bounds cross-worker staleness.
+
+Redis is optional: without REDIS_URL (or when it is unreachable) the cache
+runs L1-only.
+
+L2 values are JSON, never pickle, so a writable Redis cannot run code in the
+workers. Besides JSON types, datetimes and the pydantic models registered
+with register_cache_model() round-trip through type tags; any other value is
+kept in L1 only.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import zlib
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from shared_libs.caching.lru_cache import cache_manager
+from shared_libs.data_models.health_models import UserHealthContext
+
+logger = logging.getLogger(__name__)
+
+# Import monitoring (optional - cache works without prometheus)
+try:
+    from shared_libs.monitoring.metrics import metrics
+    MONITORING_AVAILABLE = True
+except ImportError:
+    MONITORING_AVAILABLE = False
+
+# Bump when cached value shapes change so a deploy never reads old payloads
+CACHE_SCHEMA_VERSION = 2
+
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "holisticos:cache")
+CACHE_L2_ENABLED = os.getenv("CACHE_L2_ENABLED", "true").lower() == "true"
+
+# Payload header bytes: JSON as-is or zlib-compressed JSON
+_RAW = b"j"
+_COMPRESSED = b"z"
+
+# Type tags for values JSON has no type for
+_MODEL_TAG = "__cache_model__"
+_DATETIME_TAG = "__cache_datetime__"
+_DATE_TAG = "__cache_date__"
+
+# Scopes whose version each TieredCache remembers; past this the oldest are dropped
+CACHE_MAX_SCOPE_VERSIONS = int(os.getenv("CACHE_MAX_SCOPE_VERSIONS", "10000"))
+
+# Seconds to stop using Redis after a connection error
+_REDIS_RETRY_AFTER = 30.0
+
+_redis_client = None
+
+
+# Pydantic models allowed in L2, by class name
+_cache_models: Dict[str, Type[BaseModel]] = {}
+
+
+def register_cache_model(model: Type[BaseModel]) -> Type[BaseModel]:
+    """Allow a pydantic model in L2 values (usable as a class decorator)"""
+    _cache_models[model.__name__] = model
+    return model
+
+
+register_cache_model(UserHealthContext)
+
+
+def _encode_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        name = type(value).__name__
+        if _cache_models.get(name) is not type(value):
+            raise TypeError(f"{name} is not registered with register_cache_model()")
+        return {_MODEL_TAG: name, "data": value.model_dump()}
+    if isinstance(value, datetime):
+        return {_DATETIME_TAG: value.isoformat()}
+    if isinstance(value, date):
+        return {_DATE_TAG: value.isoformat()}
+    raise TypeError(f"{type(value).__name__} values cannot be cached in L2")
+
+
+def _decode_object(obj: Dict[str, Any]) -> Any:
+    if _MODEL_TAG in obj:
+        model = _cache_models.get(obj[_MODEL_TAG])
+        if model is None:
+            raise ValueError(f"{obj[_MODEL_TAG]} is not registered with register_cache_model()")
+        return model.model_validate(obj["data"])
+    if _DATETIME_TAG in obj:
+        return datetime.fromisoformat(obj[_DATETIME_TAG])
+    if _DATE_TAG in obj:
+        return date.fromisoformat(obj[_DATE_TAG])
+    return obj
+
+
+def encode_value(value: Any, compress_threshold: int = 1024) -> bytes:
+    """
+    Compact serialization: tagged JSON, zlib-compressed above compress_threshold bytes.
+    Raises TypeError for values JSON and the type tags cannot represent.
+    """
+    payload = json.dumps(value, default=_encode_default, separators=(",", ":")).encode()
+    if len(payload) > compress_threshold:
+        return _COMPRESSED + zlib.compress(payload, 6)
+    return _RAW + payload
+
+
+def decode_value(data: bytes) -> Any:
+    header, payload = data[:1], data[1:]
+    if header == _COMPRESSED:
+        payload = zlib.decompress(payload)
+    elif header != _RAW:
+        raise ValueError(f"Unknown cache payload header {header!r}")
+    return json.loads(payload, object_hook=_decode_object)
+
+
+def _get_redis_client():
+    """Shared redis.asyncio client for L2 (None -> L1 only)"""
+    global _redis_client
+    if not CACHE_L2_ENABLED or _redis_client is not None:
+        return _redis_client
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        return None
+    try:
+        import redis.asyncio as redis
+        _redis_client = redis.from_url(
+            redis_url,
+            decode_responses=False,
+            socket_timeout=1.0,
+            socket_connect_timeout=1.0,
+            max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "20"))
+        )
+    except Exception as e:
+        logger.warning(f"[TIERED_CACHE] Redis unavailable, using L1 only: {e}")
+        return None
+    return _redis_client
+
+
+def _scope_base(namespace: str, scope: str) -> str:
+    return f"{CACHE_KEY_PREFIX}:v{CACHE_SCHEMA_VERSION}:{namespace}:{scope}"
+
+
+class TieredCache:
+    """
+    In-process L1 + Redis L2 cache for one namespace.
+
+    get_or_load() is the main entry point: L1, then L2, then the loader.
+    Concurrent misses for the same key share one load within a worker
+    (in-flight future) and, across workers, wait briefly on a Redis lock
+    for the first worker to fill L2.
+    """
+
+    def __init__(self, namespace: str, l1_max_size: int = 100, l1_ttl_seconds: int = 60,
+                 l1_max_bytes: Optional[int] = None, l2_ttl_seconds: int = 600, version_ttl_seconds: float = 2.0,
+                 lock_ttl_seconds: float = 30.0, lock_wait_seconds: float = 10.0,
+                 lock_poll_interval: float = 0.05, compress_threshold: int = 1024,
+                 max_scope_versions: int = CACHE_MAX_SCOPE_VERSIONS, redis_client: Any = None):
+        self.namespace = namespace
+        self.l2_ttl_seconds = l2_ttl_seconds
+        self.version_ttl_seconds = version_ttl_seconds
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.lock_wait_seconds = lock_wait_seconds
+        self.lock_poll_interval = lock_poll_interval
+        self.compress_threshold = compress_threshold
+        self._redis_client = redis_client
+        self._redis_failed_at = 0.0
+
+        # L1 is registered with cache_manager so memory cleanup and stats cover it
+        self.l1 = cache_manager.create_cache(f"tiered:{namespace}", max_size=l1_max_size,
+                                             ttl_seconds=l1_ttl_seconds, max_bytes=l1_max_bytes)
+
+        # scope -> (version, fetched_at), oldest fetch first. Entries idle longer than
+        # both TTLs are dropped (no L1 entry of an older version can remain); past
+        # max_scope_versions the oldest go early and raise _version_floor instead.
+        self._versions: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._version_floor = 0
+        self.max_scope_versions = max_scope_versions
+        self._version_horizon = max(version_ttl_seconds, l1_ttl_seconds)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self._stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "loads": 0,
+                       "load_errors": 0, "lock_waits": 0, "l2_errors": 0}
+
+    # ----- Redis -----
+
+    def _redis(self):
+        if time.monotonic() - self._redis_failed_at < _REDIS_RETRY_AFTER:
+            return None
+        return self._redis_client if self._redis_client is not None else _get_redis_client()
+
+    def _redis_error(self, operation: str, error: Exception):
+        self._stats["l2_errors"] += 1
+        self._redis_failed_at = time.monotonic()
+        logger.warning(f"[TIERED_CACHE] {self.namespace} L2 {operation} failed, L1 only for "
+                       f"{_REDIS_RETRY_AFTER:.0f}s: {error}")
+
+    # ----- Keys and versions -----
+
+    def _base(self, scope: str) -> str:
+        return _scope_base(self.namespace, scope)
+
+    async def _version(self, scope: str) -> int:
+        cached = self._versions.get(scope)
+        if cached and time.monotonic() - cached[1] < self.version_ttl_seconds:
+            return cached[0]
+
+        version = cached[0] if cached else self._version_floor
+        client = self._redis()
+        if client is not None:
+            try:
+                raw = await client.get(f"{self._base(scope)}:version")
+                version = int(raw) if raw is not None else 0
+            except Exception as e:
+                self._redis_error("version read", e)
+        self._remember_version(scope, version)
+        return version
+
+    def _remember_version(self, scope: str, version: int) -> None:
+        now = time.monotonic()
+        self._versions[scope] = (version, now)
+        self._versions.move_to_end(scope)
+        while self._versions:
+            oldest_scope, (oldest_version, fetched_at) = next(iter(self._versions.items()))
+            if now - fetched_at < self._version_horizon:
+                if len(self._versions) <= self.max_scope_versions:
+                    break
+                # Forgotten early: without Redis, unknown scopes start above any
+                # version this scope had, so its older L1 entries stay unreachable
+                self._version_floor = max(self._version_floor, oldest_version + 1)
+            del self._versions[oldest_scope]
+
+    async def _key(self, key: str, scope: Optional[str]) -> str:
+        scope = scope or "_"
+        return f"{self._base(scope)}:{await self._version(scope)}:{key}"
+
+    # ----- Public API -----
+
+    async def get(self, key: str, scope: Optional[str] = None) -> Optional[Any]:
+        """L1 then L2 lookup; None on miss"""
+        full_key = await self._key(key, scope)
+        value = self.l1.get(full_key)
+        if value is not None:
+            self._record("l1", True)
+            return value
+        self._record("l1", False)
+
+        client = self._redis()
+        data = None
+        if client is not None:
+            try:
+                data = await client.get(full_key)
+            except Exception as e:
+                self._redis_error("get", e)
+            else:
+                self._record("l2", data is not None)
+        value = self._decode(full_key, data) if data is not None else None
+        if value is None:
+            self._stats["misses"] += 1
+            return None
+        self.l1.set(full_key, value)
+        return value
+
+    def _decode(self, full_key: str, data: bytes) -> Optional[Any]:
+        """Decoded L2 payload, or None (a miss) if it cannot be decoded"""
+        try:
+            return decode_value(data)
+        except Exception as e:
+            logger.warning(f"[TIERED_CACHE] {self.namespace} ignoring undecodable L2 value for {full_key}: {e}")
+            return None
+
+    async def set(self, key: str, value: Any, scope: Optional[str] = None) -> None:
+        full_key = await self._key(key, scope)
+        await self._store(full_key, value)
+
+    async def _store(self, full_key: str, value: Any) -> None:
+        self.l1.set(full_key, value)
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            data = encode_value(value, self.compress_threshold)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"[TIERED_CACHE] {self.namespace} keeping {full_key} in L1 only: {e}")
+            return
+        try:
+            await client.set(full_key, data, ex=self.l2_ttl_seconds)
+        except Exception as e:
+            self._redis_error("set", e)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]],
+                          scope: Optional[str] = None) -> Any:
+        """
+        Cached value, or the loader's result (stored in both tiers).
+        Loader exceptions propagate and nothing is cached; None is not cached.
+        """
+        value = await self.get(key, scope)
+        if value is not None:
+            return value
+
+        full_key = await self._key(key, scope)
+        inflight = self._inflight.get(full_key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[full_key] = future
+        try:
+            value = await self._load_once(full_key, loader)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self._inflight.pop(full_key, None)
+
+    async def _load_once(self, full_key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Run the loader, letting at most one worker at a time load a key"""
+        client = self._redis()
+        lock_key = f"{full_key}:lock"
+        locked = False
+        if client is not None:
+            try:
+                locked = bool(await client.set(lock_key, b"1", nx=True, px=int(self.lock_ttl_seconds * 1000)))
+                if not locked:
+                    value = await self._wait_for_fill(client, full_key)
+                    if value is not None:
+                        return value
+            except Exception as e:
+                self._redis_error("lock", e)
+
+        try:
+            self._stats["loads"] += 1
+            try:
+                value = await loader()
+            except Exception:
+                self._stats["load_errors"] += 1
+                raise
+            if value is not None:
+                await self._store(full_key, value)
+            return value
+        finally:
+            if locked:
+                try:
+                    # Unconditional release: if the lock expired and another worker took it,
+                    # the worst case is one extra load
+                    await client.delete(lock_key)
+                except Exception as e:
+                    self._redis_error("unlock", e)
+
+    async def _wait_for_fill(self, client, full_key: str) -> Optional[Any]:
+        """Another worker holds the load lock - poll L2 until it stores the value"""
+        self._stats["lock_waits"] += 1
+        deadline = time.monotonic() + self.lock_wait_seconds
+        lock_key = f"{full_key}:lock"
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.lock_poll_interval)
+            data = await client.get(full_key)
+            value = self._decode(full_key, data) if data is not None else None
+            if value is not None:
+                self._record("l2", True)
+                self.l1.set(full_key, value)
+                return value
+            if not await client.exists(lock_key):
+                return None  # Holder gave up (error or None result) - load ourselves
+        return None
+
+    async def invalidate(self, scope: str) -> int:
+        """Drop every entry of a scope (all workers) by bumping its version"""
+        version = (self._versions.get(scope) or (self._version_floor, 0.0))[0] + 1
+        client = self._redis()
+        if client is not None:
+            try:
+                version = int(await client.incr(f"{self._base(scope)}:version"))
+            except Exception as e:
+                self._redis_error("invalidate", e)
+        self._remember_version(scope, version)
+        return version
+
+    def _record(self, tier: str, hit: bool):
+        if hit:
+            self._stats[f"{tier}_hits"] += 1
+        if MONITORING_AVAILABLE:
+            metrics.track_cache_lookup(self.namespace, tier, hit)
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self._stats["l1_hits"] + self._stats["l2_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0,
+            "l2_enabled": self._redis() is not None,
+            "l1": self.l1.get_stats()
+        }
+
+
+# One TieredCache per namespace so every service instance in a worker shares it
+_tiered_caches: Dict[str, TieredCache] = {}
+# Settings each namespace was created with
+_tiered_cache_settings: Dict[str, Dict[str, Any]] = {}
+
+
+def get_tiered_cache(namespace: str, **kwargs) -> TieredCache:
+    """
+    Get or create the namespace's cache
+
+    kwargs apply on first creation; later calls with different settings get
+    the existing cache and a warning.
+    """
+    cache = _tiered_caches.get(namespace)
+    if cache is None:
+        cache = TieredCache(namespace, **kwargs)
+        _tiered_caches[namespace] = cache
+        _tiered_cache_settings[namespace] = dict(kwargs)
+    elif kwargs and kwargs != _tiered_cache_settings[namespace]:
+        logger.warning(f"[TIERED_CACHE] {namespace} already exists with {_tiered_cache_settings[namespace]}; "
+                       f"ignoring {kwargs}")
+    return cache
+
+
+async def invalidate_cache_scope(namespace: str, scope: str) -> None:
+    """
+    Invalidate a scope (e.g. a user) of a namespace from anywhere
+
+    Never creates the namespace's cache: a worker that has not used the
+    namespace only bumps the Redis version, so the settings of the service
+    that owns the namespace still apply when it creates the cache.
+    """
+    cache = _tiered_caches.get(namespace)
+    if cache is not None:
+        await cache.invalidate(scope)
+        return
+
+    client = _get_redis_client()
+    if client is not None:
+        try:
+            await client.incr(f"{_scope_base(namespace, scope)}:version")
+        except Exception as e:
+            logger.warning(f"[TIERED_CACHE] {namespace} L2 invalidate failed: {e}")
+
+
+def get_tiered_cache_stats() -> Dict[str, Any]:
+    return {namespace: cache.get_stats() for namespace, cache in _tiered_caches.items()}
@@ -162,6 +162,10 @@ class DatabasePool:
                 except Exception as e:
                     logger.error(f"Error releasing connection back to pool: {e}")
     
+    def acquire(self):
+        """asyncpg-style alias for get_connection() (lets pool-based helpers take db_pool)"""
+        return self.get_connection()
+    
     async def execute_query(self, query: str, *args) -> list:
         """
         Execute a SELECT query using a pooled connection
@@ -13,6 +13,7 @@ from typing import Dict, List, Any, Optional
 from pydantic import BaseModel
 
 from ..utils.system_prompts import get_system_prompt, get_archetype_adaptation
+from ..utils.log_sink import get_log_sink, summarize_payload
 
 logger = structlog.get_logger()
 
@@ -132,13 +133,12 @@ class BaseAgent(ABC):
                 input_file = f"input_{self.agent_id}_{timestamp}.txt"
                 output_file = f"output_{self.agent_id}_{timestamp}.txt"
             
-            # Log input data
-            with open(input_file, 'w') as f:
-                json.dump(input_data, f, indent=2, default=str)
-            
-            # Log output data 
-            with open(output_file, 'w') as f:
-                json.dump(output_data, f, indent=2, default=str)
+            # Queue both files on the background log sink (no file I/O here)
+            log_sink = get_log_sink()
+            if not log_sink.should_sample(analysis_number or output_file):
+                input_data, output_data = summarize_payload(input_data), summarize_payload(output_data)
+            log_sink.submit(input_file, input_data, stream="agent_input")
+            log_sink.submit(output_file, output_data, stream="agent_output")
                 
             self.logger.info("Input/output logged", 
                            input_file=input_file, 
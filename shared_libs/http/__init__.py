@@ -0,0 +1,8 @@
+"""
+HTTP transport utilities for HolisticOS MVP
+Provides process-wide pooled async HTTP clients for upstream APIs
+"""
+
+from .client_pool import HTTPClientPool, http_pool, get_http_client, close_http_pool
+
+__all__ = ['HTTPClientPool', 'http_pool', 'get_http_client', 'close_http_pool']
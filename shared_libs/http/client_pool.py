@@ -0,0 +1,158 @@
+"""
+HTTP Client Pool for HolisticOS MVP
+Implements a singleton registry of pooled httpx clients (one per upstream host) so
+keep-alive connections are reused instead of paying a TCP+TLS handshake per request
+"""
+
+import asyncio
+import logging
+import os
+from typing import Optional, Dict, Any, Tuple
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 is only available when the optional `h2` package is installed
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class HTTPClientPool:
+    """
+    Singleton registry of long-lived httpx.AsyncClient instances
+    One client per origin gives each upstream host its own connection limits
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._clients = {}
+            cls._instance._request_counts = {}
+        return cls._instance
+
+    def __init__(self):
+        # Pool configuration (per host) - sized for 0.5 CPU Render instances
+        self.max_connections = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "20"))
+        self.max_keepalive = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "10"))
+        self.keepalive_expiry = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "30"))
+        self.default_timeout = float(os.getenv("HTTP_POOL_DEFAULT_TIMEOUT", "30"))
+        self.http2 = HTTP2_AVAILABLE and os.getenv("HTTP_POOL_ENABLE_HTTP2", "true").lower() == "true"
+
+    @staticmethod
+    def _origin(base_url: str) -> str:
+        """Normalize a URL to scheme://host[:port] so all paths on a host share a pool"""
+        parts = urlsplit(base_url)
+        if not parts.scheme or not parts.netloc:
+            raise ValueError(f"Invalid base URL for HTTP client pool: {base_url!r}")
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    def get_client(self, base_url: str, timeout: Optional[float] = None) -> httpx.AsyncClient:
+        """
+        Get the shared client for the host of base_url, creating it on first use
+
+        Args:
+            base_url: Any URL on the upstream host
+            timeout: Default timeout for the client (only applied on creation;
+                     pass timeout= per request to override)
+
+        Returns:
+            Pooled httpx.AsyncClient - do NOT close it, the pool owns its lifecycle
+        """
+        origin = self._origin(base_url)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        entry: Optional[Tuple[httpx.AsyncClient, Any]] = self._clients.get(origin)
+        if entry is not None:
+            client, client_loop = entry
+            # Connections are bound to the loop that opened them
+            if not client.is_closed and client_loop is loop:
+                self._request_counts[origin] = self._request_counts.get(origin, 0) + 1
+                return client
+            logger.debug(f"[HTTP_POOL] Recreating client for {origin} (closed or new event loop)")
+            if not client.is_closed:
+                self._close_stale(origin, client, client_loop, loop)
+
+        client = httpx.AsyncClient(
+            timeout=timeout or self.default_timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            http2=self.http2,
+        )
+        self._clients[origin] = (client, loop)
+        self._request_counts[origin] = self._request_counts.get(origin, 0) + 1
+        logger.debug(f"[HTTP_POOL] Created client for {origin} (max={self.max_connections}, http2={self.http2})")
+        return client
+
+    @staticmethod
+    def _close_stale(origin: str, client: httpx.AsyncClient, client_loop: Any, loop: Any) -> None:
+        """Close a replaced client on the loop that owns its connections"""
+        async def aclose():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.debug(f"[HTTP_POOL] Error closing stale client for {origin}: {e}")
+
+        if client_loop is not None and client_loop.is_running() and client_loop is not loop:
+            # Owned by a loop still running in another thread
+            asyncio.run_coroutine_threadsafe(aclose(), client_loop)
+        elif loop is not None:
+            loop.create_task(aclose())
+        else:
+            logger.debug(f"[HTTP_POOL] Dropped stale client for {origin} (no running loop to close it on)")
+
+    async def close(self):
+        """Close every pooled client - called from application shutdown"""
+        clients = list(self._clients.items())
+        self._clients.clear()
+        for origin, (client, _) in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"[HTTP_POOL] Error closing client for {origin}: {e}")
+        if clients:
+            logger.debug(f"✅ HTTP client pool closed ({len(clients)} clients)")
+
+    def get_pool_status(self) -> Dict[str, Any]:
+        """Get pool statistics for monitoring"""
+        return {
+            "status": "healthy",
+            "http2_enabled": self.http2,
+            "max_connections_per_host": self.max_connections,
+            "max_keepalive_per_host": self.max_keepalive,
+            "hosts": {
+                origin: {
+                    "closed": client.is_closed,
+                    "requests_served": self._request_counts.get(origin, 0),
+                }
+                for origin, (client, _) in self._clients.items()
+            },
+            "timestamp": datetime.now().isoformat()
+        }
+
+
+# Global pool instance - singleton pattern
+http_pool = HTTPClientPool()
+
+
+def get_http_client(base_url: str, timeout: Optional[float] = None) -> httpx.AsyncClient:
+    """Get the pooled client for an upstream host"""
+    return http_pool.get_client(base_url, timeout)
+
+
+async def close_http_pool():
+    """Close the global HTTP client pool"""
+    return await http_pool.close()
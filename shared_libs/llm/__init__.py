@@ -0,0 +1,15 @@
+"""
+LLM client utilities for HolisticOS MVP
+Provides shared OpenAI clients with per-model concurrency limits
+and a content-addressed response cache
+"""
+
+from .openai_registry import (
+    OpenAIClientRegistry, openai_registry, get_openai_client, create_chat_completion,
+    stream_chat_completion
+)
+from .response_cache import LLMResponseCache, get_response_cache, make_cache_key
+
+__all__ = ['OpenAIClientRegistry', 'openai_registry', 'get_openai_client', 'create_chat_completion',
+           'stream_chat_completion',
+           'LLMResponseCache', 'get_response_cache', 'make_cache_key']
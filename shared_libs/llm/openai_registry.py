@@ -0,0 +1,335 @@
+"""
+OpenAI Client Registry for HolisticOS MVP
+Keeps one warm AsyncOpenAI client per credential and queues bursts locally with
+per-model concurrency limits instead of letting them hit OpenAI 429s
+"""
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Dict, Any, Tuple
+
+import openai
+from openai.types.chat import ChatCompletion
+
+from .response_cache import get_response_cache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Import monitoring (optional - registry works without prometheus)
+try:
+    from shared_libs.monitoring.metrics import metrics
+    MONITORING_AVAILABLE = True
+except ImportError:
+    MONITORING_AVAILABLE = False
+
+# Default per-model concurrency - o3 calls are slow and expensive, so keep them tight
+DEFAULT_MODEL_CONCURRENCY = "o3=2,gpt-4o=6"
+
+# Reasoning and long plan-generation calls routinely run past a short
+# OPENAI_REQUEST_TIMEOUT; keep the SDK's 600s for them whatever it is set to
+DEFAULT_MODEL_TIMEOUTS = "o3=600,gpt-4o=600"
+
+
+def _parse_model_limits(spec: str, cast=int) -> Dict[str, Any]:
+    """Parse "model=limit,model=limit" into a dict, skipping malformed entries"""
+    limits = {}
+    for entry in spec.split(","):
+        if "=" not in entry:
+            continue
+        model, limit = entry.split("=", 1)
+        try:
+            limits[model.strip()] = max(1, cast(limit))
+        except ValueError:
+            logger.warning(f"[OPENAI_REGISTRY] Ignoring invalid per-model entry: {entry!r}")
+    return limits
+
+
+class _ModelGate:
+    """Concurrency gate for a single model with in-flight/queued/wait accounting"""
+
+    def __init__(self, model: str, limit: int):
+        self.model = model
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.queued = 0
+        self.total_calls = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _publish(self):
+        if MONITORING_AVAILABLE:
+            metrics.track_openai_concurrency(self.model, self.in_flight, self.queued)
+
+    @asynccontextmanager
+    async def slot(self):
+        self.queued += 1
+        self._publish()
+        start = time.perf_counter()
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.queued -= 1
+        wait = time.perf_counter() - start
+
+        self.in_flight += 1
+        self.total_calls += 1
+        self.total_wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        self._publish()
+        if MONITORING_AVAILABLE:
+            metrics.track_openai_queue_wait(self.model, wait)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+            self._publish()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "total_calls": self.total_calls,
+            "avg_wait_ms": round(self.total_wait_seconds / max(self.total_calls, 1) * 1000, 2),
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+        }
+
+
+class OpenAIClientRegistry:
+    """
+    Singleton registry of shared AsyncOpenAI clients and per-model concurrency gates
+
+    Clients are keyed by API key and bound to the event loop that created them,
+    mirroring shared_libs.http.HTTPClientPool.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._clients = {}
+            cls._instance._gates = {}
+            cls._instance._gate_loop = None
+        return cls._instance
+
+    def __init__(self):
+        self.model_limits = _parse_model_limits(
+            os.getenv("OPENAI_MODEL_CONCURRENCY", DEFAULT_MODEL_CONCURRENCY)
+        )
+        self.default_limit = int(os.getenv("OPENAI_DEFAULT_CONCURRENCY", "4"))
+        self.max_retries = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+        # Unset keeps the SDK default (600s); per-model timeouts take precedence
+        timeout = os.getenv("OPENAI_REQUEST_TIMEOUT")
+        self.timeout = float(timeout) if timeout else openai.DEFAULT_TIMEOUT
+        self.model_timeouts = _parse_model_limits(
+            os.getenv("OPENAI_MODEL_TIMEOUT", DEFAULT_MODEL_TIMEOUTS), cast=float
+        )
+
+    @staticmethod
+    def _current_loop():
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    def get_client(self, api_key: Optional[str] = None) -> openai.AsyncOpenAI:
+        """
+        Get the shared AsyncOpenAI client for a credential, creating it on first use
+
+        Args:
+            api_key: OpenAI API key (defaults to OPENAI_API_KEY)
+
+        Returns:
+            Shared client - do NOT close it, the registry owns its lifecycle
+        """
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        loop = self._current_loop()
+
+        entry: Optional[Tuple[openai.AsyncOpenAI, Any]] = self._clients.get(api_key)
+        if entry is not None:
+            client, client_loop = entry
+            if client_loop is loop and not client.is_closed():
+                return client
+            if not client.is_closed():
+                self._close_stale(client, client_loop, loop)
+
+        client = openai.AsyncOpenAI(
+            api_key=api_key,
+            max_retries=self.max_retries,
+            timeout=self.timeout,
+        )
+        self._clients[api_key] = (client, loop)
+        logger.debug("[OPENAI_REGISTRY] Created shared AsyncOpenAI client")
+        return client
+
+    @staticmethod
+    def _close_stale(client: openai.AsyncOpenAI, client_loop: Any, loop: Any) -> None:
+        """Close a replaced client (and its connection pool) on the loop that owns it"""
+        async def aclose():
+            try:
+                await client.close()
+            except Exception as e:
+                logger.debug(f"[OPENAI_REGISTRY] Error closing stale client: {e}")
+
+        if client_loop is not None and client_loop.is_running() and client_loop is not loop:
+            # Owned by a loop still running in another thread
+            asyncio.run_coroutine_threadsafe(aclose(), client_loop)
+        elif loop is not None:
+            loop.create_task(aclose())
+        else:
+            logger.debug("[OPENAI_REGISTRY] Dropped stale client (no running loop to close it on)")
+
+    def _get_gate(self, model: str) -> _ModelGate:
+        loop = self._current_loop()
+        if self._gate_loop is not loop:
+            # Semaphores are bound to the loop they first wait on
+            self._gates = {}
+            self._gate_loop = loop
+
+        gate = self._gates.get(model)
+        if gate is None:
+            gate = _ModelGate(model, self.model_limits.get(model, self.default_limit))
+            self._gates[model] = gate
+        return gate
+
+    def _request_options(self, model: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply the model's timeout unless the caller passed one"""
+        if "timeout" not in kwargs and model in self.model_timeouts:
+            return {**kwargs, "timeout": self.model_timeouts[model]}
+        return kwargs
+
+    @asynccontextmanager
+    async def model_slot(self, model: str):
+        """Hold one of the model's concurrency slots for the duration of a call"""
+        async with self._get_gate(model).slot():
+            yield
+
+    async def chat_completion(self, model: str, api_key: Optional[str] = None, cache: bool = False,
+                              cache_ttl: Optional[int] = None, **kwargs):
+        """
+        Run chat.completions.create on the shared client inside the model's concurrency slot
+
+        Args:
+            model: Model name
+            api_key: OpenAI API key (defaults to OPENAI_API_KEY)
+            cache: Serve byte-identical requests from the LLM response cache
+            cache_ttl: Override the cache TTL in seconds for this response
+            **kwargs: Passed through to chat.completions.create
+        """
+        response_cache = get_response_cache() if cache else None
+        if response_cache is not None and response_cache.enabled:
+            key = make_cache_key(model, kwargs.get("messages"), **{k: v for k, v in kwargs.items() if k != "messages"})
+            cached = await response_cache.get(key, model)
+            if cached is not None:
+                return ChatCompletion.model_validate(cached[0])
+        else:
+            response_cache = None
+
+        client = self.get_client(api_key)
+        async with self.model_slot(model):
+            response = await client.chat.completions.create(model=model, **self._request_options(model, kwargs))
+
+        # Truncated or filtered completions are not worth replaying
+        if (response_cache is not None and isinstance(response, ChatCompletion)
+                and response.choices and all(c.finish_reason == "stop" for c in response.choices)):
+            await response_cache.set(key, model, response.model_dump(mode="json"), cache_ttl)
+        return response
+
+    async def stream_chat_completion(self, model: str, api_key: Optional[str] = None, cache: bool = False,
+                                     cache_ttl: Optional[int] = None, **kwargs) -> AsyncIterator[str]:
+        """
+        Stream a chat completion as content deltas, holding the model's slot until it ends
+
+        Streamed and non-streamed requests share cache entries: a hit is yielded as a
+        single delta, and a completed stream is stored as a regular ChatCompletion.
+        """
+        response_cache = get_response_cache() if cache else None
+        if response_cache is not None and response_cache.enabled:
+            key = make_cache_key(model, kwargs.get("messages"), **{k: v for k, v in kwargs.items() if k != "messages"})
+            cached = await response_cache.get(key, model)
+            if cached is not None:
+                yield ChatCompletion.model_validate(cached[0]).choices[0].message.content or ""
+                return
+        else:
+            response_cache = None
+
+        client = self.get_client(api_key)
+        parts = []
+        completion_id, created, finish_reason, usage = None, None, None, None
+        async with self.model_slot(model):
+            stream = await client.chat.completions.create(
+                model=model, stream=True, stream_options={"include_usage": True},
+                **self._request_options(model, kwargs)
+            )
+            async for chunk in stream:
+                completion_id = completion_id or chunk.id
+                created = created or chunk.created
+                if chunk.usage is not None:
+                    usage = chunk.usage.model_dump(mode="json")
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                finish_reason = choice.finish_reason or finish_reason
+                if choice.delta and choice.delta.content:
+                    parts.append(choice.delta.content)
+                    yield choice.delta.content
+
+        if response_cache is not None and finish_reason == "stop":
+            await response_cache.set(key, model, {
+                "id": completion_id or "stream",
+                "object": "chat.completion",
+                "created": created or int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": finish_reason,
+                    "message": {"role": "assistant", "content": "".join(parts)},
+                }],
+                "usage": usage,
+            }, cache_ttl)
+
+    async def close(self):
+        """Close every shared client - called from application shutdown"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client, _ in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.error(f"[OPENAI_REGISTRY] Error closing client: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-model concurrency statistics for monitoring"""
+        return {
+            "clients": len(self._clients),
+            "default_limit": self.default_limit,
+            "models": {model: gate.get_stats() for model, gate in self._gates.items()},
+        }
+
+
+# Global registry instance - singleton pattern
+openai_registry = OpenAIClientRegistry()
+
+
+def get_openai_client(api_key: Optional[str] = None) -> openai.AsyncOpenAI:
+    """Get the shared AsyncOpenAI client"""
+    return openai_registry.get_client(api_key)
+
+
+async def create_chat_completion(model: str, **kwargs):
+    """
+    Create a chat completion through the shared client and per-model limiter
+    Pass cache=True to reuse responses for byte-identical prompts
+    """
+    return await openai_registry.chat_completion(model, **kwargs)
+
+
+def stream_chat_completion(model: str, **kwargs) -> AsyncIterator[str]:
+    """Stream a chat completion's content deltas through the shared client and per-model limiter"""
+    return openai_registry.stream_chat_completion(model, **kwargs)
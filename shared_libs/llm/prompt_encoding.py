@@ -0,0 +1,271 @@
+"""
+Compact Prompt Serialization for HolisticOS MVP
+The 96-slot energy timeline dumped as indented JSON costs thousands of prompt
+tokens per routine generation. Timeline encoders render it compactly instead:
+
+    rle      - one line per run of contiguous zone with its energy range (default)
+    csv      - one "time,energy,zone" row per slot
+    summary  - minutes per zone only
+    json     - the previous indented JSON dump
+
+Encoders are pluggable via register_timeline_encoder(). PromptBudget measures
+the token count of each prompt section with a local tokenizer and logs it, so
+prompt size is visible and sections can be capped.
+"""
+
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Local tokenizer (optional - falls back to an approximation)
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Import monitoring (optional - encoding works without prometheus)
+try:
+    from shared_libs.monitoring.metrics import metrics
+    MONITORING_AVAILABLE = True
+except ImportError:
+    MONITORING_AVAILABLE = False
+
+# Words, numbers (split every 3 digits like BPE does) and single punctuation marks
+_APPROX_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+# model -> tiktoken encoding, or _NO_ENCODING when it could not be loaded
+_NO_ENCODING = object()
+_encodings: Dict[str, Any] = {}
+
+
+def _get_encoding(model: str) -> Any:
+    encoding = _encodings.get(model)
+    if encoding is None:
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # e.g. the BPE file cannot be downloaded; don't retry on every call
+            logger.warning(f"[PROMPT_ENCODING] tiktoken encoding unavailable for {model}, approximating: {e}")
+            encoding = _NO_ENCODING
+        _encodings[model] = encoding
+    return encoding
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """
+    Count prompt tokens locally
+
+    Uses tiktoken when installed and its encoding loads; otherwise a
+    word/number/punctuation approximation that tracks BPE counts closely for
+    English prompts and JSON.
+    """
+    if not text:
+        return 0
+    if TIKTOKEN_AVAILABLE:
+        encoding = _get_encoding(model)
+        if encoding is not _NO_ENCODING:
+            return len(encoding.encode(text, disallowed_special=()))
+    return len(_APPROX_TOKEN_PATTERN.findall(text))
+
+
+def _slot_minutes(timeline: List[Dict[str, Any]]) -> int:
+    """Slot length from the first two slots (15 when it cannot be derived)"""
+    if len(timeline) >= 2:
+        try:
+            first = _to_minutes(timeline[0]["time"])
+            second = _to_minutes(timeline[1]["time"])
+            if second > first:
+                return second - first
+        except (KeyError, ValueError, TypeError):
+            pass
+    return 15
+
+
+def _to_minutes(hhmm: str) -> int:
+    hour, minute = hhmm.split(":")[:2]
+    return int(hour) * 60 + int(minute)
+
+
+def _to_hhmm(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class TimelineEncoder:
+    """Base class: renders an energy timeline (list of slot dicts) as prompt text"""
+
+    name = "base"
+    description = ""
+
+    def encode(self, timeline: List[Dict[str, Any]]) -> str:
+        raise NotImplementedError
+
+
+class RLETimelineEncoder(TimelineEncoder):
+    """
+    Run-length encoding: contiguous slots of one zone become a single line
+
+        07:00-10:00 peak 75-81
+        10:00-13:00 productive 65-68
+    """
+
+    name = "rle"
+    description = "One line per continuous zone: start-end (end exclusive), zone, energy range (0-100)"
+
+    def encode(self, timeline: List[Dict[str, Any]]) -> str:
+        if not timeline:
+            return ""
+        step = _slot_minutes(timeline)
+        lines = []
+        run_start = 0
+        for i in range(1, len(timeline) + 1):
+            if i < len(timeline) and timeline[i].get("zone") == timeline[run_start].get("zone"):
+                continue
+            run = timeline[run_start:i]
+            levels = [slot.get("energy_level", 0) for slot in run]
+            low, high = min(levels), max(levels)
+            energy = str(low) if low == high else f"{low}-{high}"
+            end = _to_minutes(run[-1]["time"]) + step
+            lines.append(f"{run[0]['time']}-{_to_hhmm(end)} {run[0].get('zone')} {energy}")
+            run_start = i
+        return "\n".join(lines)
+
+
+class CSVTimelineEncoder(TimelineEncoder):
+    """Every slot, one compact row per slot"""
+
+    name = "csv"
+    description = "CSV rows: time,energy_level (0-100),zone"
+
+    def encode(self, timeline: List[Dict[str, Any]]) -> str:
+        rows = ["time,energy,zone"]
+        rows.extend(f"{slot.get('time')},{slot.get('energy_level')},{slot.get('zone')}" for slot in timeline)
+        return "\n".join(rows)
+
+
+class SummaryTimelineEncoder(TimelineEncoder):
+    """Totals only - for tight budgets; relies on the prompt's quick summary for timing"""
+
+    name = "summary"
+    description = "Minutes per zone (use the quick summary periods for timing)"
+
+    def encode(self, timeline: List[Dict[str, Any]]) -> str:
+        step = _slot_minutes(timeline)
+        totals: Dict[str, int] = {}
+        for slot in timeline:
+            zone = slot.get("zone")
+            totals[zone] = totals.get(zone, 0) + step
+        return ", ".join(f"{zone} {minutes} min" for zone, minutes in totals.items())
+
+
+class JSONTimelineEncoder(TimelineEncoder):
+    """The previous format: indented JSON list of slot objects"""
+
+    name = "json"
+    description = "JSON list of slots: time (HH:MM), energy_level (0-100), zone"
+
+    def encode(self, timeline: List[Dict[str, Any]]) -> str:
+        return json.dumps(timeline, indent=2, default=str)
+
+
+TIMELINE_ENCODERS: Dict[str, TimelineEncoder] = {}
+
+
+def register_timeline_encoder(encoder: TimelineEncoder):
+    """Register (or replace) a timeline encoder under encoder.name"""
+    TIMELINE_ENCODERS[encoder.name] = encoder
+
+
+for _encoder in (RLETimelineEncoder(), CSVTimelineEncoder(), SummaryTimelineEncoder(), JSONTimelineEncoder()):
+    register_timeline_encoder(_encoder)
+
+
+def get_timeline_encoder(name: Optional[str] = None) -> TimelineEncoder:
+    """
+    Get a timeline encoder by name
+
+    Defaults to PROMPT_TIMELINE_ENCODING (or "rle"); unknown names fall back to rle.
+    """
+    name = (name or os.getenv("PROMPT_TIMELINE_ENCODING", "rle")).lower()
+    encoder = TIMELINE_ENCODERS.get(name)
+    if encoder is None:
+        logger.warning(f"[PROMPT_BUDGET] Unknown timeline encoder '{name}' - using rle")
+        encoder = TIMELINE_ENCODERS["rle"]
+    return encoder
+
+
+class PromptBudget:
+    """
+    Per-section token accounting for one prompt
+
+    Sections are measured as they are added; caps (tokens per section) flag
+    oversized sections, and encode_timeline() degrades the timeline encoding
+    to the summary encoder to stay under its cap.
+    """
+
+    def __init__(self, prompt_name: str, model: str = "gpt-4o", caps: Optional[Dict[str, int]] = None):
+        self.prompt_name = prompt_name
+        self.model = model
+        self.caps = caps or {}
+        self.sections: Dict[str, int] = {}
+
+    def add(self, section: str, text: str) -> int:
+        """Measure a section; returns its token count"""
+        tokens = count_tokens(text, self.model)
+        self.sections[section] = self.sections.get(section, 0) + tokens
+        cap = self.caps.get(section)
+        if cap is not None and tokens > cap:
+            logger.warning(f"[PROMPT_BUDGET] {self.prompt_name}.{section} is {tokens} tokens (cap {cap})")
+        return tokens
+
+    def add_remainder(self, section: str, full_text: str, parts: List[str]) -> int:
+        """Measure what is left of full_text once the already-measured parts are excluded"""
+        tokens = max(0, count_tokens(full_text, self.model) - sum(self.sections.get(p, 0) for p in parts))
+        self.sections[section] = self.sections.get(section, 0) + tokens
+        return tokens
+
+    def encode_timeline(self, timeline: List[Dict[str, Any]], section: str = "energy_timeline",
+                        encoder: Optional[TimelineEncoder] = None) -> Tuple[TimelineEncoder, str]:
+        """
+        Encode a timeline section and measure it
+
+        Falls back to the summary encoder when the preferred encoding exceeds
+        the section's cap.
+
+        Returns:
+            (encoder used, encoded text)
+        """
+        encoder = encoder or get_timeline_encoder()
+        text = encoder.encode(timeline)
+        tokens = count_tokens(text, self.model)
+        cap = self.caps.get(section)
+        if cap is not None and tokens > cap and encoder.name != "summary":
+            logger.info(f"[PROMPT_BUDGET] {self.prompt_name}.{section} is {tokens} tokens with "
+                        f"{encoder.name} (cap {cap}) - using summary encoding")
+            encoder = TIMELINE_ENCODERS["summary"]
+            text = encoder.encode(timeline)
+            tokens = count_tokens(text, self.model)
+        self.sections[section] = self.sections.get(section, 0) + tokens
+        return encoder, text
+
+    @property
+    def total(self) -> int:
+        return sum(self.sections.values())
+
+    def log(self):
+        """Log the per-section token budget (and export it when monitoring is enabled)"""
+        breakdown = ", ".join(f"{section}={tokens}" for section, tokens in self.sections.items())
+        logger.info(f"[PROMPT_BUDGET] {self.prompt_name}: {breakdown} (total={self.total})")
+        if MONITORING_AVAILABLE:
+            for section, tokens in self.sections.items():
+                metrics.track_prompt_tokens(self.prompt_name, section, tokens)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"prompt": self.prompt_name, "sections": dict(self.sections), "total": self.total}
@@ -0,0 +1,317 @@
+"""
+Content-addressed LLM Response Cache for HolisticOS MVP
+Re-running an analysis on a byte-identical prompt (force_refresh retries,
+archetype toggles back and forth) costs seconds and cents for the same answer.
+Responses are stored under a hash of everything that determines the output:
+model, messages (system prompt + user content), response_format and sampling
+parameters.
+
+Backends:
+    - sqlite: persistent across restarts, for local runs (default in development)
+    - memory: in-process LRU (default elsewhere)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Import monitoring (optional - cache works without prometheus)
+try:
+    from shared_libs.monitoring.metrics import metrics
+    MONITORING_AVAILABLE = True
+except ImportError:
+    MONITORING_AVAILABLE = False
+
+# USD per 1M tokens (input, output) - used only to report cost saved by hits
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "o3": (2.00, 8.00),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+# Request arguments that never change the model output
+_NON_OUTPUT_KWARGS = {"timeout", "extra_headers", "user", "stream", "stream_options"}
+
+
+def make_cache_key(model: str, messages: Any, **params) -> str:
+    """
+    Build the content address for a chat completion request
+
+    Args:
+        model: Model name
+        messages: Chat messages (system prompt + user content)
+        **params: Remaining create() arguments (response_format, temperature, ...)
+
+    Returns:
+        SHA-256 hex digest of the canonical request
+    """
+    material = {
+        "model": model,
+        "messages": messages,
+        "params": {k: v for k, v in params.items() if k not in _NON_OUTPUT_KWARGS},
+    }
+    canonical = json.dumps(material, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def estimate_cost(model: str, usage: Optional[Dict[str, Any]]) -> float:
+    """Estimate the USD cost of a completion from its usage block"""
+    if not usage:
+        return 0.0
+    input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    prompt_tokens = usage.get("prompt_tokens") or 0
+    completion_tokens = usage.get("completion_tokens") or 0
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class MemoryResponseStore:
+    """In-process LRU store bounded by total payload bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()  # key -> (payload, expires_at, cost)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, expires_at, cost = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return payload, cost
+
+    def set(self, key: str, model: str, payload: str, ttl_seconds: int, cost: float):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (payload, time.time() + ttl_seconds, cost)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+class SQLiteResponseStore:
+    """Persistent store for local runs; evicts least recently used rows past max_bytes"""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                cost REAL NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_access ON llm_responses(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at, cost FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, expires_at, cost = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return payload, cost
+
+    def set(self, key: str, model: str, payload: str, ttl_seconds: int, cost: float):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses "
+                "(key, model, payload, size_bytes, cost, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, payload, size, cost, now, now + ttl_seconds, now),
+            )
+            self._conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,))
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM llm_responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size_bytes FROM llm_responses ORDER BY last_access"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM llm_responses WHERE key = ?", victims)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+            self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM llm_responses"
+            ).fetchone()
+        return {"entries": entries, "bytes": total, "max_bytes": self.max_bytes, "path": self.path}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LLMResponseCache:
+    """
+    Content-addressed cache of chat completion responses
+
+    Responses are stored as the SDK's JSON dump and rebuilt with the caller's
+    response type, so cached and live responses are interchangeable.
+    """
+
+    def __init__(self, backend: Optional[str] = None, ttl_seconds: Optional[int] = None,
+                 max_bytes: Optional[int] = None, path: Optional[str] = None):
+        self.enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+        self.ttl_seconds = ttl_seconds or int(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 3600)))
+        max_bytes = max_bytes or int(float(os.getenv("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+        if backend is None:
+            default_backend = "sqlite" if os.getenv("ENVIRONMENT", "development").lower() == "development" else "memory"
+            backend = os.getenv("LLM_CACHE_BACKEND", default_backend).lower()
+
+        if backend == "sqlite":
+            path = path or os.getenv("LLM_CACHE_PATH", "logs/llm_response_cache.sqlite3")
+            try:
+                self.store = SQLiteResponseStore(path, max_bytes)
+            except sqlite3.Error as e:
+                logger.warning(f"[LLM_CACHE] SQLite backend unavailable ({e}) - using memory")
+                backend = "memory"
+        if backend != "sqlite":
+            self.store = MemoryResponseStore(max_bytes)
+        self.backend = backend
+
+        self.hits = 0
+        self.misses = 0
+        self.cost_saved = 0.0
+
+    async def _run(self, func, *args):
+        # SQLite I/O goes to a thread so it never stalls the event loop
+        if self.backend == "sqlite":
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def get(self, key: str, model: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Look up a cached response
+
+        Returns:
+            (response dict, cost of the original call) or None on miss
+        """
+        try:
+            entry = await self._run(self.store.get, key)
+        except Exception as e:
+            logger.warning(f"[LLM_CACHE] Lookup failed: {e}")
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            if MONITORING_AVAILABLE:
+                metrics.track_llm_cache_lookup(model, hit=False)
+            return None
+
+        payload, cost = entry
+        self.hits += 1
+        self.cost_saved += cost
+        if MONITORING_AVAILABLE:
+            metrics.track_llm_cache_lookup(model, hit=True, cost_saved=cost)
+        logger.debug(f"[LLM_CACHE] Hit for {model} (saved ${cost:.4f})")
+        return json.loads(payload), cost
+
+    async def set(self, key: str, model: str, response: Dict[str, Any], ttl_seconds: Optional[int] = None):
+        """Store a response dict under its content address"""
+        cost = estimate_cost(model, response.get("usage"))
+        payload = json.dumps(response, separators=(",", ":"), default=str)
+        try:
+            await self._run(self.store.set, key, model, payload, ttl_seconds or self.ttl_seconds, cost)
+        except Exception as e:
+            logger.warning(f"[LLM_CACHE] Store failed: {e}")
+
+    def clear(self):
+        """Drop every cached response"""
+        self.store.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/cost-saved statistics for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+            "cost_saved_usd": round(self.cost_saved, 4),
+            **self.store.get_stats(),
+        }
+
+
+_response_cache: Optional[LLMResponseCache] = None
+
+
+def get_response_cache() -> LLMResponseCache:
+    """Get the process-wide LLM response cache, creating it on first use"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = LLMResponseCache()
+    return _response_cache
@@ -148,8 +148,6 @@ class HealthChecker:
         start_time = time.time()
         
         try:
-            import openai
-            
             # Use the API key from environment
             api_key = os.getenv("OPENAI_API_KEY")
             if not api_key:
@@ -160,7 +158,8 @@ class HealthChecker:
                     message="OpenAI API key not configured"
                 )
             
-            client = openai.AsyncOpenAI(api_key=api_key)
+            from shared_libs.llm.openai_registry import get_openai_client
+            client = get_openai_client(api_key)
             
             # Simple test call - list models
             await asyncio.wait_for(
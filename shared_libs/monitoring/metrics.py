@@ -55,6 +55,57 @@ OPENAI_API_COST = Counter(
     'OpenAI API costs in USD'
 )
 
+OPENAI_IN_FLIGHT = Gauge(
+    'holisticos_openai_in_flight',
+    'OpenAI calls currently holding a concurrency slot',
+    ['model']
+)
+
+OPENAI_QUEUED = Gauge(
+    'holisticos_openai_queued',
+    'OpenAI calls waiting locally for a concurrency slot',
+    ['model']
+)
+
+OPENAI_QUEUE_WAIT = Histogram(
+    'holisticos_openai_queue_wait_seconds',
+    'Time spent waiting for an OpenAI concurrency slot',
+    ['model'],
+    buckets=(0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+)
+
+LLM_CACHE_LOOKUPS = Counter(
+    'holisticos_llm_cache_lookups_total',
+    'LLM response cache lookups',
+    ['model', 'result']
+)
+
+LLM_CACHE_COST_SAVED = Counter(
+    'holisticos_llm_cache_cost_saved_total',
+    'Estimated OpenAI spend avoided by LLM response cache hits in USD',
+    ['model']
+)
+
+PROMPT_SECTION_TOKENS = Histogram(
+    'holisticos_prompt_section_tokens',
+    'Prompt tokens per section, measured locally before the call',
+    ['prompt', 'section'],
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, float('inf'))
+)
+
+CACHE_LOOKUPS = Counter(
+    'holisticos_cache_lookups_total',
+    'Tiered cache lookups per namespace and tier',
+    ['namespace', 'tier', 'result']
+)
+
+CONTEXT_SOURCE_DURATION = Histogram(
+    'holisticos_context_source_duration_seconds',
+    'Time to fetch one context source during context assembly',
+    ['assembler', 'source', 'status'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float('inf'))
+)
+
 MEMORY_USAGE = Gauge(
     'holisticos_memory_usage_bytes',
     'Memory usage in bytes'
@@ -129,6 +180,33 @@ class MetricsCollector:
         if cost > 0:
             OPENAI_API_COST.inc(cost)
     
+    def track_openai_concurrency(self, model: str, in_flight: int, queued: int):
+        """Track per-model OpenAI concurrency slot usage"""
+        OPENAI_IN_FLIGHT.labels(model=model).set(in_flight)
+        OPENAI_QUEUED.labels(model=model).set(queued)
+    
+    def track_openai_queue_wait(self, model: str, wait_seconds: float):
+        """Track how long a call waited for an OpenAI concurrency slot"""
+        OPENAI_QUEUE_WAIT.labels(model=model).observe(wait_seconds)
+    
+    def track_llm_cache_lookup(self, model: str, hit: bool, cost_saved: float = 0):
+        """Track LLM response cache hits/misses and the spend a hit avoided"""
+        LLM_CACHE_LOOKUPS.labels(model=model, result="hit" if hit else "miss").inc()
+        if cost_saved > 0:
+            LLM_CACHE_COST_SAVED.labels(model=model).inc(cost_saved)
+    
+    def track_prompt_tokens(self, prompt: str, section: str, tokens: int):
+        """Track the token size of one prompt section"""
+        PROMPT_SECTION_TOKENS.labels(prompt=prompt, section=section).observe(tokens)
+    
+    def track_cache_lookup(self, namespace: str, tier: str, hit: bool):
+        """Track a tiered cache lookup (tier: l1 or l2)"""
+        CACHE_LOOKUPS.labels(namespace=namespace, tier=tier, result="hit" if hit else "miss").inc()
+    
+    def track_context_source(self, assembler: str, source: str, status: str, duration: float):
+        """Track fetch time and outcome of one context source"""
+        CONTEXT_SOURCE_DURATION.labels(assembler=assembler, source=source, status=status).observe(duration)
+    
     def track_analysis(self, user_archetype: str, analysis_type: str):
         """Track behavior analysis operations"""
         ANALYSIS_COUNT.labels(user_archetype=user_archetype, analysis_type=analysis_type).inc()
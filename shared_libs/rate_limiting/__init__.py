@@ -4,6 +4,6 @@ Rate Limiting Module for HolisticOS
 Provides Redis-based rate limiting with cost tracking and tier-based limits.
 """
 
-from .rate_limiter import HolisticRateLimiter, RateLimitTier, rate_limiter
+from .rate_limiter import CostSettlement, HolisticRateLimiter, RateLimitTier, rate_limiter
 
-__all__ = ['HolisticRateLimiter', 'RateLimitTier', 'rate_limiter']
\ No newline at end of file
+__all__ = ['CostSettlement', 'HolisticRateLimiter', 'RateLimitTier', 'rate_limiter']
\ No newline at end of file
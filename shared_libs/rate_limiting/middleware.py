@@ -80,13 +80,21 @@ async def _add_rate_limit_headers(request: Request, response: Response) -> None:
                 tier_limits = stats.get("rate_limits", {})
                 cost_info = stats.get("cost_info", {})
                 
-                # General API limit
-                general_limit = tier_limits.get("general_api", "50/hour")
-                limit_value = general_limit.split("/")[0]
-                
-                response.headers["X-RateLimit-Limit"] = limit_value
-                response.headers["X-RateLimit-Remaining"] = str(max(0, int(limit_value) - 1))  # Approximate
-                response.headers["X-RateLimit-Reset"] = str(int(time.time()) + 3600)  # 1 hour from now
+                decision = getattr(request.state, "rate_limit", None)
+                if decision is not None:
+                    # Exact values from the check apply_rate_limit made for this request
+                    response.headers["X-RateLimit-Limit"] = str(decision.limit.count)
+                    response.headers["X-RateLimit-Remaining"] = str(decision.remaining)
+                    refill_seconds = (decision.limit.count - decision.remaining) * decision.limit.emission_interval
+                    response.headers["X-RateLimit-Reset"] = str(int(time.time() + refill_seconds))
+                else:
+                    # General API limit
+                    general_limit = tier_limits.get("general_api", "50/hour")
+                    limit_value = general_limit.split("/")[0]
+
+                    response.headers["X-RateLimit-Limit"] = limit_value
+                    response.headers["X-RateLimit-Remaining"] = str(max(0, int(limit_value) - 1))  # Approximate
+                    response.headers["X-RateLimit-Reset"] = str(int(time.time()) + 3600)  # 1 hour from now
                 
                 # Cost tracking headers
                 if cost_info.get("redis_available", False):
@@ -3,39 +3,237 @@ HolisticOS Rate Limiter
 
 Redis-based rate limiting with cost tracking and tier-based limits.
 Integrates with existing error handling and timeout systems.
+
+Request limits use GCRA (generic cell rate algorithm): each key stores one
+timestamp, the theoretical arrival time (TAT), so a check is O(1) whatever
+the number of active users. A limit of "N/window" allows a burst of N and
+then one request every window/N. With Redis the check runs as one Lua
+script so limits hold across workers; without it each process keeps its
+own state.
+
+Cost budgets are reserve-then-settle: apply_rate_limit() reserves the
+endpoint's estimated cost against the daily and monthly budgets in one
+atomic script (refused if it would overspend), and track_api_cost()
+settles the reservation to the actual cost afterwards. apply_rate_limit()
+returns a CostSettlement for the request; releasing it in a finally block
+refunds the reservation whenever the request fails before settling.
 """
 
 import asyncio
+import heapq
 import json
+import math
 import os
+import re
 import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Dict, Any, Optional, List
+from collections import deque
+from typing import Deque, Dict, Any, Optional, List, Tuple
 import logging
 
 import redis.asyncio as redis
 from fastapi import Request, HTTPException
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-
-# Import existing error handling
-try:
-    from shared_libs.exceptions.holisticos_exceptions import (
-        HolisticOSException, RateLimitException, CostLimitException
-    )
-    from shared_libs.utils.retry_handler import exponential_backoff_retry
-    EXCEPTIONS_AVAILABLE = True
-except ImportError:
-    # Fallback if exceptions module not available
-    HolisticOSException = Exception
-    RateLimitException = Exception
-    CostLimitException = Exception
-    EXCEPTIONS_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Window units accepted in limit strings ("3/hour", "100/minute", "10/5minutes")
+_WINDOW_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Float slack when comparing timestamps (a full burst must not be refused by rounding)
+_EPSILON = 1e-6
+
+# GCRA in one round trip. Uses the Redis clock so workers agree on "now".
+# Returns {allowed, remaining, retry_after} (retry_after as a string - Redis
+# truncates Lua numbers to integers).
+GCRA_SCRIPT = """
+redis.replicate_commands()
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+local allow_at = tat + interval - window
+if allow_at - now > 0.000001 then
+    return {0, 0, string.format('%.6f', allow_at - now)}
+end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], string.format('%.6f', new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, math.floor((window - (new_tat - now)) / interval + 0.000001), '0'}
+"""
+
+# Cost budget windows (seconds), started by the first spend in each window
+COST_DAILY_TTL = 86400
+COST_MONTHLY_TTL = 2592000
+
+# Seconds the in-process view of a user's spend is trusted (fast path only -
+# a reservation always goes through Redis)
+COST_BUDGET_CACHE_TTL = float(os.getenv("COST_BUDGET_CACHE_TTL", "5"))
+
+# Reservations still unsettled after this many seconds are refunded (a
+# request that settles later is then charged its full cost)
+COST_RESERVATION_TTL = 900
+
+# Reserve ARGV[1] against both budgets only if neither would be exceeded.
+# KEYS: daily, monthly; ARGV: cost, daily limit, monthly limit, daily ttl, monthly ttl.
+# Returns {reserved, daily spend, monthly spend}.
+COST_RESERVE_SCRIPT = """
+local cost = tonumber(ARGV[1])
+local daily = tonumber(redis.call('GET', KEYS[1]) or '0')
+local monthly = tonumber(redis.call('GET', KEYS[2]) or '0')
+if daily + cost > tonumber(ARGV[2]) + 0.000000001 or monthly + cost > tonumber(ARGV[3]) + 0.000000001 then
+    return {0, tostring(daily), tostring(monthly)}
+end
+daily = redis.call('INCRBYFLOAT', KEYS[1], cost)
+monthly = redis.call('INCRBYFLOAT', KEYS[2], cost)
+if redis.call('TTL', KEYS[1]) < 0 then redis.call('EXPIRE', KEYS[1], ARGV[4]) end
+if redis.call('TTL', KEYS[2]) < 0 then redis.call('EXPIRE', KEYS[2], ARGV[5]) end
+return {1, daily, monthly}
+"""
+
+# Add ARGV[1] (actual - reserved, may be negative) to both budgets, never below 0.
+# KEYS: daily, monthly; ARGV: delta, daily ttl, monthly ttl. Returns {daily spend, monthly spend}.
+COST_SETTLE_SCRIPT = """
+local delta = tonumber(ARGV[1])
+local spent = {}
+for i, key in ipairs(KEYS) do
+    local value = tonumber(redis.call('INCRBYFLOAT', key, delta))
+    if value < 0 then
+        redis.call('INCRBYFLOAT', key, -value)
+        value = 0
+    end
+    if redis.call('TTL', key) < 0 then redis.call('EXPIRE', key, ARGV[i + 1]) end
+    spent[i] = tostring(value)
+end
+return spent
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """A parsed limit string: count requests per window_seconds"""
+    count: int
+    window_seconds: float
+    text: str
+
+    @property
+    def emission_interval(self) -> float:
+        """Spacing between requests once the burst is used up"""
+        return self.window_seconds / self.count
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of one rate limit check"""
+    allowed: bool
+    limit: RateLimit
+    remaining: int       # Requests still allowed right now
+    retry_after: float   # Seconds until the next request is allowed (0 when allowed)
+
+
+def parse_rate_limit(limit: str) -> RateLimit:
+    """Parse "N/unit" or "N/Munit" (e.g. "3/hour", "10/5minutes")"""
+    count_text, _, window_text = limit.strip().partition("/")
+    match = re.fullmatch(r"(\d*)\s*([a-z]+?)s?", window_text.strip().lower())
+    if not count_text.strip().isdigit() or not match or match.group(2) not in _WINDOW_UNITS:
+        raise ValueError(f"Invalid rate limit: {limit!r}")
+    count = int(count_text)
+    multiplier = int(match.group(1) or 1)
+    if count <= 0 or multiplier <= 0:
+        raise ValueError(f"Invalid rate limit: {limit!r}")
+    return RateLimit(count=count, window_seconds=float(multiplier * _WINDOW_UNITS[match.group(2)]), text=limit)
+
+
+class InMemoryGCRA:
+    """
+    Per-process GCRA state: key -> theoretical arrival time.
+
+    Keys whose TAT has passed are back to a full burst, so they are dropped.
+    A min-heap holds one expiry record per key; each check pops only the
+    records that are due, instead of scanning every key.
+    """
+
+    def __init__(self):
+        self._tats: Dict[str, float] = {}
+        self._expiry: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def check(self, key: str, limit: RateLimit, now: Optional[float] = None) -> RateLimitDecision:
+        now = time.monotonic() if now is None else now
+        self._purge(now)
+
+        interval = limit.emission_interval
+        stored = self._tats.get(key)
+        tat = stored if stored is not None and stored > now else now
+
+        allow_at = tat + interval - limit.window_seconds
+        if allow_at - now > _EPSILON:
+            return RateLimitDecision(False, limit, 0, allow_at - now)
+
+        new_tat = tat + interval
+        self._tats[key] = new_tat
+        if stored is None:
+            heapq.heappush(self._expiry, (new_tat, key))
+        remaining = int((limit.window_seconds - (new_tat - now)) / interval + _EPSILON)
+        return RateLimitDecision(True, limit, remaining, 0.0)
+
+    def _purge(self, now: float) -> None:
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= now:
+            _, key = heapq.heappop(expiry)
+            tat = self._tats.get(key)
+            if tat is None:
+                continue
+            if tat <= now:
+                del self._tats[key]
+            else:
+                heapq.heappush(expiry, (tat, key))  # Used since - check again when it lapses
+
+
+@dataclass
+class CostReservation:
+    """Estimated cost held against a user's budgets until settled"""
+    user_id: str
+    endpoint_type: str
+    amount: float
+    created_at: float
+
+
+class CostSettlement:
+    """
+    The cost one request reserved in apply_rate_limit(). settle() charges the
+    actual cost; release() refunds the reservation unless settle() already
+    ran, so calling it from a finally block covers every failure path.
+    """
+
+    def __init__(self, limiter: "HolisticRateLimiter", user_id: str, endpoint_type: str):
+        self.limiter = limiter
+        self.user_id = user_id
+        self.endpoint_type = endpoint_type
+        self.settled = False
+
+    async def settle(self, actual_cost: float = None):
+        """Charge the actual cost (defaults to the endpoint estimate; 0.0 releases)"""
+        if self.settled:
+            return
+        self.settled = True
+        await self.limiter.track_api_cost(self.user_id, self.endpoint_type, actual_cost)
+
+    async def release(self):
+        """Refund the reservation if the request never settled it"""
+        try:
+            await self.settle(0.0)
+        except Exception as e:
+            logger.error(f"Failed to release cost reservation for {self.user_id}:{self.endpoint_type}: {e}")
+
 
 class RateLimitTier(Enum):
     """Different rate limit tiers for different users"""
@@ -62,7 +260,17 @@ class HolisticRateLimiter:
         self._redis_available = bool(self.redis_url)  # Only available if URL is configured
         
         # In-memory rate limiting for development (when Redis not available)
-        self._in_memory_limits = {}  # {user_id:endpoint_type: {"count": int, "reset_time": float}}
+        self._in_memory_limits = InMemoryGCRA()
+        self._gcra_script = None
+
+        # Cost budgeting: Lua scripts, reservations awaiting settlement
+        # ({user_id:endpoint_type: deque}) and recent spend per user
+        # ({user_id: (expires_at, daily_cost, monthly_cost)})
+        self._cost_reserve_script = None
+        self._cost_settle_script = None
+        self._cost_reservations: Dict[str, Deque[CostReservation]] = {}
+        self._reservations_swept_at = time.monotonic()
+        self._budget_cache: Dict[str, Tuple[float, float, float]] = {}
         
         # Production-ready rate limit configurations per tier
         self.tier_limits = {
@@ -104,6 +312,13 @@ class HolisticRateLimiter:
             "insights_generation": 0.01,   # Lower cost
             "general_api": 0.005          # Minimal cost
         }
+
+        # Limit strings are parsed once here, not on every request
+        self._parsed_limits = {
+            tier: {endpoint: parse_rate_limit(limit) for endpoint, limit in limits.items()}
+            for tier, limits in self.tier_limits.items()
+        }
+        self._default_limit = parse_rate_limit("10/hour")
         
         # Initialize slowapi limiter
         self.limiter = Limiter(
@@ -167,8 +382,12 @@ class HolisticRateLimiter:
     
     def get_limit_for_endpoint(self, endpoint_type: str, user_id: str) -> str:
         """Get rate limit for specific endpoint and user"""
+        return self.get_rate_limit(endpoint_type, user_id).text
+
+    def get_rate_limit(self, endpoint_type: str, user_id: str) -> RateLimit:
+        """Parsed rate limit for specific endpoint and user"""
         tier = self._get_user_tier(user_id)
-        return self.tier_limits[tier].get(endpoint_type, "10/hour")
+        return self._parsed_limits[tier].get(endpoint_type, self._default_limit)
     
     async def check_cost_limits(self, user_id: str) -> Dict[str, Any]:
         """
@@ -191,11 +410,13 @@ class HolisticRateLimiter:
             }
         
         try:
-            daily_cost_key = f"cost:daily:{user_id}"
-            monthly_cost_key = f"cost:monthly:{user_id}"
-            
-            daily_cost = float(await redis_client.get(daily_cost_key) or 0)
-            monthly_cost = float(await redis_client.get(monthly_cost_key) or 0)
+            cached = self._get_cached_spend(user_id)
+            if cached:
+                daily_cost, monthly_cost = cached
+            else:
+                daily_raw, monthly_raw = await redis_client.mget(self._cost_keys(user_id))
+                daily_cost, monthly_cost = float(daily_raw or 0), float(monthly_raw or 0)
+                self._cache_spend(user_id, daily_cost, monthly_cost)
             
             # Get cost limits for user tier
             tier = self._get_user_tier(user_id)
@@ -211,7 +432,7 @@ class HolisticRateLimiter:
             }
             
             # Log cost tracking
-            logger.info(f"Cost check: user={user_id}, daily=${daily_cost:.4f}/{tier_limits['daily']}, monthly=${monthly_cost:.4f}/{tier_limits['monthly']}")
+            logger.debug(f"Cost check: user={user_id}, daily=${daily_cost:.4f}/{tier_limits['daily']}, monthly=${monthly_cost:.4f}/{tier_limits['monthly']}")
             
             return result
             
@@ -228,47 +449,172 @@ class HolisticRateLimiter:
                 "error": str(e)
             }
     
-    async def track_api_cost(self, user_id: str, endpoint_type: str):
+    def _cost_keys(self, user_id: str) -> List[str]:
+        return [f"cost:daily:{user_id}", f"cost:monthly:{user_id}"]
+
+    def _get_cached_spend(self, user_id: str) -> Optional[Tuple[float, float]]:
+        cached = self._budget_cache.get(user_id)
+        if cached is None or cached[0] < time.monotonic():
+            return None
+        return cached[1], cached[2]
+
+    def _cache_spend(self, user_id: str, daily_cost: float, monthly_cost: float):
+        if COST_BUDGET_CACHE_TTL > 0:
+            self._budget_cache[user_id] = (time.monotonic() + COST_BUDGET_CACHE_TTL, daily_cost, monthly_cost)
+
+    def _cost_result(self, user_id: str, daily_cost: float, monthly_cost: float, within_limits: bool) -> Dict[str, Any]:
+        tier_limits = self.cost_limits[self._get_user_tier(user_id)]
+        return {
+            "daily_cost": daily_cost,
+            "monthly_cost": monthly_cost,
+            "daily_limit": tier_limits["daily"],
+            "monthly_limit": tier_limits["monthly"],
+            "within_limits": within_limits,
+            "redis_available": True
+        }
+
+    async def reserve_cost(self, user_id: str, endpoint_type: str, estimated_cost: float = None) -> Dict[str, Any]:
         """
-        Track API costs for rate limiting
+        Atomically reserve an endpoint's estimated cost against the user's
+        daily and monthly budgets (one Lua script, one round trip)
+
+        Returns the check_cost_limits() shape plus "reserved"; within_limits
+        is False when the reservation would overspend either budget.
+        """
+        cost = self.endpoint_costs.get(endpoint_type, 0.005) if estimated_cost is None else estimated_cost
+        tier_limits = self.cost_limits[self._get_user_tier(user_id)]
+
+        # Fast path: refuse without a round trip when recent spend already rules it out
+        cached = self._get_cached_spend(user_id)
+        if cached and (cached[0] + cost > tier_limits["daily"] or cached[1] + cost > tier_limits["monthly"]):
+            return {**self._cost_result(user_id, cached[0], cached[1], False), "reserved": False}
+
+        redis_client = await self._get_redis_pool()
+        if not redis_client:
+            # If Redis unavailable, allow requests (expected in development)
+            logger.debug("Redis unavailable for cost budgeting - allowing request")
+            result = await self.check_cost_limits(user_id)
+            return {**result, "reserved": False}
+
+        try:
+            if self._cost_reserve_script is None:
+                self._cost_reserve_script = redis_client.register_script(COST_RESERVE_SCRIPT)
+            reserved, daily_raw, monthly_raw = await self._cost_reserve_script(
+                keys=self._cost_keys(user_id),
+                args=[cost, tier_limits["daily"], tier_limits["monthly"], COST_DAILY_TTL, COST_MONTHLY_TTL]
+            )
+        except Exception as e:
+            logger.error(f"Cost reservation failed for {user_id}: {e}")
+            # Fallback to allow request
+            result = await self.check_cost_limits(user_id)
+            return {**result, "redis_available": False, "reserved": False, "error": str(e)}
+
+        daily_cost, monthly_cost = float(daily_raw), float(monthly_raw)
+        self._cache_spend(user_id, daily_cost, monthly_cost)
+        if reserved:
+            await self._refund_stale(self._add_reservation(CostReservation(user_id, endpoint_type, cost, time.monotonic())))
+        logger.info(f"Cost {'reserved' if reserved else 'refused'}: user={user_id}, endpoint={endpoint_type}, "
+                    f"cost=${cost:.4f}, daily=${daily_cost:.4f}/{tier_limits['daily']}, "
+                    f"monthly=${monthly_cost:.4f}/{tier_limits['monthly']}")
+        return {**self._cost_result(user_id, daily_cost, monthly_cost, bool(reserved)), "reserved": bool(reserved)}
+
+    def _add_reservation(self, reservation: CostReservation) -> List[CostReservation]:
+        """Hold a reservation; returns stale reservations for the caller to refund"""
+        key = f"{reservation.user_id}:{reservation.endpoint_type}"
+        pending = self._cost_reservations.setdefault(key, deque())
+        stale = self._drop_stale_reservations(pending)
+        pending.append(reservation)
+
+        # Users who never come back are swept at most once per TTL
+        now = time.monotonic()
+        if now - self._reservations_swept_at >= COST_RESERVATION_TTL:
+            self._reservations_swept_at = now
+            for other_key, other in list(self._cost_reservations.items()):
+                stale.extend(self._drop_stale_reservations(other))
+                if not other:
+                    del self._cost_reservations[other_key]
+        return stale
+
+    def _pop_reservation(self, user_id: str, endpoint_type: str) -> Tuple[Optional[CostReservation], List[CostReservation]]:
+        """This request's reservation (oldest first) and any stale ones to refund"""
+        key = f"{user_id}:{endpoint_type}"
+        pending = self._cost_reservations.get(key)
+        if pending is None:
+            return None, []
+        stale = self._drop_stale_reservations(pending)
+        reservation = pending.popleft() if pending else None
+        if not pending:
+            del self._cost_reservations[key]
+        return reservation, stale
+
+    def _drop_stale_reservations(self, pending: Deque[CostReservation]) -> List[CostReservation]:
+        """Remove reservations nobody settled within COST_RESERVATION_TTL"""
+        cutoff = time.monotonic() - COST_RESERVATION_TTL
+        stale = []
+        while pending and pending[0].created_at < cutoff:
+            stale.append(pending.popleft())
+        return stale
+
+    async def _refund_stale(self, stale: List[CostReservation]):
+        refunds: Dict[str, float] = {}
+        for reservation in stale:
+            refunds[reservation.user_id] = refunds.get(reservation.user_id, 0.0) + reservation.amount
+        for user_id, amount in refunds.items():
+            logger.warning(f"Refunding unsettled cost reservations: user={user_id}, amount=${amount:.4f}")
+            await self._adjust_cost(user_id, -amount)
+
+    async def _adjust_cost(self, user_id: str, delta: float) -> bool:
+        """Add delta (negative refunds) to both budgets atomically; False if Redis is unavailable or fails"""
+        redis_client = await self._get_redis_pool()
+        if not redis_client:
+            return False
+        try:
+            if self._cost_settle_script is None:
+                self._cost_settle_script = redis_client.register_script(COST_SETTLE_SCRIPT)
+            daily_raw, monthly_raw = await self._cost_settle_script(
+                keys=self._cost_keys(user_id),
+                args=[delta, COST_DAILY_TTL, COST_MONTHLY_TTL]
+            )
+            self._cache_spend(user_id, float(daily_raw), float(monthly_raw))
+            return True
+        except Exception as e:
+            logger.error(f"Failed to adjust cost for {user_id}: {e}")
+            return False
+
+    async def track_api_cost(self, user_id: str, endpoint_type: str, actual_cost: float = None):
+        """
+        Settle API costs for rate limiting
         
         Args:
             user_id: User identifier
             endpoint_type: Type of endpoint called
+            actual_cost: Actual cost in USD (defaults to the endpoint estimate;
+                0.0 releases the reservation, e.g. for cached results)
         """
-        cost = self.endpoint_costs.get(endpoint_type, 0.005)
-        
-        redis_client = await self._get_redis_pool()
-        if not redis_client:
-            logger.warning(f"Redis unavailable - cannot track cost: user={user_id}, endpoint={endpoint_type}, cost=${cost:.4f}")
+        cost = self.endpoint_costs.get(endpoint_type, 0.005) if actual_cost is None else actual_cost
+        reservation, stale = self._pop_reservation(user_id, endpoint_type)
+        # Charge without reservation, or actual - reserved; stale reservations are refunded in the same call
+        delta = (cost - reservation.amount if reservation else cost) - sum(r.amount for r in stale)
+        if abs(delta) < 1e-9:
+            logger.debug(f"Cost settled at reservation: user={user_id}, endpoint={endpoint_type}, cost=${cost:.4f}")
             return
-        
-        try:
-            # Track costs with expiration
-            daily_key = f"cost:daily:{user_id}"
-            monthly_key = f"cost:monthly:{user_id}"
-            
-            # Increment costs atomically
-            async with redis_client.pipeline() as pipe:
-                await pipe.incrbyfloat(daily_key, cost)
-                await pipe.expire(daily_key, 86400)  # 24 hours
-                await pipe.incrbyfloat(monthly_key, cost)
-                await pipe.expire(monthly_key, 2592000)  # 30 days
-                await pipe.execute()
-            
+
+        if await self._adjust_cost(user_id, delta):
             # Log cost tracking (info level for production monitoring)
-            logger.info(f"Cost tracked: user={user_id}, endpoint={endpoint_type}, cost=${cost:.4f}")
-            
-        except Exception as e:
-            logger.error(f"Failed to track cost for {user_id}: {e}")
+            logger.info(f"Cost tracked: user={user_id}, endpoint={endpoint_type}, cost=${cost:.4f}, adjustment=${delta:+.4f}")
+        else:
+            logger.warning(f"Cost not tracked: user={user_id}, endpoint={endpoint_type}, cost=${cost:.4f}")
     
-    async def apply_rate_limit(self, request: Request, endpoint_type: str) -> None:
+    async def apply_rate_limit(self, request: Request, endpoint_type: str) -> CostSettlement:
         """
         Apply rate limiting to a request
         
         Args:
             request: FastAPI request object
             endpoint_type: Type of endpoint for rate limiting
+
+        Returns:
+            CostSettlement for the reserved cost - settle() on success, release() in a finally
             
         Raises:
             HTTPException: If rate limit or cost limit exceeded
@@ -277,123 +623,65 @@ class HolisticRateLimiter:
         identifier = self._get_user_identifier(request)
         user_id = identifier.replace("user:", "") if identifier.startswith("user:") else identifier
         
-        # Get rate limit for this endpoint and user
-        limit = self.get_limit_for_endpoint(endpoint_type, user_id)
-        
-        try:
-            # Temporary fix: Skip SlowAPI integration and use basic in-memory rate limiting
-            # Since we're not using Redis in development, just do basic checking
-            
-            # Use in-memory rate limiting for development
-            await self._check_in_memory_rate_limit(user_id, endpoint_type, limit)
-                
-        except RateLimitExceeded as e:
-            if EXCEPTIONS_AVAILABLE:
-                raise RateLimitException(
-                    message=f"Rate limit exceeded for {endpoint_type}",
-                    details={
-                        "limit": limit,
-                        "endpoint_type": endpoint_type,
-                        "suggestion": "Please wait before making another request",
-                        "retry_after": 3600  # 1 hour
-                    }
-                )
-            else:
-                raise HTTPException(
-                    status_code=429,
-                    detail={
-                        "error": "Rate limit exceeded",
-                        "limit": limit,
-                        "endpoint_type": endpoint_type,
-                        "suggestion": "Please wait before making another request",
-                        "retry_after": 3600
-                    }
-                )
+        decision = await self.check_rate_limit(user_id, endpoint_type)
+        request.state.rate_limit = decision  # For the rate limit response headers
+
+        if not decision.allowed:
+            retry_after = math.ceil(decision.retry_after)
+            logger.warning(f"Rate limit exceeded for {user_id}:{endpoint_type} "
+                           f"({decision.limit.text}), retry in {retry_after}s")
+            raise HTTPException(
+                status_code=429,
+                detail={
+                    "error": "Rate limit exceeded",
+                    "limit": decision.limit.text,
+                    "endpoint_type": endpoint_type,
+                    "suggestion": "Please wait before making another request",
+                    "retry_after": retry_after
+                },
+                headers={"Retry-After": str(retry_after)}
+            )
         
-        # Check cost limits
-        cost_check = await self.check_cost_limits(user_id)
+        # Reserve the estimated cost (settled by track_api_cost)
+        cost_check = await self.reserve_cost(user_id, endpoint_type)
         if not cost_check["within_limits"]:
-            if EXCEPTIONS_AVAILABLE:
-                raise CostLimitException(
-                    message="Daily cost limit exceeded",
-                    details={
-                        "daily_cost": cost_check["daily_cost"],
-                        "daily_limit": cost_check["daily_limit"],
-                        "monthly_cost": cost_check["monthly_cost"],
-                        "monthly_limit": cost_check["monthly_limit"],
-                        "suggestion": "Upgrade to premium or wait until tomorrow"
-                    }
-                )
-            else:
-                raise HTTPException(
-                    status_code=402,  # Payment Required
-                    detail={
-                        "error": "Daily cost limit exceeded",
-                        "daily_cost": cost_check["daily_cost"],
-                        "daily_limit": cost_check["daily_limit"],
-                        "suggestion": "Upgrade to premium or wait until tomorrow"
-                    }
-                )
-    
-    async def _check_in_memory_rate_limit(self, user_id: str, endpoint_type: str, limit: str) -> None:
-        """Check rate limit using in-memory storage (for development without Redis)"""
-        try:
-            # Parse limit (e.g., "5/hour" -> 5 requests per hour)
-            limit_parts = limit.split("/")
-            if len(limit_parts) != 2:
-                logger.warning(f"Invalid limit format: {limit}")
-                return
-            
-            count_limit = int(limit_parts[0])
-            time_window = limit_parts[1]
-            
-            # Convert time window to seconds
-            window_seconds = {
-                "minute": 60,
-                "hour": 3600,
-                "day": 86400
-            }.get(time_window, 3600)  # Default to 1 hour
-            
-            # Key for this user and endpoint
-            rate_key = f"{user_id}:{endpoint_type}"
-            current_time = time.time()
-            
-            # Clean up expired entries first
-            expired_keys = []
-            for key, data in self._in_memory_limits.items():
-                if current_time > data.get("reset_time", 0):
-                    expired_keys.append(key)
-            
-            for key in expired_keys:
-                del self._in_memory_limits[key]
-            
-            # Check current limit
-            if rate_key not in self._in_memory_limits:
-                # First request in this window
-                self._in_memory_limits[rate_key] = {
-                    "count": 1,
-                    "reset_time": current_time + window_seconds
+            raise HTTPException(
+                status_code=402,  # Payment Required
+                detail={
+                    "error": "Daily cost limit exceeded",
+                    "daily_cost": cost_check["daily_cost"],
+                    "daily_limit": cost_check["daily_limit"],
+                    "suggestion": "Upgrade to premium or wait until tomorrow"
                 }
-                logger.debug(f"Rate limit OK for {user_id}:{endpoint_type} (1/{count_limit})")
-                return
-            
-            # Increment existing counter
-            self._in_memory_limits[rate_key]["count"] += 1
-            current_count = self._in_memory_limits[rate_key]["count"]
-            
-            # Check if limit exceeded
-            if current_count > count_limit:
-                logger.warning(f"Rate limit exceeded for {user_id}:{endpoint_type} ({current_count}/{count_limit})")
-                raise RateLimitExceeded(detail=f"Rate limit exceeded: {current_count}/{count_limit}")
-            
-            logger.debug(f"Rate limit OK for {user_id}:{endpoint_type} ({current_count}/{count_limit})")
-            
-        except RateLimitExceeded:
-            raise
-        except Exception as e:
-            logger.error(f"In-memory rate limit check error: {e}")
-            # Graceful degradation - don't block request if check fails
-            return
+            )
+        return CostSettlement(self, user_id, endpoint_type)
+    
+    async def check_rate_limit(self, user_id: str, endpoint_type: str) -> RateLimitDecision:
+        """
+        GCRA check for user and endpoint - shared across workers through Redis
+        when available, per process otherwise (and if the Redis call fails)
+        """
+        limit = self.get_rate_limit(endpoint_type, user_id)
+        rate_key = f"{user_id}:{endpoint_type}"
+
+        redis_client = await self._get_redis_pool()
+        if redis_client:
+            try:
+                return await self._check_redis_rate_limit(redis_client, rate_key, limit)
+            except Exception as e:
+                logger.warning(f"Redis rate limit check failed, using in-memory limits: {e}")
+
+        return self._in_memory_limits.check(rate_key, limit)
+
+    async def _check_redis_rate_limit(self, redis_client, rate_key: str, limit: RateLimit) -> RateLimitDecision:
+        """Atomic GCRA check (one Lua script, EVALSHA after the first call)"""
+        if self._gcra_script is None:
+            self._gcra_script = redis_client.register_script(GCRA_SCRIPT)
+        allowed, remaining, retry_after = await self._gcra_script(
+            keys=[f"ratelimit:{rate_key}"],
+            args=[limit.emission_interval, limit.window_seconds]
+        )
+        return RateLimitDecision(bool(allowed), limit, int(remaining), float(retry_after))
     
     async def get_user_stats(self, user_id: str) -> Dict[str, Any]:
         """Get current usage statistics for a user"""
@@ -8,7 +8,7 @@ import asyncio
 import json
 import logging
 from typing import Any, Dict, List, Optional, Union
-from supabase import create_client, Client
+from supabase import Client
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -21,6 +21,8 @@ try:
 except ImportError:
     CONNECTION_POOL_AVAILABLE = False
 
+from shared_libs.supabase_client.async_executor import execute_async, get_shared_supabase_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -87,14 +89,14 @@ class SupabaseAsyncPGAdapter:
 
                 # Also initialize Supabase client as fallback for development mode
                 if self.supabase_url and self.supabase_key:
-                    self.client = create_client(self.supabase_url, self.supabase_key)
+                    self.client = get_shared_supabase_client(self.supabase_url, self.supabase_key)
                     logger.debug("✅ Supabase client initialized as fallback")
             else:
                 logger.debug("Attempting Supabase client connection...")
                 logger.debug(f"URL: {self.supabase_url[:30]}..." if self.supabase_url else "URL: None")
                 logger.debug(f"Key: {'Present' if self.supabase_key else 'Missing'}")
 
-                self.client = create_client(self.supabase_url, self.supabase_key)
+                self.client = get_shared_supabase_client(self.supabase_url, self.supabase_key)
                 self._connected = True
                 logger.debug(f"✅ Connected to Supabase successfully - client type: {type(self.client)}")
 
@@ -107,7 +109,7 @@ class SupabaseAsyncPGAdapter:
             if self.use_connection_pool and self.supabase_url and self.supabase_key:
                 logger.warning("🔄 Database pool failed, falling back to Supabase REST API only")
                 try:
-                    self.client = create_client(self.supabase_url, self.supabase_key)
+                    self.client = get_shared_supabase_client(self.supabase_url, self.supabase_key)
                     self.use_connection_pool = False
                     self._connected = True
                     logger.info("✅ Fallback to Supabase REST API successful")
@@ -136,6 +138,13 @@ class SupabaseAsyncPGAdapter:
         else:
             return self._connected and self.client is not None
 
+    async def execute_query(self, query: Any) -> Any:
+        """
+        Execute a native Supabase request builder without blocking the event loop
+        Use this instead of calling `.execute()` directly from async code
+        """
+        return await execute_async(query)
+
     def _ensure_connected(self):
         """Ensure we have an active connection"""
         if not self._connected:
@@ -175,7 +184,7 @@ class SupabaseAsyncPGAdapter:
         parsed_query = self._parse_query(query, args)
         
         if parsed_query['operation'] == 'INSERT':
-            result = self.client.table(parsed_query['table']).insert(parsed_query['data']).execute()
+            result = await execute_async(self.client.table(parsed_query['table']).insert(parsed_query['data']))
             return f"INSERT 0 {len(result.data)}"
             
         elif parsed_query['operation'] == 'UPDATE':
@@ -185,9 +194,9 @@ class SupabaseAsyncPGAdapter:
             if 'total_analyses' in update_data:
                 logger.debug(f"Handling total_analyses increment for {parsed_query['where_value']}")
                 # First get current value
-                current_record = self.client.table(parsed_query['table']).select('total_analyses').eq(
+                current_record = await execute_async(self.client.table(parsed_query['table']).select('total_analyses').eq(
                     parsed_query['where_column'], parsed_query['where_value']
-                ).execute()
+                ))
                 
                 current_count = 0
                 if current_record.data:
@@ -207,17 +216,17 @@ class SupabaseAsyncPGAdapter:
             # Debug WHERE clause
             logger.debug(f"WHERE {parsed_query.get('where_column')} = {parsed_query.get('where_value')}")
             
-            result = self.client.table(parsed_query['table']).update(update_data).eq(
+            result = await execute_async(self.client.table(parsed_query['table']).update(update_data).eq(
                 parsed_query['where_column'], parsed_query['where_value']
-            ).execute()
+            ))
             
             logger.debug(f"Update successful: {len(result.data)} rows affected")
             return f"UPDATE {len(result.data)}"
             
         elif parsed_query['operation'] == 'DELETE':
-            result = self.client.table(parsed_query['table']).delete().eq(
+            result = await execute_async(self.client.table(parsed_query['table']).delete().eq(
                 parsed_query['where_column'], parsed_query['where_value']
-            ).execute()
+            ))
             return f"DELETE {len(result.data)}"
             
         else:
@@ -318,7 +327,7 @@ class SupabaseAsyncPGAdapter:
         if parsed_query.get('limit'):
             supabase_query = supabase_query.limit(parsed_query['limit'])
         
-        result = supabase_query.execute()
+        result = await execute_async(supabase_query)
         return result.data
 
     async def fetchrow(self, query: str, *args) -> Optional[Dict[str, Any]]:
@@ -1039,7 +1048,7 @@ class SupabaseAsyncPGAdapter:
                         supabase_query = supabase_query.lte(column, value)
             
             # Execute query
-            result = supabase_query.execute()
+            result = await execute_async(supabase_query)
             count_value = result.count if result.count is not None else 0
             
             # Return in format expected by fetchval
@@ -1059,7 +1068,7 @@ class SupabaseAsyncPGAdapter:
                 raise ValueError(f"Expected INSERT query, got {parsed_query['operation']}")
             
             # Use the correct Supabase client pattern for insert with return
-            result = self.client.table(parsed_query['table']).insert(parsed_query['data']).execute()
+            result = await execute_async(self.client.table(parsed_query['table']).insert(parsed_query['data']))
             
             # Return the first inserted record
             return result.data[0] if result.data else None
@@ -0,0 +1,128 @@
+"""
+Non-blocking Supabase execution for HolisticOS MVP
+supabase-py's `.execute()` is synchronous; calling it from an async handler stalls
+every concurrent request on the worker for the full PostgREST round trip. This
+module runs those calls on a bounded thread pool and shares one client per
+credential so connection pools are reused across requests.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from supabase import create_client, Client
+
+logger = logging.getLogger(__name__)
+
+_clients: Dict[Tuple[str, str], Client] = {}
+_clients_lock = threading.Lock()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Simple counters for monitoring; updated from executor threads, so under _stats_lock
+_stats = {"queries": 0, "errors": 0, "total_ms": 0.0, "in_flight": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(**deltas: float) -> None:
+    with _stats_lock:
+        for name, delta in deltas.items():
+            _stats[name] += delta
+
+
+def get_shared_supabase_client(supabase_url: str = None, supabase_key: str = None) -> Client:
+    """
+    Get the process-wide Supabase client for a credential
+
+    Args:
+        supabase_url: Defaults to SUPABASE_URL
+        supabase_key: Defaults to SUPABASE_SERVICE_KEY, then SUPABASE_KEY
+
+    Returns:
+        Shared supabase-py Client (safe to use from executor threads)
+    """
+    supabase_url = supabase_url or os.getenv('SUPABASE_URL')
+    supabase_key = supabase_key or os.getenv('SUPABASE_SERVICE_KEY') or os.getenv('SUPABASE_KEY')
+
+    if not supabase_url or not supabase_key:
+        raise ValueError("SUPABASE_URL and SUPABASE_KEY must be provided or set in environment")
+
+    key = (supabase_url, supabase_key)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = create_client(supabase_url, supabase_key)
+                _clients[key] = client
+                logger.debug("[SUPABASE_ASYNC] Created shared Supabase client")
+    return client
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = int(os.getenv("SUPABASE_EXECUTOR_WORKERS", "8"))
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="supabase-io")
+                logger.debug(f"[SUPABASE_ASYNC] Executor started with {workers} workers")
+    return _executor
+
+
+def _timed_execute(query: Any) -> Any:
+    start = time.perf_counter()
+    failed = False
+    try:
+        return query.execute()
+    except Exception:
+        failed = True
+        raise
+    finally:
+        _count(errors=int(failed), total_ms=(time.perf_counter() - start) * 1000)
+
+
+async def execute_async(query: Any) -> Any:
+    """
+    Execute a supabase-py request builder without blocking the event loop
+
+    Args:
+        query: Any builder exposing `.execute()` (table().select()..., rpc(), ...)
+
+    Returns:
+        The builder's APIResponse, exactly as `.execute()` would return it
+    """
+    loop = asyncio.get_running_loop()
+    _count(queries=1, in_flight=1)
+    try:
+        return await loop.run_in_executor(_get_executor(), _timed_execute, query)
+    finally:
+        _count(in_flight=-1)
+
+
+def get_executor_stats() -> Dict[str, Any]:
+    """Get executor statistics for monitoring"""
+    with _stats_lock:
+        stats = dict(_stats)
+    return {
+        "workers": _executor._max_workers if _executor else 0,
+        "in_flight": stats["in_flight"],
+        "queries": stats["queries"],
+        "errors": stats["errors"],
+        "avg_query_ms": round(stats["total_ms"] / max(stats["queries"], 1), 2),
+        "shared_clients": len(_clients),
+    }
+
+
+def shutdown_executor():
+    """Stop the executor - called from application shutdown"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,205 @@
+"""
+Context assembly for HolisticOS endpoints
+Declares context sources as a dependency graph and fetches independent
+sources concurrently, each with its own timeout and timing
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Import monitoring (optional - assembly works without prometheus)
+try:
+    from shared_libs.monitoring.metrics import metrics
+    MONITORING_AVAILABLE = True
+except ImportError:
+    MONITORING_AVAILABLE = False
+
+# Per-source timeouts in seconds. The default applies to sources that set no
+# timeout and suits optional lookups that degrade to their default; sources that
+# can legitimately be slow (live health data) or fail the assembly when they
+# time out (required sources) should use SLOW_SOURCE_TIMEOUT
+DEFAULT_SOURCE_TIMEOUT = float(os.getenv("CONTEXT_SOURCE_TIMEOUT", "5.0"))
+SLOW_SOURCE_TIMEOUT = float(os.getenv("CONTEXT_SLOW_SOURCE_TIMEOUT", "30.0"))
+
+# Source statuses
+STATUS_OK = "ok"
+STATUS_TIMEOUT = "timeout"
+STATUS_ERROR = "error"
+STATUS_SKIPPED = "skipped"  # A dependency did not produce a value
+
+
+@dataclass
+class ContextSource:
+    """
+    One piece of context.
+
+    fetch receives a dict with the assembly inputs plus the values of the
+    sources listed in depends_on, and returns the source value.
+    """
+    name: str
+    fetch: Callable[[Dict[str, Any]], Awaitable[Any]]
+    depends_on: Tuple[str, ...] = ()
+    timeout: Optional[float] = None   # None -> DEFAULT_SOURCE_TIMEOUT
+    default: Any = None               # Value used when the source degrades
+    required: bool = False            # Failure fails the whole assembly
+
+
+@dataclass
+class SourceResult:
+    """Outcome and timing of one source"""
+    name: str
+    value: Any
+    status: str
+    duration_ms: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == STATUS_OK
+
+
+@dataclass
+class AssembledContext:
+    """Values of all sources plus per-source timing"""
+    results: Dict[str, SourceResult] = field(default_factory=dict)
+    duration_ms: float = 0.0
+
+    def __getitem__(self, name: str) -> Any:
+        return self.results[name].value
+
+    def get(self, name: str, default: Any = None) -> Any:
+        result = self.results.get(name)
+        return result.value if result is not None else default
+
+    @property
+    def degraded(self) -> List[str]:
+        """Sources that fell back to their default"""
+        return [name for name, result in self.results.items() if not result.ok]
+
+    def timings(self) -> Dict[str, Dict[str, Any]]:
+        """Per-source timing for response metadata"""
+        timings = {}
+        for name, result in self.results.items():
+            timings[name] = {"status": result.status, "duration_ms": result.duration_ms}
+            if result.error:
+                timings[name]["error"] = result.error
+        return timings
+
+
+class ContextAssembler:
+    """
+    Runs a graph of ContextSources.
+
+    Every source starts as soon as its dependencies finish, so end-to-end
+    latency is the slowest dependency chain rather than the sum of all
+    fetches. A source that fails or times out degrades to its default and
+    its dependents are skipped; a failing required source raises.
+    """
+
+    def __init__(self, name: str, sources: Iterable[ContextSource]):
+        self.name = name
+        self.sources: Dict[str, ContextSource] = {}
+        for source in sources:
+            if source.name in self.sources:
+                raise ValueError(f"Duplicate context source: {source.name}")
+            self.sources[source.name] = source
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        """Validate the graph (unknown dependencies, cycles) and order it"""
+        order: List[str] = []
+        state: Dict[str, str] = {}
+
+        def visit(name: str, path: Tuple[str, ...]):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Context source cycle: {' -> '.join(path + (name,))}")
+            state[name] = "visiting"
+            for dependency in self.sources[name].depends_on:
+                if dependency not in self.sources:
+                    raise ValueError(f"Context source '{name}' depends on unknown source '{dependency}'")
+                visit(dependency, path + (name,))
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.sources:
+            visit(name, ())
+        return order
+
+    async def assemble(self, **inputs) -> AssembledContext:
+        """Fetch every source; inputs are passed to each fetch"""
+        start = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run(source: ContextSource) -> SourceResult:
+            # Wait for dependencies (their tasks are already scheduled)
+            dependencies = [await tasks[name] for name in source.depends_on]
+            missing = [result.name for result in dependencies if not result.ok]
+            if missing:
+                return SourceResult(source.name, source.default, STATUS_SKIPPED, 0.0,
+                                    f"dependency unavailable: {', '.join(missing)}")
+
+            context = dict(inputs)
+            context.update({result.name: result.value for result in dependencies})
+            timeout = source.timeout if source.timeout is not None else DEFAULT_SOURCE_TIMEOUT
+
+            source_start = time.perf_counter()
+            try:
+                value = await asyncio.wait_for(source.fetch(context), timeout=timeout)
+                status, error = STATUS_OK, None
+            except asyncio.TimeoutError:
+                value, status, error = source.default, STATUS_TIMEOUT, f"timed out after {timeout}s"
+            except Exception as e:
+                value, status, error = source.default, STATUS_ERROR, str(e)
+            duration_ms = round((time.perf_counter() - source_start) * 1000, 1)
+
+            if status != STATUS_OK:
+                if source.required and status == STATUS_ERROR:
+                    logger.error(f"[CONTEXT] {self.name}.{source.name} failed: {error}")
+                else:
+                    logger.warning(f"[CONTEXT] {self.name}.{source.name} degraded ({status}): {error}")
+            if MONITORING_AVAILABLE:
+                metrics.track_context_source(self.name, source.name, status, duration_ms / 1000)
+            return SourceResult(source.name, value, status, duration_ms, error)
+
+        for name in self.order:
+            tasks[name] = asyncio.create_task(run(self.sources[name]))
+
+        try:
+            results = await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+
+        assembled = AssembledContext(
+            results={result.name: result for result in results},
+            duration_ms=round((time.perf_counter() - start) * 1000, 1)
+        )
+
+        for name in self.order:
+            result = assembled.results[name]
+            if self.sources[name].required and not result.ok:
+                raise ContextAssemblyError(self.name, result)
+
+        summary = ", ".join(
+            f"{name}={result.duration_ms}ms" + ("" if result.ok else f" ({result.status})")
+            for name, result in assembled.results.items()
+        )
+        logger.info(f"[CONTEXT] {self.name} assembled in {assembled.duration_ms}ms: {summary}")
+        return assembled
+
+
+class ContextAssemblyError(Exception):
+    """A required context source failed, timed out or was skipped"""
+
+    def __init__(self, assembler: str, result: SourceResult):
+        self.result = result
+        super().__init__(f"{assembler}: required source '{result.name}' {result.status}: {result.error}")
@@ -0,0 +1,254 @@
+"""
+Vectorized Energy Timeline Engine for HolisticOS
+Builds circadian energy timelines (energy level + zone per slot) as NumPy arrays
+instead of per-slot Python loops:
+
+- Interval painting: each slot takes the first (by start time) energy block
+  covering it
+- Gaps between blocks: linear interpolation between the surrounding blocks
+- Remaining slots: time-of-day defaults
+- Zone periods: run-length encoding; wake/sleep windows: sliding-window sums
+
+Any slot resolution that divides the day (5, 15, 30 min, ...) is supported, and
+many timelines (users or days) are built in one batch, one row per timeline.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MINUTES_PER_DAY = 24 * 60
+
+# Zone codes used in the zone arrays
+ZONES: Tuple[str, ...] = ("recovery", "maintenance", "productive", "peak")
+ZONE_CODES: Dict[str, int] = {zone: code for code, zone in enumerate(ZONES)}
+
+RECOVERY = ZONE_CODES["recovery"]
+MAINTENANCE = ZONE_CODES["maintenance"]
+PRODUCTIVE = ZONE_CODES["productive"]
+PEAK = ZONE_CODES["peak"]
+
+# Energy zone thresholds, shared with the timeline endpoints
+PEAK_THRESHOLD = 75
+MAINTENANCE_THRESHOLD = 50
+
+# (start_minutes, end_minutes, energy_level, zone)
+EnergyBlock = Tuple[int, int, float, str]
+
+_PAD_START = 2 * MINUTES_PER_DAY
+
+
+def _block_start(block: EnergyBlock) -> int:
+    return block[0]
+
+
+@dataclass(frozen=True)
+class TimelineDefaults:
+    """Energy levels for slots with no block on either side"""
+    early_morning: int = 30   # 00:00-06:00
+    late_night: int = 25      # 22:00-24:00
+    unspecified: int = 40     # Daytime
+
+
+class EnergyTimelineEngine:
+    """
+    Builds energy timelines for one slot resolution
+
+    Energy arrays are int (n_timelines, n_slots); zone arrays hold ZONE_CODES.
+    """
+
+    def __init__(self, resolution_minutes: int = 15, peak_threshold: float = PEAK_THRESHOLD,
+                 maintenance_threshold: float = MAINTENANCE_THRESHOLD):
+        if resolution_minutes <= 0 or MINUTES_PER_DAY % resolution_minutes:
+            raise ValueError(f"Slot resolution must divide the day, got {resolution_minutes} minutes")
+
+        self.resolution_minutes = resolution_minutes
+        self.peak_threshold = peak_threshold
+        self.maintenance_threshold = maintenance_threshold
+
+        self.n_slots = MINUTES_PER_DAY // resolution_minutes
+        self.minutes = np.arange(self.n_slots, dtype=np.int64) * resolution_minutes
+        self.hours = self.minutes // 60
+        self.times: List[str] = [f"{m // 60:02d}:{m % 60:02d}" for m in self.minutes.tolist()]
+        self._default_zones = np.where((self.hours < 6) | (self.hours >= 22), RECOVERY, MAINTENANCE)
+
+        # Wake/sleep detection: energy sustained for 45 min, windows span 1 hour
+        self._sustain_slots = max(1, -(-45 // resolution_minutes))
+        self._window_slots = max(1, 60 // resolution_minutes)
+        self._sleep_search_start = (15 * 60) // resolution_minutes
+
+    # ------------------------------------------------------------------
+    # Timeline construction
+    # ------------------------------------------------------------------
+
+    def paint(self, block_sets: Sequence[Sequence[EnergyBlock]],
+              defaults: TimelineDefaults = TimelineDefaults()) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Build one timeline per block set
+
+        Args:
+            block_sets: Energy blocks per timeline (unsorted; blocks with
+                end <= start never cover a slot)
+            defaults: Energy levels where no interpolation is possible
+
+        Returns:
+            (energy, zones) arrays of shape (len(block_sets), n_slots)
+        """
+        # Pack into (n, width) arrays, each row sorted by start time (stable, like
+        # list.sort). Padding can neither cover a slot nor end after one.
+        width = max(1, max((len(blocks) for blocks in block_sets), default=0))
+        padding = (_PAD_START, -1, 0.0, RECOVERY)
+        packed = np.array(
+            [
+                [(start, end, level, ZONE_CODES[zone]) for start, end, level, zone in sorted(blocks, key=_block_start)]
+                + [padding] * (width - len(blocks))
+                for blocks in block_sets
+            ],
+            dtype=np.float64
+        ).reshape(len(block_sets), width, 4)
+        starts = packed[:, :, 0].astype(np.int64)
+        ends = packed[:, :, 1].astype(np.int64)
+        levels = packed[:, :, 2]
+        codes = packed[:, :, 3].astype(np.int8)
+        block_counts = np.array([len(blocks) for blocks in block_sets], dtype=np.int64)
+
+        t = self.minutes[None, :, None]
+        starts3, ends3 = starts[:, None, :], ends[:, None, :]
+
+        # Interval painting: first block covering the slot wins
+        covering = (starts3 <= t) & (t < ends3)
+        in_block = covering.any(axis=2)
+        block_idx = covering.argmax(axis=2)
+
+        # Gap neighbours: next = first block ending after the slot, prev = the one before it
+        ending_after = ends3 > t
+        has_next = ending_after.any(axis=2)
+        next_idx = ending_after.argmax(axis=2)
+        prev_idx = np.where(has_next, next_idx - 1, block_counts[:, None] - 1)
+        interpolate = ~in_block & has_next & (prev_idx >= 0)
+        prev_idx = np.maximum(prev_idx, 0)
+
+        def gather(values: np.ndarray, idx: np.ndarray) -> np.ndarray:
+            return np.take_along_axis(values, idx, axis=1)
+
+        prev_end = gather(ends, prev_idx)
+        prev_level = gather(levels, prev_idx)
+        next_start = gather(starts, next_idx)
+        gap = np.where(interpolate, next_start - prev_end, 1)
+        progress = (self.minutes[None, :] - prev_end) / gap
+        interpolated = prev_level + (gather(levels, next_idx) - prev_level) * progress
+
+        default_level = np.where(
+            self.hours < 6, defaults.early_morning,
+            np.where(self.hours >= 22, defaults.late_night, defaults.unspecified)
+        )
+
+        energy = np.where(
+            in_block, gather(levels, block_idx),
+            np.where(interpolate, interpolated, default_level[None, :])
+        )
+        zones = np.where(
+            in_block, gather(codes, block_idx),
+            np.where(interpolate, self._threshold_zones(interpolated), self._default_zones[None, :])
+        ).astype(np.int8)
+
+        return np.round(energy).astype(np.int64), zones
+
+    def _threshold_zones(self, energy: np.ndarray) -> np.ndarray:
+        return np.where(
+            energy >= self.peak_threshold, PEAK,
+            np.where(energy >= self.maintenance_threshold, MAINTENANCE, RECOVERY)
+        )
+
+    def baseline(self, count: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Build the generous baseline timeline (used when data is insufficient)
+
+        Two peaks (morning, mid-afternoon), productive windows for most waking
+        hours and recovery only around sleep.
+
+        Returns:
+            (energy, zones) arrays of shape (count, n_slots)
+        """
+        hour = self.hours
+        quarter = (self.minutes % 60) // 15
+
+        conditions = [
+            (7 <= hour) & (hour < 10),                                   # Morning peak
+            (10 <= hour) & (hour < 13),                                  # Productive morning
+            ((13 <= hour) & (hour < 14)) | ((hour == 14) & (quarter < 2)),  # Post-lunch dip
+            ((hour == 14) & (quarter >= 2)) | ((15 <= hour) & (hour < 17)),  # Afternoon peak
+            (17 <= hour) & (hour < 21),                                  # Evening maintenance
+            (21 <= hour) & (hour < 22),                                  # Sleep prep
+        ]
+        energy = np.select(
+            conditions,
+            [75 + quarter * 2, 65 + quarter, 52 + quarter, 68 + quarter, 50 - (hour - 17) * 2, 38 - quarter * 2],
+            25 + quarter                                                 # Sleep
+        )
+        zones = np.select(
+            conditions,
+            [PEAK, PRODUCTIVE, MAINTENANCE, PRODUCTIVE, MAINTENANCE, RECOVERY],
+            RECOVERY
+        ).astype(np.int8)
+
+        return np.tile(energy, (count, 1)), np.tile(zones, (count, 1))
+
+    # ------------------------------------------------------------------
+    # Summaries (one timeline row at a time)
+    # ------------------------------------------------------------------
+
+    def zone_periods(self, zones: np.ndarray) -> Dict[str, List[str]]:
+        """
+        Continuous periods of every zone as "HH:MM-HH:MM" (start and last slot)
+
+        One run-length encoding pass over the zone row.
+        """
+        run_starts = np.flatnonzero(np.diff(zones, prepend=-1))
+        run_ends = np.append(run_starts[1:], len(zones)) - 1
+        periods: Dict[str, List[str]] = {zone: [] for zone in ZONES}
+        for code, start, end in zip(zones[run_starts].tolist(), run_starts.tolist(), run_ends.tolist()):
+            periods[ZONES[code]].append(f"{self.times[start]}-{self.times[end]}")
+        return periods
+
+    def zone_minutes(self, zones: np.ndarray, zone: str) -> int:
+        """Total minutes spent in a zone"""
+        return int(np.count_nonzero(zones == ZONE_CODES[zone])) * self.resolution_minutes
+
+    def _first_sustained(self, mask: np.ndarray, first: int = 0) -> Optional[int]:
+        last = self.n_slots - self._sustain_slots  # exclusive
+        if last <= first:
+            return None
+        window_counts = np.convolve(mask.astype(np.int64), np.ones(self._sustain_slots, dtype=np.int64), "valid")
+        hits = np.flatnonzero(window_counts[first:last] == self._sustain_slots)
+        return int(hits[0]) + first if hits.size else None
+
+    def wake_window(self, energy: np.ndarray) -> Optional[str]:
+        """Window starting at the first sustained rise above 50"""
+        i = self._first_sustained(energy > 50)
+        if i is None:
+            return None
+        return f"{self.times[i]}-{self.times[min(i + self._window_slots, self.n_slots - 1)]}"
+
+    def sleep_window(self, energy: np.ndarray) -> Optional[str]:
+        """Window ending at the first sustained drop below 35 from 15:00 onwards"""
+        i = self._first_sustained(energy < 35, self._sleep_search_start)
+        if i is None:
+            return None
+        return f"{self.times[max(0, i - self._window_slots)]}-{self.times[i]}"
+
+    def to_slots(self, energy: np.ndarray, zones: np.ndarray) -> List[Dict]:
+        """Convert one timeline row into the API's slot dicts"""
+        return [
+            {"time": time_str, "energy_level": level, "slot_index": index, "zone": ZONES[code]}
+            for index, (time_str, level, code) in enumerate(zip(self.times, energy.tolist(), zones.tolist()))
+        ]
+
+
+@lru_cache(maxsize=8)
+def get_timeline_engine(resolution_minutes: int = 15, peak_threshold: float = PEAK_THRESHOLD,
+                        maintenance_threshold: float = MAINTENANCE_THRESHOLD) -> EnergyTimelineEngine:
+    """Get the shared engine for a slot resolution and set of zone thresholds"""
+    return EnergyTimelineEngine(resolution_minutes, peak_threshold, maintenance_threshold)
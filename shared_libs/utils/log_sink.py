@@ -0,0 +1,397 @@
+"""
+Non-blocking Log Sink for Debug Payload Dumps
+MVPStyleLogger, the agent handoff dumps and BaseAgent.log_input_output used to
+open/write/close JSON files on the request path (from the event loop). They now
+hand records to this sink and return immediately:
+
+    - bounded queue + one background writer thread, drained in batches
+    - backpressure: a full queue drops the new record (drop_new), evicts the
+      oldest one (drop_oldest) or waits briefly for room (block)
+    - sampling: only a fraction of records keep their full payload; the rest
+      keep metadata plus the keys of the large fields
+    - optional gzip compression
+    - formats: "files" (one file per record, the existing logs/ layout) or
+      "jsonl" (one line per record in per-stream segments rotated by size)
+    - JSONL segments may be shared by several processes (uvicorn/gunicorn
+      workers): the size check, rotation and append run under an exclusive
+      OS lock on a sidecar .lock file, like SequenceAllocator's counter
+
+Defaults keep today's behaviour in development (files, every payload) and
+write sampled, rotated JSONL elsewhere.
+"""
+
+import atexit
+import collections
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from shared_libs.utils.sequence_allocator import _lock_file, _unlock_file
+
+logger = logging.getLogger(__name__)
+
+DROP_POLICIES = ("drop_new", "drop_oldest", "block")
+FORMATS = ("files", "jsonl")
+
+
+def serialize_record(record: Any) -> str:
+    """Serialize a log record the way the file loggers always have"""
+    return json.dumps(record, indent=2, default=str, ensure_ascii=False)
+
+
+def summarize_payload(value: Any) -> Dict[str, Any]:
+    """Placeholder kept for a payload that was sampled out"""
+    summary: Dict[str, Any] = {"sampled_out": True, "type": type(value).__name__}
+    if isinstance(value, dict):
+        summary["keys"] = list(value.keys())
+    elif isinstance(value, (list, tuple, str)):
+        summary["length"] = len(value)
+    return summary
+
+
+def _summarize_fields(record: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """Copy of record with each (dotted) field replaced by its summary"""
+    record = dict(record)
+    for field in fields:
+        parent = record
+        *path, leaf = field.split(".")
+        for key in path:
+            if not isinstance(parent.get(key), dict):
+                break
+            parent[key] = dict(parent[key])
+            parent = parent[key]
+        else:
+            if leaf in parent:
+                parent[leaf] = summarize_payload(parent[leaf])
+    return record
+
+
+class LogSink:
+    """
+    Bounded, batched, background log writer
+
+    submit() only serializes the record and enqueues it, so callers pay no
+    file I/O. Records are serialized on the caller's thread because the
+    payloads are live dicts the request may still mutate - compactly, with
+    the C encoder; the writer re-indents them for the "files" format (an
+    indent=2 dump runs the much slower pure-Python encoder).
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 1000,
+        batch_size: int = 64,
+        drop_policy: str = "drop_new",
+        block_timeout: float = 0.05,
+        log_format: str = "files",
+        compress: bool = False,
+        max_bytes: int = 50 * 1024 * 1024,
+        backup_count: int = 10,
+        sample_rate: float = 1.0
+    ):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"drop_policy must be one of {DROP_POLICIES}")
+        if log_format not in FORMATS:
+            raise ValueError(f"log_format must be one of {FORMATS}")
+
+        self.queue_size = max(1, queue_size)
+        self.batch_size = max(1, batch_size)
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+        self.log_format = log_format
+        self.compress = compress
+        self.max_bytes = max_bytes
+        self.backup_count = max(1, backup_count)
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+
+        self._queue: collections.deque = collections.deque()
+        self._cond = threading.Condition()
+        self._writing = 0
+        self._closed = False
+        self._known_dirs = set()
+        self._thread: Optional[threading.Thread] = None
+
+        # Updated from caller threads and the writer thread
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "submitted": 0,
+            "written": 0,
+            "dropped": 0,
+            "sampled_out": 0,
+            "write_errors": 0,
+            "batches": 0,
+            "bytes_written": 0,
+            "rotations": 0,
+            "write_seconds": 0.0
+        }
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    def should_sample(self, sample_key: Optional[Any] = None) -> bool:
+        """
+        Whether a record keeps its full payload
+
+        With a sample_key the decision is deterministic, so every file of one
+        analysis (input, output, handoffs) is kept or summarized together.
+        """
+        if self.sample_rate >= 1.0:
+            return True
+        if self.sample_rate <= 0.0:
+            return False
+        if sample_key is None:
+            sample_key = time.perf_counter_ns()
+        digest = hashlib.blake2b(str(sample_key).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2 ** 64 < self.sample_rate
+
+    def submit(
+        self,
+        path: str,
+        record: Any,
+        stream: Optional[str] = None,
+        sample_key: Optional[Any] = None,
+        payload_fields: Iterable[str] = ()
+    ) -> bool:
+        """
+        Queue a record for writing
+
+        Args:
+            path: Target file in "files" format; in "jsonl" format the record
+                goes to <dirname(path)>/<stream>.jsonl instead
+            record: JSON-serializable value (default=str for the rest); in
+                "jsonl" format a dict's keys go on the line, anything else
+                under "data"
+            stream: JSONL segment name (defaults to the file name prefix)
+            sample_key: Groups records for the sampling decision
+            payload_fields: Keys ("a" or nested "a.b") replaced by a summary
+                when the record is sampled out
+
+        Returns:
+            False if the record was dropped (queue full or sink closed)
+        """
+        if payload_fields and isinstance(record, dict) and not self.should_sample(sample_key):
+            record = _summarize_fields(record, payload_fields)
+            self._count(sampled_out=1)
+
+        try:
+            if self.log_format == "jsonl":
+                name = os.path.basename(path)
+                entry = {"file": name, **record} if isinstance(record, dict) else {"file": name, "data": record}
+                line = json.dumps(entry, default=str, ensure_ascii=False)
+                stream = stream or os.path.basename(path).split("_")[0]
+                item = (os.path.join(os.path.dirname(path), f"{stream}.jsonl"), line + "\n")
+            else:
+                text = json.dumps(record, default=str, ensure_ascii=False)
+                item = (path + ".gz" if self.compress else path, text)
+        except Exception as e:
+            logger.error(f"[LOG_SINK] Could not serialize {os.path.basename(path)}: {e}")
+            self._count(write_errors=1)
+            return False
+
+        return self._enqueue(item)
+
+    def _enqueue(self, item) -> bool:
+        with self._cond:
+            if self._closed:
+                self._count(dropped=1)
+                return False
+            if len(self._queue) >= self.queue_size:
+                if self.drop_policy == "drop_oldest":
+                    self._queue.popleft()
+                    self._count(dropped=1)
+                elif self.drop_policy == "block":
+                    self._cond.wait_for(lambda: len(self._queue) < self.queue_size, self.block_timeout)
+                if len(self._queue) >= self.queue_size:
+                    self._count(dropped=1)
+                    return False
+            self._queue.append(item)
+            self._count(submitted=1)
+            self._ensure_thread()
+            self._cond.notify_all()
+            return True
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="log-sink-writer", daemon=True)
+            self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._writing = len(batch)
+                self._cond.notify_all()  # Room for blocked producers
+
+            started = time.perf_counter()
+            self._write_batch(batch)
+            elapsed = time.perf_counter() - started
+
+            self._count(batches=1, write_seconds=elapsed)
+            with self._cond:
+                self._writing = 0
+                self._cond.notify_all()
+
+    def _write_batch(self, batch: List[tuple]):
+        # Group lines per target so a JSONL segment is opened once per batch
+        grouped: Dict[str, List[str]] = {}
+        for target, text in batch:
+            if self.log_format == "jsonl":
+                grouped.setdefault(target, []).append(text)
+            else:
+                self._write_file(target, text)
+
+        for target, lines in grouped.items():
+            try:
+                self._append_lines(target, lines)
+            except Exception as e:
+                logger.error(f"[LOG_SINK] Failed to append to {target}: {e}")
+                self._count(write_errors=len(lines))
+
+    def _ensure_dir(self, path: str):
+        directory = os.path.dirname(path)
+        if directory and directory not in self._known_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._known_dirs.add(directory)
+
+    def _write_file(self, target: str, text: str):
+        try:
+            self._ensure_dir(target)
+            data = serialize_record(json.loads(text)).encode("utf-8")
+            if self.compress:
+                data = gzip.compress(data, compresslevel=5)
+            with open(target, "wb") as f:
+                f.write(data)
+            self._count(written=1, bytes_written=len(data))
+        except Exception as e:
+            logger.error(f"[LOG_SINK] Failed to write {target}: {e}")
+            self._count(write_errors=1)
+
+    def _append_lines(self, target: str, lines: List[str]):
+        self._ensure_dir(target)
+        data = "".join(lines).encode("utf-8")
+        # Another process may be rotating the same segment
+        with open(target + ".lock", "a+", encoding="utf-8") as lock:
+            _lock_file(lock)
+            try:
+                try:
+                    size = os.path.getsize(target)
+                except OSError:
+                    size = 0
+                if size and size + len(data) > self.max_bytes:
+                    self._rotate(target)
+                with open(target, "ab") as f:
+                    f.write(data)
+            finally:
+                _unlock_file(lock)
+        self._count(written=len(lines), bytes_written=len(data))
+
+    def _rotate(self, target: str):
+        """Shift target -> target.1 (gzipped when compression is on), dropping the oldest"""
+        suffix = ".gz" if self.compress else ""
+        for index in range(self.backup_count - 1, 0, -1):
+            older = f"{target}.{index}{suffix}"
+            if os.path.exists(older):
+                os.replace(older, f"{target}.{index + 1}{suffix}")
+        if self.compress:
+            with open(target, "rb") as src:
+                data = gzip.compress(src.read(), compresslevel=5)
+            with open(f"{target}.1.gz", "wb") as dst:
+                dst.write(data)
+            os.remove(target)
+        else:
+            os.replace(target, f"{target}.1")
+        self._count(rotations=1)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Wait until every queued record is written; False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._writing, timeout)
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """Write what is queued, then stop the writer thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._queue:
+            logger.warning(f"[LOG_SINK] Closed with {len(self._queue)} unwritten records")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get log sink statistics for monitoring"""
+        with self._cond:
+            queued = len(self._queue)
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {
+            **stats,
+            "write_seconds": round(stats["write_seconds"], 3),
+            "queued": queued,
+            "queue_size": self.queue_size,
+            "drop_policy": self.drop_policy,
+            "format": self.log_format,
+            "compress": self.compress,
+            "sample_rate": self.sample_rate
+        }
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
+def create_log_sink() -> LogSink:
+    """Create a log sink configured from LOG_SINK_* environment variables"""
+    is_development = os.getenv("ENVIRONMENT", "development").lower() in ("development", "dev")
+    return LogSink(
+        queue_size=int(os.getenv("LOG_SINK_QUEUE_SIZE", "1000")),
+        batch_size=int(os.getenv("LOG_SINK_BATCH_SIZE", "64")),
+        drop_policy=os.getenv("LOG_SINK_DROP_POLICY", "drop_new").lower(),
+        log_format=os.getenv("LOG_SINK_FORMAT", "files" if is_development else "jsonl").lower(),
+        compress=_env_flag("LOG_SINK_COMPRESS", False),
+        max_bytes=int(float(os.getenv("LOG_SINK_MAX_MB", "50")) * 1024 * 1024),
+        backup_count=int(os.getenv("LOG_SINK_BACKUP_COUNT", "10")),
+        sample_rate=float(os.getenv("LOG_SINK_SAMPLE_RATE", "1.0" if is_development else "0.01"))
+    )
+
+
+# Singleton instance
+_log_sink = None
+
+
+def get_log_sink() -> LogSink:
+    """Get or create singleton log sink"""
+    global _log_sink
+
+    if _log_sink is None:
+        _log_sink = create_log_sink()
+        atexit.register(_log_sink.close)
+
+    return _log_sink
+
+
+def close_log_sink(timeout: float = 5.0):
+    """Flush and stop the singleton log sink (app shutdown)"""
+    if _log_sink is not None:
+        _log_sink.close(timeout)
@@ -0,0 +1,108 @@
+"""
+File-backed Sequence Allocator
+Hands out unique, increasing integers (e.g. MVP log analysis numbers) without
+scanning a directory:
+
+    - the last allocated value lives in a small counter file, updated under an
+      exclusive OS lock (on a sidecar .lock file), so uvicorn/gunicorn workers
+      sharing the logs directory never receive the same number
+    - the counter is replaced atomically (temp file, fsync, os.replace), so a
+      crash mid-write leaves the old value instead of an empty file that
+      would reseed the numbering
+    - each process reserves a block of numbers per lock round-trip and serves
+      the rest of the block from memory (block_size=1 keeps numbers gapless
+      across workers; larger blocks trade gaps after a restart for fewer
+      locked file writes)
+    - a missing counter file is seeded once from an optional callable (the
+      old directory scan), so existing numbering continues
+"""
+
+import os
+import threading
+from typing import Callable, Optional
+
+try:
+    import fcntl
+
+    def _lock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+except ImportError:  # Windows
+    import msvcrt
+
+    def _lock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class SequenceAllocator:
+    """Atomic, persisted counter with an in-memory fast path"""
+
+    def __init__(self, path: str, block_size: int = 1, seed: Optional[Callable[[], int]] = None):
+        """
+        Args:
+            path: Counter file (created on first use)
+            block_size: Numbers reserved per locked file update
+            seed: Returns the last value already in use; only called when the
+                counter file does not exist yet
+        """
+        self.path = path
+        self.block_size = max(1, block_size)
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._next = 0
+        self._limit = 0  # Exclusive end of the reserved block
+        self.file_updates = 0
+
+    def next(self) -> int:
+        """Allocate the next number"""
+        with self._lock:
+            if self._next >= self._limit:
+                self._next = self._reserve(self.block_size)
+                self._limit = self._next + self.block_size
+            value = self._next
+            self._next += 1
+            return value
+
+    def _reserve(self, count: int) -> int:
+        """Advance the shared counter by count; returns the first reserved value"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # The counter file itself is replaced on every update, so the lock
+        # lives on a file that never changes
+        with open(self.path + ".lock", "a+", encoding="utf-8") as lock:
+            _lock_file(lock)
+            try:
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        content = f.read().strip()
+                except FileNotFoundError:
+                    content = ""
+                if content:
+                    last = int(content)
+                else:
+                    last = self.seed() if self.seed else 0
+                self._write(last + count)
+            finally:
+                _unlock_file(lock)
+
+        self.file_updates += 1
+        return last + 1
+
+    def _write(self, value: int):
+        """Replace the counter file atomically"""
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(str(value))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
@@ -0,0 +1,76 @@
+"""
+Analysis number allocation benchmark
+
+Creates a logs directory with N existing input_*.txt files and times
+allocating analysis numbers with the previous directory scan (glob + parse
+every filename) against MVPStyleLogger's locked counter file. The scan grows
+with the directory; the counter does not.
+
+Usage:
+    python tests/benchmarks/analysis_number_benchmark.py [existing_files] [allocations]
+"""
+
+import glob
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.utils.sequence_allocator import SequenceAllocator
+
+
+def scan_next_number(logs_dir: str) -> int:
+    """The previous get_next_analysis_number implementation"""
+    numbers = []
+    for filename in glob.glob(f"{logs_dir}/input_*.txt"):
+        try:
+            numbers.append(int(os.path.basename(filename).replace("input_", "").replace(".txt", "")))
+        except ValueError:
+            continue
+    return max(numbers) + 1 if numbers else 1
+
+
+def time_calls(label: str, calls: int, allocate) -> float:
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        allocate()
+        timings.append((time.perf_counter() - start) * 1000)
+    median = statistics.median(timings)
+    print(f"⏱️  {label:<34} median {median:9.4f}ms")
+    return median
+
+
+def main():
+    existing = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    allocations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    with tempfile.TemporaryDirectory() as logs_dir:
+        counter_path = os.path.join(logs_dir, ".analysis_number")
+        created = 0
+        results = {}
+        for stage in sorted({existing // 100, existing // 10, existing}):
+            print(f"🧪 {stage} existing input_*.txt files")
+            for number in range(created + 1, stage + 1):
+                open(os.path.join(logs_dir, f"input_{number}.txt"), "w").close()
+            created = stage
+
+            scan = time_calls("directory scan", max(5, allocations // 20), lambda: scan_next_number(logs_dir))
+            if not os.path.exists(counter_path):
+                # Seeded once from the scan, as MVPStyleLogger does
+                SequenceAllocator(counter_path, seed=lambda: scan_next_number(logs_dir) - 1).next()
+            locked = time_calls("locked counter (block 1)", allocations, SequenceAllocator(counter_path).next)
+            blocked = time_calls("locked counter (block 16)", allocations,
+                                 SequenceAllocator(counter_path, block_size=16).next)
+            results[stage] = (scan, locked, blocked)
+
+        scan, locked, blocked = results[existing]
+        print(f"🚀 Per-allocation speedup at {existing} files: {scan / locked:.0f}x (block 1), "
+              f"{scan / blocked:.0f}x (block 16)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Energy timeline benchmark
+
+Builds 96-slot energy timelines for thousands of users with the previous
+per-slot loop (linear block scan per slot + list-comprehension summaries)
+and with the vectorized EnergyTimelineEngine, one call per user and one
+batched call for everyone. Outputs are checked for equality first.
+
+Usage:
+    python tests/benchmarks/energy_timeline_benchmark.py [users]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.utils.energy_timeline import (
+    EnergyTimelineEngine, TimelineDefaults, PEAK_THRESHOLD, MAINTENANCE_THRESHOLD
+)
+
+
+def legacy_timeline(energy_blocks: list, defaults: TimelineDefaults) -> dict:
+    """The per-slot loop previously inlined in _generate_energy_timeline_from_analysis"""
+    blocks = sorted(
+        ({'start': s, 'end': e, 'energy': level, 'zone': zone} for s, e, level, zone in energy_blocks),
+        key=lambda x: x['start']
+    )
+
+    def get_energy_for_slot(slot_minutes):
+        for block in blocks:
+            if block['start'] <= slot_minutes < block['end']:
+                return block['energy'], block['zone']
+        prev_block = next_block = None
+        for block in blocks:
+            if block['end'] <= slot_minutes:
+                prev_block = block
+            elif block['start'] > slot_minutes:
+                next_block = block
+                break
+        if prev_block and next_block:
+            progress = (slot_minutes - prev_block['end']) / (next_block['start'] - prev_block['end'])
+            energy = prev_block['energy'] + ((next_block['energy'] - prev_block['energy']) * progress)
+            zone = 'peak' if energy >= PEAK_THRESHOLD else 'maintenance' if energy >= MAINTENANCE_THRESHOLD else 'recovery'
+            return round(energy), zone
+        hour = slot_minutes // 60
+        if hour < 6:
+            return defaults.early_morning, 'recovery'
+        if hour >= 22:
+            return defaults.late_night, 'recovery'
+        return defaults.unspecified, 'maintenance'
+
+    timeline = []
+    for slot_index in range(96):
+        m = slot_index * 15
+        energy, zone = get_energy_for_slot(m)
+        timeline.append({"time": f"{m // 60:02d}:{m % 60:02d}", "energy_level": energy,
+                         "slot_index": slot_index, "zone": zone})
+
+    def periods(zone_filter):
+        result, start_idx = [], None
+        for i, slot in enumerate(timeline):
+            if slot['zone'] == zone_filter:
+                if start_idx is None:
+                    start_idx = i
+            elif start_idx is not None:
+                result.append(f"{timeline[start_idx]['time']}-{timeline[i - 1]['time']}")
+                start_idx = None
+        if start_idx is not None:
+            result.append(f"{timeline[start_idx]['time']}-{timeline[-1]['time']}")
+        return result
+
+    wake_window = None
+    for i in range(len(timeline) - 3):
+        if all(timeline[i + j]['energy_level'] > 50 for j in range(3)):
+            wake_window = f"{timeline[i]['time']}-{timeline[min(i + 4, 95)]['time']}"
+            break
+
+    return {
+        "energy_timeline": timeline,
+        "peak": periods('peak'),
+        "maintenance": periods('maintenance'),
+        "recovery": periods('recovery'),
+        "total_peak_minutes": sum(1 for s in timeline if s['zone'] == 'peak') * 15,
+        "wake_window": wake_window,
+    }
+
+
+def engine_timeline(engine: EnergyTimelineEngine, energy, zones) -> dict:
+    periods = engine.zone_periods(zones)
+    return {
+        "energy_timeline": engine.to_slots(energy, zones),
+        "peak": periods['peak'],
+        "maintenance": periods['maintenance'],
+        "recovery": periods['recovery'],
+        "total_peak_minutes": engine.zone_minutes(zones, 'peak'),
+        "wake_window": engine.wake_window(energy),
+    }
+
+
+def random_blocks(rng: random.Random) -> list:
+    blocks = []
+    for level, zone in ((85, 'peak'), (60, 'maintenance'), (35, 'recovery')):
+        for _ in range(rng.randint(0, 2)):
+            start = rng.randrange(0, 22 * 60, 15)
+            blocks.append((start, start + rng.randrange(30, 240, 15), level, zone))
+    return blocks
+
+
+async def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(42)
+    block_sets = [random_blocks(rng) for _ in range(users)]
+    defaults = TimelineDefaults()
+    engine = EnergyTimelineEngine(15)
+
+    for blocks in block_sets[:200]:
+        energy, zones = engine.paint([blocks], defaults)
+        assert engine_timeline(engine, energy[0], zones[0]) == legacy_timeline(blocks, defaults)
+
+    start = time.perf_counter()
+    for blocks in block_sets:
+        legacy_timeline(blocks, defaults)
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for blocks in block_sets:
+        energy, zones = engine.paint([blocks], defaults)
+        engine_timeline(engine, energy[0], zones[0])
+    per_user_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    energy, zones = engine.paint(block_sets, defaults)
+    paint_only_s = time.perf_counter() - start
+    for row in range(users):
+        engine_timeline(engine, energy[row], zones[row])
+    batch_s = time.perf_counter() - start
+
+    fine_engine = EnergyTimelineEngine(5)
+    start = time.perf_counter()
+    fine_engine.paint(block_sets, defaults)
+    fine_paint_s = time.perf_counter() - start
+
+    print(f"⚡ Energy timelines for {users} users (96 x 15-min slots)")
+    print(f"{'':<34}{'total':>10}{'per user':>12}{'speedup':>10}")
+    for label, seconds in (
+        ("legacy per-slot loop", legacy_s),
+        ("engine, one call per user", per_user_s),
+        ("engine, one batch + summaries", batch_s),
+        ("engine, batch painting only", paint_only_s),
+        ("engine, batch painting, 5-min", fine_paint_s),
+    ):
+        print(f"{label:<34}{seconds * 1000:>8.0f}ms{seconds / users * 1e6:>10.1f}µs{legacy_s / seconds:>9.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+HTTP client pool microbenchmark
+
+Compares a fresh httpx.AsyncClient per request (the old HealthDataClient /
+SahhaClient behaviour) against the shared keep-alive pool in shared_libs.http,
+using a local stub server so only transport overhead is measured.
+
+Usage:
+    python tests/benchmarks/http_pool_benchmark.py [requests]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+from aiohttp import web
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.http.client_pool import get_http_client, close_http_pool
+
+
+async def _start_stub_server() -> tuple:
+    """Start a local stub of the upstream biomarker endpoint"""
+    async def biomarkers(request):
+        return web.json_response([{"id": "1", "profile_id": "p", "category": "sleep", "type": "sleep_duration"}])
+
+    app = web.Application()
+    app.router.add_get('/api/v1/profile/biomarker/{external_id}', biomarkers)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def _per_request_client(base_url: str, n: int) -> list:
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.get(f"{base_url}/api/v1/profile/biomarker/bench")
+            response.json()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def _pooled_client(base_url: str, n: int) -> list:
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        client = get_http_client(base_url)
+        response = await client.get(f"{base_url}/api/v1/profile/biomarker/bench")
+        response.json()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _summarize(timings: list) -> dict:
+    ordered = sorted(timings)
+    return {
+        "mean_ms": statistics.mean(ordered),
+        "p50_ms": ordered[len(ordered) // 2],
+        "p99_ms": ordered[int(len(ordered) * 0.99) - 1],
+    }
+
+
+async def main(n: int = 500):
+    runner, base_url = await _start_stub_server()
+    try:
+        # Warm up both paths once so import/first-connect cost is excluded
+        await _per_request_client(base_url, 5)
+        await _pooled_client(base_url, 5)
+
+        fresh = _summarize(await _per_request_client(base_url, n))
+        pooled = _summarize(await _pooled_client(base_url, n))
+    finally:
+        await close_http_pool()
+        await runner.cleanup()
+
+    print(f"🔌 HTTP transport benchmark ({n} sequential requests against {base_url})")
+    print(f"{'':<22}{'mean':>10}{'p50':>10}{'p99':>10}")
+    for label, stats in (("client per request", fresh), ("shared pool", pooled)):
+        print(f"{label:<22}{stats['mean_ms']:>9.2f}ms{stats['p50_ms']:>8.2f}ms{stats['p99_ms']:>8.2f}ms")
+    print(f"⚡ Saved per request: {fresh['mean_ms'] - pooled['mean_ms']:.2f}ms "
+          f"({fresh['mean_ms'] / max(pooled['mean_ms'], 1e-9):.1f}x faster)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
@@ -0,0 +1,93 @@
+"""
+Log sink benchmark
+
+Simulates the debug logging of one routine request (input, output, raw health
+data and three agent handoffs, each a realistically sized payload) and
+measures the time the request path spends on it: first with the previous
+synchronous open/json.dump/close per file, then through the background log
+sink. Everything is written under a temporary directory.
+
+Usage:
+    python tests/benchmarks/log_sink_benchmark.py [requests] [payload_kb]
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.utils.log_sink import LogSink
+
+FILES_PER_REQUEST = ("input", "output", "raw_health", "handoff_1", "handoff_2", "handoff_3")
+
+
+def make_payload(payload_kb: int) -> dict:
+    biomarkers = [
+        {"type": "sleep_duration", "value": 420 + i, "unit": "minute", "startDateTime": "2026-10-01T00:00:00Z"}
+        for i in range(payload_kb * 1024 // 100)
+    ]
+    return {"user_id": "bench-user", "data": {"biomarkers": biomarkers}}
+
+
+def sync_request(directory: str, request_id: int, payload: dict):
+    for name in FILES_PER_REQUEST:
+        with open(os.path.join(directory, f"{name}_{request_id}.json"), 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2, default=str, ensure_ascii=False)
+
+
+def sink_request(sink: LogSink, directory: str, request_id: int, payload: dict):
+    for name in FILES_PER_REQUEST:
+        sink.submit(os.path.join(directory, f"{name}_{request_id}.json"), payload,
+                    sample_key=request_id, payload_fields=("data",))
+
+
+def measure(label: str, requests: int, run) -> list:
+    timings = []
+    for request_id in range(requests):
+        start = time.perf_counter()
+        run(request_id)
+        timings.append((time.perf_counter() - start) * 1000)
+    p95 = sorted(timings)[int(len(timings) * 0.95) - 1]
+    print(f"⏱️  {label:<32} median {statistics.median(timings):6.2f}ms   p95 {p95:6.2f}ms")
+    return timings
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    payload_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    payload = make_payload(payload_kb)
+
+    print(f"🧪 {requests} requests x {len(FILES_PER_REQUEST)} log files (~{payload_kb}KB payloads)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        sync_dir = os.path.join(directory, "sync")
+        os.makedirs(sync_dir)
+        sync_times = measure("synchronous json.dump", requests,
+                             lambda i: sync_request(sync_dir, i, payload))
+
+        results = {}
+        for label, sink in (
+            ("log sink (files, all payloads)", LogSink(queue_size=10000)),
+            ("log sink (jsonl, 1% sampled)", LogSink(queue_size=10000, log_format="jsonl", sample_rate=0.01)),
+        ):
+            sink_dir = os.path.join(directory, label.split()[2].strip("(,"))
+            results[label] = measure(label, requests, lambda i: sink_request(sink, sink_dir, i, payload))
+            start = time.perf_counter()
+            sink.flush(60)
+            stats = sink.get_stats()
+            print(f"   📝 writer drained in {time.perf_counter() - start:.2f}s after the requests, "
+                  f"{stats['written']} written, {stats['dropped']} dropped, {stats['sampled_out']} sampled out")
+            sink.close()
+
+    for label, timings in results.items():
+        saved = statistics.median(sync_times) - statistics.median(timings)
+        print(f"🚀 {label}: {saved:.2f}ms less logging time per request "
+              f"({statistics.median(sync_times) / statistics.median(timings):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+LRU cache benchmark
+
+Measures get/set throughput with 100k live entries for the previous
+RLock-guarded cache (reproduced below), ThreadSafeLRUCache and the
+lock-free LRUCache, then checks eviction correctness at that size: the byte
+budget holds, the tracked byte count matches the entries, the most recently
+used entries survive and expired entries are reclaimed by the timer wheel.
+
+Usage:
+    python tests/benchmarks/lru_cache_benchmark.py [entries]
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.caching.lru_cache import LRUCache, ThreadSafeLRUCache, estimate_size
+
+ROUNDS = 3  # Best of, to damp scheduler noise
+
+
+class PreviousLRUCache:
+    """The cache before byte accounting: RLock, pop/reinsert, timestamp dict"""
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.cache = OrderedDict()
+        self.timestamps = {}
+        self.lock = threading.RLock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.cache:
+                return None
+            if time.time() - self.timestamps[key] > self.ttl_seconds:
+                self.cache.pop(key, None)
+                self.timestamps.pop(key, None)
+                return None
+            value = self.cache.pop(key)
+            self.cache[key] = value
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            if key in self.cache:
+                self.cache.pop(key)
+                self.timestamps.pop(key, None)
+            self.cache[key] = value
+            self.timestamps[key] = time.time()
+            while len(self.cache) > self.max_size:
+                oldest_key = next(iter(self.cache))
+                self.cache.pop(oldest_key, None)
+                self.timestamps.pop(oldest_key, None)
+
+
+def make_value(i: int) -> dict:
+    return {"id": i, "type": "sleep_duration", "value": 420 + i % 60, "unit": "minute"}
+
+
+def throughput(label: str, cache, entries: int, keys: list, values: list):
+    for key, value in zip(keys, values):
+        cache.set(key, value)
+
+    reads = random.Random(7).choices(keys, k=entries)
+    get_rate = set_rate = 0.0
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for key in reads:
+            cache.get(key)
+        get_rate = max(get_rate, entries / (time.perf_counter() - start))
+
+        start = time.perf_counter()
+        for key, value in zip(keys, values):
+            cache.set(key, value)
+        set_rate = max(set_rate, entries / (time.perf_counter() - start))
+
+    print(f"⏱️  {label:<30} get {get_rate / 1e6:5.2f}M ops/s   set {set_rate / 1e6:5.2f}M ops/s")
+
+
+def check_eviction(entries: int, keys: list, values: list):
+    value_size = estimate_size(values[0])
+    budget = value_size * entries // 2
+    cache = LRUCache(max_size=entries, ttl_seconds=600, max_bytes=budget)
+    for key, value in zip(keys, values):
+        cache.set(key, value)
+
+    survivors = [key for key in keys if cache.get(key) is not None]
+    tracked = sum(estimate_size(cache.get(key)) for key in survivors)
+    assert cache.total_bytes <= budget, "byte budget exceeded"
+    assert cache.total_bytes == tracked, "byte accounting drifted"
+    assert survivors == keys[-len(survivors):], "evicted entries were not the least recently used"
+    print(f"✅ Byte budget {budget / 1024 / 1024:.1f}MB held: {len(survivors)} of {entries} entries kept, "
+          f"all most recently used")
+
+    cache = LRUCache(max_size=entries, ttl_seconds=0.2)
+    for key, value in zip(keys, values):
+        cache.set(key, value)
+    time.sleep(0.25)
+    start = time.perf_counter()
+    cache.set("trigger", 1)
+    reclaim_ms = (time.perf_counter() - start) * 1000
+    assert len(cache) == 1 and cache.total_bytes == estimate_size(1), "expired entries not reclaimed"
+    print(f"✅ Timer wheel reclaimed {entries} expired entries in {reclaim_ms:.1f}ms")
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    keys = [f"user-{i}:7days" for i in range(entries)]
+    values = [make_value(i) for i in range(entries)]
+
+    print(f"🧪 {entries} entries")
+    throughput("previous cache (RLock)", PreviousLRUCache(entries, 600), entries, keys, values)
+    throughput("ThreadSafeLRUCache", ThreadSafeLRUCache(entries, 600), entries, keys, values)
+    throughput("LRUCache (estimated sizes)", LRUCache(entries, 600), entries, keys, values)
+    throughput("LRUCache (fixed sizeof)", LRUCache(entries, 600, sizeof=lambda value: 256),
+               entries, keys, values)
+
+    print()
+    check_eviction(entries, keys, values)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Memory snapshot benchmark
+
+Compares retrieving the four memory layers one after another (old
+insights path) with retrieve_memory_snapshot (one statement, one pooled
+connection).
+
+By default each query costs a simulated database round trip. Set
+MEMORY_BENCHMARK_DATABASE_URL to a local Postgres that has
+documentation/database_scripts/memory_system_tables.sql applied to measure
+real queries instead.
+
+Usage:
+    python tests/benchmarks/memory_snapshot_benchmark.py
+    MEMORY_BENCHMARK_DATABASE_URL=postgresql://localhost/holisticos python tests/benchmarks/memory_snapshot_benchmark.py
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from services.agents.memory.memory_layers import MEMORY_LAYERS, MemoryLayerFactory, retrieve_memory_snapshot
+
+ROUND_TRIP_SECONDS = 0.004  # Simulated app <-> database latency
+RUNS = 50
+
+
+class SimulatedConnection:
+    async def fetch(self, query, *args):
+        await asyncio.sleep(ROUND_TRIP_SECONDS)
+        return []
+
+    async def fetchrow(self, query, *args):
+        await asyncio.sleep(ROUND_TRIP_SECONDS)
+        if "WITH working AS" in query:
+            return {layer: "[]" for layer in MEMORY_LAYERS}
+        return None
+
+
+class SimulatedAcquire:
+    async def __aenter__(self):
+        await asyncio.sleep(ROUND_TRIP_SECONDS / 4)  # Pool checkout
+        return SimulatedConnection()
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class SimulatedPool:
+    def acquire(self):
+        return SimulatedAcquire()
+
+
+async def sequential_layers(pool, user_id: str):
+    return {
+        layer: await MemoryLayerFactory.create_layer(layer, pool).retrieve(user_id)
+        for layer in MEMORY_LAYERS
+    }
+
+
+async def measure(fn, pool, user_id: str) -> float:
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        await fn(pool, user_id)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def main():
+    database_url = os.getenv("MEMORY_BENCHMARK_DATABASE_URL")
+    if database_url:
+        import asyncpg
+        pool = await asyncpg.create_pool(database_url, min_size=1, max_size=4)
+        print(f"🐘 Using Postgres at {database_url}")
+    else:
+        pool = SimulatedPool()
+        print(f"🧪 Simulated pool ({ROUND_TRIP_SECONDS * 1000:.0f}ms round trip)")
+
+    user_id = "benchmark-user"
+    try:
+        sequential = await measure(sequential_layers, pool, user_id)
+        snapshot = await measure(retrieve_memory_snapshot, pool, user_id)
+    finally:
+        if database_url:
+            await pool.close()
+
+    print(f"\n📊 Memory retrieval, median of {RUNS} runs")
+    print(f"   Sequential layers: {sequential:.2f}ms")
+    print(f"   Snapshot:          {snapshot:.2f}ms")
+    print(f"   🚀 Speedup:        {sequential / snapshot:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+"""
+Sahha fetch benchmark
+
+Starts a local stub Sahha server (fixed latency, server-side rate limit that
+answers 429 + Retry-After) and fetches biomarkers for a few users with the
+previous sequential loop (fixed 0.5s sleep per category) and with the
+concurrent, rate-controlled SahhaClient. Reports wall time, 429s received and
+the peak request rate the server saw (politeness).
+
+Usage:
+    python tests/benchmarks/sahha_fetch_benchmark.py [users] [server_rps]
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from collections import deque
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from shared_libs.http.client_pool import get_http_client, close_http_pool
+
+LATENCY = 0.08           # Simulated Sahha response time
+CATEGORIES = ["activity", "sleep", "vitals"]
+DAYS = 14
+
+
+class StubSahhaServer:
+    """Stub Sahha API with a sliding one-second rate limit"""
+
+    def __init__(self, max_rps: int):
+        self.max_rps = max_rps
+        self.requests = deque()
+        self.throttled = 0
+        self.peak_rps = 0
+        self.app = FastAPI()
+
+        @self.app.post("/api/v1/oauth/account/token")
+        async def token():
+            return {"accountToken": "stub-token"}
+
+        @self.app.get("/api/v1/profile/biomarker/{external_id}")
+        async def biomarkers(external_id: str, request: Request):
+            now = time.monotonic()
+            while self.requests and self.requests[0] <= now - 1:
+                self.requests.popleft()
+            if len(self.requests) >= self.max_rps:
+                self.throttled += 1
+                return JSONResponse([], status_code=429, headers={"Retry-After": "1"})
+            self.requests.append(now)
+            self.peak_rps = max(self.peak_rps, len(self.requests))
+            await asyncio.sleep(LATENCY)
+            category = request.query_params.get("categories")
+            return [{"category": category, "type": f"{category}_metric", "value": 1}] * 20
+
+    def start(self) -> str:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="error"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return f"http://127.0.0.1:{port}"
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join()
+
+    def reset(self):
+        self.requests.clear()
+        self.throttled = 0
+        self.peak_rps = 0
+
+
+async def legacy_fetch(base_url: str, external_id: str) -> int:
+    """The previous fetch_biomarkers loop: one category at a time, fixed sleep, 429 = skip"""
+    client = get_http_client(base_url)
+    count = 0
+    for category in CATEGORIES:
+        await asyncio.sleep(0.5)
+        response = await client.get(
+            f"{base_url}/api/v1/profile/biomarker/{external_id}",
+            params={"categories": [category]}
+        )
+        if response.status_code == 200:
+            count += len(response.json())
+        elif response.status_code == 429:
+            await asyncio.sleep(int(response.headers.get("Retry-After", 2)))
+    return count
+
+
+async def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    server_rps = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    logging.basicConfig(level=logging.ERROR)
+
+    stub = StubSahhaServer(server_rps)
+    base_url = stub.start()
+    os.environ["SAHHA_API_BASE_URL"] = base_url
+    os.environ["SAHHA_FETCH_WINDOW_DAYS"] = str(DAYS)
+    from services.sahha.sahha_client import SahhaClient
+
+    print(f"🧪 {users} users x {len(CATEGORIES)} categories, {LATENCY * 1000:.0f}ms latency, server limit {server_rps} req/s")
+
+    try:
+        # Single analysis request: the latency a user waits for
+        start = time.perf_counter()
+        await legacy_fetch(base_url, "single-user")
+        legacy_single = time.perf_counter() - start
+        start = time.perf_counter()
+        await SahhaClient().fetch_biomarkers("single-user", days=DAYS)
+        print(f"👤 One user: sequential {legacy_single:.2f}s -> concurrent {time.perf_counter() - start:.2f}s")
+        await asyncio.sleep(1)  # Let the server's rate window drain
+
+        start = time.perf_counter()
+        counts = await asyncio.gather(*(legacy_fetch(base_url, f"user-{i}") for i in range(users)))
+        legacy_seconds = time.perf_counter() - start
+        print(f"🐢 Sequential + fixed sleep: {legacy_seconds:.2f}s, {sum(counts)} biomarkers, "
+              f"{stub.throttled} x 429 (skipped), peak {stub.peak_rps} req/s")
+
+        for rps in (server_rps, server_rps * 2):
+            stub.reset()
+            os.environ["SAHHA_RATE_LIMIT_RPS"] = str(rps)
+            client = SahhaClient()
+            start = time.perf_counter()
+            results = await asyncio.gather(*(client.fetch_biomarkers(f"user-{i}", days=DAYS) for i in range(users)))
+            seconds = time.perf_counter() - start
+            print(f"⚡ Concurrent, bucket at {rps} req/s: {seconds:.2f}s, {sum(len(r) for r in results)} biomarkers, "
+                  f"{stub.throttled} x 429 (retried), peak {stub.peak_rps} req/s, "
+                  f"final rate {client.rate_controller.rate:.1f} req/s")
+    finally:
+        await close_http_pool()
+        stub.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+Supabase executor concurrency benchmark
+
+Measures p50/p99 latency of a cheap endpoint while a heavy PostgREST query is
+in flight, comparing a blocking `.execute()` on the event loop (old behaviour)
+against shared_libs.supabase_client.async_executor.execute_async.
+
+The "query" is a stand-in builder whose .execute() blocks like the sync
+supabase-py client does, so no database is needed.
+
+Usage:
+    python tests/benchmarks/supabase_executor_benchmark.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.supabase_client.async_executor import execute_async, shutdown_executor
+
+
+class FakeQuery:
+    """Mimics a supabase-py request builder: .execute() blocks for `seconds`"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def execute(self):
+        time.sleep(self.seconds)
+        return {"data": []}
+
+
+async def heavy_endpoint(non_blocking: bool, rounds: int):
+    for _ in range(rounds):
+        query = FakeQuery(0.25)
+        if non_blocking:
+            await execute_async(query)
+        else:
+            query.execute()
+        await asyncio.sleep(0)
+
+
+async def cheap_endpoint(samples: list, requests: int):
+    for _ in range(requests):
+        start = time.perf_counter()
+        await asyncio.sleep(0.005)  # e.g. a cached lookup
+        samples.append((time.perf_counter() - start) * 1000)
+
+
+async def run_scenario(non_blocking: bool) -> dict:
+    samples = []
+    await asyncio.gather(
+        heavy_endpoint(non_blocking, rounds=8),
+        cheap_endpoint(samples, requests=100),
+    )
+    samples.sort()
+    return {
+        "p50_ms": samples[len(samples) // 2],
+        "p99_ms": samples[int(len(samples) * 0.99) - 1],
+        "max_ms": samples[-1],
+    }
+
+
+async def main():
+    blocking = await run_scenario(non_blocking=False)
+    threaded = await run_scenario(non_blocking=True)
+    shutdown_executor()
+
+    print("🗄️  Cheap-endpoint latency while a 250ms query runs")
+    print(f"{'':<26}{'p50':>10}{'p99':>10}{'max':>10}")
+    for label, stats in (("blocking .execute()", blocking), ("execute_async()", threaded)):
+        print(f"{label:<26}{stats['p50_ms']:>8.1f}ms{stats['p99_ms']:>8.1f}ms{stats['max_ms']:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,185 @@
+"""
+Unit tests for the set-based admin users listing
+"""
+import asyncio
+import pytest
+import sys
+import os
+
+from fastapi import HTTPException
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from services.api_gateway import admin_apis
+from services.api_gateway.admin_apis import get_admin_users_list
+
+
+class FakeResult:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.ops = []
+        self.counting = False
+
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            if name == "select" and kwargs.get("count"):
+                self.counting = True
+            self.ops.append((name, args, kwargs))
+            return self
+        return record
+
+    def execute(self):
+        self.client.queries.append(self)
+        if self.table == "admin_user_summaries" and self.client.view_missing:
+            raise Exception('relation "public.admin_user_summaries" does not exist')
+        if self.counting:
+            return FakeResult([], count=len(self.client.tables[self.table]))
+        rows = self.client.tables[self.table]
+        for name, args, _ in self.ops:
+            if name == "range":
+                rows = rows[args[0]:args[1] + 1]
+            elif name == "limit":
+                rows = rows[:args[0]]
+        return FakeResult(rows)
+
+
+class FakeSupabase:
+    def __init__(self, users, view_missing=False):
+        self.view_missing = view_missing
+        self.queries = []
+        self.tables = {
+            "admin_user_summaries": [
+                {"id": f"user-{i:04d}", "data": {"name": f"User {i}", "age": "30"},
+                 "created_at": f"2026-10-{16 - i % 10:02d}T00:00:00+00:00", "total_analyses": i % 3,
+                 "last_analysis_at": "2026-10-15T12:00:00+00:00" if i % 3 else None,
+                 "last_analysis_sort": "2026-10-15T12:00:00+00:00" if i % 3 else "-infinity",
+                 "latest_archetype": "Foundation Builder" if i % 3 else None}
+                for i in range(users)
+            ],
+            "profiles": [
+                {"id": f"user-{i:04d}", "data": {"name": f"User {i}"}, "created_at": "2026-10-16T00:00:00+00:00"}
+                for i in range(users)
+            ],
+            "holistic_analysis_results": [
+                {"user_id": "user-0000", "archetype": "Peak Performer", "created_at": "2026-10-15T00:00:00+00:00"},
+                {"user_id": "user-0000", "archetype": "Foundation Builder", "created_at": "2026-10-14T00:00:00+00:00"}
+            ]
+        }
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+def list_users(supabase, monkeypatch, **params):
+    monkeypatch.setattr(admin_apis, "_get_supabase", lambda: supabase)
+    defaults = dict(limit=50, offset=0, status=None, cursor=None, sort="created", order="desc",
+                    search=None, archetype=None)
+    return asyncio.run(get_admin_users_list(**{**defaults, **params}))
+
+
+class TestAdminUsersList:
+    """Test the users page stays a constant number of queries"""
+
+    @pytest.mark.parametrize("users", [10, 500])
+    def test_query_count_is_flat(self, monkeypatch, users):
+        """Test a page is one view query plus one count, whatever the user count"""
+        supabase = FakeSupabase(users)
+        response = list_users(supabase, monkeypatch, limit=200)
+
+        assert len(supabase.queries) == 2
+        assert response.total_count == users
+        assert len(response.users) == min(users, 200)
+        assert response.has_more == (users > 200)
+        assert response.users[1].total_analyses == 1 and response.users[1].age == 30
+
+    def test_keyset_cursor_round_trip(self, monkeypatch):
+        """Test next_cursor encodes the last row and becomes a keyset filter"""
+        supabase = FakeSupabase(30)
+        first = list_users(supabase, monkeypatch, limit=10, sort="last_analysis")
+        assert first.has_more and first.next_cursor
+
+        supabase.queries.clear()
+        list_users(supabase, monkeypatch, limit=10, sort="last_analysis", cursor=first.next_cursor)
+        page_query = next(q for q in supabase.queries if not q.counting)
+        keyset = next(args[0] for name, args, _ in page_query.ops if name == "or_")
+        # user-0009 has no analyses: its non-null sort key keeps the keyset comparable
+        assert keyset == 'last_analysis_sort.lt."-infinity",and(last_analysis_sort.eq."-infinity",id.lt."user-0009")'
+        assert ("order", ("last_analysis_sort",), {"desc": True}) in page_query.ops
+
+    def test_cursor_values_are_escaped(self, monkeypatch):
+        """Test quotes in a cursor stay inside the filter value and the page emits one limit"""
+        supabase = FakeSupabase(3)
+        cursor = admin_apis._encode_cursor('x"),id.neq.("', 'user-"\\')
+        list_users(supabase, monkeypatch, limit=2, sort="created", cursor=cursor)
+
+        page_query = next(query for query in supabase.queries if not query.counting)
+        keyset = next(args[0] for name, args, _ in page_query.ops if name == "or_")
+        assert keyset == ('created_at.lt."x\\"),id.neq.(\\"",'
+                          'and(created_at.eq."x\\"),id.neq.(\\"",id.lt."user-\\"\\\\")')
+        names = [name for name, _, _ in page_query.ops]
+        assert names.count("limit") == 1 and "range" not in names
+
+        with pytest.raises(HTTPException) as error:
+            list_users(supabase, monkeypatch, cursor=admin_apis._encode_cursor({"a": 1}, "user-1"))
+        assert error.value.status_code == 400
+
+    def test_first_page_uses_range_only(self, monkeypatch):
+        """Test offset pages fetch one extra row through range() without a second limit"""
+        supabase = FakeSupabase(5)
+        response = list_users(supabase, monkeypatch, limit=2, offset=1)
+
+        page_query = next(query for query in supabase.queries if not query.counting)
+        assert ("range", (1, 3), {}) in page_query.ops
+        assert "limit" not in [name for name, _, _ in page_query.ops]
+        assert [user.id for user in response.users] == ["user-0001", "user-0002"]
+        assert response.next_cursor
+
+    def test_filters_apply_to_page_and_count(self, monkeypatch):
+        """Test search/archetype/status filter both the page and the total count"""
+        supabase = FakeSupabase(5)
+        list_users(supabase, monkeypatch, search="Ada", archetype="Peak Performer", status="active", order="asc")
+        for query in supabase.queries:
+            names = [(name, args) for name, args, _ in query.ops]
+            assert ("ilike", ("search_text", "*ada*")) in names
+            assert ("eq", ("latest_archetype", "Peak Performer")) in names
+            assert ("gt", ("total_analyses", 0)) in names
+
+    def test_search_wildcards_are_escaped(self, monkeypatch):
+        """Test % and _ in a search match literally instead of as LIKE wildcards"""
+        supabase = FakeSupabase(1)
+        list_users(supabase, monkeypatch, search="100%_Ada\\")
+        names = [(name, args) for name, args, _ in supabase.queries[0].ops]
+        assert ("ilike", ("search_text", "*100\\%\\_ada\\\\*")) in names
+
+    def test_invalid_parameters(self, monkeypatch):
+        """Test unknown sort columns and malformed cursors are rejected"""
+        supabase = FakeSupabase(1)
+        with pytest.raises(HTTPException) as error:
+            list_users(supabase, monkeypatch, sort="password")
+        assert error.value.status_code == 400
+        with pytest.raises(HTTPException) as error:
+            list_users(supabase, monkeypatch, cursor="not-a-cursor")
+        assert error.value.status_code == 400
+
+    def test_fallback_without_view(self, monkeypatch):
+        """Test the batched fallback aggregates analyses for the page in one in_() query"""
+        supabase = FakeSupabase(3, view_missing=True)
+        response = list_users(supabase, monkeypatch)
+
+        tables = [query.table for query in supabase.queries]
+        assert tables.count("holistic_analysis_results") == 1
+        first = response.users[0]
+        assert first.total_analyses == 2 and first.latest_archetype == "Peak Performer"
+        assert response.users[1].total_analyses == 0 and not response.users[1].has_health_data
+
+        with pytest.raises(HTTPException) as error:
+            list_users(supabase, monkeypatch, sort="name")
+        assert error.value.status_code == 501
@@ -0,0 +1,241 @@
+"""
+Unit tests for batched Sahha archival (dedupe, chunking, bisection)
+"""
+import asyncio
+import pytest
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from postgrest.exceptions import APIError
+
+from services.background import archival_service as archival_module
+from services.background.archival_service import ArchivalService
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, client, table, rows, on_conflict):
+        self.client = client
+        self.table = table
+        self.rows = rows
+        self.on_conflict = on_conflict
+
+    def execute(self):
+        self.client.calls.append((self.table, len(self.rows)))
+        if self.client.outages:
+            self.client.outages -= 1
+            raise ConnectionError("connection reset by peer")
+        if any(row.get("value") == "bad" for row in self.rows):
+            raise APIError({"code": "22P02", "message": "invalid input syntax"})
+        keys = self.on_conflict.split(",")
+        seen = set()
+        for row in self.rows:
+            key = tuple(row.get(k) for k in keys)
+            if key in seen:
+                raise APIError({"code": "21000", "message": "ON CONFLICT DO UPDATE command cannot affect row a second time"})
+            seen.add(key)
+        return FakeResult(list(self.rows))
+
+
+class FakeTable:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def upsert(self, rows, on_conflict):
+        return FakeQuery(self.client, self.name, rows, on_conflict)
+
+
+class FakeSupabase:
+    def __init__(self, outages=0):
+        self.calls = []
+        self.outages = outages
+
+    def table(self, name):
+        return FakeTable(self, name)
+
+
+def biomarker(i, value=1):
+    return {
+        "id": f"bio-{i}", "category": "sleep", "type": "sleep_duration", "value": value,
+        "unit": "minute", "startDateTime": f"2025-01-01T00:{i % 60:02d}:00", "endDateTime": f"2025-01-02T{i // 60:02d}:00:00"
+    }
+
+
+class TestBatchedArchival:
+    """Test biomarker/score archival writes"""
+
+    def test_records_are_written_in_chunks(self):
+        """Test one upsert per chunk instead of one per record"""
+        service = ArchivalService(batch_size=100)
+        supabase = FakeSupabase()
+        stored, failed = asyncio.run(service._store_biomarkers(supabase, "user", [biomarker(i) for i in range(250)]))
+
+        assert (len(stored), len(failed)) == (250, 0)
+        assert supabase.calls == [("biomarkers", 100), ("biomarkers", 100), ("biomarkers", 50)]
+
+    def test_duplicates_are_dropped_before_writing(self):
+        """Test rows sharing conflict keys collapse to the last one"""
+        service = ArchivalService(batch_size=100)
+        supabase = FakeSupabase()
+        records = [biomarker(1, value=10), biomarker(2), biomarker(1, value=20)]
+        stored, _ = asyncio.run(service._store_biomarkers(supabase, "user", records))
+
+        assert len(stored) == 2
+        assert service.stats["duplicates_dropped"] == 1
+        deduped = service._dedupe(
+            [service._normalize_biomarker("user", r, "now") for r in records], service.BIOMARKER_CONFLICT_KEYS
+        )
+        assert [row["value"] for row in deduped] == [1, 20]
+
+    def test_bad_row_is_isolated_by_bisection(self):
+        """Test a failing chunk is bisected so only the bad row is skipped"""
+        service = ArchivalService(batch_size=64)
+        supabase = FakeSupabase()
+        records = [biomarker(i) for i in range(64)]
+        records[37]["value"] = "bad"
+        stored, failed = asyncio.run(service._store_biomarkers(supabase, "user", records))
+
+        assert (len(stored), len(failed)) == (63, 1)
+        assert service.stats["rows_failed"] == 1
+        # 1 chunk + 2 calls per level of a 6-level bisection - far fewer than 64 per-row writes
+        assert len(supabase.calls) == 1 + 2 * 6
+        assert service.stats["bisections"] == 6
+
+    def test_scores_use_score_conflict_keys(self):
+        """Test scores dedupe on (profile_id, type, score_date_time)"""
+        service = ArchivalService()
+        supabase = FakeSupabase()
+        scores = [
+            {"id": "s1", "type": "sleep", "score": 0.7, "scoreDateTime": "2025-01-01", "state": "medium"},
+            {"id": "s2", "type": "sleep", "score": 0.8, "scoreDateTime": "2025-01-01", "state": "high"},
+            {"id": "s3", "type": "activity", "score": 0.5, "scoreDateTime": "2025-01-01", "state": "low"},
+        ]
+        stored, _ = asyncio.run(service._store_scores(supabase, "user", scores))
+
+        assert len(stored) == 2
+        assert supabase.calls == [("scores", 2)]
+
+    def test_archive_reports_throughput(self, monkeypatch):
+        """Test archive_sahha_data returns counts and rows/second"""
+        service = ArchivalService(batch_size=50)
+        supabase = FakeSupabase()
+        monkeypatch.setattr(service, "_get_supabase", lambda: supabase)
+
+        async def no_status(*args, **kwargs):
+            return None
+
+        monkeypatch.setattr(service, "_update_sync_status", no_status)
+        monkeypatch.setattr(service, "_update_watermarks", no_status)
+        summary = asyncio.run(service.archive_sahha_data(
+            "user", "Foundation Builder", "behavior_analysis", {"biomarkers": [biomarker(i) for i in range(120)], "scores": []}
+        ))
+
+        assert summary["biomarkers"] == 120
+        assert summary["rows"] == 120
+        assert summary["rows_per_second"] > 0
+        stats = service.get_stats()
+        assert stats["rows_written"] == 120
+        assert stats["upsert_calls"] == 3
+
+    def test_transient_errors_are_retried_not_bisected(self):
+        """Test a connection error retries the same chunk and raises once retries run out"""
+        service = ArchivalService(batch_size=64)
+        service.retry_delay = 0
+        records = [biomarker(i) for i in range(64)]
+
+        supabase = FakeSupabase(outages=2)
+        stored, failed = asyncio.run(service._store_biomarkers(supabase, "user", records))
+        assert (len(stored), len(failed)) == (64, 0)
+        assert supabase.calls == [("biomarkers", 64)] * 3
+        assert service.stats["bisections"] == 0
+
+        supabase = FakeSupabase(outages=3)
+        with pytest.raises(ConnectionError):
+            asyncio.run(service._store_biomarkers(supabase, "user", records))
+        assert len(supabase.calls) == 3
+
+    def test_rejected_rows_complete_as_partial_sync(self, monkeypatch):
+        """Test a rejected row is reported as a partial sync instead of failing the job"""
+        service = ArchivalService(batch_size=50)
+        supabase = FakeSupabase()
+        monkeypatch.setattr(service, "_get_supabase", lambda: supabase)
+        statuses = []
+
+        async def record_status(*args, **kwargs):
+            statuses.append((kwargs["success"], kwargs.get("error_message")))
+
+        async def no_watermarks(*args, **kwargs):
+            return None
+
+        monkeypatch.setattr(service, "_update_sync_status", record_status)
+        monkeypatch.setattr(service, "_update_watermarks", no_watermarks)
+        records = [biomarker(i) for i in range(10)]
+        records[3]["value"] = "bad"
+
+        summary = asyncio.run(service.archive_sahha_data(
+            "user", "Foundation Builder", "behavior_analysis", {"biomarkers": records, "scores": []}
+        ))
+        assert (summary["biomarkers"], summary["rejected"]) == (9, 1)
+        assert summary["incomplete_categories"] == ["sleep"]
+        assert statuses == [(True, "Partial sync: 1 biomarkers and 0 scores rejected (incomplete: sleep)")]
+        assert service.stats["rows_written"] == 9
+
+    def test_watermarks_advance_only_for_complete_categories(self, monkeypatch):
+        """Test watermarks come from stored rows and skip categories with fetch gaps or rejected rows"""
+        service = ArchivalService(batch_size=50)
+        supabase = FakeSupabase()
+        monkeypatch.setattr(service, "_get_supabase", lambda: supabase)
+
+        async def no_status(*args, **kwargs):
+            return None
+
+        class RecordingStore:
+            advanced = []
+
+            async def advance(self, user_id, marks, supabase=None):
+                self.advanced.append(marks)
+
+        monkeypatch.setattr(service, "_update_sync_status", no_status)
+        monkeypatch.setattr(archival_module, "get_watermark_store", RecordingStore)
+        records = []
+        for category in ("sleep", "activity", "vitals"):
+            for i in range(3):
+                records.append({**biomarker(i), "category": category, "type": f"{category}_metric"})
+        records[1]["value"] = "bad"  # A sleep row is rejected
+        sahha_data = {"biomarkers": records, "scores": [], "incomplete_categories": ["vitals"]}
+
+        summary = asyncio.run(service.archive_sahha_data("user", "Foundation Builder", "behavior_analysis", sahha_data))
+        assert summary["incomplete_categories"] == ["sleep", "vitals"]
+        assert list(RecordingStore.advanced[0]) == ["activity"]
+
+    def test_coalesced_analyses_each_get_sync_status(self, monkeypatch):
+        """Test a job merged across analyses updates the latest run of each one"""
+        service = ArchivalService(batch_size=50)
+        supabase = FakeSupabase()
+        monkeypatch.setattr(service, "_get_supabase", lambda: supabase)
+        updated = []
+
+        async def record_status(supabase, user_id, archetype, analysis_type, **kwargs):
+            updated.append((archetype, analysis_type, kwargs["success"]))
+
+        async def no_watermarks(*args, **kwargs):
+            return None
+
+        monkeypatch.setattr(service, "_update_sync_status", record_status)
+        monkeypatch.setattr(service, "_update_watermarks", no_watermarks)
+        asyncio.run(service.archive_sahha_data(
+            "user", "Foundation Builder", "circadian_analysis", {"biomarkers": [biomarker(1)], "scores": []},
+            analyses=[["Foundation Builder", "behavior_analysis"], ["Foundation Builder", "circadian_analysis"]]
+        ))
+
+        assert updated == [
+            ("Foundation Builder", "behavior_analysis", True), ("Foundation Builder", "circadian_analysis", True)
+        ]
@@ -0,0 +1,115 @@
+"""
+Unit tests for the batched plan_items lookup in submit_batch_checkin
+"""
+import asyncio
+import sys
+import os
+from datetime import date
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from services.api_gateway.engagement_endpoints import (
+    BatchCheckinItem, BatchCheckinRequest, submit_batch_checkin
+)
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.op = None
+        self.filters = {}
+        self.rows = None
+
+    def select(self, columns):
+        self.op = "select"
+        return self
+
+    def in_(self, column, values):
+        self.filters[column] = list(values)
+        return self
+
+    def upsert(self, rows, on_conflict):
+        self.op = "upsert"
+        self.rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def execute(self):
+        self.client.calls.append((self.table, self.op, len(self.rows or self.filters.get("id", []))))
+        if self.op == "select":
+            return FakeResult([row for row in self.client.plan_items if row["id"] in self.filters["id"]])
+        if any(row["plan_item_id"] in self.client.failing_items for row in self.rows):
+            raise Exception("violates foreign key constraint")
+        return FakeResult([{"id": f"checkin-{row['plan_item_id']}", **row} for row in self.rows])
+
+
+class FakeSupabase:
+    def __init__(self, plan_items, failing_items=()):
+        self.plan_items = plan_items
+        self.failing_items = set(failing_items)
+        self.calls = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+def plan_item(i, profile_id="user-1"):
+    return {"id": f"item-{i}", "profile_id": profile_id, "analysis_result_id": "analysis-1", "plan_date": "2026-10-16"}
+
+
+def batch(ids):
+    return BatchCheckinRequest(
+        profile_id="user-1",
+        planned_date=date(2026, 10, 16),
+        checkins=[BatchCheckinItem(plan_item_id=plan_item_id) for plan_item_id in ids]
+    )
+
+
+class TestBatchCheckin:
+    """Test round trips and per-item error reporting"""
+
+    def test_fifty_items_take_two_round_trips(self):
+        """Test one plan_items lookup and one bulk upsert for a 50-item batch"""
+        supabase = FakeSupabase([plan_item(i) for i in range(50)])
+        response = asyncio.run(submit_batch_checkin(batch([f"item-{i}" for i in range(50)]), supabase=supabase))
+
+        assert response["success"] and response["items_processed"] == 50
+        assert response["failed_items"] == []
+        assert supabase.calls == [("plan_items", "select", 50), ("task_checkins", "upsert", 50)]
+
+    def test_invalid_items_are_reported_individually(self):
+        """Test unknown and foreign plan items are reported while the rest are written"""
+        supabase = FakeSupabase([plan_item(1), plan_item(2, profile_id="someone-else"), plan_item(3)])
+        response = asyncio.run(submit_batch_checkin(batch(["item-1", "item-2", "missing", "item-3", "item-1"]),
+                                                    supabase=supabase))
+
+        assert response["items_processed"] == 2
+        assert response["failed_items"] == [
+            {"plan_item_id": "item-2", "error": "Plan item belongs to another profile"},
+            {"plan_item_id": "missing", "error": "Plan item not found"}
+        ]
+        # Duplicate ids are checked in once
+        assert supabase.calls[-1] == ("task_checkins", "upsert", 2)
+
+    def test_failed_bulk_write_reports_failing_rows(self):
+        """Test a bulk upsert failure falls back to per-item writes to isolate the bad row"""
+        supabase = FakeSupabase([plan_item(i) for i in range(4)], failing_items={"item-2"})
+        response = asyncio.run(submit_batch_checkin(batch([f"item-{i}" for i in range(4)]), supabase=supabase))
+
+        assert response["items_processed"] == 3
+        assert response["failed_items"] == [{"plan_item_id": "item-2", "error": "violates foreign key constraint"}]
+
+    def test_no_valid_items(self):
+        """Test a batch with only unknown items writes nothing"""
+        supabase = FakeSupabase([])
+        response = asyncio.run(submit_batch_checkin(batch(["nope"]), supabase=supabase))
+
+        assert response["success"] is False
+        assert response["failed_items"] == [{"plan_item_id": "nope", "error": "Plan item not found"}]
+        assert [call[1] for call in supabase.calls] == ["select"]
@@ -0,0 +1,133 @@
+"""
+Unit tests for the dependency-graph context assembler
+"""
+import asyncio
+import time
+import pytest
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.utils.context_assembler import ContextAssembler, ContextAssemblyError, ContextSource
+
+
+def sleeper(seconds, value, calls=None):
+    async def fetch(ctx):
+        if calls is not None:
+            calls.append(dict(ctx))
+        await asyncio.sleep(seconds)
+        return value
+    return fetch
+
+
+async def failing(ctx):
+    raise RuntimeError("boom")
+
+
+class TestContextAssembler:
+    """Test concurrent, dependency-ordered context assembly"""
+
+    def test_independent_sources_run_concurrently(self):
+        """Test latency approaches the slowest source rather than the sum"""
+        assembler = ContextAssembler("test", [
+            ContextSource(f"source_{i}", sleeper(0.1, i)) for i in range(5)
+        ])
+        start = time.perf_counter()
+        assembled = asyncio.run(assembler.assemble())
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.3  # Sequential would be 0.5s
+        assert [assembled[f"source_{i}"] for i in range(5)] == list(range(5))
+        assert assembled.degraded == []
+        assert assembled.timings()["source_0"]["duration_ms"] >= 90
+
+    def test_dependencies_receive_values(self):
+        """Test dependents start after their dependencies and see their values"""
+        calls = []
+        assembler = ContextAssembler("test", [
+            ContextSource("child", sleeper(0, "child", calls), depends_on=("root",)),
+            ContextSource("root", sleeper(0.05, {"user_id": "user-1"})),
+        ])
+        assembled = asyncio.run(assembler.assemble(analysis_id="a1"))
+
+        assert assembled["child"] == "child"
+        assert calls == [{"analysis_id": "a1", "root": {"user_id": "user-1"}}]
+
+    def test_timeout_and_error_degrade(self):
+        """Test failing or slow sources fall back to defaults and skip their dependents"""
+        assembler = ContextAssembler("test", [
+            ContextSource("slow", sleeper(1, "late"), timeout=0.05, default="fallback"),
+            ContextSource("broken", failing, default=[]),
+            ContextSource("after_broken", sleeper(0, "never"), depends_on=("broken",)),
+            ContextSource("fine", sleeper(0, "ok")),
+        ])
+        start = time.perf_counter()
+        assembled = asyncio.run(assembler.assemble())
+
+        assert time.perf_counter() - start < 0.5
+        assert assembled["slow"] == "fallback" and assembled["broken"] == [] and assembled["fine"] == "ok"
+        assert assembled["after_broken"] is None
+        statuses = {name: timing["status"] for name, timing in assembled.timings().items()}
+        assert statuses == {"slow": "timeout", "broken": "error", "after_broken": "skipped", "fine": "ok"}
+        assert sorted(assembled.degraded) == ["after_broken", "broken", "slow"]
+
+    def test_required_source_failure_raises(self):
+        """Test a failing required source fails the assembly"""
+        assembler = ContextAssembler("test", [
+            ContextSource("primary", failing, required=True),
+            ContextSource("other", sleeper(0, "ok")),
+        ])
+        with pytest.raises(ContextAssemblyError, match="primary"):
+            asyncio.run(assembler.assemble())
+
+    def test_invalid_graphs_rejected(self):
+        """Test unknown dependencies and cycles are caught at construction"""
+        with pytest.raises(ValueError, match="unknown"):
+            ContextAssembler("test", [ContextSource("a", failing, depends_on=("missing",))])
+        with pytest.raises(ValueError, match="cycle"):
+            ContextAssembler("test", [
+                ContextSource("a", failing, depends_on=("b",)),
+                ContextSource("b", failing, depends_on=("a",)),
+            ])
+
+
+class TestChatContextEndpoint:
+    """Test get_chat_context assembles its sources in parallel"""
+
+    def test_chat_context_parallel_and_degraded(self, monkeypatch, tmp_path):
+        """Test the endpoint overlaps fetches and reports a failed source"""
+        monkeypatch.chdir(tmp_path)
+        from services.api_gateway import context_endpoints
+
+        async def health(service, user_id):
+            await asyncio.sleep(0.1)
+            return {"scores": [{"score": 1}], "biomarkers": [], "date_range": {}}
+
+        async def broken(user_id):
+            raise RuntimeError("db down")
+
+        monkeypatch.setattr(context_endpoints, "_fetch_health_data", health)
+        monkeypatch.setattr(context_endpoints, "_fetch_behavior_analysis", lambda user_id: sleeper(0.1, {"id": "b"})({}))
+        monkeypatch.setattr(context_endpoints, "_fetch_circadian_analysis", lambda user_id: sleeper(0.1, None)({}))
+        monkeypatch.setattr(context_endpoints, "_fetch_plan_data", broken)
+
+        start = time.perf_counter()
+        context = asyncio.run(context_endpoints.get_chat_context("user-1", service=None))
+        assert time.perf_counter() - start < 0.3
+
+        assert context["behavior_analysis"] == {"id": "b"} and context["plan"] is None
+        assert context["metadata"]["has_health_data"] and not context["metadata"]["has_plan"]
+        assert context["metadata"]["degraded_sources"] == ["plan"]
+        assert set(context["metadata"]["sources"]) == {"health_data", "behavior_analysis", "circadian_analysis", "plan"}
+
+    def test_chat_context_source_timeouts(self, monkeypatch, tmp_path):
+        """Test every chat source sets its timeout and health data gets the slow one"""
+        monkeypatch.chdir(tmp_path)
+        from services.api_gateway import context_endpoints
+        from shared_libs.utils.context_assembler import DEFAULT_SOURCE_TIMEOUT, SLOW_SOURCE_TIMEOUT
+
+        timeouts = {name: source.timeout for name, source in context_endpoints.chat_context_assembler.sources.items()}
+        assert timeouts["health_data"] == SLOW_SOURCE_TIMEOUT > DEFAULT_SOURCE_TIMEOUT
+        assert all(timeout is not None for timeout in timeouts.values())
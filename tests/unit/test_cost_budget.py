@@ -0,0 +1,255 @@
+"""
+Unit tests for reserve-then-settle cost budgeting in HolisticRateLimiter
+
+TestLocalRedis runs the Lua scripts against a real Redis when REDIS_TEST_URL
+is set (e.g. REDIS_TEST_URL=redis://localhost:6379/15); the database is
+only touched under test-specific keys.
+"""
+import asyncio
+import importlib
+import uuid
+import pytest
+import sys
+import os
+
+from fastapi import HTTPException, Request
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.rate_limiting.rate_limiter import (
+    COST_RESERVE_SCRIPT, COST_SETTLE_SCRIPT, HolisticRateLimiter
+)
+
+# The package re-exports the rate_limiter instance under the module's name
+rate_limiter_module = importlib.import_module("shared_libs.rate_limiting.rate_limiter")
+
+REDIS_TEST_URL = os.getenv("REDIS_TEST_URL")
+
+
+class FakeRedis:
+    """
+    Runs the budget scripts' logic in Python. Like Redis, each script runs
+    without interleaving; the sleep(0) before it lets concurrent callers
+    queue up the way they would on the network.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.round_trips = 0
+
+    def register_script(self, script):
+        async def run(keys, args):
+            self.round_trips += 1
+            await asyncio.sleep(0)
+            if script == COST_RESERVE_SCRIPT:
+                return self._reserve(keys, *args)
+            assert script == COST_SETTLE_SCRIPT
+            return self._settle(keys, args[0])
+        return run
+
+    def _reserve(self, keys, cost, daily_limit, monthly_limit, *ttls):
+        daily, monthly = (self.data.get(key, 0.0) for key in keys)
+        if daily + cost > daily_limit + 1e-9 or monthly + cost > monthly_limit + 1e-9:
+            return [0, str(daily), str(monthly)]
+        for key in keys:
+            self.data[key] = self.data.get(key, 0.0) + cost
+        return [1, str(daily + cost), str(monthly + cost)]
+
+    def _settle(self, keys, delta):
+        for key in keys:
+            self.data[key] = max(0.0, self.data.get(key, 0.0) + delta)
+        return [str(self.data[key]) for key in keys]
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self.data.get(key) for key in keys]
+
+
+def make_request(user_id):
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": [],
+                    "path_params": {"user_id": user_id}})
+
+
+def make_limiter(client, monkeypatch):
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    limiter = HolisticRateLimiter()
+
+    async def pool():
+        return client
+    limiter._get_redis_pool = pool
+    return limiter
+
+
+async def spend_concurrently(limiter, user_id, requests):
+    """Reserve and settle like concurrent endpoint calls; count admitted requests"""
+    async def request():
+        result = await limiter.reserve_cost(user_id, "behavior_analysis")
+        if not result["within_limits"]:
+            return False
+        await asyncio.sleep(0.01)  # The expensive call
+        await limiter.track_api_cost(user_id, "behavior_analysis")
+        return True
+
+    return sum(await asyncio.gather(*[request() for _ in range(requests)]))
+
+
+class TestCostBudget:
+    """Test reservations never overspend and settle to the actual cost"""
+
+    def test_concurrent_reservations_do_not_overspend(self, monkeypatch):
+        """Test 50 concurrent requests against a $0.50 budget admit exactly 16 ($0.03 each)"""
+        redis = FakeRedis()
+        limiter = make_limiter(redis, monkeypatch)
+
+        admitted = asyncio.run(spend_concurrently(limiter, "user-1", 50))
+        assert admitted == 16
+        assert redis.data["cost:daily:user-1"] == pytest.approx(0.48)
+
+    def test_settle_adjusts_reservation(self, monkeypatch):
+        """Test settling charges the difference and 0.0 releases the reservation"""
+        redis = FakeRedis()
+        limiter = make_limiter(redis, monkeypatch)
+
+        async def run():
+            await limiter.reserve_cost("user-1", "behavior_analysis")
+            await limiter.track_api_cost("user-1", "behavior_analysis", actual_cost=0.05)
+            after_settle = redis.data["cost:daily:user-1"]
+            await limiter.reserve_cost("user-1", "behavior_analysis")
+            await limiter.track_api_cost("user-1", "behavior_analysis", actual_cost=0.0)
+            return after_settle, redis.data["cost:daily:user-1"]
+
+        after_settle, after_release = asyncio.run(run())
+        assert after_settle == pytest.approx(0.05)
+        assert after_release == pytest.approx(0.05)
+
+    def test_settle_at_estimate_skips_redis(self, monkeypatch):
+        """Test the common case (actual == reserved) costs no extra round trip"""
+        redis = FakeRedis()
+        limiter = make_limiter(redis, monkeypatch)
+
+        async def run():
+            await limiter.reserve_cost("user-1", "routine_generation")
+            await limiter.track_api_cost("user-1", "routine_generation")
+
+        asyncio.run(run())
+        assert redis.round_trips == 1
+
+    def test_cached_budget_refuses_without_round_trip(self, monkeypatch):
+        """Test a known exhausted budget is refused locally and served to check_cost_limits"""
+        redis = FakeRedis()
+        redis.data["cost:daily:user-1"] = 0.49
+        limiter = make_limiter(redis, monkeypatch)
+
+        async def run():
+            first = await limiter.reserve_cost("user-1", "behavior_analysis")
+            second = await limiter.reserve_cost("user-1", "behavior_analysis")
+            check = await limiter.check_cost_limits("user-1")
+            return first, second, check
+
+        first, second, check = asyncio.run(run())
+        assert not first["within_limits"] and not second["within_limits"]
+        assert check["daily_cost"] == pytest.approx(0.49)
+        assert redis.round_trips == 1
+
+        monkeypatch.setattr(rate_limiter_module, "COST_BUDGET_CACHE_TTL", 0)
+        limiter._budget_cache.clear()
+        asyncio.run(limiter.check_cost_limits("user-1"))
+        assert redis.round_trips == 2
+
+    def test_release_refunds_unsettled_requests(self, monkeypatch):
+        """Test a request that fails before settling gives its reservation back, and settled ones keep their charge"""
+        redis = FakeRedis()
+        limiter = make_limiter(redis, monkeypatch)
+
+        async def failing_request():
+            cost = await limiter.apply_rate_limit(make_request("user-1"), "behavior_analysis")
+            try:
+                raise RuntimeError("openai timeout")
+            finally:
+                await cost.release()
+
+        async def successful_request():
+            cost = await limiter.apply_rate_limit(make_request("user-1"), "behavior_analysis")
+            try:
+                await cost.settle()
+            finally:
+                await cost.release()
+
+        async def run():
+            with pytest.raises(RuntimeError):
+                await failing_request()
+            after_failure = redis.data["cost:daily:user-1"]
+            await successful_request()
+            return after_failure, redis.data["cost:daily:user-1"]
+
+        after_failure, after_success = asyncio.run(run())
+        assert after_failure == pytest.approx(0.0)
+        assert after_success == pytest.approx(0.03)
+        assert not limiter._cost_reservations
+
+    def test_refused_request_has_nothing_to_release(self, monkeypatch):
+        """Test a 402 refusal reserves nothing, so no other request's reservation is released"""
+        redis = FakeRedis()
+        redis.data["cost:daily:user-1"] = 0.45
+        limiter = make_limiter(redis, monkeypatch)
+
+        async def run():
+            held = await limiter.apply_rate_limit(make_request("user-1"), "behavior_analysis")
+            with pytest.raises(HTTPException) as exc_info:
+                await limiter.apply_rate_limit(make_request("user-1"), "behavior_analysis")
+            await held.settle()
+            return exc_info.value
+
+        error = asyncio.run(run())
+        assert error.status_code == 402
+        assert redis.data["cost:daily:user-1"] == pytest.approx(0.48)
+
+    def test_stale_reservations_are_refunded(self, monkeypatch):
+        """Test reservations nobody settled within the TTL are refunded, including other users' on a sweep"""
+        redis = FakeRedis()
+        limiter = make_limiter(redis, monkeypatch)
+        clock = [1000.0]
+        monkeypatch.setattr(rate_limiter_module.time, "monotonic", lambda: clock[0])
+        limiter._reservations_swept_at = clock[0]
+
+        async def run():
+            await limiter.reserve_cost("user-1", "behavior_analysis")
+            await limiter.reserve_cost("user-2", "behavior_analysis")
+            clock[0] += rate_limiter_module.COST_RESERVATION_TTL + 1
+            await limiter.reserve_cost("user-1", "behavior_analysis")  # Refunds user-1's and sweeps user-2's
+            await limiter.track_api_cost("user-1", "behavior_analysis")
+
+        asyncio.run(run())
+        assert redis.data["cost:daily:user-1"] == pytest.approx(0.03)
+        assert redis.data["cost:daily:user-2"] == pytest.approx(0.0)
+        assert not limiter._cost_reservations
+
+
+@pytest.mark.skipif(not REDIS_TEST_URL, reason="REDIS_TEST_URL not set")
+class TestLocalRedis:
+    """Test the Lua scripts on a real Redis"""
+
+    def test_no_overspend_under_concurrency(self, monkeypatch):
+        """Test concurrent reservations from two workers never exceed the budget"""
+        import redis.asyncio as redis
+
+        monkeypatch.setattr(rate_limiter_module, "COST_BUDGET_CACHE_TTL", 0)
+        user_id = f"cost-test-{uuid.uuid4().hex}"
+
+        async def run():
+            client = redis.from_url(REDIS_TEST_URL, decode_responses=True)
+            workers = [make_limiter(client, monkeypatch) for _ in range(2)]
+            try:
+                admitted = await asyncio.gather(*[spend_concurrently(worker, user_id, 40) for worker in workers])
+                daily, monthly = await client.mget([f"cost:daily:{user_id}", f"cost:monthly:{user_id}"])
+                ttl = await client.ttl(f"cost:daily:{user_id}")
+                return sum(admitted), float(daily), float(monthly), ttl
+            finally:
+                await client.delete(f"cost:daily:{user_id}", f"cost:monthly:{user_id}")
+                await client.aclose()
+
+        admitted, daily, monthly, ttl = asyncio.run(run())
+        assert admitted == 16
+        assert daily == pytest.approx(0.48) and monthly == pytest.approx(0.48)
+        assert 0 < ttl <= 86400
@@ -0,0 +1,205 @@
+"""
+Unit tests for the set-based current plan lookup and the current plan cache
+"""
+import asyncio
+import pytest
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from services import plan_extraction_service as plan_module
+from services.plan_extraction_service import ExtractedTask, PlanExtractionService, TimeBlockContext
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, client, name, params=None):
+        self.client = client
+        self.name = name
+        self.params = params
+        self.op = "select"
+        self.filters = []
+        self.window = None
+        self.rows = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, [value]))
+        return self
+
+    def in_(self, column, values):
+        self.filters.append((column, list(values)))
+        return self
+
+    def order(self, column, desc=False):
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end + 1)
+        return self
+
+    def upsert(self, rows, on_conflict):
+        self.op = "upsert"
+        self.rows = rows
+        return self
+
+    def execute(self):
+        self.client.calls.append((self.name, self.op))
+        if self.name == "rpc:get_latest_complete_plan":
+            if not self.client.rpc_available:
+                raise Exception("PGRST202: Could not find the function public.get_latest_complete_plan")
+            return FakeResult(self.client.latest_complete(self.params["p_profile_id"]))
+        if self.op == "upsert":
+            return FakeResult(list(self.rows))
+        rows = [
+            row for row in self.client.tables[self.name]
+            if all(row.get(column) in values for column, values in self.filters)
+        ]
+        if self.window:
+            rows = rows[self.window[0]:self.window[1]]
+        return FakeResult(rows)
+
+
+class FakeSupabase:
+    def __init__(self, analyses, complete_ids, rpc_available=True):
+        self.rpc_available = rpc_available
+        self.calls = []
+        # Newest first, like .order("created_at", desc=True)
+        self.tables = {
+            "holistic_analysis_results": [
+                {"id": a, "archetype": "Foundation Builder", "analysis_date": "2026-10-16",
+                 "created_at": f"2026-10-16T0{i}:00:00", "user_id": "user-1", "analysis_type": "routine_plan"}
+                for i, a in enumerate(analyses)
+            ],
+            "time_blocks": [{"id": f"tb-{a}", "analysis_result_id": a, "block_title": "Morning Block",
+                             "block_order": 1} for a in complete_ids],
+            "plan_items": [{"id": f"pi-{a}", "analysis_result_id": a, "time_block_id": f"tb-{a}",
+                            "time_block": "block_1", "is_trackable": True, "title": "Walk"} for a in complete_ids]
+        }
+
+    def latest_complete(self, profile_id):
+        complete = {row["analysis_result_id"] for row in self.tables["time_blocks"]} & \
+                   {row["analysis_result_id"] for row in self.tables["plan_items"]}
+        return [row for row in self.tables["holistic_analysis_results"]
+                if row["user_id"] == profile_id and row["id"] in complete][:1]
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        return FakeQuery(self, f"rpc:{name}", params)
+
+
+def make_service(supabase):
+    service = PlanExtractionService.__new__(PlanExtractionService)
+    service.supabase = supabase
+    return service
+
+
+@pytest.fixture(autouse=True)
+def reset_plan_cache(monkeypatch):
+    plan_module._current_plan_cache.clear()
+    monkeypatch.setattr(PlanExtractionService, "_latest_plan_rpc_available", True)
+    yield
+    plan_module._current_plan_cache.clear()
+
+
+class TestCurrentPlanLookup:
+    """Test round trips of the "what's my plan today" path"""
+
+    def test_rpc_then_cache_hit(self):
+        """Test one RPC plus one concurrent items/blocks round, then no queries at all"""
+        supabase = FakeSupabase(["a3", "a2", "a1"], complete_ids=["a2", "a1"])
+        service = make_service(supabase)
+
+        plan = asyncio.run(service.get_current_plan_items_for_user("user-1", "2026-10-16"))
+        assert plan["analysis_used"] == "a2"
+        assert plan["items"][0]["time_blocks"]["block_title"] == "Morning Block"
+        assert [name for name, _ in supabase.calls] == ["rpc:get_latest_complete_plan", "plan_items", "time_blocks"]
+
+        supabase.calls.clear()
+        cached = asyncio.run(service.get_current_plan_items_for_user("user-1", "2026-10-17"))
+        assert supabase.calls == []
+        assert cached["analysis_used"] == "a2" and cached["date"] == "2026-10-17"
+
+    def test_storing_plan_data_invalidates_cache(self):
+        """Test _store_time_blocks / _store_plan_items drop the cached current plan"""
+        supabase = FakeSupabase(["a1"], complete_ids=["a1"])
+        service = make_service(supabase)
+        asyncio.run(service.get_current_plan_items_for_user("user-1"))
+
+        block = TimeBlockContext(block_id="block_1", title="Morning Block", time_range="6-9 AM")
+        asyncio.run(service._store_time_blocks("a1", "user-1", [block], "Foundation Builder"))
+        supabase.calls.clear()
+        asyncio.run(service.get_current_plan_items_for_user("user-1"))
+        assert supabase.calls[0] == ("rpc:get_latest_complete_plan", "select")
+
+        task = ExtractedTask(
+            task_id="t1", title="Walk", description="", scheduled_time=None, scheduled_end_time=None,
+            estimated_duration_minutes=10, task_type="exercise", priority_level="high",
+            task_order_in_block=1, time_block_id="block_1"
+        )
+        asyncio.run(service._store_plan_items("a1", "user-1", [task], override_plan_date="2026-10-16"))
+        supabase.calls.clear()
+        asyncio.run(service.get_current_plan_items_for_user("user-1"))
+        assert supabase.calls[0] == ("rpc:get_latest_complete_plan", "select")
+
+    def test_other_users_stay_cached(self):
+        """Test invalidation is per user"""
+        supabase = FakeSupabase(["a1"], complete_ids=["a1"])
+        service = make_service(supabase)
+        asyncio.run(service.get_current_plan_items_for_user("user-1"))
+
+        plan_module.invalidate_current_plan_cache("user-2")
+        supabase.calls.clear()
+        asyncio.run(service.get_current_plan_items_for_user("user-1"))
+        assert supabase.calls == []
+
+    def test_store_during_lookup_is_not_cached_over(self):
+        """Test a lookup that raced a plan store is not cached, and no per-user state is left behind"""
+        supabase = FakeSupabase(["a1"], complete_ids=["a1"])
+        service = make_service(supabase)
+        find = service._find_latest_complete_analysis
+
+        async def racing_find(profile_id):
+            result = await find(profile_id)
+            plan_module.invalidate_current_plan_cache(profile_id)  # Plan stored meanwhile
+            return result
+
+        service._find_latest_complete_analysis = racing_find
+        asyncio.run(service.get_current_plan_items_for_user("user-1"))
+        assert plan_module._current_plan_cache.get("user-1") is None
+
+        service._find_latest_complete_analysis = find
+        for i in range(100):
+            plan_module.invalidate_current_plan_cache(f"user-{i}")
+        asyncio.run(service.get_current_plan_items_for_user("user-1"))
+        assert plan_module._current_plan_cache.get("user-1") is not None
+        assert plan_module._current_plan_lookups == {}
+
+    def test_batched_fallback_without_rpc(self):
+        """Test the missing RPC falls back to in_() probes instead of two queries per analysis"""
+        analyses = [f"a{i}" for i in range(30, 0, -1)]  # a30 newest
+        supabase = FakeSupabase(analyses, complete_ids=["a3"], rpc_available=False)
+        service = make_service(supabase)
+
+        plan = asyncio.run(service.get_current_plan_items_for_user("user-1"))
+        assert plan["analysis_used"] == "a3"
+        lookups = [name for name, _ in supabase.calls][:-2]  # Minus the final items/blocks fetch
+        # RPC attempt, then two candidate batches of (candidates, time_blocks, plan_items)
+        assert lookups == ["rpc:get_latest_complete_plan"] + ["holistic_analysis_results", "time_blocks", "plan_items"] * 2
+        assert PlanExtractionService._latest_plan_rpc_available is False
+
+    def test_no_complete_plan(self):
+        """Test users without a complete plan get an empty response"""
+        supabase = FakeSupabase(["a1"], complete_ids=[])
+        plan = asyncio.run(make_service(supabase).get_current_plan_items_for_user("user-1", "2026-10-16"))
+        assert plan == {"routine_plan": None, "nutrition_plan": None, "items": [], "date": "2026-10-16"}
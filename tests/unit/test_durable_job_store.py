@@ -0,0 +1,213 @@
+"""
+Unit tests for the durable job store (recovery, leases, idempotency)
+"""
+import asyncio
+import pytest
+import sys
+import os
+import time
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from services.background.job_store import SQLiteJobStore, MemoryJobStore, create_job_store
+from services.background.simple_queue import SimpleJobQueue
+
+
+async def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        await asyncio.sleep(0.01)
+
+
+async def kill(queue: SimpleJobQueue):
+    """Simulate a crash: cancel workers mid-job without any cleanup"""
+    tasks = [*queue.worker_tasks, queue.scheduler_task]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def make_queue(path: str, handler, **kwargs) -> SimpleJobQueue:
+    queue = SimpleJobQueue(store=SQLiteJobStore(path), lease_seconds=0.3, reap_interval=0.05, **kwargs)
+    queue.register_handler("FAKE", handler)
+    return queue
+
+
+class TestDurableJobQueue:
+    """Test at-least-once delivery across a crash"""
+
+    def test_jobs_survive_worker_killed_mid_batch(self, tmp_path):
+        """Test queued and in-flight jobs are delivered again after a crash"""
+        path = str(tmp_path / "jobs.sqlite3")
+        done = []
+
+        async def first_run():
+            async def hangs_on_some(job):
+                if job.payload["n"] in (2, 5):
+                    await asyncio.sleep(3600)  # Worker dies during this job
+                done.append(job.payload["n"])
+
+            queue = make_queue(path, hangs_on_some, concurrency=2)
+            await queue.start()
+            for n in range(8):
+                await queue.submit_job("FAKE", {"n": n})
+            await wait_until(lambda: queue.stats["completed"] == 4 and queue._in_flight == 2)
+            await kill(queue)
+            queue.store.close()
+
+        async def second_run():
+            async def record(job):
+                done.append(job.payload["n"])
+
+            queue = make_queue(path, record, concurrency=2)
+            await queue.start()
+            # Queued (6, 7) and running (2, 5) jobs were all leased by the dead process
+            recovered_at_start = queue.stats["recovered"]
+            await wait_until(lambda: queue.stats["completed"] == 4)
+            await queue.stop()
+            return recovered_at_start, queue.store.get_stats()
+
+        asyncio.run(first_run())
+        assert sorted(done) == [0, 1, 3, 4]
+        time.sleep(0.35)  # Restart after the dead process's leases ran out
+
+        recovered_at_start, store_stats = asyncio.run(second_run())
+        assert recovered_at_start == 4
+        assert sorted(done) == list(range(8))
+        assert store_stats["jobs_by_status"] == {"completed": 8}
+
+    def test_retry_backoff_survives_restart(self, tmp_path):
+        """Test a job waiting for its retry is rescheduled after a restart"""
+        path = str(tmp_path / "jobs.sqlite3")
+        attempts = []
+
+        async def first_run():
+            async def fail(job):
+                attempts.append(job.attempts)
+                raise Exception("sahha unavailable")
+
+            queue = make_queue(path, fail, retry_base_delay=1.0)
+            await queue.start()
+            await queue.submit_job("FAKE", {"n": 1})
+            await wait_until(lambda: queue.stats["retries"] == 1)
+            await kill(queue)
+            queue.store.close()
+
+        async def second_run():
+            async def succeed(job):
+                attempts.append(job.attempts)
+
+            queue = make_queue(path, succeed, retry_base_delay=1.0)
+            await queue.start()
+            delayed = queue.get_stats()["delayed"]
+            await wait_until(lambda: queue.stats["completed"] == 1)
+            await queue.stop()
+            return delayed
+
+        asyncio.run(first_run())
+        time.sleep(0.35)  # Lease expired, backoff not yet
+        assert asyncio.run(second_run()) == 1
+        assert attempts == [1, 2]
+
+    def test_live_instance_keeps_its_jobs(self, tmp_path):
+        """Test a second process sharing the store does not take jobs leased by a live one"""
+        path = str(tmp_path / "jobs.sqlite3")
+
+        async def run():
+            release = asyncio.Event()
+            owner_runs, other_runs = [], []
+
+            async def owner_handler(job):
+                await release.wait()
+                owner_runs.append(job.payload["n"])
+
+            async def other_handler(job):
+                other_runs.append(job.payload["n"])
+
+            owner = make_queue(path, owner_handler, concurrency=1)
+            await owner.start()
+            for n in range(3):
+                await owner.submit_job("FAKE", {"n": n})  # One running, two queued
+
+            other = make_queue(path, other_handler)
+            await other.start()
+            await asyncio.sleep(0.7)  # Twice the lease: the owner keeps renewing
+            recovered = other.stats["recovered"]
+            await other.stop()
+
+            release.set()
+            await wait_until(lambda: owner.stats["completed"] == 3)
+            await owner.stop()
+            return owner_runs, other_runs, recovered
+
+        owner_runs, other_runs, recovered = asyncio.run(run())
+        assert recovered == 0 and other_runs == []
+        assert owner_runs == [0, 1, 2]
+
+    def test_idempotency_keys(self):
+        """Test explicit keys stay taken after completion; payload keys only while in flight"""
+
+        async def run():
+            runs = []
+
+            async def record(job):
+                runs.append(job.payload["n"])
+
+            queue = SimpleJobQueue(store=MemoryJobStore())
+            queue.register_handler("FAKE", record)
+            first = await queue.submit_job("FAKE", {"n": 1})
+            assert await queue.submit_job("FAKE", {"n": 1}) == first
+            await queue.submit_job("FAKE", {"n": 2}, idempotency_key="user-1:2025-01-01")
+
+            await queue.start()
+            await wait_until(lambda: queue.stats["completed"] == 2)
+            assert await queue.submit_job("FAKE", {"n": 3}, idempotency_key="user-1:2025-01-01") is not None
+            await queue.submit_job("FAKE", {"n": 1})  # Same work submitted again later runs again
+            await wait_until(lambda: queue.stats["completed"] == 3)
+            await queue.stop()
+            return runs, queue.stats
+
+        runs, stats = asyncio.run(run())
+        assert runs == [1, 2, 1]
+        assert stats["duplicates"] == 2
+
+
+class TestJobStores:
+    """Test the store backends directly"""
+
+    @pytest.mark.parametrize("backend", ["memory", "sqlite"])
+    def test_claim_respects_leases(self, backend, tmp_path):
+        """Test only unfinished jobs without a live lease are claimed, and only once"""
+        store = create_job_store(backend, path=str(tmp_path / "jobs.sqlite3"))
+        now = time.time()
+        base = {"job_type": "FAKE", "payload": {"a": 1}, "attempts": 0, "max_attempts": 3,
+                "idempotency_key": None, "available_at": now, "lease_until": None, "error": None,
+                "created_at": now, "updated_at": now}
+        store.add({**base, "id": "queued", "status": "pending"})
+        store.add({**base, "id": "queued-leased", "status": "pending", "lease_until": now + 60})
+        store.add({**base, "id": "leased", "status": "processing", "lease_until": now + 60})
+        store.add({**base, "id": "orphaned", "status": "processing", "lease_until": now - 1})
+        store.add({**base, "id": "done", "status": "completed"})
+
+        claimed = store.claim(now, now + 60)
+        assert sorted(r["id"] for r in claimed) == ["orphaned", "queued"]
+        assert store.claim(now, now + 60) == []  # Already taken
+        assert store.get("queued")["payload"] == {"a": 1}
+
+        store.set_lease(["leased"], None)
+        assert [r["id"] for r in store.claim(now, now + 60)] == ["leased"]
+        assert store.purge(now + 1) == 1
+
+    def test_default_backend_is_durable(self, monkeypatch, tmp_path):
+        """Test memory is only the default under ENVIRONMENT=test"""
+        monkeypatch.delenv("JOB_STORE_BACKEND", raising=False)
+        monkeypatch.delenv("SUPABASE_URL", raising=False)
+        path = str(tmp_path / "jobs.sqlite3")
+
+        monkeypatch.setenv("ENVIRONMENT", "test")
+        assert create_job_store(path=path).name == "memory"
+        monkeypatch.setenv("ENVIRONMENT", "production")
+        assert create_job_store(path=path).name == "sqlite"  # supabase not configured
@@ -0,0 +1,127 @@
+"""
+Unit tests for the vectorized energy timeline engine
+"""
+import pytest
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.utils.energy_timeline import (
+    EnergyTimelineEngine, TimelineDefaults, get_timeline_engine, PEAK_THRESHOLD, MAINTENANCE_THRESHOLD
+)
+
+DEFAULTS = TimelineDefaults(early_morning=30, late_night=25, unspecified=40)
+
+
+def slot(engine: EnergyTimelineEngine, hhmm: str) -> int:
+    return engine.times.index(hhmm)
+
+
+class TestPainting:
+    """Test block painting, interpolation and defaults"""
+
+    def test_blocks_and_linear_interpolation(self):
+        """Test slots inside blocks take the block level and gaps interpolate linearly"""
+        engine = EnergyTimelineEngine(15)
+        blocks = [(8 * 60, 10 * 60, 85, 'peak'), (12 * 60, 14 * 60, 35, 'recovery')]
+        energy, zones = engine.paint([blocks], DEFAULTS)
+        slots = engine.to_slots(energy[0], zones[0])
+
+        assert slots[slot(engine, "08:00")] == {"time": "08:00", "energy_level": 85, "slot_index": 32, "zone": "peak"}
+        assert slots[slot(engine, "09:45")]["energy_level"] == 85
+        # 10:00 -> 12:00 gap from 85 to 35: halfway at 11:00
+        assert slots[slot(engine, "11:00")]["energy_level"] == 60
+        assert slots[slot(engine, "11:00")]["zone"] == "maintenance"
+        assert slots[slot(engine, "10:15")]["zone"] == "peak"
+        assert slots[slot(engine, "12:00")]["zone"] == "recovery"
+
+    def test_defaults_outside_blocks(self):
+        """Test time-of-day defaults where there is no block on both sides"""
+        engine = EnergyTimelineEngine(15)
+        energy, zones = engine.paint([[(9 * 60, 17 * 60, 60, 'maintenance')]], DEFAULTS)
+        slots = engine.to_slots(energy[0], zones[0])
+
+        assert slots[slot(engine, "03:00")]["energy_level"] == 30
+        assert slots[slot(engine, "07:00")]["energy_level"] == 40
+        assert slots[slot(engine, "23:00")]["energy_level"] == 25
+        assert slots[slot(engine, "23:00")]["zone"] == "recovery"
+
+    def test_first_block_by_start_wins_on_overlap(self):
+        """Test overlapping blocks resolve to the earliest-starting block"""
+        engine = EnergyTimelineEngine(15)
+        blocks = [(9 * 60, 11 * 60, 60, 'maintenance'), (8 * 60, 10 * 60, 85, 'peak')]
+        energy, zones = engine.paint([blocks], DEFAULTS)
+        slots = engine.to_slots(energy[0], zones[0])
+
+        assert slots[slot(engine, "09:30")]["zone"] == "peak"
+        assert slots[slot(engine, "10:30")]["zone"] == "maintenance"
+
+    def test_batch_rows_match_single_calls(self):
+        """Test a multi-timeline batch equals painting each timeline alone"""
+        engine = EnergyTimelineEngine(15)
+        block_sets = [
+            [],
+            [(7 * 60, 9 * 60, 85, 'peak')],
+            [(13 * 60, 15 * 60, 60, 'maintenance'), (6 * 60, 8 * 60, 85, 'peak'), (21 * 60, 23 * 60, 35, 'recovery')],
+        ]
+        energy, zones = engine.paint(block_sets, DEFAULTS)
+        assert energy.shape == zones.shape == (3, 96)
+        for row, blocks in enumerate(block_sets):
+            single_energy, single_zones = engine.paint([blocks], DEFAULTS)
+            assert (energy[row] == single_energy[0]).all()
+            assert (zones[row] == single_zones[0]).all()
+
+    @pytest.mark.parametrize("resolution,slots", [(5, 288), (15, 96), (30, 48)])
+    def test_slot_resolutions(self, resolution, slots):
+        """Test arbitrary slot resolutions produce the expected slot counts"""
+        engine = get_timeline_engine(resolution)
+        energy, zones = engine.paint([[(8 * 60, 10 * 60, 85, 'peak')]], DEFAULTS)
+        assert energy.shape == (1, slots)
+        assert engine.zone_minutes(zones[0], 'peak') == 120
+
+    def test_invalid_resolution(self):
+        """Test resolutions that do not divide the day are rejected"""
+        with pytest.raises(ValueError):
+            EnergyTimelineEngine(7)
+
+    def test_shared_engine_uses_thresholds(self):
+        """Test the shared engine defaults to the module thresholds and honours overrides"""
+        engine = get_timeline_engine(15)
+        assert (engine.peak_threshold, engine.maintenance_threshold) == (PEAK_THRESHOLD, MAINTENANCE_THRESHOLD)
+
+        strict = get_timeline_engine(15, 90, 60)
+        assert strict is not engine
+        blocks = [(8 * 60, 10 * 60, 85, 'peak'), (12 * 60, 14 * 60, 35, 'recovery')]
+        energy, default_zones = engine.paint([blocks], DEFAULTS)
+        _, strict_zones = strict.paint([blocks], DEFAULTS)
+        # 10:15 interpolates to ~80: peak at 75, maintenance at 90
+        assert engine.to_slots(energy[0], default_zones[0])[slot(engine, "10:15")]["zone"] == "peak"
+        assert strict.to_slots(energy[0], strict_zones[0])[slot(strict, "10:15")]["zone"] == "maintenance"
+
+
+class TestSummaries:
+    """Test run-length summaries and wake/sleep windows"""
+
+    def test_baseline_periods(self):
+        """Test the generous baseline's zone periods and totals"""
+        engine = EnergyTimelineEngine(15)
+        energy, zones = engine.baseline()
+        periods = engine.zone_periods(zones[0])
+
+        assert periods["peak"] == ["07:00-09:45"]
+        assert periods["productive"] == ["10:00-12:45", "14:30-16:45"]
+        assert periods["recovery"] == ["00:00-06:45", "21:00-23:45"]
+        assert engine.zone_minutes(zones[0], "peak") == 180
+        assert energy[0][slot(engine, "07:15")] == 77
+
+    def test_wake_and_sleep_windows(self):
+        """Test wake/sleep windows come from sustained rises and drops"""
+        engine = EnergyTimelineEngine(15)
+        blocks = [(7 * 60, 12 * 60, 85, 'peak'), (21 * 60, 24 * 60, 20, 'recovery')]
+        energy, _ = engine.paint([blocks], TimelineDefaults(early_morning=20, late_night=20, unspecified=60))
+
+        assert engine.wake_window(energy[0]) == "06:00-07:00"
+        # 12:00 -> 21:00 interpolates 85 -> 20, dropping below 35 just before 19:00
+        assert engine.sleep_window(energy[0]) == "18:00-19:00"
@@ -0,0 +1,225 @@
+"""
+Unit tests for the energy zone result store and interval index
+"""
+import asyncio
+import random
+import pytest
+import sys
+import os
+from datetime import datetime, date, time, timedelta
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from services.energy_zone_store import EnergyZoneIndex, EnergyZoneResultStore
+from shared_libs.data_models.energy_zones_models import (
+    EnergyZonesResult, EnergyZone, SleepSchedule, IntensityLevel, ModeType,
+    ChronotypeCategory, ZoneName
+)
+
+
+def make_zone(start: time, end: time, zone_name: ZoneName = ZoneName.PEAK) -> EnergyZone:
+    return EnergyZone(
+        zone_name=zone_name,
+        start_time=start,
+        end_time=end,
+        energy_level=60,
+        intensity_level=IntensityLevel.MODERATE,
+        optimal_activities=[],
+        description="",
+        start_offset_hours=0.0,
+        duration_hours=1.0
+    )
+
+
+def make_result(user_id: str = "user_a", expires_in: timedelta = timedelta(hours=24),
+                data_sources=None) -> EnergyZonesResult:
+    return EnergyZonesResult(
+        user_id=user_id,
+        calculation_date=date.today(),
+        detected_mode=ModeType.PRODUCTIVE,
+        sleep_schedule=SleepSchedule(
+            estimated_wake_time=time(7, 0),
+            estimated_bedtime=time(23, 0),
+            chronotype=ChronotypeCategory.NEUTRAL,
+            confidence_score=0.8,
+            data_sources=data_sources or ["ai_analysis"]
+        ),
+        energy_zones=[make_zone(time(7, 0), time(9, 0)), make_zone(time(9, 0), time(12, 0))],
+        confidence_score=0.8,
+        generated_at=datetime.now(),
+        expires_at=datetime.now() + expires_in
+    )
+
+
+class TestEnergyZoneIndex:
+    """Test that indexed lookups match the linear scan"""
+
+    def test_matches_linear_scan_with_overlaps_and_gaps(self):
+        """Test zone_at agrees with get_current_zone for every minute of the day"""
+        rng = random.Random(7)
+        for _ in range(20):
+            zones = []
+            for _ in range(rng.randint(0, 8)):
+                start, end = sorted(rng.sample(range(0, 24 * 60, 15), 2))
+                zones.append(make_zone(time(start // 60, start % 60), time(end // 60, end % 60)))
+            result = make_result()
+            result.energy_zones = zones
+            index = EnergyZoneIndex(zones)
+
+            for minute in range(24 * 60):
+                current = time(minute // 60, minute % 60)
+                assert index.zone_at(current) is result.get_current_zone(current)
+            assert index.zone_at(time(23, 59, 59, 999999)) is result.get_current_zone(time(23, 59, 59, 999999))
+
+    def test_next_zone(self):
+        """Test next_zone returns the first zone starting after the given time"""
+        morning = make_zone(time(7, 0), time(9, 0), ZoneName.FOUNDATION)
+        peak = make_zone(time(9, 0), time(12, 0), ZoneName.PEAK)
+        index = EnergyZoneIndex([peak, morning])
+
+        assert index.next_zone(time(6, 0)) is morning
+        assert index.next_zone(time(7, 0)) is peak
+        assert index.next_zone(time(10, 0)) is None
+
+
+class TestEnergyZoneResultStore:
+    """Test expiry, invalidation and eviction"""
+
+    def test_expired_results_are_not_served(self):
+        """Test get() honours expires_at"""
+        store = EnergyZoneResultStore()
+        store.put("user_a", make_result(expires_in=timedelta(seconds=-1)))
+        assert store.get("user_a") is None
+        assert len(store) == 0
+
+    def test_new_data_invalidates_only_when_newer(self):
+        """Test note_new_data compares against the stored data watermark"""
+        store = EnergyZoneResultStore()
+        watermark = datetime(2025, 1, 1, 12, 0)
+        store.put("user_a", make_result(), data_watermark=watermark)
+
+        assert store.note_new_data("user_a", watermark - timedelta(hours=1)) is False
+        assert store.get("user_a") is not None
+        assert store.note_new_data("user_a", watermark + timedelta(hours=1)) is True
+        assert store.get("user_a") is None
+        assert store.invalidations == 1
+
+    def test_lru_eviction(self):
+        """Test the least recently used user is evicted past max_users"""
+        store = EnergyZoneResultStore(max_users=2)
+        store.put("user_a", make_result("user_a"))
+        store.put("user_b", make_result("user_b"))
+        store.get("user_a")
+        store.put("user_c", make_result("user_c"))
+
+        assert store.get("user_b") is None
+        assert store.get("user_a") is not None
+
+
+class TestEnergyZonesServiceStore:
+    """Test AIEnergyZonesService serves from the store"""
+
+    @pytest.fixture
+    def service(self, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        from services.ai_energy_zones_service import AIEnergyZonesService
+
+        calls = {"data": 0, "ai": 0}
+
+        class FakeUserDataService:
+            async def get_analysis_data(self, user_id):
+                calls["data"] += 1
+                await asyncio.sleep(0.01)
+                return SimpleNamespace(scores=[1], biomarkers=[]), datetime(2025, 1, 1)
+
+        service = AIEnergyZonesService(FakeUserDataService())
+        service.store = EnergyZoneResultStore()
+        base = make_result()
+
+        async def fake_analysis(health_context):
+            calls["ai"] += 1
+            return {
+                "sleep_schedule": base.sleep_schedule,
+                "detected_mode": base.detected_mode,
+                "energy_zones": base.energy_zones,
+                "confidence_score": base.confidence_score
+            }
+
+        monkeypatch.setattr(service, "_ai_comprehensive_analysis", fake_analysis)
+        monkeypatch.setattr(service, "_create_biomarker_snapshot", lambda health_context: None)
+        service.calls = calls
+        return service
+
+    def test_repeat_requests_use_stored_result(self, service):
+        """Test a second request does not re-fetch data or call the model"""
+        async def run():
+            first = await service.calculate_energy_zones("user_a")
+            second = await service.calculate_energy_zones("user_a")
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first is second
+        assert service.calls == {"data": 1, "ai": 1}
+
+    def test_force_recalculate_bypasses_store(self, service):
+        """Test force_recalculate runs a new calculation and replaces the entry"""
+        async def run():
+            first = await service.calculate_energy_zones("user_a")
+            second = await service.calculate_energy_zones("user_a", force_recalculate=True)
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first is not second
+        assert service.calls["ai"] == 2
+        assert service.store.get("user_a").result is second
+
+    def test_concurrent_cold_requests_share_one_calculation(self, service):
+        """Test concurrent polls for an unstored user trigger one AI call"""
+        async def run():
+            return await asyncio.gather(*(service.get_stored_zones("user_a") for _ in range(5)))
+
+        results = asyncio.run(run())
+        assert service.calls["ai"] == 1
+        assert all(entry is results[0] for entry in results)
+
+    def test_forced_recalculation_does_not_join_unforced_run(self, service):
+        """Test force_recalculate starts its own calculation while a normal one is in flight"""
+        async def run():
+            return await asyncio.gather(
+                service.get_stored_zones("user_a"),
+                service.get_stored_zones("user_a", force_recalculate=True),
+            )
+
+        plain, forced = asyncio.run(run())
+        assert plain is not forced
+        assert service.calls["ai"] == 2
+
+    def test_analysis_uses_shared_openai_client(self, monkeypatch):
+        """Test the model call goes through the shared client registry"""
+        from services import ai_energy_zones_service as module
+
+        requests = []
+
+        async def fake_completion(model, **kwargs):
+            requests.append(model)
+            raise RuntimeError("no network in tests")
+
+        monkeypatch.setattr(module, "create_chat_completion", fake_completion)
+        service = module.AIEnergyZonesService(user_data_service=None)
+        from shared_libs.data_models.health_models import create_health_context_from_raw_data
+        health_context = create_health_context_from_raw_data("user_a", [], [], [], days=7)
+        result = asyncio.run(service._ai_comprehensive_analysis(health_context))
+        assert requests == ["gpt-4o"]
+        assert "fallback" in result["sleep_schedule"].data_sources
+
+    def test_fallback_results_are_not_stored(self, service, monkeypatch):
+        """Test fallback zones are returned but recalculated on the next request"""
+        async def failing_analysis(health_context):
+            service.calls["ai"] += 1
+            return service._create_fallback_analysis()
+
+        monkeypatch.setattr(service, "_ai_comprehensive_analysis", failing_analysis)
+        asyncio.run(service.calculate_energy_zones("user_a"))
+        assert service.store.get("user_a") is None
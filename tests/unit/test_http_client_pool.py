@@ -0,0 +1,67 @@
+"""
+Unit tests for the shared HTTP client pool
+"""
+import asyncio
+import pytest
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.http.client_pool import HTTPClientPool, http_pool
+
+
+class TestHTTPClientPool:
+    """Test pooled client reuse and lifecycle"""
+
+    def test_singleton(self):
+        """Test that the pool is a process-wide singleton"""
+        assert HTTPClientPool() is http_pool
+
+    def test_same_host_shares_client(self):
+        """Test that every path on a host reuses one client"""
+        async def run():
+            a = http_pool.get_client("https://api.sahha.ai/api/v1/profile")
+            b = http_pool.get_client("https://API.sahha.ai")
+            c = http_pool.get_client("https://hos-fapi-hm-sahha.onrender.com")
+            await http_pool.close()
+            return a, b, c
+
+        a, b, c = asyncio.run(run())
+        assert a is b
+        assert a is not c
+
+    def test_close_and_recreate(self):
+        """Test that closing the pool releases clients and new calls recreate them"""
+        async def run():
+            first = http_pool.get_client("http://127.0.0.1:9")
+            await http_pool.close()
+            second = http_pool.get_client("http://127.0.0.1:9")
+            await http_pool.close()
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first.is_closed
+        assert first is not second
+
+    def test_invalid_base_url(self):
+        """Test that relative URLs are rejected"""
+        with pytest.raises(ValueError):
+            http_pool.get_client("/api/v1/health")
+
+    def test_stale_client_is_closed(self):
+        """Test that a client left over from another event loop is closed when replaced"""
+        async def first_loop():
+            return http_pool.get_client("http://127.0.0.1:9")
+
+        async def second_loop():
+            client = http_pool.get_client("http://127.0.0.1:9")
+            await asyncio.sleep(0)  # Let the scheduled close run
+            await http_pool.close()
+            return client
+
+        stale = asyncio.run(first_loop())
+        fresh = asyncio.run(second_loop())
+        assert stale is not fresh
+        assert stale.is_closed
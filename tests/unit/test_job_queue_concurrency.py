@@ -0,0 +1,219 @@
+"""
+Unit tests for the multi-worker SimpleJobQueue (delayed retries, coalescing)
+"""
+import asyncio
+import pytest
+import sys
+import os
+import time
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from services.background.job_store import MemoryJobStore
+from services.background.simple_queue import SimpleJobQueue, JobStatus, payload_analyses, tracking_record_ids
+
+
+async def wait_for_stat(queue: SimpleJobQueue, key: str, value: int, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while queue.stats[key] < value:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"{key} stayed at {queue.stats[key]} (expected {value})")
+        await asyncio.sleep(0.01)
+
+
+class TestJobQueueConcurrency:
+    """Test workers, retry scheduling and per-user coalescing"""
+
+    def test_failing_job_does_not_block_other_jobs(self):
+        """Test a job waiting for its retry backoff does not hold a worker"""
+
+        async def run():
+            queue = SimpleJobQueue(concurrency=1, retry_base_delay=0.5, store=MemoryJobStore())
+            finished = []
+
+            async def flaky(job):
+                if job.payload["name"] == "flaky" and job.attempts < 3:
+                    raise Exception("sahha unavailable")
+                finished.append((job.payload["name"], time.monotonic()))
+
+            queue.register_handler("FAKE", flaky)
+            await queue.start()
+            start = time.monotonic()
+            await queue.submit_job("FAKE", {"name": "flaky"})
+            for i in range(5):
+                await queue.submit_job("FAKE", {"name": f"job-{i}"})
+            await wait_for_stat(queue, "completed", 6)
+            stats = queue.get_stats()
+            await queue.stop()
+            return start, finished, stats
+
+        start, finished, stats = asyncio.run(run())
+
+        # With one worker the healthy jobs still finish before the first backoff ends
+        healthy = [t for name, t in finished if name != "flaky"]
+        assert max(healthy) - start < 0.5
+        assert finished[-1][0] == "flaky"
+        assert stats["retries"] == 2
+        assert stats["delayed"] == 0
+
+    def test_jobs_run_concurrently(self):
+        """Test slow jobs overlap across workers"""
+
+        async def run():
+            queue = SimpleJobQueue(concurrency=4, store=MemoryJobStore())
+
+            async def slow(job):
+                await asyncio.sleep(0.2)
+
+            queue.register_handler("FAKE", slow)
+            await queue.start()
+            start = time.monotonic()
+            for i in range(8):
+                await queue.submit_job("FAKE", {"name": i})
+            await wait_for_stat(queue, "completed", 8)
+            elapsed = time.monotonic() - start
+            await queue.stop()
+            return elapsed
+
+        assert asyncio.run(run()) < 0.7
+
+    def test_pending_sync_jobs_are_coalesced(self):
+        """Test repeated SYNC_SAHHA_DATA submissions for one user merge into one job"""
+
+        async def run():
+            queue = SimpleJobQueue(concurrency=1, store=MemoryJobStore())
+            processed = []
+
+            async def record(job):
+                processed.append(job.payload)
+
+            queue.register_handler("SYNC_SAHHA_DATA", record)
+            payload = {"user_id": "u1", "archetype": "Foundation Builder", "analysis_type": "behavior_analysis"}
+            for i in range(3):
+                await queue.submit_job("SYNC_SAHHA_DATA", {**payload, "sahha_data": {"biomarkers": [i], "scores": []}})
+            await queue.submit_job("SYNC_SAHHA_DATA", {**payload, "user_id": "u2", "sahha_data": {"biomarkers": [9]}})
+
+            await queue.start()
+            await wait_for_stat(queue, "completed", 2)
+            stats = queue.get_stats()
+            await queue.stop()
+            return processed, stats
+
+        processed, stats = asyncio.run(run())
+
+        assert stats["queued"] == 2
+        assert stats["coalesced"] == 2
+        assert processed[0]["sahha_data"]["biomarkers"] == [0, 1, 2]
+        assert processed[1]["user_id"] == "u2"
+
+    def test_coalesced_jobs_keep_every_tracking_record(self):
+        """Test merging keeps each submission's tracking_record_id so all are completed"""
+
+        async def run():
+            queue = SimpleJobQueue(concurrency=1, store=MemoryJobStore())
+            processed = []
+
+            async def record(job):
+                processed.append(job.payload)
+
+            queue.register_handler("SYNC_SAHHA_DATA", record)
+            payload = {"user_id": "u1", "archetype": "Foundation Builder", "analysis_type": "behavior_analysis"}
+            for tracking_id in (11, 12, 12, 13):
+                await queue.submit_job("SYNC_SAHHA_DATA", {
+                    **payload, "tracking_record_id": tracking_id, "sahha_data": {"biomarkers": [tracking_id]}
+                })
+
+            await queue.start()
+            await wait_for_stat(queue, "completed", 1)
+            await queue.stop()
+            return processed
+
+        processed = asyncio.run(run())
+
+        assert len(processed) == 1
+        assert processed[0]["tracking_record_ids"] == [11, 12, 13]
+        assert "tracking_record_id" not in processed[0]
+        assert tracking_record_ids(processed[0]) == [11, 12, 13]
+
+    def test_user_jobs_merge_across_analyses(self):
+        """Test a user's sync jobs for different analyses merge and keep each analysis"""
+
+        async def run():
+            queue = SimpleJobQueue(concurrency=1, store=MemoryJobStore())
+            processed = []
+
+            async def record(job):
+                processed.append(job.payload)
+
+            queue.register_handler("SYNC_SAHHA_DATA", record)
+            for analysis_type in ("behavior_analysis", "circadian_analysis", "behavior_analysis"):
+                await queue.submit_job("SYNC_SAHHA_DATA", {
+                    "user_id": "u1", "archetype": "Foundation Builder", "analysis_type": analysis_type,
+                    "sahha_data": {"biomarkers": [analysis_type]}
+                })
+
+            await queue.start()
+            await wait_for_stat(queue, "completed", 1)
+            await queue.stop()
+            return processed
+
+        processed = asyncio.run(run())
+
+        assert len(processed) == 1
+        assert payload_analyses(processed[0]) == [
+            ["Foundation Builder", "behavior_analysis"], ["Foundation Builder", "circadian_analysis"]
+        ]
+
+    def test_user_jobs_never_run_concurrently(self):
+        """Test a job submitted while the user's job runs waits for it, other users do not"""
+
+        async def run():
+            queue = SimpleJobQueue(concurrency=4, store=MemoryJobStore())
+            running, overlaps, order = set(), [], []
+
+            async def slow(job):
+                user_id = job.payload["user_id"]
+                if user_id in running:
+                    overlaps.append(user_id)
+                running.add(user_id)
+                order.append(user_id)
+                await asyncio.sleep(0.1)
+                running.discard(user_id)
+
+            queue.register_handler("SYNC_SAHHA_DATA", slow)
+            await queue.start()
+            await queue.submit_job("SYNC_SAHHA_DATA", {"user_id": "u1", "analysis_type": "behavior_analysis"})
+            await asyncio.sleep(0.03)
+            await queue.submit_job("SYNC_SAHHA_DATA", {"user_id": "u1", "analysis_type": "circadian_analysis"})
+            await queue.submit_job("SYNC_SAHHA_DATA", {"user_id": "u2", "analysis_type": "behavior_analysis"})
+            await wait_for_stat(queue, "completed", 3)
+            await queue.stop()
+            return overlaps, order
+
+        overlaps, order = asyncio.run(run())
+
+        assert overlaps == []
+        assert order == ["u1", "u2", "u1"]
+
+    def test_job_fails_after_max_attempts(self):
+        """Test a job that keeps failing is marked failed after 3 attempts"""
+
+        async def run():
+            queue = SimpleJobQueue(concurrency=2, retry_base_delay=0.01, store=MemoryJobStore())
+            jobs = []
+
+            async def always_fail(job):
+                jobs.append(job)
+                raise Exception("boom")
+
+            queue.register_handler("FAKE", always_fail)
+            await queue.start()
+            await queue.submit_job("FAKE", {})
+            await wait_for_stat(queue, "failed", 1)
+            await queue.stop()
+            return jobs
+
+        jobs = asyncio.run(run())
+        assert len(jobs) == 3
+        assert jobs[-1].status == JobStatus.FAILED
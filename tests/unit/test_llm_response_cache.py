@@ -0,0 +1,145 @@
+"""
+Unit tests for the content-addressed LLM response cache
+"""
+import asyncio
+import time
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.llm.response_cache import (
+    LLMResponseCache, MemoryResponseStore, make_cache_key, estimate_cost
+)
+from shared_libs.llm.openai_registry import OpenAIClientRegistry
+
+COMPLETION = {
+    "id": "chatcmpl-1",
+    "object": "chat.completion",
+    "created": 1700000000,
+    "model": "gpt-4o",
+    "choices": [{
+        "index": 0,
+        "finish_reason": "stop",
+        "message": {"role": "assistant", "content": "{\"ok\": true}"},
+    }],
+    "usage": {"prompt_tokens": 1000, "completion_tokens": 500, "total_tokens": 1500},
+}
+
+
+class TestCacheKey:
+    """Test the content address covers everything that changes the output"""
+
+    def test_key_is_stable_and_content_sensitive(self):
+        """Test identical requests collide and any prompt/format change does not"""
+        messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "ctx"}]
+        base = make_cache_key("gpt-4o", messages, temperature=0.2)
+        assert base == make_cache_key("gpt-4o", list(messages), temperature=0.2, timeout=30)
+        assert base != make_cache_key("o3", messages, temperature=0.2)
+        assert base != make_cache_key("gpt-4o", messages[:1], temperature=0.2)
+        assert base != make_cache_key("gpt-4o", messages, temperature=0.2, response_format={"type": "json_object"})
+
+    def test_cost_estimate(self):
+        """Test cost saved is derived from the stored usage block"""
+        assert round(estimate_cost("gpt-4o", COMPLETION["usage"]), 4) == 0.0075
+        assert estimate_cost("unknown-model", COMPLETION["usage"]) == 0.0
+
+
+class TestStores:
+    """Test TTL and size-bounded eviction in both backends"""
+
+    def test_memory_store_evicts_lru_by_bytes(self):
+        """Test the least recently used entry goes first when over budget"""
+        store = MemoryResponseStore(max_bytes=20)
+        store.set("a", "m", "x" * 8, 60, 0.0)
+        store.set("b", "m", "y" * 8, 60, 0.0)
+        store.get("a")
+        store.set("c", "m", "z" * 8, 60, 0.0)
+        assert store.get("b") is None
+        assert store.get("a") is not None and store.get("c") is not None
+        assert store.get_stats()["bytes"] <= 20
+
+    def test_sqlite_backend_persists_and_expires(self, tmp_path):
+        """Test responses survive a new cache instance and expire after their TTL"""
+        path = str(tmp_path / "llm.sqlite3")
+
+        async def run():
+            first = LLMResponseCache(backend="sqlite", path=path)
+            await first.set("k", "gpt-4o", COMPLETION)
+            await first.set("short", "gpt-4o", COMPLETION, ttl_seconds=1)
+            second = LLMResponseCache(backend="sqlite", path=path)
+            hit = await second.get("k", "gpt-4o")
+            second.store._conn.execute("UPDATE llm_responses SET expires_at = ? WHERE key = 'short'", (time.time() - 1,))
+            expired = await second.get("short", "gpt-4o")
+            return hit, expired, second.get_stats()
+
+        hit, expired, stats = asyncio.run(run())
+        assert hit[0]["choices"][0]["message"]["content"] == "{\"ok\": true}"
+        assert expired is None
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        assert stats["cost_saved_usd"] == 0.0075
+
+
+class _FakeCompletions:
+    def __init__(self, finish_reason="stop"):
+        self.calls = 0
+        self.finish_reason = finish_reason
+
+    async def create(self, **kwargs):
+        from openai.types.chat import ChatCompletion
+        self.calls += 1
+        completion = ChatCompletion.model_validate(COMPLETION)
+        completion.choices[0].finish_reason = self.finish_reason
+        return completion
+
+
+class _FakeClient:
+    def __init__(self, finish_reason="stop"):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _FakeCompletions(finish_reason)
+
+
+class TestRegistryIntegration:
+    """Test chat_completion serves repeated prompts from the cache"""
+
+    def test_identical_prompt_served_from_cache(self, monkeypatch):
+        """Test the second identical call does not reach OpenAI"""
+        registry_module = sys.modules[OpenAIClientRegistry.__module__]
+
+        cache = LLMResponseCache(backend="memory")
+        monkeypatch.setattr(registry_module, "get_response_cache", lambda: cache)
+        registry = OpenAIClientRegistry()
+        client = _FakeClient()
+        monkeypatch.setattr(registry, "get_client", lambda api_key=None: client)
+        messages = [{"role": "user", "content": "same context"}]
+
+        async def run():
+            first = await registry.chat_completion("gpt-4o", cache=True, messages=messages)
+            second = await registry.chat_completion("gpt-4o", cache=True, messages=messages)
+            uncached = await registry.chat_completion("gpt-4o", messages=messages)
+            return first, second, uncached
+
+        first, second, _ = asyncio.run(run())
+        assert client.chat.completions.calls == 2
+        assert second.choices[0].message.content == first.choices[0].message.content
+        assert cache.get_stats()["hits"] == 1
+
+    def test_truncated_completion_not_cached(self, monkeypatch):
+        """Test a completion cut off at max tokens is not replayed from the cache"""
+        registry_module = sys.modules[OpenAIClientRegistry.__module__]
+
+        cache = LLMResponseCache(backend="memory")
+        monkeypatch.setattr(registry_module, "get_response_cache", lambda: cache)
+        registry = OpenAIClientRegistry()
+        client = _FakeClient(finish_reason="length")
+        monkeypatch.setattr(registry, "get_client", lambda api_key=None: client)
+        messages = [{"role": "user", "content": "long context"}]
+
+        async def run():
+            await registry.chat_completion("gpt-4o", cache=True, messages=messages)
+            await registry.chat_completion("gpt-4o", cache=True, messages=messages)
+
+        asyncio.run(run())
+        assert client.chat.completions.calls == 2
+        assert cache.get_stats()["hits"] == 0
@@ -0,0 +1,211 @@
+"""
+Unit tests for the background log sink and MVPStyleLogger integration
+"""
+
+import gzip
+import json
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.utils import log_sink as log_sink_module
+from shared_libs.utils.log_sink import LogSink
+
+
+class TestLogSink:
+    """Queueing, backpressure, sampling, compression and rotation"""
+
+    def test_files_format_writes_existing_layout(self, tmp_path):
+        """Records land in their own files with the usual JSON formatting"""
+        sink = LogSink()
+        target = tmp_path / "agent_handoffs" / "handoff_1_1.json"
+        assert sink.submit(str(target), {"user_id": "u1", "data": {"a": 1}})
+        assert sink.flush(2)
+        assert json.loads(target.read_text(encoding="utf-8")) == {"user_id": "u1", "data": {"a": 1}}
+        assert sink.get_stats()["written"] == 1
+        sink.close()
+
+    @staticmethod
+    def _stall_writer(sink: LogSink) -> threading.Event:
+        """Make the writer hang on its first batch until the returned event is set"""
+        release = threading.Event()
+        original = sink._write_batch
+
+        def slow_write(batch):
+            release.wait(2)
+            original(batch)
+
+        sink._write_batch = slow_write
+        return release
+
+    @staticmethod
+    def _wait_for_writer(sink: LogSink):
+        with sink._cond:
+            assert sink._cond.wait_for(lambda: sink._writing, 2)
+
+    def test_full_queue_drops_new_records(self, tmp_path):
+        """With drop_new, a full queue rejects further records instead of blocking"""
+        sink = LogSink(queue_size=2, batch_size=1)
+        release = self._stall_writer(sink)
+        results = [sink.submit(str(tmp_path / "input_0.txt"), {"n": 0})]
+        self._wait_for_writer(sink)
+        results += [sink.submit(str(tmp_path / f"input_{i}.txt"), {"n": i}) for i in range(1, 6)]
+        release.set()
+        assert sink.flush(2)
+
+        # One record was being written and two fit in the queue
+        assert results == [True, True, True, False, False, False]
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["input_0.txt", "input_1.txt", "input_2.txt"]
+        assert sink.get_stats()["dropped"] == 3
+        sink.close()
+
+    def test_drop_oldest_keeps_newest_records(self, tmp_path):
+        """drop_oldest evicts queued records so the newest ones are written"""
+        sink = LogSink(queue_size=2, batch_size=1, drop_policy="drop_oldest")
+        release = self._stall_writer(sink)
+        sink.submit(str(tmp_path / "input_0.txt"), {"n": 0})
+        self._wait_for_writer(sink)
+        results = [sink.submit(str(tmp_path / f"input_{i}.txt"), {"n": i}) for i in range(1, 6)]
+        release.set()
+        assert sink.flush(2)
+
+        assert all(results)
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["input_0.txt", "input_4.txt", "input_5.txt"]
+        assert sink.get_stats()["dropped"] == 3
+        sink.close()
+
+    def test_block_policy_waits_for_room(self, tmp_path):
+        """block waits up to block_timeout, then drops"""
+        sink = LogSink(queue_size=1, batch_size=1, drop_policy="block", block_timeout=0.05)
+        release = self._stall_writer(sink)
+        sink.submit(str(tmp_path / "input_0.txt"), {"n": 0})
+        self._wait_for_writer(sink)
+        assert sink.submit(str(tmp_path / "input_1.txt"), {"n": 1})
+        assert not sink.submit(str(tmp_path / "input_2.txt"), {"n": 2})
+        release.set()
+        assert sink.flush(2)
+        assert sink.get_stats()["written"] == 2
+        sink.close()
+
+    def test_sampling_summarizes_payload_fields(self, tmp_path):
+        """Sampled-out records keep metadata and the keys of large fields"""
+        sink = LogSink(sample_rate=0.0)
+        target = tmp_path / "output_7.txt"
+        sink.submit(str(target), {"analysis_number": 7, "data": {"plan": "x" * 1000}}, payload_fields=("data",))
+        sink.flush(2)
+
+        record = json.loads(target.read_text(encoding="utf-8"))
+        assert record["analysis_number"] == 7
+        assert record["data"] == {"sampled_out": True, "type": "dict", "keys": ["plan"]}
+        assert sink.get_stats()["sampled_out"] == 1
+        sink.close()
+
+    def test_sampling_is_consistent_per_key(self):
+        """Every record of one analysis gets the same sampling decision"""
+        sink = LogSink(sample_rate=0.01)
+        decisions = [sink.should_sample(f"analysis-{i}") for i in range(2000)]
+        assert all(sink.should_sample(f"analysis-{i}") == decisions[i] for i in range(2000))
+        assert 0 < sum(decisions) < 100
+
+    def test_jsonl_rotation_and_compression(self, tmp_path):
+        """JSONL segments rotate by size into gzipped backups"""
+        sink = LogSink(log_format="jsonl", compress=True, max_bytes=2000, backup_count=2, batch_size=1)
+        for i in range(30):
+            sink.submit(str(tmp_path / f"input_{i}.txt"), {"n": i, "data": "y" * 200}, stream="input")
+            sink.flush(2)
+        sink.close()
+
+        names = sorted(path.name for path in tmp_path.iterdir() if not path.name.endswith(".lock"))
+        assert names == ["input.jsonl", "input.jsonl.1.gz", "input.jsonl.2.gz"]
+        assert os.path.getsize(tmp_path / "input.jsonl") <= 2000
+        newest_backup = gzip.decompress((tmp_path / "input.jsonl.1.gz").read_bytes()).decode()
+        last_line = json.loads(newest_backup.splitlines()[-1])
+        assert last_line["file"].startswith("input_") and last_line["data"] == "y" * 200
+        assert sink.get_stats()["rotations"] >= 2
+
+    def test_shared_segment_rotation_loses_no_lines(self, tmp_path):
+        """Sinks sharing a segment (one per worker process) rotate it without losing lines"""
+        sinks = [LogSink(log_format="jsonl", max_bytes=3000, backup_count=100, batch_size=4) for _ in range(2)]
+
+        def produce(sink, worker):
+            for i in range(100):
+                sink.submit(str(tmp_path / f"input_{i}.txt"), {"worker": worker, "n": i, "data": "y" * 100}, stream="input")
+            sink.flush(5)
+
+        threads = [threading.Thread(target=produce, args=(sink, worker)) for worker, sink in enumerate(sinks)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for sink in sinks:
+            sink.close()
+
+        records = [
+            json.loads(line)
+            for path in tmp_path.glob("input.jsonl*") if not path.name.endswith(".lock")
+            for line in path.read_text().splitlines()
+        ]
+        assert len(records) == 200
+        assert sum(sink.get_stats()["written"] for sink in sinks) == 200
+
+    def test_stats_are_exact_under_concurrent_submits(self, tmp_path):
+        """Counters updated by callers and the writer thread add up"""
+        sink = LogSink(queue_size=10000, batch_size=8)
+
+        def produce(worker):
+            for i in range(250):
+                sink.submit(str(tmp_path / f"w{worker}_{i}.json"), {"n": i})
+
+        threads = [threading.Thread(target=produce, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        sink.close()
+
+        stats = sink.get_stats()
+        assert stats["submitted"] == stats["written"] == 1000
+        assert stats["bytes_written"] == sum(path.stat().st_size for path in tmp_path.iterdir())
+
+    def test_jsonl_wraps_non_dict_records(self, tmp_path):
+        """Lists and strings are written under "data" instead of being dropped"""
+        sink = LogSink(log_format="jsonl", compress=False, batch_size=1)
+        assert sink.submit(str(tmp_path / "output_1.txt"), [1, 2], stream="output", payload_fields=("x",))
+        assert sink.submit(str(tmp_path / "output_2.txt"), "plain text", stream="output")
+        sink.close()
+
+        lines = [json.loads(line) for line in (tmp_path / "output.jsonl").read_text().splitlines()]
+        assert lines == [{"file": "output_1.txt", "data": [1, 2]}, {"file": "output_2.txt", "data": "plain text"}]
+        assert sink.get_stats()["write_errors"] == 0
+
+class TestMVPLoggerSink:
+    """MVPStyleLogger hands records to the sink"""
+
+    def test_log_methods_queue_records(self, tmp_path, monkeypatch):
+        """log_complete_analysis returns before the writer thread touches disk"""
+        monkeypatch.chdir(tmp_path)  # The module-level singleton creates ./logs
+        from services.mvp_style_logger import MVPStyleLogger
+
+        sink = LogSink()
+        monkeypatch.setattr(log_sink_module, "_log_sink", sink)
+        mvp = MVPStyleLogger(logs_dir=str(tmp_path / "mvp"))
+
+        results = mvp.log_complete_analysis(
+            input_data={"request": 1},
+            output_data={"plan": "p"},
+            agent_handoffs=[{"from_agent": "behavior", "to_agent": "routine", "input_data": {"k": 1}}],
+            user_id="u1",
+            archetype="Foundation Builder"
+        )
+        assert results["input_success"] and results["output_success"]
+        assert results["agent_handoffs_success"] == 1
+        assert sink.flush(2)
+
+        number = results["analysis_number"]
+        output = json.loads((tmp_path / "mvp" / f"output_{number}.txt").read_text(encoding="utf-8"))
+        assert output["data"]["plan"] == "p"
+        handoff = json.loads((tmp_path / "mvp" / "agent_handoffs" / f"handoff_{number}_1.json").read_text(encoding="utf-8"))
+        assert handoff["input_data"]["data"] == {"k": 1}
+        sink.close()
@@ -0,0 +1,139 @@
+"""
+Unit tests for the size-aware LRU cache and cache manager
+"""
+import threading
+import time
+import pytest
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.caching.lru_cache import (
+    LRUCache, MemoryAwareCacheManager, ThreadSafeLRUCache, TimerWheel, estimate_size
+)
+from shared_libs.data_models.health_models import create_health_context_from_raw_data
+
+
+def fixed_size(value):
+    return 100
+
+
+class TestLRUCache:
+    """Test entry, byte and TTL limits"""
+
+    def test_byte_budget_evicts_least_recently_used(self):
+        """Test the byte budget holds and recently read entries survive eviction"""
+        cache = LRUCache(max_size=100, ttl_seconds=60, max_bytes=1000, sizeof=fixed_size)
+        for i in range(10):
+            cache.set(f"key_{i}", i)
+        assert cache.get("key_0") == 0  # Now most recently used
+
+        cache.set("key_10", 10)
+        assert cache.total_bytes == 1000
+        assert cache.get("key_1") is None and cache.get("key_0") == 0
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_refresh_and_delete_release_bytes(self):
+        """Test overwriting or deleting a key keeps the byte count exact"""
+        cache = LRUCache(max_size=10, ttl_seconds=60)
+        cache.set("key", "x" * 1000)
+        first = cache.total_bytes
+        cache.set("key", "x" * 10)
+        assert cache.total_bytes < first and len(cache) == 1
+        cache.delete("key")
+        cache.delete("missing")
+        assert cache.total_bytes == 0 and len(cache) == 0
+
+    def test_oversized_value_rejected(self):
+        """Test a value larger than the whole budget is not cached"""
+        cache = LRUCache(max_size=10, ttl_seconds=60, max_bytes=500)
+        cache.set("small", "ok")
+        cache.set("huge", "x" * 1000)
+        assert cache.get("huge") is None and cache.get("small") == "ok"
+        assert cache.get_stats()["rejected"] == 1
+
+    def test_lazy_ttl_and_wheel_reclaim(self):
+        """Test expired entries miss on read and are reclaimed by later writes"""
+        cache = LRUCache(max_size=1000, ttl_seconds=0.05)
+        for i in range(100):
+            cache.set(f"key_{i}", i)
+        assert cache.get("key_0") == 0
+
+        time.sleep(0.08)
+        assert cache.get("key_0") is None
+        cache.set("fresh", 1)
+        assert len(cache) == 1 and cache.get("fresh") == 1
+        assert cache.get_stats()["expirations"] == 100
+
+    def test_wheel_skips_refreshed_entries(self):
+        """Test a stale wheel record does not expire a refreshed entry"""
+        cache = LRUCache(max_size=10, ttl_seconds=0.1)
+        cache.set("key", "old")
+        time.sleep(0.06)
+        cache.set("key", "new")
+        time.sleep(0.06)
+        cache.purge_expired()
+        assert cache.get("key") == "new"
+
+    def test_timer_wheel_multiple_revolutions(self):
+        """Test records beyond one revolution wait for their own tick"""
+        wheel = TimerWheel(resolution=1.0, slots=4)
+        start = wheel.current_tick
+        entry_soon, entry_later = [None, 0, start + 2], [None, 0, start + 6]
+        wheel.schedule("soon", entry_soon)
+        wheel.schedule("later", entry_later)
+
+        assert [key for key, _ in wheel.advance(start + 3)] == ["soon"]
+        assert wheel.advance(start + 5) == []
+        assert [key for key, _ in wheel.advance(start + 100)] == ["later"]
+
+    def test_estimate_size_follows_models(self):
+        """Test sizes grow with nested content, including pydantic models"""
+        small = create_health_context_from_raw_data("user-1", [], [], [], 7)
+        scores = [{"id": str(i), "profile_id": "user-1", "type": "sleep", "score": 0.5, "data": {},
+                   "score_date_time": "2026-10-16T08:00:00+00:00", "created_at": "2026-10-16T08:00:00+00:00",
+                   "updated_at": "2026-10-16T08:00:00+00:00"} for i in range(50)]
+        large = create_health_context_from_raw_data("user-1", scores, [], [], 7)
+        assert estimate_size(large) > estimate_size(small) + 50 * 200
+
+        shared = "x" * 10000
+        assert estimate_size([shared, shared]) < 2 * estimate_size(shared)
+
+    def test_thread_safe_variant(self):
+        """Test the locked variant stays consistent under concurrent writers"""
+        cache = ThreadSafeLRUCache(max_size=50, ttl_seconds=60, max_bytes=2000, sizeof=fixed_size)
+
+        def write(offset):
+            for i in range(500):
+                cache.set(f"key_{offset}_{i}", i)
+                cache.get(f"key_{offset}_{i // 2}")
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(cache) == 20 and cache.total_bytes == 2000
+
+
+class TestMemoryAwareCacheManager:
+    """Test cleanup is driven by cache bytes, not process memory"""
+
+    def test_cleanup_uses_cache_bytes(self, monkeypatch):
+        """Test high RSS alone does not evict, while an over-budget cache is halved"""
+        manager = MemoryAwareCacheManager(total_memory_limit_mb=1)
+        monkeypatch.setattr(manager, "get_memory_usage_mb", lambda: 10_000.0)
+        cache = manager.create_cache("test", max_size=1000, ttl_seconds=60)
+        for i in range(10):
+            cache.set(f"key_{i}", "x" * 10_000)
+        assert manager.cleanup_if_needed() is False and len(cache) == 10
+
+        for i in range(10, 100):
+            cache.set(f"key_{i}", "x" * 10_000)
+        before = cache.total_bytes
+        assert manager.cleanup_if_needed() is True
+        assert cache.total_bytes <= before // 2
+        assert cache.get("key_99") is not None and cache.get("key_0") is None
+        assert manager.get_cache_stats()["caches"]["test"]["bytes"] == cache.total_bytes
@@ -0,0 +1,198 @@
+"""
+Unit tests for the memory snapshot and memoized context-prep lookups
+"""
+import asyncio
+import json
+import time
+import pytest
+import sys
+import os
+
+import asyncpg
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from services.agents.memory.memory_layers import memories_by_category, retrieve_memory_snapshot
+
+NOW = "2026-10-16T08:00:00+00:00"
+
+SNAPSHOT_ROW = {
+    "working": json.dumps([{"id": "w1", "memory_type": "user_goals", "content": {"goal": "sleep"},
+                            "priority": 8, "created_at": NOW, "expires_at": NOW}]),
+    "shortterm": json.dumps([{"id": "s1", "memory_category": "goal_progress", "content": {"done": 3},
+                              "confidence_score": 0.7, "recency_weight": 1.2, "relevance_score": 0.5,
+                              "importance_score": 0.4, "created_at": NOW, "last_accessed": NOW}]),
+    "longterm": json.dumps([{"id": "l1", "memory_category": "successful_strategies", "memory_data": {"walk": True},
+                             "confidence_score": 0.9, "stability_score": None, "version": 2,
+                             "is_consolidated": True, "created_at": NOW, "last_updated": NOW}]),
+    "meta": "[]"
+}
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def fetchrow(self, query, *args):
+        self.pool.round_trips += 1
+        await asyncio.sleep(self.pool.latency)
+        if "WITH working AS" in query:
+            if self.pool.snapshot_error:
+                raise asyncpg.UndefinedTableError('relation "holistic_meta_memory" does not exist')
+            return SNAPSHOT_ROW
+        return None
+
+    async def fetch(self, query, *args):
+        self.pool.round_trips += 1
+        await asyncio.sleep(self.pool.latency)
+        return []
+
+
+class FakeAcquire:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        self.pool.acquired += 1
+        return FakeConnection(self.pool)
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakePool:
+    def __init__(self, latency=0.0, snapshot_error=False):
+        self.latency = latency
+        self.snapshot_error = snapshot_error
+        self.acquired = 0
+        self.round_trips = 0
+
+    def acquire(self):
+        return FakeAcquire(self)
+
+
+class TestMemorySnapshot:
+    """Test all memory layers are fetched together"""
+
+    def test_single_round_trip(self):
+        """Test the snapshot is one statement on one connection with layer-shaped records"""
+        pool = FakePool()
+        snapshot = asyncio.run(retrieve_memory_snapshot(pool, "user-1"))
+
+        assert pool.acquired == 1 and pool.round_trips == 1
+        assert snapshot["working"][0] == {"id": "w1", "category": "user_goals", "content": {"goal": "sleep"},
+                                          "priority": 8, "created_at": NOW, "expires_at": NOW}
+        assert snapshot["longterm"][0]["stability"] == 0.5
+        assert snapshot["meta"] == []
+        assert memories_by_category(snapshot["shortterm"]) == {"goal_progress": {"done": 3}}
+
+    def test_fallback_retrieves_layers_concurrently(self):
+        """Test a failing snapshot statement falls back to concurrent per-layer queries"""
+        pool = FakePool(latency=0.05, snapshot_error=True)
+        start = time.perf_counter()
+        snapshot = asyncio.run(retrieve_memory_snapshot(pool, "user-1"))
+        elapsed = time.perf_counter() - start
+
+        assert set(snapshot) == {"working", "shortterm", "longterm", "meta"}
+        assert pool.round_trips == 5  # Failed snapshot + 4 layers
+        assert elapsed < 0.18  # Snapshot attempt + one overlapped round, not 5 sequential
+
+    def test_no_pool(self):
+        """Test a missing pool yields empty layers"""
+        snapshot = asyncio.run(retrieve_memory_snapshot(None, "user-1"))
+        assert snapshot == {"working": [], "shortterm": [], "longterm": [], "meta": []}
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    from services.ai_context_generation_service import AIContextGeneratorService
+
+    service = AIContextGeneratorService.__new__(AIContextGeneratorService)
+    service.fetches = []
+    service.failures = 0
+
+    async def fetch(user_id, archetype=None, limit=3):
+        service.fetches.append(limit)
+        await asyncio.sleep(0.05)
+        if service.failures:
+            service.failures -= 1
+            raise ConnectionError("database unavailable")
+        plans = [
+            {"id": "p1", "analysis_type": "behavior_analysis"},
+            {"id": "p2", "analysis_type": "circadian_analysis"},
+            {"id": "p3", "analysis_type": "routine_plan"},
+        ]
+        return plans[:limit]
+
+    monkeypatch.setattr(service, "_fetch_last_plans", fetch, raising=False)
+    return service
+
+
+class TestLastPlansMemo:
+    """Test identical _get_last_plans lookups within one request share one query"""
+
+    def test_identical_and_smaller_lookups_share_fetch(self, generator):
+        """Test concurrent identical calls and smaller limits reuse the first fetch"""
+        async def run():
+            memo = {}
+            first, second = await asyncio.gather(
+                generator._get_last_plans("user-1", "Peak Performer", 2, memo=memo),
+                generator._get_last_plans("user-1", "Peak Performer", 2, memo=memo),
+            )
+            smaller = await generator._get_last_plans("user-1", "Peak Performer", 1, memo=memo)
+            larger = await generator._get_last_plans("user-1", "Peak Performer", 3, memo=memo)
+            return first, second, smaller, larger
+
+        first, second, smaller, larger = asyncio.run(run())
+        assert first == second and len(first) == 2
+        assert [plan["id"] for plan in smaller] == ["p1"]
+        assert len(larger) == 3
+        assert generator.fetches == [2, 3]
+
+    def test_lookups_are_not_shared_across_requests(self, generator):
+        """Test calls without a memo, or with a new one, always query"""
+        async def run():
+            await generator._get_last_plans("user-1", None, 2)
+            await generator._get_last_plans("user-1", None, 2)
+            await generator._get_last_plans("user-1", None, 2, memo={})
+            await generator._get_last_plans("user-1", None, 2, memo={})
+
+        asyncio.run(run())
+        assert generator.fetches == [2, 2, 2, 2]
+
+    def test_failed_fetch_is_not_memoized(self, generator):
+        """Test a failed lookup returns no plans and the next call in the request retries"""
+        generator.failures = 1
+
+        async def run():
+            memo = {}
+            failed = await generator._get_last_plans("user-1", None, 2, memo=memo)
+            retried = await generator._get_last_plans("user-1", None, 2, memo=memo)
+            return failed, retried
+
+        failed, retried = asyncio.run(run())
+        assert failed == [] and len(retried) == 2
+        assert generator.fetches == [2, 2]
+
+    def test_prepare_context_runs_sources_concurrently(self, generator, monkeypatch):
+        """Test context prep overlaps the AI context with one shared history fetch"""
+        from services.ai_context_integration_service import AIContextIntegrationService
+
+        service = AIContextIntegrationService.__new__(AIContextIntegrationService)
+        service.ai_context_service = generator
+
+        async def summary(user_id, archetype=None, plans_memo=None):
+            await asyncio.sleep(0.05)
+            return "context"
+
+        monkeypatch.setattr(service, "_get_ai_context_summary", summary, raising=False)
+
+        start = time.perf_counter()
+        context = asyncio.run(service.prepare_memory_enhanced_context("user-1", archetype="Peak Performer"))
+        assert time.perf_counter() - start < 0.09  # Sequential would be ~0.15s
+
+        assert context.ai_context_summary == "context"
+        assert [plan["id"] for plan in context.behavior_analysis_history] == ["p1"]
+        assert [plan["id"] for plan in context.circadian_analysis_history] == ["p2"]
+        assert generator.fetches == [2]
@@ -0,0 +1,88 @@
+"""
+Unit tests for the shared OpenAI client registry
+"""
+import asyncio
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.llm.openai_registry import OpenAIClientRegistry, _parse_model_limits
+
+
+class TestOpenAIClientRegistry:
+    """Test client reuse and per-model concurrency limits"""
+
+    def test_parse_model_limits(self):
+        """Test concurrency spec parsing skips malformed entries"""
+        limits = _parse_model_limits("o3=2, gpt-4o=8,broken,gpt-4o-mini=x")
+        assert limits == {"o3": 2, "gpt-4o": 8}
+
+    def test_client_reused_per_credential(self):
+        """Test one warm client per API key"""
+        registry = OpenAIClientRegistry()
+
+        async def run():
+            a = registry.get_client("sk-test-a")
+            b = registry.get_client("sk-test-a")
+            c = registry.get_client("sk-test-b")
+            await registry.close()
+            return a, b, c
+
+        a, b, c = asyncio.run(run())
+        assert a is b
+        assert a is not c
+
+    def test_stale_client_is_closed(self):
+        """Test a client left over from another event loop is closed when replaced"""
+        registry = OpenAIClientRegistry()
+
+        async def first_loop():
+            return registry.get_client("sk-test-stale")
+
+        async def second_loop():
+            client = registry.get_client("sk-test-stale")
+            await asyncio.sleep(0)  # Let the scheduled close run
+            await registry.close()
+            return client
+
+        stale = asyncio.run(first_loop())
+        fresh = asyncio.run(second_loop())
+        assert stale is not fresh
+        assert stale.is_closed()
+
+    def test_model_slots_queue_locally(self):
+        """Test that bursts above the model limit wait instead of running"""
+        registry = OpenAIClientRegistry()
+        registry.model_limits = {"o3": 2}
+        peak = {"running": 0, "max": 0}
+
+        async def fake_call():
+            async with registry.model_slot("o3"):
+                peak["running"] += 1
+                peak["max"] = max(peak["max"], peak["running"])
+                await asyncio.sleep(0.01)
+                peak["running"] -= 1
+
+        async def run():
+            await asyncio.gather(*(fake_call() for _ in range(6)))
+            return registry.get_stats()["models"]["o3"]
+
+        stats = asyncio.run(run())
+        assert peak["max"] == 2
+        assert stats["total_calls"] == 6
+        assert stats["in_flight"] == 0 and stats["queued"] == 0
+        assert stats["max_wait_ms"] > 0
+
+    def test_model_timeout_overrides_request_timeout(self, monkeypatch):
+        """Test o3 gets its own timeout while other models keep the client default"""
+        monkeypatch.setenv("OPENAI_REQUEST_TIMEOUT", "30")
+        monkeypatch.delenv("OPENAI_MODEL_TIMEOUT", raising=False)
+        registry = OpenAIClientRegistry()
+
+        assert registry.timeout == 30
+        assert registry._request_options("o3", {})["timeout"] == 600
+        assert registry._request_options("gpt-4o", {})["timeout"] == 600
+        assert "timeout" not in registry._request_options("gpt-4o-mini", {})
+        assert registry._request_options("o3", {"timeout": 5})["timeout"] == 5
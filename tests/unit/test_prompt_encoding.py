@@ -0,0 +1,125 @@
+"""
+Unit tests for compact prompt serialization and token budgets
+"""
+import pytest
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.llm.prompt_encoding import (
+    PromptBudget, TimelineEncoder, count_tokens, get_timeline_encoder, register_timeline_encoder,
+    TIMELINE_ENCODERS
+)
+from shared_libs.utils.energy_timeline import get_timeline_engine
+
+
+def make_timeline():
+    engine = get_timeline_engine(15)
+    energy, zones = engine.baseline()
+    return engine.to_slots(energy[0], zones[0])
+
+
+class TestTimelineEncoders:
+    """Test the built-in encoders"""
+
+    def test_rle_encodes_runs_with_energy_ranges(self):
+        """Test contiguous zones collapse to one line with end-exclusive times"""
+        lines = get_timeline_encoder("rle").encode(make_timeline()).splitlines()
+
+        assert lines[0] == "00:00-07:00 recovery 25-28"
+        assert lines[1] == "07:00-10:00 peak 75-81"
+        assert lines[-1] == "21:00-24:00 recovery 25-38"
+        assert len(lines) == 7
+
+    def test_rle_is_far_smaller_than_json(self):
+        """Test the compact encoding is a small fraction of the JSON dump"""
+        timeline = make_timeline()
+        rle_tokens = count_tokens(get_timeline_encoder("rle").encode(timeline))
+        json_tokens = count_tokens(get_timeline_encoder("json").encode(timeline))
+        assert rle_tokens * 10 < json_tokens
+
+    def test_csv_and_summary(self):
+        """Test the CSV encoder keeps every slot and summary keeps totals only"""
+        timeline = make_timeline()
+        csv_rows = get_timeline_encoder("csv").encode(timeline).splitlines()
+        assert len(csv_rows) == 97
+        assert csv_rows[29] == "07:00,75,peak"
+        assert "peak 180 min" in get_timeline_encoder("summary").encode(timeline)
+
+    def test_custom_encoder_registration(self, monkeypatch):
+        """Test encoders are pluggable and selectable via PROMPT_TIMELINE_ENCODING"""
+        class ZonesOnlyEncoder(TimelineEncoder):
+            name = "zones_only"
+
+            def encode(self, timeline):
+                return " ".join(slot["zone"][0] for slot in timeline)
+
+        register_timeline_encoder(ZonesOnlyEncoder())
+        try:
+            monkeypatch.setenv("PROMPT_TIMELINE_ENCODING", "zones_only")
+            assert get_timeline_encoder().name == "zones_only"
+        finally:
+            TIMELINE_ENCODERS.pop("zones_only", None)
+
+    def test_unknown_encoder_falls_back_to_rle(self):
+        """Test an unknown encoder name does not break prompt building"""
+        assert get_timeline_encoder("nope").name == "rle"
+
+
+class TestPromptBudget:
+    """Test per-section token accounting"""
+
+    def test_sections_and_remainder(self):
+        """Test sections are measured and the remainder excludes measured parts"""
+        budget = PromptBudget("test_prompt")
+        context = "User context with a few words"
+        budget.add("context", context)
+        full = f"{context}\nPlease generate the plan now."
+        budget.add_remainder("instructions", full, ["context"])
+
+        assert budget.sections["context"] == count_tokens(context)
+        assert budget.sections["instructions"] == count_tokens(full) - count_tokens(context)
+        assert budget.total == sum(budget.sections.values())
+
+    def test_timeline_over_cap_falls_back_to_summary(self):
+        """Test encode_timeline degrades to the summary encoder past the cap"""
+        timeline = make_timeline()
+        budget = PromptBudget("test_prompt", caps={"energy_timeline": 20})
+        encoder, text = budget.encode_timeline(timeline, encoder=get_timeline_encoder("csv"))
+
+        assert encoder.name == "summary"
+        assert budget.sections["energy_timeline"] == count_tokens(text) <= 20
+
+    def test_timeline_under_cap_keeps_encoder(self):
+        """Test the preferred encoder is kept when it fits"""
+        budget = PromptBudget("test_prompt", caps={"energy_timeline": 1500})
+        encoder, _ = budget.encode_timeline(make_timeline())
+        assert encoder.name == "rle"
+
+
+class TestCountTokens:
+    """Test the tokenizer fallback"""
+
+    def test_unloadable_encoding_falls_back_once(self, monkeypatch):
+        """Test a failing tiktoken load approximates and is not retried per call"""
+        import types
+        from shared_libs.llm import prompt_encoding
+
+        calls = []
+
+        def encoding_for_model(model):
+            calls.append(model)
+            raise OSError("cannot download BPE file")
+
+        fake = types.SimpleNamespace(encoding_for_model=encoding_for_model, get_encoding=encoding_for_model)
+        monkeypatch.setattr(prompt_encoding, "tiktoken", fake, raising=False)
+        monkeypatch.setattr(prompt_encoding, "TIKTOKEN_AVAILABLE", True)
+        monkeypatch.setattr(prompt_encoding, "_encodings", {})
+
+        text = "Energy 85 at 08:00"
+        expected = len(prompt_encoding._APPROX_TOKEN_PATTERN.findall(text))
+        assert count_tokens(text, model="test-model") == expected
+        assert count_tokens(text, model="test-model") == expected
+        assert calls == ["test-model"]
@@ -0,0 +1,135 @@
+"""
+Unit tests for GCRA rate limiting in HolisticRateLimiter
+"""
+import asyncio
+import pytest
+import sys
+import os
+
+from fastapi import HTTPException, Request
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.rate_limiting.rate_limiter import HolisticRateLimiter, InMemoryGCRA, parse_rate_limit
+
+
+def make_request(user_id):
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": [],
+                    "path_params": {"user_id": user_id}})
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    return HolisticRateLimiter()
+
+
+class TestParseRateLimit:
+    """Test limit strings are parsed into counts and windows"""
+
+    def test_parse(self):
+        """Test units, plurals and multipliers"""
+        limit = parse_rate_limit("3/hour")
+        assert (limit.count, limit.window_seconds, limit.emission_interval) == (3, 3600, 1200)
+        assert parse_rate_limit("10/5minutes").window_seconds == 300
+        assert parse_rate_limit("2/day").window_seconds == 86400
+
+    def test_invalid(self):
+        """Test malformed limits are rejected"""
+        for text in ("3", "x/hour", "0/hour", "3/fortnight"):
+            with pytest.raises(ValueError):
+                parse_rate_limit(text)
+
+
+class TestInMemoryGCRA:
+    """Test burst, spacing and expiry of the in-memory GCRA"""
+
+    def test_burst_then_spacing(self):
+        """Test N requests pass as a burst, then one per window/N"""
+        gcra, limit = InMemoryGCRA(), parse_rate_limit("3/hour")
+        decisions = [gcra.check("user-1:routine", limit, now=1000.0) for _ in range(4)]
+
+        assert [d.allowed for d in decisions] == [True, True, True, False]
+        assert [d.remaining for d in decisions[:3]] == [2, 1, 0]
+        assert decisions[3].retry_after == pytest.approx(1200)
+
+        assert not gcra.check("user-1:routine", limit, now=2199.0).allowed
+        assert gcra.check("user-1:routine", limit, now=2200.0).allowed
+        assert gcra.check("user-2:routine", limit, now=2200.0).allowed  # Keys are independent
+
+    def test_lapsed_keys_are_dropped(self):
+        """Test keys leave memory once their window lapses, without scanning all keys"""
+        gcra, limit = InMemoryGCRA(), parse_rate_limit("10/minute")
+        for i in range(1000):
+            gcra.check(f"user-{i}", limit, now=0.0)
+        gcra.check("user-0", limit, now=5.0)
+        assert len(gcra) == 1000
+
+        gcra.check("late", limit, now=7.0)
+        assert len(gcra) == 2  # user-0 was used again at 5.0, so it is still active
+        gcra.check("later", limit, now=20.0)
+        assert len(gcra) == 1
+        assert gcra.check("user-0", limit, now=20.0).remaining == 9  # Full burst again
+
+
+class TestHolisticRateLimiter:
+    """Test apply_rate_limit and the Redis path"""
+
+    def test_apply_rate_limit_blocks(self, limiter):
+        """Test the tier limit is enforced with an accurate Retry-After"""
+        async def run():
+            for _ in range(3):  # Free tier: behavior_analysis 3/hour
+                await limiter.apply_rate_limit(make_request("user-1"), "behavior_analysis")
+            with pytest.raises(HTTPException) as exc_info:
+                await limiter.apply_rate_limit(make_request("user-1"), "behavior_analysis")
+            await limiter.apply_rate_limit(make_request("premium_user"), "behavior_analysis")
+            return exc_info.value
+
+        error = asyncio.run(run())
+        assert error.status_code == 429
+        assert error.detail["limit"] == "3/hour"
+        assert 1190 <= error.detail["retry_after"] <= 1200
+        assert error.headers["Retry-After"] == str(error.detail["retry_after"])
+
+    def test_cost_limit_raises_402(self, limiter):
+        """Test an exhausted budget is refused with an HTTPException the endpoints re-raise"""
+        async def refuse(user_id, endpoint_type, estimated_cost=None):
+            return {"within_limits": False, "daily_cost": 1.0, "daily_limit": 1.0,
+                    "monthly_cost": 1.0, "monthly_limit": 10.0, "reserved": False}
+        limiter.reserve_cost = refuse
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(limiter.apply_rate_limit(make_request("user-1"), "behavior_analysis"))
+        assert exc_info.value.status_code == 402
+        assert exc_info.value.detail["daily_limit"] == 1.0
+
+    def test_redis_script_result_and_fallback(self, limiter):
+        """Test the Lua result is decoded, and a failing Redis falls back to memory"""
+        calls = []
+
+        class FakeRedis:
+            def __init__(self, result):
+                self.result = result
+
+            def register_script(self, script):
+                async def run(keys, args):
+                    calls.append((keys, args))
+                    if isinstance(self.result, Exception):
+                        raise self.result
+                    return self.result
+                return run
+
+        async def check(client):
+            limiter._gcra_script = None
+            async def pool():
+                return client
+            limiter._get_redis_pool = pool
+            return await limiter.check_rate_limit("user-1", "general_api")
+
+        denied = asyncio.run(check(FakeRedis([0, 0, "42.5"])))
+        assert not denied.allowed and denied.retry_after == 42.5
+        assert calls[0] == (["ratelimit:user-1:general_api"], [120.0, 3600.0])
+
+        fallback = asyncio.run(check(FakeRedis(ConnectionError("redis down"))))
+        assert fallback.allowed and fallback.remaining == 29
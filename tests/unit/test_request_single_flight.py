@@ -0,0 +1,144 @@
+"""
+Unit tests for single-flight coordination of shared analyses
+"""
+import asyncio
+import pytest
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from services.request_deduplication_service import RequestDeduplicationService, SingleFlight
+
+
+class TestSingleFlight:
+    """Test that concurrent callers share one execution"""
+
+    def test_concurrent_callers_share_one_execution(self):
+        """Test N concurrent callers trigger exactly one underlying call"""
+        flight = SingleFlight()
+        calls = {"count": 0}
+
+        async def work():
+            calls["count"] += 1
+            await asyncio.sleep(0.02)
+            return {"analysis": "done"}
+
+        async def run():
+            return await asyncio.gather(*(flight.do("user_a", work) for _ in range(10)))
+
+        results = asyncio.run(run())
+        assert calls["count"] == 1
+        assert all(result is results[0] for result in results)
+        assert len(flight) == 0
+        assert flight.shared_waits == 9
+
+    def test_exception_propagates_to_all_callers(self):
+        """Test every waiter receives the leader's exception and the key is released"""
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("openai down")
+
+        async def run():
+            return await asyncio.gather(*(flight.do("k", failing) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert not flight.in_flight("k")
+
+    def test_cancelled_caller_does_not_cancel_shared_work(self):
+        """Test a disconnecting caller leaves the execution running for others"""
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.03)
+            return "ok"
+
+        async def run():
+            first = asyncio.ensure_future(flight.do("k", work))
+            second = asyncio.ensure_future(flight.do("k", work))
+            await asyncio.sleep(0.005)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(run()) == "ok"
+
+
+class TestRunSingleFlight:
+    """Test the deduplicator's shared-analysis entry point"""
+
+    def test_uncacheable_results_are_not_reused(self):
+        """Test skipped results release the key and are recomputed next time"""
+        service = RequestDeduplicationService()
+        calls = {"count": 0}
+
+        async def skipped():
+            calls["count"] += 1
+            return {"status": "skipped"}
+
+        async def run():
+            for _ in range(2):
+                await service.run_single_flight(
+                    "user_a", "foundation_builder", "circadian_analysis", skipped,
+                    cacheable=lambda r: r.get("status") != "skipped"
+                )
+
+        asyncio.run(run())
+        assert calls["count"] == 2
+        assert service.get_coordination_stats()["in_progress"] == 0
+        assert service.get_active_requests_count() == 0
+
+    def test_completed_result_cached_unless_bypassed(self):
+        """Test completed results are reused and force refresh bypasses them"""
+        service = RequestDeduplicationService()
+        calls = {"count": 0}
+
+        async def work():
+            calls["count"] += 1
+            return {"run": calls["count"]}
+
+        async def run():
+            first = await service.run_single_flight("u", "a", "behavior_analysis", work)
+            second = await service.run_single_flight("u", "a", "behavior_analysis", work)
+            forced = await service.run_single_flight("u", "a", "behavior_analysis", work, bypass_cache=True)
+            return first, second, forced
+
+        first, second, forced = asyncio.run(run())
+        assert first == second == {"run": 1}
+        assert forced == {"run": 2}
+
+    def test_forced_caller_does_not_join_unforced_run(self):
+        """Test force refresh starts its own run instead of sharing one that was not forced"""
+        service = RequestDeduplicationService()
+        calls = {"count": 0}
+
+        async def work():
+            calls["count"] += 1
+            run = calls["count"]
+            await asyncio.sleep(0.02)
+            return {"run": run}
+
+        async def run():
+            return await asyncio.gather(
+                service.run_single_flight("u", "a", "behavior_analysis", work),
+                service.run_single_flight("u", "a", "behavior_analysis", work),
+                service.run_single_flight("u", "a", "behavior_analysis", work, bypass_cache=True),
+            )
+
+        plain, joined, forced = asyncio.run(run())
+        assert plain == joined == {"run": 1}
+        assert forced == {"run": 2}
+
+    def test_errors_propagate(self):
+        """Test exceptions reach the caller and are not cached"""
+        service = RequestDeduplicationService()
+
+        async def failing():
+            raise ValueError("bad data")
+
+        with pytest.raises(ValueError):
+            asyncio.run(service.run_single_flight("u", "a", "behavior_analysis", failing))
+        assert service.get_coordination_stats()["cached_results"] == 0
@@ -0,0 +1,156 @@
+"""
+Unit tests for parallel Sahha fetching with adaptive rate control
+"""
+import asyncio
+import pytest
+import sys
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from services.sahha import sahha_client as sahha_module
+from services.sahha.rate_controller import AdaptiveRateController, parse_retry_after
+
+
+class StubSahha:
+    """In-process stub of the Sahha API: fixed latency, optional 429s"""
+
+    def __init__(self, latency: float = 0.1, throttle_first: int = 0, retry_after: str = "0.3",
+                 failing_categories: tuple = ()):
+        self.latency = latency
+        self.failing_categories = failing_categories
+        self.throttle_first = throttle_first
+        self.retry_after = retry_after
+        self.started = []
+        self.throttled_at = []
+        self.active = 0
+        self.max_active = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/oauth/account/token"):
+            return httpx.Response(200, json={"accountToken": "token"})
+
+        self.started.append(time.monotonic())
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+
+        if len(self.started) <= self.throttle_first:
+            self.throttled_at.append(time.monotonic())
+            return httpx.Response(429, headers={"Retry-After": self.retry_after})
+
+        params = request.url.params
+        category = params.get("categories", "score")
+        if category in self.failing_categories:
+            return httpx.Response(500, text="upstream error")
+        return httpx.Response(200, json=[{"category": category, "startDateTime": params.get("startDateTime")}])
+
+
+def make_client(monkeypatch, stub: StubSahha, rps: float = 100, burst: int = 10, concurrency: int = 4):
+    monkeypatch.setenv("SAHHA_RATE_LIMIT_RPS", str(rps))
+    monkeypatch.setenv("SAHHA_RATE_LIMIT_BURST", str(burst))
+    monkeypatch.setenv("SAHHA_MAX_CONCURRENCY", str(concurrency))
+    monkeypatch.setenv("SAHHA_FETCH_WINDOW_DAYS", "7")
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(stub.handler))
+    monkeypatch.setattr(sahha_module, "get_http_client", lambda base_url, timeout=None: http_client)
+    return sahha_module.SahhaClient()
+
+
+class TestParallelFetch:
+    """Test concurrent category/window fetching"""
+
+    def test_categories_and_windows_fetched_concurrently(self, monkeypatch):
+        """Test 3 categories x 2 windows finish in about two round trips, in order"""
+        stub = StubSahha(latency=0.1)
+        client = make_client(monkeypatch, stub)
+
+        start = time.monotonic()
+        biomarkers = asyncio.run(client.fetch_biomarkers("user-1", days=14))
+        elapsed = time.monotonic() - start
+
+        assert len(biomarkers) == 6
+        assert [b["category"] for b in biomarkers] == ["activity", "activity", "sleep", "sleep", "vitals", "vitals"]
+        assert stub.max_active == 4
+        assert elapsed < 0.45  # Sequential with the old 0.5s sleep took > 3.5s
+
+    def test_sustained_rate_is_respected(self, monkeypatch):
+        """Test requests beyond the burst are spaced at the configured rate"""
+        stub = StubSahha(latency=0.01)
+        client = make_client(monkeypatch, stub, rps=10, burst=2, concurrency=8)
+
+        asyncio.run(client.fetch_biomarkers("user-1", days=21, categories=["sleep", "activity"]))
+
+        assert len(stub.started) == 6
+        # 2 immediate, then 4 more at 10 req/s
+        assert stub.started[-1] - stub.started[0] >= 0.35
+
+
+    def test_failed_windows_are_reported(self, monkeypatch):
+        """Test a category or scores fetch that fails is listed as incomplete, not just empty"""
+        stub = StubSahha(latency=0.01, failing_categories=("sleep", "score"))
+        client = make_client(monkeypatch, stub)
+
+        result = asyncio.run(client.fetch_health_data("user-1", days=14))
+        assert [b["category"] for b in result["biomarkers"]] == ["activity", "activity", "vitals", "vitals"]
+        assert result["incomplete_categories"] == ["scores", "sleep"]
+
+
+class TestRateLimitHandling:
+    """Test 429 / Retry-After handling"""
+
+    def test_429_pauses_all_requests_and_retries(self, monkeypatch):
+        """Test a 429 is retried after Retry-After and nothing is sent during the pause"""
+        stub = StubSahha(latency=0.05, throttle_first=1, retry_after="0.3")
+        client = make_client(monkeypatch, stub, concurrency=1)
+
+        biomarkers = asyncio.run(client.fetch_biomarkers("user-1", days=7))
+
+        assert len(biomarkers) == 3
+        assert len(stub.started) == 4
+        # The request after the 429 waited out the Retry-After
+        assert stub.started[1] - stub.throttled_at[0] >= 0.29
+        stats = client.rate_controller.get_stats()
+        assert stats["throttled"] == 1
+        assert stats["rate"] < stats["max_rate"]
+
+    def test_scores_retry_after_429(self, monkeypatch):
+        """Test score fetches are retried instead of returning nothing"""
+        stub = StubSahha(latency=0.01, throttle_first=1, retry_after="0.1")
+        client = make_client(monkeypatch, stub)
+
+        scores = asyncio.run(client.fetch_scores("user-1"))
+        assert len(scores) == 1
+
+
+class TestRateController:
+    """Test the token bucket and Retry-After parsing"""
+
+    def test_parse_retry_after(self):
+        """Test delta-seconds, HTTP dates, caps and junk"""
+        assert parse_retry_after("5") == 5
+        assert parse_retry_after("600") == 60
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+        future = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+        assert 28 <= parse_retry_after(future) <= 30
+
+    def test_aimd(self):
+        """Test rate halves on throttle and recovers additively to the maximum"""
+        controller = AdaptiveRateController(rate=10, burst=1)
+        controller.on_throttle()
+        assert controller.rate == 5
+        for _ in range(3):
+            controller.on_success()
+        assert controller.rate == 8
+        for _ in range(10):
+            controller.on_success()
+        assert controller.rate == 10
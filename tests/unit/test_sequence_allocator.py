@@ -0,0 +1,124 @@
+"""
+Unit tests for the file-locked sequence allocator behind MVP analysis numbers
+"""
+
+import multiprocessing
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.utils.sequence_allocator import SequenceAllocator
+
+
+def _allocate_many(path: str, block_size: int, count: int, results):
+    allocator = SequenceAllocator(path, block_size=block_size)
+    results.put([allocator.next() for _ in range(count)])
+
+
+class TestSequenceAllocator:
+    """Persisted, lock-protected numbering"""
+
+    def test_numbers_continue_across_instances(self, tmp_path):
+        """A new allocator (e.g. after a restart) continues from the counter file"""
+        path = str(tmp_path / ".seq")
+        first = SequenceAllocator(path)
+        assert [first.next() for _ in range(3)] == [1, 2, 3]
+        assert [SequenceAllocator(path).next() for _ in range(2)] == [4, 5]
+
+    def test_seed_only_used_for_new_counter(self, tmp_path):
+        """The seed (old directory scan) runs once, when the counter file is missing"""
+        calls = []
+
+        def seed():
+            calls.append(1)
+            return 41
+
+        path = str(tmp_path / ".seq")
+        assert SequenceAllocator(path, seed=seed).next() == 42
+        assert SequenceAllocator(path, seed=seed).next() == 43
+        assert len(calls) == 1
+
+    def test_block_reservation_serves_from_memory(self, tmp_path):
+        """With a block size, only one file update happens per block"""
+        path = str(tmp_path / ".seq")
+        allocator = SequenceAllocator(path, block_size=10)
+        assert [allocator.next() for _ in range(25)] == list(range(1, 26))
+        assert allocator.file_updates == 3
+        # Another worker starts after the reserved range
+        assert SequenceAllocator(path).next() == 31
+
+    def test_counter_replaced_atomically(self, tmp_path, monkeypatch):
+        """A crash before the rename leaves the previous value, not an empty file"""
+        path = str(tmp_path / ".seq")
+        allocator = SequenceAllocator(path)
+        assert allocator.next() == 1
+
+        def crash(src, dst):
+            raise OSError("killed mid-update")
+
+        monkeypatch.setattr(os, "replace", crash)
+        try:
+            SequenceAllocator(path).next()
+        except OSError:
+            pass
+        monkeypatch.undo()
+
+        with open(path, encoding="utf-8") as f:
+            assert f.read() == "1"
+        assert SequenceAllocator(path, seed=lambda: 0).next() == 2
+
+    def test_concurrent_processes_get_unique_numbers(self, tmp_path):
+        """Workers sharing the counter file never receive the same number"""
+        path = str(tmp_path / ".seq")
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        workers = [
+            context.Process(target=_allocate_many, args=(path, block_size, 200, results))
+            for block_size in (1, 1, 7, 7)
+        ]
+        for worker in workers:
+            worker.start()
+        numbers = [n for _ in workers for n in results.get(timeout=30)]
+        for worker in workers:
+            worker.join(10)
+
+        assert len(numbers) == 800
+        assert len(set(numbers)) == 800
+
+
+class TestMVPLoggerAnalysisNumbers:
+    """MVPStyleLogger numbering"""
+
+    def test_continues_after_existing_logs(self, tmp_path, monkeypatch):
+        """Existing input_N.txt files seed the counter; later calls never rescan"""
+        monkeypatch.chdir(tmp_path)  # The module-level singleton creates ./logs
+        from services.mvp_style_logger import MVPStyleLogger
+
+        logs_dir = tmp_path / "mvp"
+        logs_dir.mkdir()
+        for number in (3, 17, 9):
+            (logs_dir / f"input_{number}.txt").write_text("{}")
+
+        mvp = MVPStyleLogger(logs_dir=str(logs_dir))
+        assert mvp.get_next_analysis_number() == 18
+        (logs_dir / "input_500.txt").write_text("{}")
+        assert mvp.get_next_analysis_number() == 19
+        assert MVPStyleLogger(logs_dir=str(logs_dir)).get_next_analysis_number() == 20
+
+    def test_reseeds_from_jsonl_segments(self, tmp_path, monkeypatch):
+        """With the jsonl sink there are no input_N.txt files; the segment's records seed the counter"""
+        monkeypatch.chdir(tmp_path)
+        import gzip
+        import json
+        from services.mvp_style_logger import MVPStyleLogger
+
+        logs_dir = tmp_path / "mvp"
+        logs_dir.mkdir()
+        (logs_dir / "input.jsonl.1.gz").write_bytes(
+            gzip.compress(json.dumps({"file": "input_40.txt", "analysis_number": 40}).encode() + b"\n")
+        )
+        lines = [json.dumps({"file": f"input_{n}.txt", "analysis_number": n}) for n in (41, 43, 42)]
+        (logs_dir / "input.jsonl").write_text("\n".join(lines) + '\n{"file": "input_44')  # Torn last line
+
+        assert MVPStyleLogger(logs_dir=str(logs_dir)).get_next_analysis_number() == 44
@@ -0,0 +1,128 @@
+"""
+Unit tests for incremental (streaming) plan parsers
+"""
+import asyncio
+import json
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from services.parsers.json_parser import JsonPlanParser
+from services.parsers.markdown_parser import MarkdownPlanParser
+from services.parsers.streaming_parser import (
+    IncrementalPlanParser, IncrementalMarkdownPlanParser, serialize_block_event
+)
+from services.plan_streaming_service import PlanEventStream
+
+ANALYSIS = {"id": "plan1", "archetype": "Foundation Builder"}
+
+JSON_PLAN = json.dumps({
+    "time_blocks": [
+        {
+            "block_name": "Morning Block",
+            "start_time": "06:00 AM",
+            "end_time": "09:00 AM",
+            "purpose": "Gentle activation {with braces} and \"quotes\"",
+            "tasks": [
+                {"start_time": "06:00 AM", "end_time": "06:30 AM", "title": "Hydrate", "priority": "high"},
+                {"start_time": "06:30 AM", "end_time": "07:00 AM", "title": "Stretch [light]"},
+            ]
+        },
+        {
+            "block_name": "Peak Energy Block",
+            "start_time": "09:00 AM",
+            "end_time": "12:00 PM",
+            "purpose": "Deep work",
+            "tasks": [{"start_time": "09:00 AM", "end_time": "11:00 AM", "title": "Focus session"}]
+        }
+    ]
+}, indent=2)
+
+MARKDOWN_PLAN = """# Plan
+
+**6:00 AM - 9:00 AM: Maintenance Zone**
+- **6:00 AM - 6:30 AM:** Wake-up and hydration. Start with water.
+- **6:30 AM - 7:00 AM:** Stretching. Light mobility.
+
+**9:00 AM - 12:00 PM: Peak Zone**
+- **9:00 AM - 11:00 AM:** Deep work. Hardest task first.
+"""
+
+
+def _stream(parser, text, chunk_size):
+    events = []
+    for i in range(0, len(text), chunk_size):
+        events.extend(parser.feed(text[i:i + chunk_size]))
+    return events, parser.finish()
+
+
+class TestIncrementalJsonPlanParser:
+    """Test JSON blocks are emitted as their objects close"""
+
+    def test_matches_batch_parser_for_any_chunking(self):
+        """Test streamed blocks/tasks equal JsonPlanParser output regardless of chunk size"""
+        expected = JsonPlanParser().parse(JSON_PLAN, ANALYSIS)
+        for chunk_size in (1, 3, 17, len(JSON_PLAN)):
+            events, tail = _stream(IncrementalPlanParser(ANALYSIS), JSON_PLAN, chunk_size)
+            assert tail == []
+            assert [e['time_block'] for e in events] == expected['time_blocks']
+            assert [t for e in events for t in e['tasks']] == expected['tasks']
+
+    def test_first_block_emitted_before_stream_ends(self):
+        """Test the first block is available as soon as its object closes"""
+        parser = IncrementalPlanParser(ANALYSIS)
+        first_close = JSON_PLAN.index('"Peak Energy Block"')
+        events = parser.feed(JSON_PLAN[:first_close])
+        assert len(events) == 1
+        assert events[0]['time_block'].block_id == "plan1_block_1"
+        assert len(events[0]['tasks']) == 2
+
+
+class TestIncrementalMarkdownPlanParser:
+    """Test markdown blocks are emitted when the next header arrives"""
+
+    def test_matches_batch_parser(self):
+        """Test streamed markdown blocks/tasks equal MarkdownPlanParser output"""
+        expected = MarkdownPlanParser().parse(MARKDOWN_PLAN, ANALYSIS)
+        events, tail = _stream(IncrementalMarkdownPlanParser(ANALYSIS), MARKDOWN_PLAN, 7)
+        events += tail
+        assert [e['time_block'] for e in events] == expected['time_blocks']
+        assert [t for e in events for t in e['tasks']] == expected['tasks']
+
+    def test_last_block_waits_for_finish(self):
+        """Test the open block is only flushed by finish()"""
+        parser = IncrementalPlanParser(ANALYSIS)
+        events = parser.feed(MARKDOWN_PLAN)
+        assert len(events) == 1
+        tail = parser.finish()
+        assert [e['time_block'].block_order for e in tail] == [2]
+
+    def test_serialized_event_is_json_safe(self):
+        """Test time fields are rendered as HH:MM strings"""
+        events, tail = _stream(IncrementalPlanParser(ANALYSIS), MARKDOWN_PLAN, 50)
+        payload = serialize_block_event((events + tail)[0])
+        assert payload['tasks'][0]['scheduled_time'] == "06:00"
+        json.dumps(payload)
+
+
+class TestPlanEventStream:
+    """Test SSE framing of plan events"""
+
+    def test_serve_yields_events_until_closed(self):
+        """Test events are framed in order and the producer completes"""
+        stream = PlanEventStream()
+
+        async def producer():
+            await stream.emit("status", {"stage": "generating"})
+            await stream.emit("time_block", {"time_block": {"block_id": "b1"}, "tasks": []})
+            await stream.close()
+
+        async def run():
+            return [frame async for frame in stream.serve(producer())]
+
+        frames = asyncio.run(run())
+        assert frames[0].startswith("event: status\n")
+        assert frames[1] == 'event: time_block\ndata: {"time_block": {"block_id": "b1"}, "tasks": []}\n\n'
+        assert stream.blocks_sent == 1
@@ -0,0 +1,71 @@
+"""
+Unit tests for the non-blocking Supabase executor
+"""
+import asyncio
+import time
+import pytest
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.supabase_client.async_executor import execute_async, get_executor_stats
+
+
+class _BlockingQuery:
+    def __init__(self, result=None, error=None, seconds=0.0):
+        self.result = result
+        self.error = error
+        self.seconds = seconds
+
+    def execute(self):
+        time.sleep(self.seconds)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+class TestExecuteAsync:
+    """Test that builder execution is moved off the event loop"""
+
+    def test_returns_execute_result(self):
+        """Test the builder's response is passed through unchanged"""
+        result = asyncio.run(execute_async(_BlockingQuery(result={"data": [1]})))
+        assert result == {"data": [1]}
+
+    def test_propagates_errors(self):
+        """Test exceptions from .execute() reach the caller"""
+        with pytest.raises(RuntimeError):
+            asyncio.run(execute_async(_BlockingQuery(error=RuntimeError("boom"))))
+
+    def test_event_loop_not_blocked(self):
+        """Test other coroutines keep running while a slow query executes"""
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(execute_async(_BlockingQuery(seconds=0.2)), ticker())
+
+        start = time.perf_counter()
+        asyncio.run(run())
+        assert ticks[-1] - start < 0.15
+        assert get_executor_stats()["in_flight"] == 0
+
+    def test_stats_are_exact_under_concurrency(self):
+        """Test counters updated from many executor threads lose no updates"""
+        before = get_executor_stats()
+
+        async def run():
+            queries = [_BlockingQuery(error=RuntimeError("boom") if i % 2 else None) for i in range(200)]
+            await asyncio.gather(*(execute_async(query) for query in queries), return_exceptions=True)
+
+        asyncio.run(run())
+        after = get_executor_stats()
+        assert after["queries"] - before["queries"] == 200
+        assert after["errors"] - before["errors"] == 100
+        assert after["in_flight"] == 0
@@ -0,0 +1,299 @@
+"""
+Unit tests for the two-tier (L1 + Redis L2) cache
+"""
+import asyncio
+import pickle
+import pytest
+import sys
+import os
+from datetime import datetime, timezone
+
+from pydantic import BaseModel
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from shared_libs.caching import tiered_cache
+from shared_libs.caching.tiered_cache import TieredCache, decode_value, encode_value
+from shared_libs.data_models.health_models import create_health_context_from_raw_data
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis.asyncio commands TieredCache uses"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, b"0")) + 1).encode()
+        return int(self.data[key])
+
+    async def delete(self, key):
+        return 1 if self.data.pop(key, None) is not None else 0
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+
+def worker(namespace, redis, **kwargs):
+    """One TieredCache per simulated worker process, sharing a Redis"""
+    kwargs.setdefault("version_ttl_seconds", 0)
+    return TieredCache(namespace, redis_client=redis, **kwargs)
+
+
+def counting_loader(calls, value, delay=0.0):
+    async def load():
+        calls.append(value)
+        await asyncio.sleep(delay)
+        return value
+    return load
+
+
+class TestTieredCache:
+    """Test L1/L2 lookups, stampede protection and versioned invalidation"""
+
+    def test_l2_shared_between_workers(self):
+        """Test a value loaded by one worker is an L2 hit for another, then an L1 hit"""
+        redis = FakeRedis()
+        first, second = worker("test_shared", redis), worker("test_shared", redis)
+        calls = []
+
+        async def run():
+            loaded = await first.get_or_load("7days", counting_loader(calls, {"scores": [1]}), scope="user-1")
+            from_l2 = await second.get_or_load("7days", counting_loader(calls, {"scores": [2]}), scope="user-1")
+            from_l1 = await second.get("7days", scope="user-1")
+            return loaded, from_l2, from_l1
+
+        loaded, from_l2, from_l1 = asyncio.run(run())
+        assert loaded == from_l2 == from_l1 == {"scores": [1]}
+        assert calls == [{"scores": [1]}]
+        assert second.get_stats()["l2_hits"] == 1 and second.get_stats()["l1_hits"] == 1
+
+    def test_concurrent_misses_load_once(self):
+        """Test concurrent misses in one worker share a single loader call"""
+        cache = worker("test_stampede", FakeRedis())
+        calls = []
+        loader = counting_loader(calls, "value", delay=0.05)
+
+        async def run():
+            return await asyncio.gather(*[cache.get_or_load("key", loader, scope="user-1") for _ in range(20)])
+
+        assert asyncio.run(run()) == ["value"] * 20
+        assert len(calls) == 1
+
+    def test_cross_worker_lock_waits_for_fill(self):
+        """Test a worker that loses the Redis lock waits for the holder's value"""
+        redis = FakeRedis()
+        first = worker("test_lock", redis)
+        second = worker("test_lock", redis, lock_poll_interval=0.01)
+        calls = []
+
+        async def run():
+            return await asyncio.gather(
+                first.get_or_load("key", counting_loader(calls, "first", delay=0.1), scope="user-1"),
+                second.get_or_load("key", counting_loader(calls, "second", delay=0.1), scope="user-1"),
+            )
+
+        assert asyncio.run(run()) == ["first", "first"]
+        assert calls == ["first"]
+        assert second.get_stats()["lock_waits"] == 1
+        assert not any(key.endswith(":lock") for key in redis.data)
+
+    def test_invalidate_reaches_other_workers(self):
+        """Test invalidating a scope on one worker makes every worker reload it"""
+        redis = FakeRedis()
+        first, second = worker("test_invalidate", redis), worker("test_invalidate", redis)
+        calls = []
+
+        async def run():
+            await second.get_or_load("key", counting_loader(calls, "old"), scope="user-1")
+            await second.get_or_load("key", counting_loader(calls, "other"), scope="user-2")
+            await first.invalidate("user-1")
+            return (await second.get_or_load("key", counting_loader(calls, "new"), scope="user-1"),
+                    await second.get_or_load("key", counting_loader(calls, "unused"), scope="user-2"))
+
+        assert asyncio.run(run()) == ("new", "other")
+        assert calls == ["old", "other", "new"]
+
+    def test_errors_and_none_not_cached(self):
+        """Test loader failures propagate and neither errors nor None are cached"""
+        cache = worker("test_errors", FakeRedis())
+
+        async def broken():
+            raise RuntimeError("api down")
+
+        async def run():
+            with pytest.raises(RuntimeError):
+                await cache.get_or_load("key", broken, scope="user-1")
+            assert await cache.get_or_load("key", counting_loader([], None), scope="user-1") is None
+            return await cache.get_or_load("key", counting_loader([], "ok"), scope="user-1")
+
+        assert asyncio.run(run()) == "ok"
+        assert cache.get_stats()["load_errors"] == 1
+
+    def test_l1_only_without_redis(self, monkeypatch):
+        """Test the cache works in-process when no Redis is configured"""
+        monkeypatch.delenv("REDIS_URL", raising=False)
+        monkeypatch.setattr(tiered_cache, "_redis_client", None)
+        cache = TieredCache("test_l1_only")
+        calls = []
+
+        async def run():
+            await cache.get_or_load("key", counting_loader(calls, [1, 2]), scope="user-1")
+            value = await cache.get_or_load("key", counting_loader(calls, [3]), scope="user-1")
+            await cache.invalidate("user-1")
+            return value, await cache.get("key", scope="user-1")
+
+        assert asyncio.run(run()) == ([1, 2], None)
+        assert calls == [[1, 2]]
+        assert cache.get_stats()["l2_enabled"] is False
+
+    def test_redis_errors_fall_back_to_l1(self):
+        """Test a failing Redis degrades to loader + L1 instead of raising"""
+        class BrokenRedis(FakeRedis):
+            async def get(self, key):
+                raise ConnectionError("redis down")
+
+        redis = BrokenRedis()
+        cache = worker("test_broken_redis", redis)
+        calls = []
+
+        async def run():
+            first = await cache.get_or_load("key", counting_loader(calls, "value"), scope="user-1")
+            second = await cache.get_or_load("key", counting_loader(calls, "again"), scope="user-1")
+            return first, second
+
+        assert asyncio.run(run()) == ("value", "value")
+        assert calls == ["value"]
+        assert cache.get_stats()["l2_errors"] == 1
+
+    def test_encoding_compresses_large_values(self):
+        """Test values round-trip and large payloads are compressed"""
+        small = {"score": 0.8}
+        large = {"biomarkers": [{"type": "sleep_duration", "value": 420}] * 500}
+
+        assert decode_value(encode_value(small)) == small
+        encoded = encode_value(large)
+        assert encoded[:1] == b"z"
+        assert decode_value(encoded) == large
+        assert len(encoded) < len(encode_value(large, compress_threshold=10 ** 9)) / 5
+
+    def test_models_and_datetimes_round_trip(self):
+        """Test registered pydantic models and datetimes decode to the same types"""
+        now = datetime(2026, 10, 16, 12, 0, tzinfo=timezone.utc)
+        context = create_health_context_from_raw_data(
+            user_id="user-1",
+            raw_scores=[{"id": "s1", "profile_id": "user-1", "type": "sleep", "score": 80,
+                         "score_date_time": now, "created_at": now, "updated_at": now}],
+            raw_biomarkers=[],
+            raw_archetypes=[],
+            days=7
+        )
+
+        decoded = decode_value(encode_value({"context": context, "synced_at": now}))
+        assert decoded["context"] == context
+        assert decoded["synced_at"] == now
+        assert isinstance(decoded["context"].scores[0].score_date_time, datetime)
+
+    def test_pickle_payloads_are_never_loaded(self):
+        """Test L2 data is parsed as JSON only; a planted pickle is a miss, not code"""
+        class Exploit:
+            def __reduce__(self):
+                return (exec, ("raise SystemExit('pickle was loaded')",))
+
+        with pytest.raises(ValueError):
+            decode_value(b"p" + pickle.dumps(Exploit()))
+
+        redis = FakeRedis()
+        cache = worker("test_pickle", redis)
+        calls = []
+
+        async def run():
+            full_key = await cache._key("key", "user-1")
+            redis.data[full_key] = b"z" + pickle.dumps(Exploit())
+            return await cache.get_or_load("key", counting_loader(calls, "fresh"), scope="user-1")
+
+        assert asyncio.run(run()) == "fresh"
+        assert calls == ["fresh"]
+
+    def test_unregistered_models_stay_in_l1(self):
+        """Test values JSON cannot carry are cached in L1 without touching L2"""
+        class Unregistered(BaseModel):
+            value: int
+
+        with pytest.raises(TypeError):
+            encode_value(Unregistered(value=1))
+
+        redis = FakeRedis()
+        cache = worker("test_unregistered", redis)
+
+        async def run():
+            await cache.get_or_load("key", counting_loader([], Unregistered(value=1)), scope="user-1")
+            return await cache.get("key", scope="user-1")
+
+        assert asyncio.run(run()) == Unregistered(value=1)
+        assert not any(key.endswith(":key") for key in redis.data)
+        assert cache.get_stats()["l2_errors"] == 0
+
+    def test_scope_versions_are_bounded(self, monkeypatch):
+        """Test remembered scope versions are capped and forgotten scopes never revive old L1 entries"""
+        monkeypatch.delenv("REDIS_URL", raising=False)
+        monkeypatch.setattr(tiered_cache, "_redis_client", None)
+        cache = TieredCache("test_scope_versions", max_scope_versions=3)
+        calls = []
+
+        async def run():
+            await cache.get_or_load("key", counting_loader(calls, "old"), scope="user-0")
+            await cache.invalidate("user-0")
+            await cache.invalidate("user-0")
+            for i in range(1, 5):
+                await cache.get("key", scope=f"user-{i}")
+            return await cache.get_or_load("key", counting_loader(calls, "new"), scope="user-0")
+
+        assert asyncio.run(run()) == "new"
+        assert len(cache._versions) == 3
+        assert calls == ["old", "new"]
+
+
+class TestNamespaceRegistry:
+    """Test the per-namespace cache registry"""
+
+    def test_invalidate_does_not_create_namespace(self, monkeypatch):
+        """Test invalidating an unused namespace bumps Redis without fixing its settings"""
+        redis = FakeRedis()
+        monkeypatch.setattr(tiered_cache, "_redis_client", redis)
+        monkeypatch.setattr(tiered_cache, "CACHE_L2_ENABLED", True)
+        monkeypatch.setattr(tiered_cache, "_tiered_caches", {})
+        monkeypatch.setattr(tiered_cache, "_tiered_cache_settings", {})
+
+        asyncio.run(tiered_cache.invalidate_cache_scope("test_registry", "user-1"))
+        assert "test_registry" not in tiered_cache._tiered_caches
+        assert redis.data[f"{tiered_cache._scope_base('test_registry', 'user-1')}:version"] == b"1"
+
+        cache = tiered_cache.get_tiered_cache("test_registry", l2_ttl_seconds=42)
+        assert cache.l2_ttl_seconds == 42
+        asyncio.run(tiered_cache.invalidate_cache_scope("test_registry", "user-1"))
+        assert cache._versions["user-1"][0] == 2
+
+    def test_conflicting_settings_warn(self, monkeypatch, caplog):
+        """Test a later call with different settings keeps the first ones and warns"""
+        monkeypatch.setattr(tiered_cache, "_tiered_caches", {})
+        monkeypatch.setattr(tiered_cache, "_tiered_cache_settings", {})
+
+        first = tiered_cache.get_tiered_cache("test_settings", l2_ttl_seconds=600)
+        with caplog.at_level("WARNING", logger=tiered_cache.logger.name):
+            assert tiered_cache.get_tiered_cache("test_settings", l2_ttl_seconds=600) is first
+            assert tiered_cache.get_tiered_cache("test_settings") is first
+            assert not caplog.records
+            assert tiered_cache.get_tiered_cache("test_settings", l2_ttl_seconds=60) is first
+        assert first.l2_ttl_seconds == 600
+        assert "ignoring" in caplog.text